@@ -1,19 +1,19 @@
 """Vérification rapide après indexation."""
 
-import pickle
 import os
 
+from rag_app.core.vector_database import VectorDatabase
+
 def check_mondial_indexed():
     """Vérifie si Mondial Tissus est maintenant indexé."""
     
-    db_path = 'data/docs/vector_db.pkl'
+    db_path = 'data/docs/vector_db'
     
-    if not os.path.exists(db_path):
+    if not os.path.exists(db_path) and not os.path.exists(db_path + '.pkl'):
         print("❌ Base vectorielle non trouvée après indexation")
         return
     
-    with open(db_path, 'rb') as f:
-        db = pickle.load(f)
+    db = VectorDatabase.load(db_path)
     
     print(f"📊 Total documents après indexation: {len(db.documents)}")
     
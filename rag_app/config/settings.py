@@ -9,7 +9,8 @@ MODELS_DIR = DATA_DIR / "models"
 
 # Configuration de la base de données
 KNOWLEDGE_BASE_FILE = DATA_DIR / "anthropic_docs.json"
-VECTOR_DB_FILE = DATA_DIR / "docs" / "vector_db.pkl"
+VECTOR_DB_FILE = DATA_DIR / "docs" / "vector_db.pkl"  # Ancien format pickle (migration)
+VECTOR_DB_DIR = DATA_DIR / "docs" / "vector_db"
 BACKUP_FILE = DATA_DIR / "anthropic_docs.json.backup"
 
 # Configuration Streamlit
@@ -34,7 +35,202 @@ VISION_CONFIG = {
 
 # Configuration de traitement
 PROCESSING_CONFIG = {
+    # Taille des passages indexés et recouvrement entre passages (en caractères)
     "max_chunk_size": 500,
     "chunk_overlap": 50,
-    "max_file_size_mb": 100
+    "max_file_size_mb": 100,
+    # Processus d'extraction parallèle (None : un par cœur, 1 : séquentiel)
+    "extraction_workers": None
+}
+
+# Extraction des PDF page par page
+PDF_CONFIG = {
+    # Nombre maximal de pages extraites par PDF (None : toutes), pour les gros scans
+    "max_pages": None,
+    # Les PDF d'au moins cette taille sont découpés en tranches de pages entre les workers
+    "split_min_size_mb": 1,
+    "pages_per_task": 50
+}
+
+# OCR des images (Tesseract)
+OCR_CONFIG = {
+    "lang": "fra+eng",
+    # Résolution visée et plus grand côté maximal avant binarisation (pas d'agrandissement)
+    "target_dpi": 300,
+    "max_dimension": 3500,
+    # Images reconnues par un même processus Tesseract dans le pool d'extraction
+    "batch_size": 8,
+    # Pré-analyse d'une miniature : les images sans texte ne passent pas par Tesseract
+    "precheck": True,
+    "precheck_size": 1024,
+    "precheck_min_components": 12
+}
+
+# Règles de classification par mots-clés
+CLASSIFICATION_CONFIG = {
+    # Catégories d'images selon le texte OCR (catégorie → mots-clés)
+    "image_categories": {
+        "Document financier": ["facture", "invoice", "total", "prix", "montant"],
+        "Document éducatif": ["certificat", "diplome", "formation", "université"],
+        "Document juridique": ["contrat", "accord", "signature", "conditions"],
+        "Communication": ["email", "mail", "message", "correspondance"]
+    },
+    # Questions de type liste : (expression, type de liste), la première qui correspond l'emporte
+    "list_requests": [
+        # Entreprises et candidatures
+        (r'(liste|énumère|cite|quelles?) .*entreprises?.*(postul|candidat|contact)', 'entreprises'),
+        (r'(où|quelles entreprises).*(j\'ai|ai).*(postul|candidat)', 'entreprises'),
+        (r'(liste|énumère|cite).*(candidatures|postulations|demandes)', 'candidatures'),
+        # Candidatures en cours spécifiquement
+        (r'(candidatures?).*(en cours|actuelles?|actives?)', 'candidatures_en_cours'),
+        (r'(quelles? sont mes).*(candidatures?).*(en cours)', 'candidatures_en_cours'),
+        (r'(suivi|status|état).*(candidatures?)', 'candidatures_en_cours'),
+        # Postes et emplois
+        (r'(liste|énumère|cite|quels?) .*postes?.*(demandé|postul|candidat)', 'postes'),
+        (r'(liste|énumère|cite|quels?) .*emplois?.*(cherch|postul|candidat)', 'postes'),
+        (r'(quels? types? de).*(postes?|emplois?|métiers?)', 'postes'),
+        # Compétences et technologies - distinguer "mes" compétences
+        (r'(mes|ma|mon).*(compétences|technologies|savoir.faire)', 'mes_competences'),
+        (r'(liste|énumère|cite|quelles?) .*compétences', 'competences'),
+        (r'(liste|énumère|cite|quelles?) .*technologies', 'technologies'),
+        # Projets
+        (r'(liste|énumère|cite|quels?) .*projets', 'projets'),
+        (r'quels? projets.*réalis|fait|participé', 'projets'),
+        # Documents généraux
+        (r'(liste|énumère|cite|quels?) .*documents', 'documents')
+    ],
+    # Tags qui ne sont jamais des noms d'entreprise
+    "company_tag_exclusions": [
+        "annonce", "cv", "todo", "new", "formation", "candidature", "presentation",
+        "cyrilsauret", "cyril", "sauret", "gpt-summary", "competences", "python",
+        "react", "javascript", "pdf", "doc", "docx"
+    ]
+}
+
+# Cache des textes extraits (PDF, TXT, OCR)
+EXTRACTION_CACHE_CONFIG = {
+    "enabled": True,
+    "path": DATA_DIR / "cache" / "extraction_cache.sqlite",
+    # Taille maximale du texte en cache ; au-delà, éviction des moins récemment utilisés
+    "max_size_mb": 512,
+    # Hacher le contenu pour garder en cache les fichiers dont seule la date a changé
+    "verify_hash": False
+}
+
+# Contexte envoyé au modèle : budget de tokens (estimés) par modèle
+CONTEXT_CONFIG = {
+    "budgets": {
+        "mistral-large-latest": 6000,
+        "mistral-medium-latest": 6000,
+        "mistral-small-latest": 4000,
+        "mistral:7b": 2500,
+        "mistral:latest": 2500,
+        "mistral-nemo:latest": 4000,
+        "mistralai/Mistral-7B-Instruct-v0.1": 2500,
+        "mistralai/Mixtral-8x7B-Instruct-v0.1": 4000
+    },
+    "default_budget": 3000,
+    # Taille maximale d'un passage, réduit à la fenêtre autour des termes de la question
+    "passage_tokens": 400,
+    # Passage plus court ignoré (fin de budget ou texte déjà couvert)
+    "min_passage_tokens": 40
+}
+
+# Cache des réponses du chat (questions identiques ou quasi identiques)
+ANSWER_CACHE_CONFIG = {
+    "enabled": True,
+    "path": DATA_DIR / "cache" / "answer_cache.sqlite",
+    # Durée de validité d'une réponse (secondes)
+    "ttl_seconds": 7 * 24 * 3600,
+    # Au-delà, éviction des réponses les moins récemment utilisées
+    "max_entries": 1000,
+    # Similarité cosinus minimale entre questions pour réutiliser une réponse
+    "similarity_threshold": 0.92
+}
+
+# Synchronisation incrémentale des sources
+SYNC_CONFIG = {
+    # Manifeste chemin source → (taille, date, empreinte, documents indexés)
+    "manifest_file": VECTOR_DB_DIR / "sync_manifest.json",
+    # Hacher le contenu : un fichier dont seule la date a changé n'est pas réindexé
+    "verify_hash": False
+}
+
+# Configuration de l'indexation TF-IDF
+INDEXING_CONFIG = {
+    # Les nouveaux documents sont projetés sur le vocabulaire/IDF gelé
+    "incremental": True,
+    # Refonte automatique quand le corpus a grossi de plus de 20 % depuis le dernier fit
+    "refit_drift_threshold": 0.2
+}
+
+# Fournisseurs de modèles de langage (réponses en streaming)
+LLM_CONFIG = {
+    "mistral_url": "https://api.mistral.ai/v1",
+    "ollama_url": "http://localhost:11434",
+    # Délai maximal d'attente entre deux fragments reçus (secondes)
+    "timeout": 30,
+    "ollama_timeout": 60,
+    "max_tokens": 1000,
+    "temperature": 0.7,
+    # Connexions HTTP gardées ouvertes par hôte
+    "pool_size": 10,
+    # Nouvelles tentatives sur 429/5xx : délai aléatoire dans [0, base * 2^n] plafonné,
+    # ou celui de Retry-After s'il ne dépasse pas le plafond (sinon basculement)
+    "max_retries": 3,
+    "backoff_base": 1.0,
+    "backoff_max": 30.0,
+    # Requêtes simultanées par fournisseur
+    "max_concurrency": {"mistral": 4, "ollama": 1},
+    # Disjoncteur : fournisseur écarté après N échecs consécutifs, pendant M secondes
+    "circuit_failure_threshold": 3,
+    "circuit_reset_timeout": 60,
+    # Ordre de basculement quand un fournisseur échoue
+    "failover_chain": ["mistral", "ollama"]
+}
+
+# Recherche dense approximative (index IVF), à côté du TF-IDF
+DENSE_CONFIG = {
+    # Moteur de VectorDatabase.search par défaut : "tfidf" ou "dense"
+    "default_backend": "tfidf",
+    # Modèle sentence-transformers local ; None : embedder déterministe par hachage
+    "model": None,
+    # Dimension des vecteurs de l'embedder par hachage
+    "dim": 256,
+    # Nombre de listes IVF (None : racine carrée du nombre de vecteurs)
+    "nlist": None,
+    # Listes parcourues par requête (compromis rappel / latence)
+    "nprobe": 8,
+    # En dessous de ce nombre de vecteurs, recherche exhaustive
+    "min_train_size": 1024,
+    # Type des vecteurs stockés (float16 : moitié de la mémoire de float32)
+    "dtype": "float16",
+    "min_similarity": 0.1
+}
+
+# Recherche hybride : BM25 à champs + recherche vectorielle, fusion par rang réciproque
+HYBRID_CONFIG = {
+    # Paramètres BM25 (saturation des fréquences, normalisation par la longueur)
+    "k1": 1.2,
+    "b": 0.75,
+    # Poids des champs indexés
+    "field_weights": {"text": 1.0, "source": 2.0, "tags": 1.5, "title": 2.0},
+    # Constante de la fusion : score = somme des 1 / (rrf_k + rang)
+    "rrf_k": 60,
+    # Résultats de chaque moteur pris en compte dans la fusion
+    "candidates": 50
+}
+
+# Index exact des codes projet, entreprises et dossiers
+TERM_INDEX_CONFIG = {
+    # Forme des codes projet (appliquée en minuscules) : m401, a595...
+    "code_pattern": r"(?<![a-z0-9])[ma]\d{3}(?!\d)"
+}
+
+# Configuration du stockage de la base vectorielle
+STORAGE_CONFIG = {
+    # Compaction du journal en nouvel instantané au-delà de ce nombre d'opérations...
+    "compaction_min_records": 500,
+    # ... et dès que le journal dépasse cette fraction des documents de l'instantané
+    "compaction_ratio": 0.5
 }
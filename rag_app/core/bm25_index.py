@@ -0,0 +1,332 @@
+"""Index inversé BM25 à champs (texte, source, tags, titre).
+
+Le score d'un document suit BM25F : pour chaque terme de la requête, les
+fréquences des différents champs sont normalisées par la longueur du champ
+(rapportée à sa longueur moyenne), pondérées puis sommées avant la
+saturation ``tf / (k1 + tf)``. Un terme présent dans le nom du fichier ou les
+tags compte ainsi davantage qu'une occurrence perdue dans un long texte.
+
+L'index est tenu à jour par ajouts et suppressions de documents identifiés
+par leur ``id`` ; longueurs moyennes et fréquences documentaires sont celles
+du corpus courant à chaque requête. Il est sauvegardé avec la base (termes,
+longueurs et postings triés par terme) : une base rechargée n'a pas besoin de
+relire les textes pour le reconstruire, seulement d'y retirer les documents
+supprimés et d'y ajouter les documents absents.
+"""
+
+import json
+import os
+import re
+import shutil
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from ..config.settings import HYBRID_CONFIG
+
+FIELDS = ('text', 'source', 'tags', 'title')
+
+FORMAT_VERSION = 2
+
+# Mots (lettres et chiffres) : « M401_Entreprise-X.pdf » → m401, entreprise, x, pdf
+_TOKEN_RE = re.compile(r'[^\W_]+', re.UNICODE)
+
+def tokenize(text: str) -> List[str]:
+    """Termes en minuscules et sans accents, d'au moins deux caractères."""
+    folded = unicodedata.normalize('NFKD', text.lower())
+    folded = ''.join(char for char in folded if not unicodedata.combining(char))
+    return [token for token in _TOKEN_RE.findall(folded) if len(token) >= 2]
+
+def document_fields(document: Dict[str, Any]) -> Tuple[str, ...]:
+    """Valeurs des champs indexés d'un document, dans l'ordre de ``FIELDS``."""
+    metadata = document.get('metadata') or {}
+    tags = metadata.get('tags', '')
+    if isinstance(tags, (list, tuple)):
+        tags = ' '.join(str(tag) for tag in tags)
+    return (document.get('text', '') or '', str(metadata.get('source', '') or ''),
+            str(tags or ''), str(metadata.get('title', '') or ''))
+
+class BM25Index:
+    """Index BM25F incrémental des documents d'une ``VectorDatabase``.
+
+    Un index rouvert par ``load`` garde ses postings sur disque, triés par
+    terme et projetés en mémoire : seules les listes des termes d'une requête
+    sont lues. Les documents ajoutés ensuite sont tenus dans des dictionnaires
+    et les suppressions masquent les lignes sauvegardées ; ``save`` réunit les
+    deux parties.
+    """
+
+    def __init__(self, k1: Optional[float] = None, b: Optional[float] = None,
+                 field_weights: Optional[Dict[str, float]] = None):
+        self.k1 = HYBRID_CONFIG.get('k1', 1.2) if k1 is None else k1
+        self.b = HYBRID_CONFIG.get('b', 0.75) if b is None else b
+        weights = field_weights or HYBRID_CONFIG.get('field_weights', {})
+        self.weights = np.array([weights.get(field, 1.0) for field in FIELDS], dtype=np.float64)
+        # terme → {id du document: fréquences par champ}
+        self._postings: Dict[str, Dict[Any, Tuple[int, ...]]] = {}
+        # id → (longueurs par champ, termes distincts)
+        self._documents: Dict[Any, Tuple[Tuple[int, ...], Tuple[str, ...]]] = {}
+        self._total_lengths = np.zeros(len(FIELDS), dtype=np.float64)
+        self._reset_saved()
+
+    def _reset_saved(self) -> None:
+        """Vide la partie rouverte d'une sauvegarde."""
+        # terme → position ; postings du terme t = lignes pointers[t]:pointers[t + 1]
+        self._saved_terms: Dict[str, int] = {}
+        self._saved_pointers = np.zeros(1, dtype=np.int64)
+        # Document (ligne) et fréquences par champ de chaque posting
+        self._saved_rows = np.zeros(0, dtype=np.int32)
+        self._saved_frequencies = np.zeros((0, len(FIELDS)), dtype=np.uint16)
+        # Identifiant, longueurs par champ et présence de chaque document sauvegardé
+        self._saved_ids: List[Any] = []
+        self._saved_positions: Dict[Any, int] = {}
+        self._saved_lengths = np.zeros((0, len(FIELDS)), dtype=np.int32)
+        self._saved_alive = np.zeros(0, dtype=bool)
+        self._saved_count = 0
+
+    @property
+    def size(self) -> int:
+        return self._saved_count + len(self._documents)
+
+    def __contains__(self, doc_id) -> bool:
+        if doc_id in self._documents:
+            return True
+        row = self._saved_positions.get(doc_id)
+        return row is not None and bool(self._saved_alive[row])
+
+    def add(self, document: Dict[str, Any]) -> None:
+        """Indexe un document (ignoré si son ``id`` est déjà indexé)."""
+        doc_id = document.get('id')
+        if doc_id in self:
+            return
+        counts: Dict[str, List[int]] = {}
+        lengths = []
+        for field_index, value in enumerate(document_fields(document)):
+            tokens = tokenize(value)
+            lengths.append(len(tokens))
+            for token in tokens:
+                counts.setdefault(token, [0] * len(FIELDS))[field_index] += 1
+        for term, frequencies in counts.items():
+            self._postings.setdefault(term, {})[doc_id] = tuple(frequencies)
+        self._documents[doc_id] = (tuple(lengths), tuple(counts))
+        self._total_lengths += lengths
+
+    def extend(self, documents: Iterable[Dict[str, Any]]) -> None:
+        for document in documents:
+            self.add(document)
+
+    def remove(self, doc_ids: Iterable[Any]) -> int:
+        """Retire des documents ; retourne le nombre de documents retirés."""
+        removed = 0
+        for doc_id in doc_ids:
+            entry = self._documents.pop(doc_id, None)
+            if entry is None:
+                row = self._saved_positions.get(doc_id)
+                if row is not None and self._saved_alive[row]:
+                    self._saved_alive[row] = False
+                    self._saved_count -= 1
+                    self._total_lengths -= self._saved_lengths[row]
+                    removed += 1
+                continue
+            lengths, terms = entry
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(doc_id, None)
+                    if not postings:
+                        del self._postings[term]
+            self._total_lengths -= lengths
+            removed += 1
+        return removed
+
+    def retain(self, doc_ids: Iterable[Any]) -> int:
+        """Retire tous les documents dont l'identifiant n'est pas dans ``doc_ids``."""
+        keep = set(doc_ids)
+        saved = [doc_id for doc_id, row in self._saved_positions.items()
+                 if self._saved_alive[row] and doc_id not in keep]
+        return self.remove(saved + [doc_id for doc_id in list(self._documents) if doc_id not in keep])
+
+    def clear(self) -> None:
+        self._postings = {}
+        self._documents = {}
+        self._total_lengths = np.zeros(len(FIELDS), dtype=np.float64)
+        self._reset_saved()
+
+    def _term_postings(self, term: str) -> Tuple[List[Any], np.ndarray, np.ndarray]:
+        """``(ids, fréquences, longueurs)`` des documents contenant ``term``."""
+        ids: List[Any] = []
+        frequencies, lengths = [], []
+        position = self._saved_terms.get(term)
+        if position is not None:
+            start, end = int(self._saved_pointers[position]), int(self._saved_pointers[position + 1])
+            rows = np.asarray(self._saved_rows[start:end])
+            alive = self._saved_alive[rows]
+            rows = rows[alive]
+            ids.extend(self._saved_ids[row] for row in rows.tolist())
+            frequencies.append(np.asarray(self._saved_frequencies[start:end])[alive])
+            lengths.append(self._saved_lengths[rows])
+        postings = self._postings.get(term)
+        if postings:
+            ids.extend(postings)
+            frequencies.append(np.array(list(postings.values())))
+            lengths.append(np.array([self._documents[doc_id][0] for doc_id in postings]))
+        if not ids:
+            return ids, np.zeros((0, len(FIELDS))), np.zeros((0, len(FIELDS)))
+        return (ids, np.concatenate(frequencies).astype(np.float64),
+                np.concatenate(lengths).astype(np.float64))
+
+    def scores(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Retourne ``(ids, scores)`` des documents contenant au moins un terme de la requête."""
+        count = self.size
+        terms = list(dict.fromkeys(term for term in tokenize(query)
+                                   if term in self._postings or term in self._saved_terms))
+        if not count or not terms:
+            return np.zeros(0, dtype=object), np.zeros(0)
+
+        average_lengths = np.maximum(self._total_lengths / count, 1e-9)
+        totals: Dict[Any, float] = {}
+        for term in terms:
+            ids, frequencies, lengths = self._term_postings(term)
+            df = len(ids)
+            if not df:
+                continue
+            idf = np.log(1.0 + (count - df + 0.5) / (df + 0.5))
+            normalization = 1.0 - self.b + self.b * lengths / average_lengths
+            tf = (frequencies / normalization) @ self.weights
+            for doc_id, score in zip(ids, idf * tf / (self.k1 + tf)):
+                totals[doc_id] = totals.get(doc_id, 0.0) + float(score)
+
+        return np.array(list(totals), dtype=object), np.fromiter(totals.values(), dtype=np.float64)
+
+    def search(self, query: str, top_k: int = 10) -> List[Tuple[Any, float]]:
+        """``(id, score)`` des ``top_k`` meilleurs documents, par score décroissant."""
+        ids, scores = self.scores(query)
+        if not scores.size:
+            return []
+        if scores.size > top_k:
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+            ids, scores = ids[best], scores[best]
+        order = np.argsort(-scores, kind='stable')
+        return [(ids[i], float(scores[i])) for i in order]
+
+    def save(self, directory: Union[str, Path]) -> None:
+        """Écrit l'index dans ``directory`` puis le rouvre en mémoire projetée.
+
+        Le répertoire est remplacé d'un bloc, comme par ``DenseIndex.save``.
+        Les fréquences sont bornées à 65535 (``uint16``).
+        """
+        # Documents : lignes sauvegardées encore présentes, puis documents en mémoire
+        kept = np.flatnonzero(self._saved_alive)
+        ids = [self._saved_ids[row] for row in kept.tolist()] + list(self._documents)
+        lengths = np.vstack([
+            self._saved_lengths[kept],
+            np.array([entry[0] for entry in self._documents.values()],
+                     dtype=np.int32).reshape(len(self._documents), len(FIELDS))
+        ])
+        new_rows = np.full(len(self._saved_ids), -1, dtype=np.int64)
+        new_rows[kept] = np.arange(len(kept))
+
+        terms = list(self._saved_terms) + [term for term in self._postings
+                                           if term not in self._saved_terms]
+        positions = {term: position for position, term in enumerate(terms)}
+        saved_terms = np.repeat(np.arange(len(self._saved_terms), dtype=np.int64),
+                                np.diff(self._saved_pointers))
+        saved_rows = new_rows[np.asarray(self._saved_rows, dtype=np.int64)]
+        live = saved_rows >= 0
+        memory_rows = {doc_id: len(kept) + row for row, doc_id in enumerate(self._documents)}
+        sizes = [len(postings) for postings in self._postings.values()]
+        pair_terms = np.concatenate([
+            saved_terms[live],
+            np.repeat(np.array([positions[term] for term in self._postings], dtype=np.int64), sizes)
+        ])
+        pair_rows = np.concatenate([
+            saved_rows[live],
+            np.fromiter((memory_rows[doc_id] for postings in self._postings.values()
+                         for doc_id in postings), dtype=np.int64, count=sum(sizes))
+        ])
+        pair_frequencies = np.vstack([
+            np.asarray(self._saved_frequencies)[live],
+            np.minimum(np.array([frequencies for postings in self._postings.values()
+                                 for frequencies in postings.values()], dtype=np.int64),
+                       np.iinfo(np.uint16).max).reshape(sum(sizes), len(FIELDS))
+        ]).astype(np.uint16)
+
+        # Termes sans document restant écartés, postings triés par terme puis par ligne
+        present = np.bincount(pair_terms, minlength=len(terms)) > 0
+        terms = [term for term, keep in zip(terms, present.tolist()) if keep]
+        pair_terms = (np.cumsum(present) - 1)[pair_terms]
+        order = np.lexsort((pair_rows, pair_terms))
+        pointers = np.searchsorted(pair_terms[order], np.arange(len(terms) + 1)).astype(np.int64)
+
+        directory = Path(directory)
+        tmp_dir = directory.with_name(directory.name + '.tmp')
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+        tmp_dir.mkdir(parents=True)
+        np.save(tmp_dir / 'lengths.npy', lengths)
+        np.save(tmp_dir / 'pointers.npy', pointers)
+        np.save(tmp_dir / 'rows.npy', pair_rows[order].astype(np.int32))
+        np.save(tmp_dir / 'frequencies.npy', pair_frequencies[order])
+        with open(tmp_dir / 'terms.json', 'w', encoding='utf-8') as f:
+            json.dump({'terms': terms, 'ids': ids}, f, ensure_ascii=False)
+        with open(tmp_dir / 'manifest.json', 'w', encoding='utf-8') as f:
+            json.dump({'version': FORMAT_VERSION}, f)
+
+        # Libérer la projection de l'ancien index avant de le remplacer (Windows)
+        self._reset_saved()
+        if directory.exists():
+            shutil.rmtree(directory)
+        os.replace(tmp_dir, directory)
+        self._open(directory)
+
+    def _open(self, directory: Path) -> None:
+        """Remplace tout le contenu de l'index par la sauvegarde de ``directory``."""
+        with open(directory / 'manifest.json', 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Version d'index BM25 non prise en charge : {manifest.get('version')}")
+        with open(directory / 'terms.json', 'r', encoding='utf-8') as f:
+            names = json.load(f)
+        lengths = np.load(directory / 'lengths.npy')
+        pointers = np.load(directory / 'pointers.npy')
+        rows = np.load(directory / 'rows.npy', mmap_mode='r')
+        frequencies = np.load(directory / 'frequencies.npy', mmap_mode='r')
+
+        self._postings = {}
+        self._documents = {}
+        self._saved_terms = {term: position for position, term in enumerate(names['terms'])}
+        self._saved_pointers = pointers
+        self._saved_rows = rows
+        self._saved_frequencies = frequencies
+        self._saved_ids = names['ids']
+        self._saved_positions = {doc_id: row for row, doc_id in enumerate(self._saved_ids)}
+        self._saved_lengths = lengths
+        self._saved_alive = np.ones(len(self._saved_ids), dtype=bool)
+        self._saved_count = len(self._saved_ids)
+        self._total_lengths = lengths.sum(axis=0, dtype=np.float64)
+
+    @classmethod
+    def load(cls, directory: Union[str, Path]) -> Optional['BM25Index']:
+        """Rouvre un index sauvegardé ; ``None`` s'il est absent ou illisible."""
+        index = cls()
+        try:
+            index._open(Path(directory))
+        except (OSError, ValueError, KeyError):
+            return None
+        return index
+
+def reciprocal_rank_fusion(rankings: Iterable[List[Any]], k: Optional[int] = None) -> List[Tuple[Any, float]]:
+    """Fusionne des classements : score d'un élément = somme des ``1 / (k + rang)``.
+
+    Les rangs commencent à 1 ; le résultat est trié par score décroissant, un
+    élément vu plus tôt (premier classement, meilleur rang) passant d'abord en
+    cas d'égalité.
+    """
+    k = HYBRID_CONFIG.get('rrf_k', 60) if k is None else k
+    fused: Dict[Any, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, 1):
+            fused[key] = fused.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,259 @@
+"""Table des candidatures, tenue à jour à l'indexation.
+
+Les questions « liste des entreprises auxquelles j'ai postulé » portent sur
+tout le corpus : plutôt que de relancer recherches et expressions régulières
+sur chaque document au moment de la question, les informations utiles sont
+extraites une fois, à l'ajout de chaque document, dans une ligne par dossier.
+
+Clé d'une ligne : le ``dossier`` du ``.data.json``, sinon le code projet
+(``M401``, ``A595``...) du nom de fichier, sinon l'entreprise indiquée dans
+les métadonnées (ligne au ``dossier`` vide). Champs repris du
+``.data.json`` (voir ``BatchService._prepare_metadata``) : entreprise, état,
+todo, contact, dates et indicateurs CV / BA. Sans ``.data.json``, l'entreprise est déduite
+du nom de fichier, des tags ou du début du texte ; elle l'est une fois, à
+l'ajout du document, et rangée dans ses métadonnées (``entreprise_devinee``)
+pour qu'une base rechargée ne relise pas les textes.
+"""
+
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..config.settings import CLASSIFICATION_CONFIG
+from .term_index import extract_codes, normalize_term
+
+# Champs d'une ligne pris au premier document qui les renseigne
+SCALAR_FIELDS = ('entreprise', 'etat', 'todo', 'contact', 'tel', 'mail', 'date',
+                 'date_reponse', 'title', 'category')
+
+_COMPANY_TAG_EXCLUSIONS = frozenset(CLASSIFICATION_CONFIG['company_tag_exclusions'])
+_FILENAME_WORDS = {'cv', 'lm', 'ba', 'lettre', 'motivation', 'data', 'new', 'doc', 'pdf', 'actions'}
+_CONTENT_STOPWORDS = {'un', 'une', 'le', 'la', 'les', 'cette', 'votre', 'notre', 'mon', 'ma',
+                      'mes', 'son', 'sa', 'ses'}
+
+# Nom d'entreprise entre séparateurs dans un nom de fichier ou un chemin
+# (séparateurs non consommés : « M401_CV_Capgemini_ » donne CV puis Capgemini)
+_FILENAME_PATTERNS = [re.compile(pattern) for pattern in [
+    r'(?<=_)([A-Z][a-zA-Z\s&\-]+?)(?=_)',
+    r'(?<=-)([A-Z][a-zA-Z\s&]+?)(?=-)',
+    r'(?<=\\)([A-Z][a-zA-Z\s&\-]+?)(?=\\)',
+    r'(?<=/)([A-Z][a-zA-Z\s&\-]+?)(?=/)',
+]]
+
+# Nom d'entreprise dans les premières lignes d'un document (lettres de motivation...)
+_CONTENT_PATTERNS = [re.compile(pattern, re.IGNORECASE | re.MULTILINE) for pattern in [
+    r'entreprise[:\s]+([A-Z][a-zA-Z\s&\-\.]+?)(?:\s|,|\.|$|\n)',
+    r'société[:\s]+([A-Z][a-zA-Z\s&\-\.]+?)(?:\s|,|\.|$|\n)',
+    r'chez[:\s]+([A-Z][a-zA-Z\s&\-\.]+?)(?:\s|,|\.|$|\n)',
+    r'([A-Z][a-zA-Z\s&\-\.]+?)\s+(?:recrute|embauche)',
+    r'candidature.*?(?:chez|pour)\s+([A-Z][a-zA-Z\s&\-\.]+?)(?:\s|,|\.|$|\n)',
+    r'postul.*?(?:chez|pour)\s+([A-Z][a-zA-Z\s&\-\.]+?)(?:\s|,|\.|$|\n)',
+    r'Madame,?\s*Monsieur,?\s*([A-Z][a-zA-Z\s&\-\.]+?)(?:\s|,|\.|$|\n)',
+    r'À l\'attention de[:\s]+([A-Z][a-zA-Z\s&\-\.]+?)(?:\s|,|\.|$|\n)'
+]]
+
+_PROJECT_CODE_RE = re.compile(r'^[A-Z]\d+$')
+
+# Métadonnée recevant l'entreprise devinée d'un document qui n'en indique pas
+GUESSED_COMPANY_FIELD = 'entreprise_devinee'
+
+def guess_company(source: str, text: str = '', tags: str = '') -> str:
+    """Entreprise déduite du nom de fichier, des tags puis du début du texte (ou ``''``)."""
+    for pattern in _FILENAME_PATTERNS:
+        for match in pattern.findall(source):
+            if (len(match) > 2 and match.lower() not in _FILENAME_WORDS
+                    and not match.lower().startswith('cyril')
+                    and not _PROJECT_CODE_RE.match(match)):
+                return match.strip()
+
+    for tag in str(tags or '').split(','):
+        tag = tag.strip()
+        if (len(tag) > 2 and tag.lower() not in _COMPANY_TAG_EXCLUSIONS
+                and not tag.startswith('maturité-') and not extract_codes(tag)):
+            return tag
+
+    if text and len(text.strip()) > 50:
+        start = ' '.join(text.split('\n')[:15])
+        for pattern in _CONTENT_PATTERNS:
+            for match in pattern.findall(start):
+                match = match.strip()
+                if (len(match) > 3 and match.lower() not in _CONTENT_STOPWORDS
+                        and not match.lower().startswith('cyril')
+                        and not match.lower().endswith('sauret')
+                        and not _PROJECT_CODE_RE.match(match)):
+                    return match
+    return ''
+
+def _clean(value: Any) -> str:
+    value = str(value or '').strip()
+    return '' if value in ('N/A', '?') else value
+
+def _identify(metadata: Dict[str, Any]) -> Tuple[str, str, str, str, Optional[str]]:
+    """``(source, nom de fichier, dossier, entreprise indiquée, clé de la ligne ou None)``."""
+    source = str(metadata.get('source', '') or '')
+    file_name = os.path.basename(source.replace('\\', '/'))
+
+    dossier = _clean(metadata.get('dossier'))
+    codes = extract_codes(file_name)
+    dossier = dossier.upper() if dossier else (codes[0].upper() if codes else '')
+    company = _clean(metadata.get('entreprise')) or _clean(metadata.get('company'))
+    if dossier:
+        key = dossier
+    elif normalize_term(company):
+        # Candidature sans dossier ni code : une ligne par entreprise
+        key = f"entreprise:{normalize_term(company)}"
+    else:
+        key = None
+    return source, file_name, dossier, company, key
+
+def _guess_document_company(document: Dict[str, Any], metadata: Dict[str, Any], source: str) -> str:
+    if GUESSED_COMPANY_FIELD in metadata:
+        return str(metadata[GUESSED_COMPANY_FIELD] or '')
+    # Le texte n'est lu que pour le premier passage d'un document découpé
+    text = document.get('text', '') if not metadata.get('chunk_index') else ''
+    return guess_company(source, text, metadata.get('tags', ''))
+
+def remember_guessed_company(document: Dict[str, Any]) -> None:
+    """Range l'entreprise devinée d'un document de candidature dans ses métadonnées.
+
+    Sans effet si le document indique son entreprise, n'appartient à aucune
+    candidature ou porte déjà l'entreprise devinée. Les métadonnées sont
+    remplacées par une copie : le dictionnaire de l'appelant reste intact.
+    """
+    metadata = document.get('metadata')
+    if not isinstance(metadata, dict) or GUESSED_COMPANY_FIELD in metadata:
+        return
+    source, _, _, company, key = _identify(metadata)
+    if key is not None and not company:
+        document['metadata'] = {**metadata,
+                                GUESSED_COMPANY_FIELD: _guess_document_company(document, metadata, source)}
+
+def document_record(document: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Informations de candidature portées par un document, ou ``None``.
+
+    L'entreprise devinée rangée par ``remember_guessed_company`` est reprise
+    telle quelle ; à défaut, elle est devinée (texte lu si nécessaire).
+    """
+    metadata = document.get('metadata') or {}
+    source, file_name, dossier, company, key = _identify(metadata)
+    if key is None:
+        return None
+    if not company:
+        company = _guess_document_company(document, metadata, source)
+
+    lowered = file_name.lower()
+    record = {field: _clean(metadata.get(field)) for field in SCALAR_FIELDS}
+    record.update({
+        'key': key,
+        'dossier': dossier,
+        'entreprise': company,
+        'project': _clean(metadata.get('project')),
+        'source': file_name,
+        'cv': bool(metadata.get('cv')) or '_cv_' in lowered,
+        'ba': bool(metadata.get('ba')) or '_ba_' in lowered
+    })
+    return record
+
+class CandidatureTable:
+    """Lignes ``dossier (ou entreprise) → informations de candidature``, tenues à jour par id de document."""
+
+    def __init__(self):
+        self._rows: Dict[str, Dict[str, Any]] = {}
+        # clé de la ligne → {id du document: informations extraites}
+        self._records: Dict[str, Dict[Any, Dict[str, Any]]] = {}
+        self._document_keys: Dict[Any, str] = {}
+
+    @property
+    def size(self) -> int:
+        return len(self._rows)
+
+    def add(self, document: Dict[str, Any]) -> None:
+        doc_id = document.get('id')
+        if doc_id in self._document_keys:
+            return
+        record = document_record(document)
+        if record is None:
+            return
+        key = record['key']
+        self._document_keys[doc_id] = key
+        self._records.setdefault(key, {})[doc_id] = record
+        self._merge(self._rows.setdefault(key, self._empty_row(record['dossier'])), record)
+
+    def extend(self, documents: Iterable[Dict[str, Any]]) -> None:
+        for document in documents:
+            self.add(document)
+
+    def remove(self, doc_ids: Iterable[Any]) -> int:
+        removed = 0
+        touched = set()
+        for doc_id in doc_ids:
+            key = self._document_keys.pop(doc_id, None)
+            if key is None:
+                continue
+            del self._records[key][doc_id]
+            touched.add(key)
+            removed += 1
+        for key in touched:
+            # Ligne recalculée à partir des documents restants
+            records = self._records[key]
+            if not records:
+                del self._records[key]
+                del self._rows[key]
+                continue
+            row = self._rows[key] = self._empty_row(next(iter(records.values()))['dossier'])
+            for record in records.values():
+                self._merge(row, record)
+        return removed
+
+    @staticmethod
+    def _empty_row(dossier: str) -> Dict[str, Any]:
+        row = {field: '' for field in SCALAR_FIELDS}
+        row.update({'dossier': dossier, 'cv': False, 'ba': False, 'projects': [], 'sources': [],
+                    'document_count': 0})
+        return row
+
+    @staticmethod
+    def _merge(row: Dict[str, Any], record: Dict[str, Any]) -> None:
+        for field in SCALAR_FIELDS:
+            if not row[field] and record[field]:
+                row[field] = record[field]
+        row['cv'] = row['cv'] or record['cv']
+        row['ba'] = row['ba'] or record['ba']
+        if record['project'] and record['project'] not in row['projects']:
+            row['projects'].append(record['project'])
+        if record['source'] and record['source'] not in row['sources']:
+            row['sources'].append(record['source'])
+        row['document_count'] += 1
+
+    @staticmethod
+    def _copy(row: Dict[str, Any]) -> Dict[str, Any]:
+        return {**row, 'projects': list(row['projects']), 'sources': list(row['sources'])}
+
+    def get(self, dossier: str) -> Optional[Dict[str, Any]]:
+        row = self._rows.get(str(dossier).upper())
+        return self._copy(row) if row is not None else None
+
+    def rows(self, filter_by: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Lignes triées par dossier (lignes sans dossier en dernier).
+
+        ``filter_by`` compare les champs sans tenir compte de la casse.
+        """
+        rows = []
+        for key in sorted(self._rows, key=lambda key: (not self._rows[key]['dossier'], key)):
+            row = self._rows[key]
+            if filter_by and any(str(row.get(field, '')).lower() != str(value).lower()
+                                 for field, value in filter_by.items()):
+                continue
+            rows.append(self._copy(row))
+        return rows
+
+    def companies(self, filter_by: Optional[Dict[str, Any]] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Lignes regroupées par entreprise (nom tel qu'écrit la première fois), triées par nom."""
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        names: Dict[str, str] = {}
+        for row in self.rows(filter_by):
+            if len(row['entreprise']) <= 2:
+                continue
+            name = names.setdefault(normalize_term(row['entreprise']), row['entreprise'])
+            groups.setdefault(name, []).append(row)
+        return dict(sorted(groups.items(), key=lambda item: item[0].lower()))
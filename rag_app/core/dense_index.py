@@ -0,0 +1,356 @@
+"""Index vectoriel dense approximatif (IVF) pour la recherche sémantique.
+
+Les documents sont projetés par un modèle d'embedding local (ou, à défaut,
+par l'embedder déterministe ``HashingEmbedder``) dans des vecteurs normalisés.
+L'index partitionne ces vecteurs par k-means sphérique en ``nlist`` listes ;
+une requête n'est comparée qu'aux vecteurs des ``nprobe`` listes dont le
+centroïde lui est le plus proche.
+
+Les vecteurs sont stockés triés par liste, en ``float16`` par défaut, et
+rouverts avec ``mmap_mode='r'`` après sauvegarde. Les ajouts sont rangés dans
+une zone annexe (affectés au centroïde le plus proche, sans réentraînement)
+fusionnée à la sauvegarde ; les suppressions sont masquées jusque-là. En
+dessous de ``min_train_size`` vecteurs, l'index reste exhaustif (aucune liste).
+"""
+
+import json
+import os
+import re
+import shutil
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from ..config.settings import DENSE_CONFIG
+
+FORMAT_VERSION = 1
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+class HashingEmbedder:
+    """Embedder déterministe sans modèle : hachage signé des mots et trigrammes.
+
+    Deux textes partageant des mots (ou des fragments de mots) ont des vecteurs
+    proches ; suffisant pour les tests et comme repli sans modèle local.
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = int(dim)
+        self.signature = f"hashing-{self.dim}"
+
+    def _features(self, text: str) -> List[str]:
+        tokens = _TOKEN_RE.findall(text.lower())
+        trigrams = [f"#{token[i:i + 3]}" for token in tokens if len(token) > 3
+                    for i in range(len(token) - 2)]
+        return tokens + trigrams
+
+    def embed(self, texts: Iterable[str]) -> np.ndarray:
+        texts = list(texts)
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            hashes = np.fromiter((zlib.crc32(feature.encode('utf-8'))
+                                  for feature in self._features(text or '')), dtype=np.uint32)
+            if hashes.size:
+                signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+                np.add.at(vectors[row], hashes % self.dim, signs)
+        return _normalize(vectors)
+
+class SentenceTransformerEmbedder:
+    """Modèle d'embedding local (``sentence-transformers``) exécuté sur CPU."""
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, device='cpu')
+        self.dim = int(self.model.get_sentence_embedding_dimension())
+        self.signature = f"st-{model_name}"
+
+    def embed(self, texts: Iterable[str]) -> np.ndarray:
+        vectors = self.model.encode(list(texts), batch_size=32, convert_to_numpy=True,
+                                    normalize_embeddings=True, show_progress_bar=False)
+        return np.asarray(vectors, dtype=np.float32)
+
+_default_embedder = None
+
+def get_embedder():
+    """Retourne l'embedder configuré dans ``DENSE_CONFIG`` (repli sur le hachage)."""
+    global _default_embedder
+    if _default_embedder is None:
+        model_name = DENSE_CONFIG.get('model')
+        if model_name:
+            try:
+                _default_embedder = SentenceTransformerEmbedder(model_name)
+            except Exception as e:
+                print(f"Modèle d'embedding indisponible ({e}), repli sur l'embedder par hachage")
+        if _default_embedder is None:
+            _default_embedder = HashingEmbedder(DENSE_CONFIG.get('dim', 256))
+    return _default_embedder
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def train_centroids(vectors: np.ndarray, nlist: int, iterations: int = 10,
+                    seed: int = 0, max_samples_per_list: int = 256) -> np.ndarray:
+    """K-means sphérique (similarité cosinus) sur un échantillon des vecteurs."""
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), nlist * max_samples_per_list)
+    sample = np.asarray(vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))],
+                        dtype=np.float32)
+    centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, sample)
+        counts = np.bincount(assignment, minlength=nlist)
+        empty = counts == 0
+        if empty.any():
+            # Liste vide : recentrée sur des points tirés au hasard
+            sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+        centroids = _normalize(sums)
+    return centroids
+
+def assign_lists(vectors: np.ndarray, centroids: np.ndarray, batch_size: int = 8192) -> np.ndarray:
+    """Liste (centroïde le plus proche) de chaque vecteur."""
+    lists = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), batch_size):
+        block = np.asarray(vectors[start:start + batch_size], dtype=np.float32)
+        lists[start:start + batch_size] = np.argmax(block @ centroids.T, axis=1)
+    return lists
+
+class DenseIndex:
+    """Index IVF de vecteurs normalisés identifiés par l'``id`` des documents."""
+
+    def __init__(self, dim: int, signature: str = '', nprobe: Optional[int] = None,
+                 min_train_size: Optional[int] = None, dtype: Optional[str] = None):
+        self.dim = int(dim)
+        self.signature = signature
+        self.nprobe = int(nprobe or DENSE_CONFIG.get('nprobe', 8))
+        self.min_train_size = int(min_train_size if min_train_size is not None
+                                  else DENSE_CONFIG.get('min_train_size', 1024))
+        self.dtype = np.dtype(dtype or DENSE_CONFIG.get('dtype', 'float16'))
+        self.centroids = None
+        # Zone principale, triée par liste : liste l = lignes offsets[l]:offsets[l + 1]
+        self.vectors = np.zeros((0, self.dim), dtype=self.dtype)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        # Ajouts depuis la dernière fusion (liste affectée à chacun)
+        self._tail_vectors = np.zeros((0, self.dim), dtype=np.float32)
+        self._tail_ids = np.zeros(0, dtype=np.int64)
+        self._tail_lists = np.zeros(0, dtype=np.int32)
+        self._removed = set()
+        self._id_set = set()
+        self._trained_size = 0
+        # État de la base accompagnée, enregistré dans le manifeste
+        self.state = None
+        self.dirty = False
+
+    @property
+    def size(self) -> int:
+        return len(self._id_set)
+
+    @property
+    def nlist(self) -> int:
+        return 0 if self.centroids is None else len(self.centroids)
+
+    def __contains__(self, doc_id) -> bool:
+        return doc_id in self._id_set
+
+    def add(self, vectors: np.ndarray, ids: Iterable[int]) -> None:
+        """Ajoute des vecteurs normalisés ; les identifiants déjà présents sont ignorés."""
+        ids = np.asarray(list(ids), dtype=np.int64)
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(ids), self.dim)
+        new = np.array([int(doc_id) not in self._id_set and int(doc_id) not in self._removed
+                        for doc_id in ids], dtype=bool)
+        ids, vectors = ids[new], vectors[new]
+        if not ids.size:
+            return
+        lists = (assign_lists(vectors, self.centroids) if self.centroids is not None
+                 else np.zeros(len(ids), dtype=np.int32))
+        self._tail_vectors = np.vstack([self._tail_vectors, vectors])
+        self._tail_ids = np.concatenate([self._tail_ids, ids])
+        self._tail_lists = np.concatenate([self._tail_lists, lists])
+        self._id_set.update(int(doc_id) for doc_id in ids)
+        self.dirty = True
+        # Zone annexe parcourue en entier à chaque requête : fusion quand elle grossit
+        if len(self._tail_ids) > max(self.min_train_size, len(self.ids) // 2):
+            self.merge()
+
+    def remove(self, ids: Iterable[int]) -> int:
+        """Masque des identifiants ; retourne le nombre de vecteurs retirés."""
+        removed = 0
+        for doc_id in ids:
+            if doc_id in self._id_set:
+                self._id_set.discard(doc_id)
+                self._removed.add(doc_id)
+                removed += 1
+        if removed:
+            self.dirty = True
+        return removed
+
+    def retain(self, ids: Iterable[int]) -> int:
+        """Retire tous les vecteurs dont l'identifiant n'est pas dans ``ids``."""
+        keep = set(ids)
+        return self.remove([doc_id for doc_id in list(self._id_set) if doc_id not in keep])
+
+    def _needs_training(self) -> bool:
+        size = self.size
+        if size < self.min_train_size:
+            return self.centroids is not None
+        # Corpus doublé depuis l'entraînement : listes déséquilibrées
+        return self.centroids is None or size > 2 * self._trained_size
+
+    def merge(self) -> None:
+        """Fusionne les ajouts dans la zone principale (réentraîne si nécessaire)."""
+        live = ~np.isin(self.ids, list(self._removed)) if self._removed else slice(None)
+        tail_live = (~np.isin(self._tail_ids, list(self._removed)) if self._removed
+                     else slice(None))
+        vectors = np.vstack([np.asarray(self.vectors[live], dtype=np.float32),
+                             self._tail_vectors[tail_live]])
+        ids = np.concatenate([self.ids[live], self._tail_ids[tail_live]])
+
+        if self._needs_training():
+            if len(ids) >= self.min_train_size:
+                nlist = max(1, int(DENSE_CONFIG.get('nlist') or np.sqrt(len(ids))))
+                self.centroids = train_centroids(vectors, nlist)
+            else:
+                self.centroids = None
+            self._trained_size = len(ids)
+            lists = (assign_lists(vectors, self.centroids) if self.centroids is not None
+                     else np.zeros(len(ids), dtype=np.int32))
+        else:
+            main_count = len(self.ids[live])
+            lists = np.concatenate([
+                np.repeat(np.arange(len(self.offsets) - 1, dtype=np.int32),
+                          np.diff(self.offsets))[live] if main_count else np.zeros(0, np.int32),
+                self._tail_lists[tail_live]
+            ])
+
+        order = np.argsort(lists, kind='stable')
+        self.vectors = vectors[order].astype(self.dtype)
+        self.ids = ids[order]
+        self.offsets = np.searchsorted(lists[order], np.arange(max(self.nlist, 1) + 1))
+        self._tail_vectors = np.zeros((0, self.dim), dtype=np.float32)
+        self._tail_ids = np.zeros(0, dtype=np.int64)
+        self._tail_lists = np.zeros(0, dtype=np.int32)
+        self._removed = set()
+
+    def search(self, queries: np.ndarray, top_k: int,
+               nprobe: Optional[int] = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Retourne, par requête, ``(ids, similarités)`` des ``top_k`` plus proches.
+
+        ``nprobe`` listes sont parcourues (toutes si ``nprobe >= nlist``).
+        Les résultats sont triés par similarité décroissante.
+        """
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        top_k = max(int(top_k), 1)
+        nprobe = min(int(nprobe or self.nprobe), max(self.nlist, 1))
+        removed = np.fromiter(self._removed, dtype=np.int64) if self._removed else None
+        probes = None
+        if self.centroids is not None and nprobe < self.nlist:
+            coarse = queries @ self.centroids.T
+            probes = np.argpartition(-coarse, nprobe - 1, axis=1)[:, :nprobe]
+
+        results = []
+        for q, query in enumerate(queries):
+            if probes is None:
+                parts = [(self.ids, self.vectors)]
+                tail = slice(None)
+            else:
+                parts = [(self.ids[self.offsets[l]:self.offsets[l + 1]],
+                          self.vectors[self.offsets[l]:self.offsets[l + 1]])
+                         for l in np.sort(probes[q])]
+                tail = np.isin(self._tail_lists, probes[q])
+            parts.append((self._tail_ids[tail], self._tail_vectors[tail]))
+
+            ids = np.concatenate([part_ids for part_ids, _ in parts])
+            scores = np.concatenate([np.asarray(part_vectors, dtype=np.float32) @ query
+                                     for _, part_vectors in parts])
+            if removed is not None:
+                keep = ~np.isin(ids, removed)
+                ids, scores = ids[keep], scores[keep]
+            if scores.size > top_k:
+                best = np.argpartition(-scores, top_k - 1)[:top_k]
+                ids, scores = ids[best], scores[best]
+            order = np.argsort(-scores, kind='stable')
+            results.append((ids[order], scores[order]))
+        return results
+
+    def save(self, directory: Union[str, Path], state: Optional[Dict[str, Any]] = None) -> None:
+        """Écrit l'index dans ``directory`` puis le rouvre en mémoire projetée.
+
+        ``state`` décrit la base que l'index accompagne (``database``) et les
+        identifiants qu'elle avait attribués (``next_id``) ; ``load`` écarte
+        l'index s'il ne correspond pas à la base rechargée.
+
+        Les fichiers sont écrits dans un répertoire temporaire qui remplace
+        l'ancien : une sauvegarde interrompue laisse un index absent ou
+        complet, jamais mélangé (un index absent est reconstruit).
+        """
+        self.merge()
+        directory = Path(directory)
+        tmp_dir = directory.with_name(directory.name + '.tmp')
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+        tmp_dir.mkdir(parents=True)
+        np.save(tmp_dir / 'vectors.npy', self.vectors)
+        np.save(tmp_dir / 'ids.npy', self.ids)
+        np.save(tmp_dir / 'offsets.npy', self.offsets)
+        if self.centroids is not None:
+            np.save(tmp_dir / 'centroids.npy', self.centroids)
+        with open(tmp_dir / 'manifest.json', 'w', encoding='utf-8') as f:
+            json.dump({'version': FORMAT_VERSION, 'dim': self.dim, 'signature': self.signature,
+                       'dtype': self.dtype.name, 'trained_size': self._trained_size,
+                       'state': state}, f)
+
+        # Libérer la projection de l'ancien index avant de le remplacer (Windows)
+        self.vectors = None
+        if directory.exists():
+            shutil.rmtree(directory)
+        os.replace(tmp_dir, directory)
+        self.vectors = np.load(directory / 'vectors.npy', mmap_mode='r')
+        self.state = state
+        self.dirty = False
+
+    @classmethod
+    def load(cls, directory: Union[str, Path], signature: str = '',
+             state: Optional[Dict[str, Any]] = None) -> Optional['DenseIndex']:
+        """Rouvre un index sauvegardé.
+
+        Retourne ``None`` s'il est absent, d'un autre embedder ou, si ``state``
+        est fourni, enregistré pour une autre base ou avec des identifiants
+        qu'elle n'a pas encore attribués.
+        """
+        directory = Path(directory)
+        try:
+            with open(directory / 'manifest.json', 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('version') != FORMAT_VERSION or manifest.get('signature') != signature:
+                return None
+            saved = manifest.get('state') or {}
+            if state is not None and (saved.get('database') != state.get('database')
+                                      or saved.get('next_id', 0) > state.get('next_id', 0)):
+                return None
+            index = cls(manifest['dim'], signature, dtype=manifest['dtype'])
+            index.vectors = np.load(directory / 'vectors.npy', mmap_mode='r')
+            index.ids = np.load(directory / 'ids.npy')
+            index.offsets = np.load(directory / 'offsets.npy')
+            centroids = directory / 'centroids.npy'
+            index.centroids = np.load(centroids) if centroids.exists() else None
+        except (OSError, ValueError, KeyError):
+            return None
+        index._trained_size = manifest.get('trained_size', len(index.ids))
+        index.state = manifest.get('state')
+        index._id_set = set(int(doc_id) for doc_id in index.ids)
+        return index
+
+def exact_search(vectors: np.ndarray, queries: np.ndarray, top_k: int) -> List[np.ndarray]:
+    """Recherche exhaustive (référence des mesures de rappel) : indices des ``top_k`` meilleurs."""
+    scores = np.asarray(queries, dtype=np.float32) @ np.asarray(vectors, dtype=np.float32).T
+    results = []
+    for row in scores:
+        best = np.argpartition(-row, min(top_k, row.size) - 1)[:top_k]
+        results.append(best[np.argsort(-row[best], kind='stable')])
+    return results
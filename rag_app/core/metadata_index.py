@@ -0,0 +1,92 @@
+"""Index inversé des métadonnées pour préfiltrer les recherches."""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Champs de métadonnées indexés (les autres clés de filtre sont vérifiées document par document)
+INDEXED_FIELDS = ('category', 'project', 'type', 'author', 'status', 'tags')
+
+class MetadataIndex:
+    """Associe chaque valeur de métadonnée aux positions des documents qui la portent.
+
+    Les valeurs sont indexées en minuscules et telles quelles (les tags restent
+    la chaîne séparée par des virgules), ce qui permet de reproduire exactement
+    la sémantique de ``VectorDatabase._matches_filter`` : égalité insensible à
+    la casse pour une valeur simple, sous-chaîne pour une liste de valeurs. Le
+    nombre de valeurs distinctes étant faible devant le nombre de documents, un
+    filtre se résout sans parcourir le corpus.
+
+    L'index ne connaît que des ajouts en fin de liste ; une suppression le rend
+    obsolète et il doit alors être reconstruit.
+    """
+
+    def __init__(self, fields: Iterable[str] = INDEXED_FIELDS):
+        self.fields = tuple(fields)
+        self._postings: Dict[str, Dict[str, List[int]]] = {field: {} for field in self.fields}
+        self._document_types: Dict[Any, List[int]] = {}
+        self.size = 0
+
+    def add(self, document: Dict[str, Any]) -> None:
+        """Indexe le document suivant (position ``self.size``)."""
+        position = self.size
+        metadata = document.get('metadata') or {}
+        for field in self.fields:
+            value = metadata.get(field, '')
+            key = (value if isinstance(value, str) else str(value)).lower()
+            self._postings[field].setdefault(key, []).append(position)
+        self._document_types.setdefault(document.get('type'), []).append(position)
+        self.size += 1
+
+    def extend(self, documents: Iterable[Dict[str, Any]]) -> None:
+        for document in documents:
+            self.add(document)
+
+    def filter_rows(self, filter_by: Optional[Dict] = None, filter_type: Optional[str] = None,
+                    limit: Optional[int] = None) -> Tuple[Optional[np.ndarray], Optional[Dict]]:
+        """Résout les filtres indexés.
+
+        Retourne les positions (triées) des documents qui les satisfont,
+        limitées aux ``limit`` premières, ou ``None`` si aucun filtre n'est
+        indexé, ainsi que les filtres restants à vérifier document par document.
+        """
+        mask = None
+        residual = {}
+
+        for key, values in (filter_by or {}).items():
+            if key not in self._postings:
+                residual[key] = values
+                continue
+            mask = self._combine(mask, self._field_mask(key, values))
+
+        if filter_type:
+            mask = self._combine(mask, self._positions_mask(self._document_types.get(filter_type, [])))
+
+        if mask is None:
+            return None, residual or None
+        if limit is not None:
+            mask = mask[:limit]
+        return np.flatnonzero(mask), residual or None
+
+    def _field_mask(self, field: str, values: Any) -> np.ndarray:
+        postings = self._postings[field]
+        if isinstance(values, list):
+            needles = [value.lower() for value in values]
+            keys = [key for key in postings if any(needle in key for needle in needles)]
+        else:
+            keys = [values.lower()]
+
+        mask = np.zeros(self.size, dtype=bool)
+        for key in keys:
+            if key in postings:
+                mask[postings[key]] = True
+        return mask
+
+    def _positions_mask(self, positions: List[int]) -> np.ndarray:
+        mask = np.zeros(self.size, dtype=bool)
+        mask[positions] = True
+        return mask
+
+    @staticmethod
+    def _combine(mask: Optional[np.ndarray], other: np.ndarray) -> np.ndarray:
+        return other if mask is None else mask & other
@@ -0,0 +1,424 @@
+"""Persistance colonnaire de la base vectorielle.
+
+Un instantané est un répertoire ``snapshot-NNNNNN`` contenant :
+
+- ``vectors_data.npy`` / ``vectors_indices.npy`` / ``vectors_indptr.npy`` :
+  composantes CSR de la matrice TF-IDF, rouvertes avec ``mmap_mode='r'`` ;
+- ``vocabulary.json``, ``idf.npy`` et ``vectorizer.json`` : état du vectoriseur ;
+- ``documents.jsonl`` : une ligne de métadonnées par document (sans le texte) ;
+- ``texts.bin`` : textes UTF-8 concaténés, lus à la demande par décalage ;
+- ``images.jsonl`` et ``manifest.json`` ;
+- des sous-répertoires d'index annexes (``bm25``) écrits par la base ;
+- ``journal.log`` : opérations (ajouts, suppressions) postérieures à
+  l'instantané, ajoutées en fin de fichier à chaque sauvegarde.
+
+Le fichier ``CURRENT`` du répertoire de la base désigne l'instantané actif ;
+il est remplacé atomiquement, si bien qu'une sauvegarde interrompue laisse
+toujours l'instantané précédent intact.
+
+Chaque ligne du journal est préfixée par le CRC32 de son contenu JSON et
+chaque sauvegarde se termine par un enregistrement ``commit``. À la relecture,
+seules les opérations suivies d'un ``commit`` valide sont rejouées : une
+écriture interrompue (ligne tronquée ou corrompue) est ignorée puis écrasée
+par la sauvegarde suivante.
+"""
+
+import json
+import os
+import shutil
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+FORMAT_VERSION = 1
+CURRENT_FILE = 'CURRENT'
+SNAPSHOT_PREFIX = 'snapshot-'
+JOURNAL_FILE = 'journal.log'
+
+class TextStore:
+    """Accès en lecture aux textes concaténés d'un instantané."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = str(path)
+
+    def read_bytes(self, offset: int, length: int) -> bytes:
+        # Ouverture à chaque lecture : aucun verrou durable sur le fichier (Windows)
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def read(self, offset: int, length: int) -> str:
+        return self.read_bytes(offset, length).decode('utf-8')
+
+class LazyDocument(dict):
+    """Document dont le champ ``text`` n'est lu sur disque qu'au premier accès.
+
+    Se comporte comme le ``dict`` d'un document classique : ``doc['text']``,
+    ``doc.get('text')``, ``'text' in doc`` ou une copie chargent le texte.
+    """
+
+    __slots__ = ('_text_source', 'text_length')
+
+    def __init__(self, fields: Dict[str, Any], store: TextStore, offset: int,
+                 byte_length: int, text_length: int):
+        super().__init__(fields)
+        self._text_source = (store, offset, byte_length)
+        self.text_length = text_length
+
+    @property
+    def text_loaded(self) -> bool:
+        return self._text_source is None
+
+    def raw_text_bytes(self) -> bytes:
+        """Retourne le texte encodé sans le décoder ni le garder en mémoire."""
+        if self._text_source is None:
+            return dict.__getitem__(self, 'text').encode('utf-8')
+        store, offset, byte_length = self._text_source
+        return store.read_bytes(offset, byte_length)
+
+    def rebind(self, store: TextStore, offset: int, byte_length: int) -> None:
+        """Fait pointer un texte non encore chargé vers un autre fichier de textes."""
+        if self._text_source is not None:
+            self._text_source = (store, offset, byte_length)
+
+    def _load_text(self) -> None:
+        if self._text_source is not None:
+            store, offset, byte_length = self._text_source
+            dict.__setitem__(self, 'text', store.read(offset, byte_length))
+            self._text_source = None
+
+    def __missing__(self, key):
+        if key == 'text' and self._text_source is not None:
+            self._load_text()
+            return dict.__getitem__(self, 'text')
+        raise KeyError(key)
+
+    def __setitem__(self, key, value) -> None:
+        if key == 'text':
+            self._text_source = None
+        dict.__setitem__(self, key, value)
+
+    def get(self, key, default=None):
+        if key == 'text':
+            self._load_text()
+        return dict.get(self, key, default)
+
+    def __contains__(self, key) -> bool:
+        return (key == 'text' and self._text_source is not None) or dict.__contains__(self, key)
+
+    def __iter__(self):
+        self._load_text()
+        return dict.__iter__(self)
+
+    def __len__(self) -> int:
+        return dict.__len__(self) + (1 if self._text_source is not None else 0)
+
+    def __eq__(self, other) -> bool:
+        self._load_text()
+        return dict.__eq__(self, other)
+
+    def __repr__(self) -> str:
+        self._load_text()
+        return dict.__repr__(self)
+
+    def keys(self):
+        self._load_text()
+        return dict.keys(self)
+
+    def items(self):
+        self._load_text()
+        return dict.items(self)
+
+    def values(self):
+        self._load_text()
+        return dict.values(self)
+
+    def copy(self) -> Dict[str, Any]:
+        self._load_text()
+        return dict(dict.items(self))
+
+    def __reduce__(self):
+        return (dict, (self.copy(),))
+
+def document_text_length(document: Dict[str, Any]) -> int:
+    """Longueur du texte d'un document sans forcer son chargement."""
+    if isinstance(document, LazyDocument) and not document.text_loaded:
+        return document.text_length
+    return len(document.get('text', ''))
+
+def resolve_storage_dir(filepath: Union[str, Path]) -> Path:
+    """Répertoire de stockage d'une base (``vector_db.pkl`` → ``vector_db/``)."""
+    path = Path(filepath)
+    return path.with_suffix('') if path.suffix == '.pkl' else path
+
+def current_snapshot(directory: Union[str, Path]) -> Optional[Path]:
+    """Retourne l'instantané actif désigné par ``CURRENT``, s'il existe."""
+    directory = Path(directory)
+    try:
+        name = (directory / CURRENT_FILE).read_text(encoding='utf-8').strip()
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    snapshot = directory / name
+    return snapshot if (snapshot / 'manifest.json').exists() else None
+
+def _snapshot_generation(snapshot: Optional[Path]) -> int:
+    if snapshot is None:
+        return 0
+    try:
+        return int(snapshot.name[len(SNAPSHOT_PREFIX):])
+    except ValueError:
+        return 0
+
+def _vectorizer_params(vectorizer: TfidfVectorizer) -> Dict[str, Any]:
+    params = vectorizer.get_params()
+    params['dtype'] = np.dtype(params['dtype']).name
+    if params.get('ngram_range') is not None:
+        params['ngram_range'] = list(params['ngram_range'])
+    # Les objets appelables (tokenizer personnalisé...) ne sont pas sérialisables
+    return {k: v for k, v in params.items() if not callable(v)}
+
+def _restore_vectorizer(snapshot: Path) -> TfidfVectorizer:
+    params = json.loads((snapshot / 'vectorizer.json').read_text(encoding='utf-8'))
+    params['dtype'] = np.dtype(params['dtype']).type
+    if params.get('ngram_range') is not None:
+        params['ngram_range'] = tuple(params['ngram_range'])
+    vectorizer = TfidfVectorizer(**params)
+
+    vocabulary_path = snapshot / 'vocabulary.json'
+    if vocabulary_path.exists():
+        vocabulary = json.loads(vocabulary_path.read_text(encoding='utf-8'))
+        vectorizer.vocabulary_ = {term: int(index) for term, index in vocabulary.items()}
+        vectorizer.idf_ = np.load(snapshot / 'idf.npy')
+    return vectorizer
+
+def _write_json(path: Path, data: Any) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, default=str)
+
+def _write_jsonl(path: Path, records: List[Dict[str, Any]]) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False, default=str))
+            f.write('\n')
+
+def _read_jsonl(path: Path) -> List[Dict[str, Any]]:
+    if not path.exists():
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def write_snapshot(directory: Union[str, Path], documents: List[Dict[str, Any]],
+                   images: List[Dict[str, Any]], vectors: Optional[sp.csr_matrix],
+                   vectorizer: TfidfVectorizer, state: Dict[str, Any],
+                   carry: Iterable[Union[str, Path]] = ()) -> Path:
+    """Écrit un nouvel instantané puis l'active atomiquement.
+
+    ``carry`` liste des répertoires (index annexes de l'instantané précédent)
+    déplacés tels quels dans le nouvel instantané avant son activation.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    previous = current_snapshot(directory)
+    generation = _snapshot_generation(previous) + 1
+    snapshot = directory / f"{SNAPSHOT_PREFIX}{generation:06d}"
+    if snapshot.exists():
+        shutil.rmtree(snapshot)
+    snapshot.mkdir()
+
+    # Textes et métadonnées
+    records = []
+    lazy_documents = []
+    offset = 0
+    with open(snapshot / 'texts.bin', 'wb') as texts_file:
+        for document in documents:
+            if isinstance(document, LazyDocument):
+                raw = document.raw_text_bytes()
+                text_length = document_text_length(document)
+                fields = {k: v for k, v in dict.items(document) if k != 'text'}
+            else:
+                text = document.get('text', '')
+                raw = text.encode('utf-8')
+                text_length = len(text)
+                fields = {k: v for k, v in document.items() if k != 'text'}
+            texts_file.write(raw)
+            if isinstance(document, LazyDocument) and not document.text_loaded:
+                lazy_documents.append((document, offset, len(raw)))
+            records.append({
+                'fields': fields,
+                'text_offset': offset,
+                'text_bytes': len(raw),
+                'text_length': text_length
+            })
+            offset += len(raw)
+    _write_jsonl(snapshot / 'documents.jsonl', records)
+    _write_jsonl(snapshot / 'images.jsonl', images)
+
+    # Matrice creuse
+    if vectors is not None:
+        vectors = sp.csr_matrix(vectors)
+        np.save(snapshot / 'vectors_data.npy', np.asarray(vectors.data))
+        np.save(snapshot / 'vectors_indices.npy', np.asarray(vectors.indices))
+        np.save(snapshot / 'vectors_indptr.npy', np.asarray(vectors.indptr))
+
+    # Vectoriseur
+    _write_json(snapshot / 'vectorizer.json', _vectorizer_params(vectorizer))
+    if hasattr(vectorizer, 'vocabulary_') and hasattr(vectorizer, 'idf_'):
+        _write_json(snapshot / 'vocabulary.json',
+                    {term: int(index) for term, index in vectorizer.vocabulary_.items()})
+        np.save(snapshot / 'idf.npy', np.asarray(vectorizer.idf_))
+
+    _write_json(snapshot / 'manifest.json', {
+        'format_version': FORMAT_VERSION,
+        'generation': generation,
+        'documents': len(documents),
+        'images': len(images),
+        'vectors_shape': list(vectors.shape) if vectors is not None else None,
+        'state': state
+    })
+
+    # Données durables sur disque avant l'activation
+    for entry in snapshot.iterdir():
+        _fsync_file(entry)
+    for path in carry:
+        path = Path(path)
+        if path.is_dir():
+            os.replace(path, snapshot / path.name)
+
+    # Activation atomique puis nettoyage des anciens instantanés
+    pointer_tmp = directory / f"{CURRENT_FILE}.tmp"
+    with open(pointer_tmp, 'w', encoding='utf-8') as f:
+        f.write(snapshot.name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer_tmp, directory / CURRENT_FILE)
+    # Les textes non chargés sont désormais lus dans le nouvel instantané :
+    # l'ancien peut être supprimé sans les rendre illisibles
+    store = TextStore(snapshot / 'texts.bin')
+    for document, text_offset, byte_length in lazy_documents:
+        document.rebind(store, text_offset, byte_length)
+    _remove_stale_snapshots(directory, keep=snapshot.name)
+
+    return snapshot
+
+def _fsync_file(path: Path) -> None:
+    with open(path, 'rb+') as f:
+        os.fsync(f.fileno())
+
+def _remove_stale_snapshots(directory: Path, keep: str) -> None:
+    for entry in directory.iterdir():
+        if entry.is_dir() and entry.name.startswith(SNAPSHOT_PREFIX) and entry.name != keep:
+            # Un instantané encore projeté en mémoire (Windows) sera supprimé plus tard
+            shutil.rmtree(entry, ignore_errors=True)
+
+def read_snapshot(directory: Union[str, Path],
+                  mmap_mode: Optional[str] = 'r') -> Optional[Dict[str, Any]]:
+    """Charge l'instantané actif : métadonnées en mémoire, textes à la demande."""
+    snapshot = current_snapshot(directory)
+    if snapshot is None:
+        return None
+
+    manifest = json.loads((snapshot / 'manifest.json').read_text(encoding='utf-8'))
+    store = TextStore(snapshot / 'texts.bin')
+
+    documents = [
+        LazyDocument(record['fields'], store, record['text_offset'],
+                     record['text_bytes'], record['text_length'])
+        for record in _read_jsonl(snapshot / 'documents.jsonl')
+    ]
+    images = _read_jsonl(snapshot / 'images.jsonl')
+
+    vectors = None
+    if manifest.get('vectors_shape'):
+        vectors = sp.csr_matrix(
+            (np.load(snapshot / 'vectors_data.npy', mmap_mode=mmap_mode),
+             np.load(snapshot / 'vectors_indices.npy', mmap_mode=mmap_mode),
+             np.load(snapshot / 'vectors_indptr.npy', mmap_mode=mmap_mode)),
+            shape=tuple(manifest['vectors_shape']),
+            copy=False
+        )
+
+    return {
+        'snapshot': snapshot,
+        'manifest': manifest,
+        'documents': documents,
+        'images': images,
+        'vectors': vectors,
+        'vectorizer': _restore_vectorizer(snapshot),
+        'state': manifest.get('state', {})
+    }
+
+def _encode_journal_record(record: Dict[str, Any]) -> bytes:
+    payload = json.dumps(record, ensure_ascii=False, default=str).encode('utf-8')
+    return b'%08x\t' % zlib.crc32(payload) + payload + b'\n'
+
+def _decode_journal_line(line: bytes) -> Optional[Dict[str, Any]]:
+    if not line.endswith(b'\n'):
+        return None
+    checksum, sep, payload = line[:-1].partition(b'\t')
+    if not sep:
+        return None
+    try:
+        if int(checksum, 16) != zlib.crc32(payload):
+            return None
+        return json.loads(payload.decode('utf-8'))
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+def read_journal(snapshot: Union[str, Path]) -> Tuple[List[Dict[str, Any]], int]:
+    """Relit le journal d'un instantané.
+    
+    Retourne les opérations validées par un ``commit`` et la taille en octets
+    de la partie valide du fichier (la suite éventuelle est une écriture
+    interrompue).
+    """
+    path = Path(snapshot) / JOURNAL_FILE
+    if not path.exists():
+        return [], 0
+
+    committed: List[Dict[str, Any]] = []
+    pending: List[Dict[str, Any]] = []
+    valid_size = 0
+    offset = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            record = _decode_journal_line(line)
+            if record is None:
+                break
+            offset += len(line)
+            if record.get('op') == 'commit':
+                if record.get('count') != len(pending):
+                    break
+                committed.extend(pending)
+                pending = []
+                valid_size = offset
+            else:
+                pending.append(record)
+    return committed, valid_size
+
+def append_journal(snapshot: Union[str, Path], records: List[Dict[str, Any]],
+                   valid_size: int) -> int:
+    """Ajoute un lot d'opérations suivi d'un ``commit`` et le rend durable.
+    
+    Une fin de fichier invalide au-delà de ``valid_size`` est d'abord tronquée ;
+    un journal plus court que prévu lève ``ValueError``. Retourne la nouvelle
+    taille valide du journal.
+    """
+    path = Path(snapshot) / JOURNAL_FILE
+    data = b''.join(_encode_journal_record(record) for record in records)
+    data += _encode_journal_record({'op': 'commit', 'count': len(records)})
+
+    with open(path, 'ab') as f:
+        if f.tell() < valid_size:
+            raise ValueError(f"Journal tronqué : {path}")
+        if f.tell() > valid_size:
+            f.truncate(valid_size)
+            f.seek(valid_size)
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    return valid_size + len(data)
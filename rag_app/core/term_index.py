@@ -0,0 +1,121 @@
+"""Index exact des codes projet, entreprises et dossiers.
+
+Les questions du type « M595 » ou « connais-tu Coservices » portent sur un
+identifiant précis : plutôt que de scorer tout le corpus, l'index associe
+chaque terme normalisé aux identifiants des documents qui le portent.
+
+Termes indexés par document (métadonnées uniquement, texte jamais lu) :
+
+- ``code`` : codes projet (``M401``, ``A595``...) trouvés dans le nom du
+  fichier, le dossier, le projet ou le titre ;
+- ``company`` : entreprise du ``.data.json`` ;
+- ``dossier`` : identifiant de dossier du ``.data.json``.
+
+Une requête est découpée en n-grammes de mots, chacun cherché par simple
+accès au dictionnaire : le coût ne dépend pas de la taille du corpus.
+"""
+
+import os
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+from ..config.settings import TERM_INDEX_CONFIG
+
+FIELDS = ('code', 'company', 'dossier')
+
+_CODE_RE = re.compile(TERM_INDEX_CONFIG.get('code_pattern', r'(?<![a-z0-9])[ma]\d{3}(?!\d)'))
+_WORD_RE = re.compile(r'[^\W_]+', re.UNICODE)
+
+def normalize_term(value: str) -> str:
+    """Minuscules, sans accents, mots séparés par une espace."""
+    folded = unicodedata.normalize('NFKD', str(value).lower())
+    folded = ''.join(char for char in folded if not unicodedata.combining(char))
+    return ' '.join(_WORD_RE.findall(folded))
+
+def extract_codes(text: str) -> List[str]:
+    """Codes projet présents dans un texte (minuscules, sans doublon)."""
+    return list(dict.fromkeys(_CODE_RE.findall(str(text).lower())))
+
+def document_terms(document: Dict[str, Any]) -> Set[Tuple[str, str]]:
+    """Couples ``(champ, terme)`` indexés pour un document."""
+    metadata = document.get('metadata') or {}
+    terms = set()
+    source = os.path.basename(str(metadata.get('source', '') or ''))
+    for value in (source, metadata.get('dossier', ''), metadata.get('project', ''),
+                  metadata.get('title', '')):
+        terms.update(('code', code) for code in extract_codes(value or ''))
+    for field, key in (('company', 'entreprise'), ('dossier', 'dossier')):
+        term = normalize_term(metadata.get(key, '') or '')
+        if term:
+            terms.add((field, term))
+    return terms
+
+class TermIndex:
+    """Dictionnaire ``(champ, terme) → identifiants de documents`` tenu à jour par id."""
+
+    def __init__(self):
+        self._postings: Dict[Tuple[str, str], Dict[Any, None]] = {}
+        self._document_terms: Dict[Any, Set[Tuple[str, str]]] = {}
+        # Nombre de mots du plus long terme indexé (taille des n-grammes essayés)
+        self._max_words = 1
+
+    @property
+    def size(self) -> int:
+        return len(self._document_terms)
+
+    def add(self, document: Dict[str, Any]) -> None:
+        doc_id = document.get('id')
+        if doc_id in self._document_terms:
+            return
+        terms = document_terms(document)
+        self._document_terms[doc_id] = terms
+        for term in terms:
+            # Dictionnaire ordonné : les documents restent dans l'ordre d'ajout
+            self._postings.setdefault(term, {})[doc_id] = None
+            self._max_words = max(self._max_words, term[1].count(' ') + 1)
+
+    def extend(self, documents: Iterable[Dict[str, Any]]) -> None:
+        for document in documents:
+            self.add(document)
+
+    def remove(self, doc_ids: Iterable[Any]) -> int:
+        removed = 0
+        for doc_id in doc_ids:
+            terms = self._document_terms.pop(doc_id, None)
+            if terms is None:
+                continue
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(doc_id, None)
+                    if not postings:
+                        del self._postings[term]
+            removed += 1
+        return removed
+
+    def lookup(self, field: str, value: str) -> List[Any]:
+        """Identifiants des documents dont le champ vaut exactement ``value``."""
+        term = value.lower() if field == 'code' else normalize_term(value)
+        return list(self._postings.get((field, term), ()))
+
+    def match(self, query: str) -> List[Tuple[str, str]]:
+        """Termes indexés présents dans la requête, dans leur ordre d'apparition."""
+        matched = [('code', code) for code in extract_codes(query)
+                   if ('code', code) in self._postings]
+        words = normalize_term(query).split()
+        for size in range(min(self._max_words, len(words)), 0, -1):
+            for start in range(len(words) - size + 1):
+                term = ' '.join(words[start:start + size])
+                for field in ('company', 'dossier'):
+                    if (field, term) in self._postings and (field, term) not in matched:
+                        matched.append((field, term))
+        return matched
+
+    def documents_for(self, terms: Iterable[Tuple[str, str]]) -> Dict[Any, List[Tuple[str, str]]]:
+        """Identifiants des documents portant au moins un des termes, avec les termes portés."""
+        found: Dict[Any, List[Tuple[str, str]]] = {}
+        for term in terms:
+            for doc_id in self._postings.get(term, ()):
+                found.setdefault(doc_id, []).append(term)
+        return found
@@ -1,19 +1,113 @@
 """Module de base de données vectorielle refactorisé."""
 
 import pickle
+import shutil
+import uuid
 import numpy as np
-from typing import List, Dict, Optional, Any
+import scipy.sparse as sp
+from typing import List, Dict, Optional, Any, Iterable, Iterator, Tuple, Union
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 from datetime import datetime
-import os
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
 
-from ..config.settings import VECTOR_DB_FILE
+from ..config.settings import (
+    VECTOR_DB_DIR, INDEXING_CONFIG, STORAGE_CONFIG, DENSE_CONFIG, HYBRID_CONFIG
+)
+from .bm25_index import BM25Index, reciprocal_rank_fusion
+from .term_index import TermIndex
+from .candidature_table import CandidatureTable, remember_guessed_company
+from .dense_index import DenseIndex, get_embedder
+from .metadata_index import MetadataIndex
+from .storage import (
+    append_journal,
+    current_snapshot,
+    document_text_length,
+    read_journal,
+    read_snapshot,
+    resolve_storage_dir,
+    write_snapshot
+)
+
+# Seuil de similarité minimum des résultats de recherche
+MIN_SIMILARITY = 0.1
+
+# Sous-répertoire de la base contenant l'index dense
+DENSE_INDEX_DIR = 'dense'
+
+# Sous-répertoire de l'instantané contenant l'index BM25
+BM25_INDEX_DIR = 'bm25'
+
+def iter_ranked_indices(similarities: np.ndarray, min_similarity: float = MIN_SIMILARITY,
+                        first_batch: int = 5) -> Iterator[int]:
+    """Parcourt les indices par similarité décroissante sans trier tout le tableau.
+    
+    Seuls les indices au-dessus de ``min_similarity`` sont retenus (masque
+    vectorisé), puis extraits par paquets de taille croissante avec
+    ``np.argpartition``. L'ordre est celui de ``np.argsort(...)[::-1]`` avec un
+    tri stable : à similarité égale, l'indice le plus grand vient d'abord.
+    """
+    remaining = np.flatnonzero(similarities >= min_similarity)
+    batch_size = max(int(first_batch), 1)
+    
+    while remaining.size:
+        if remaining.size > batch_size:
+            scores = similarities[remaining]
+            kth = remaining.size - batch_size
+            cutoff = scores[np.argpartition(scores, kth)[kth]]
+            # Les ex aequo du seuil sont tous pris pour garder un ordre exact
+            selected = scores >= cutoff
+            chunk, remaining = remaining[selected], remaining[~selected]
+        else:
+            chunk, remaining = remaining, remaining[:0]
+            
+        for idx in chunk[np.lexsort((-chunk, -similarities[chunk]))]:
+            yield int(idx)
+        batch_size *= 4
 
 class VectorDatabase:
-    """Base de données vectorielle optimisée et modulaire."""
+    """Base de données vectorielle optimisée et modulaire.
+    
+    En mode incrémental, les documents ajoutés sont projetés sur le
+    vocabulaire et l'IDF du dernier fit puis empilés dans la matrice creuse.
+    Le vocabulaire n'est recalculé que par ``rebuild()`` ou automatiquement
+    quand la dérive (documents ajoutés depuis le fit / documents au fit)
+    dépasse ``refit_drift_threshold``.
+    
+    Tolérance par rapport à une refonte complète : pour un terme du
+    vocabulaire, l'IDF recalculé ne dépasse jamais l'IDF gelé de plus de
+    ``ln(1 + seuil)`` (≈ 0.18 pour le seuil par défaut de 0.2) ; il peut en
+    revanche baisser pour les termes devenus fréquents depuis le fit. Les termes
+    apparus depuis le dernier fit sont ignorés jusqu'à la prochaine refonte,
+    ce qui peut légèrement surévaluer les scores des documents récents
+    (normalisation L2 sur leurs seuls termes connus).
+    
+    Persistance : ``save()`` n'ajoute au journal de l'instantané courant que
+    les opérations effectuées depuis la sauvegarde précédente. L'instantané est
+    réécrit en entier (compaction) quand le vocabulaire a été recalculé, quand
+    la base est vidée ou quand le journal devient trop long par rapport à
+    l'instantané (``STORAGE_CONFIG``).
     
-    def __init__(self):
+    Recherche dense : avec ``backend='dense'`` (ou ``DENSE_CONFIG['default_backend']``),
+    les requêtes sont comparées aux embeddings des documents dans un index IVF
+    (``dense_index.DenseIndex``) construit à la première recherche dense, tenu
+    à jour ensuite et sauvegardé dans le sous-répertoire ``dense`` de la base.
+    
+    Recherche lexicale : un index BM25 à champs (texte, source, tags, titre),
+    tenu à jour à chaque ajout ou suppression, alimente ``search_bm25`` et
+    ``hybrid_search``. Il est écrit dans l'instantané (sous-répertoire
+    ``bm25``) à chaque compaction et rouvert à la première requête qui s'en
+    sert ; les opérations du journal y sont alors rattrapées.
+    
+    Recherche exacte : un index des codes projet, entreprises et dossiers
+    (``term_index.TermIndex``), alimenté à l'indexation des documents, répond à
+    ``exact_lookup`` sans scorer le corpus.
+    """
+    
+    def __init__(self, incremental: Optional[bool] = None,
+                 refit_drift_threshold: Optional[float] = None):
         self.documents = []
         self.images = []
         self.vectors = None
@@ -22,17 +116,102 @@ class VectorDatabase:
             stop_words='english',
             ngram_range=(1, 2)
         )
+        self.incremental = (INDEXING_CONFIG.get('incremental', True)
+                            if incremental is None else incremental)
+        self.refit_drift_threshold = (INDEXING_CONFIG.get('refit_drift_threshold', 0.2)
+                                      if refit_drift_threshold is None else refit_drift_threshold)
+        # Nombre de documents lors du dernier fit du vocabulaire
+        self._fitted_doc_count = 0
+        # Lot en cours : profondeur d'imbrication et premier document non vectorisé
+        self._batch_depth = 0
+        self._batch_start = None
+        # Identifiant stable attribué au prochain document
+        self._next_id = 0
+        # Identifiant de la base, conservé d'un instantané à l'autre
+        self._database_id = uuid.uuid4().hex
+        # Opérations non sauvegardées et instantané sur lequel elles sont journalisées
+        self._pending_ops = []
+        self._needs_compaction = True
+        self._storage_dir = None
+        self._storage_snapshot = None
+        self._snapshot_doc_count = 0
+        self._journal_size = 0
+        self._journal_records = 0
+        # Index inversé des métadonnées, construit à la première recherche filtrée
+        self._metadata_index = None
+        # Index dense, documents déjà embarqués et position de chaque identifiant
+        self._dense_index = None
+        self._dense_synced = 0
+        self._id_positions = None
+        # Index BM25 et documents déjà indexés
+        self._bm25_index = None
+        self._bm25_synced = 0
+        # Index exact des codes, entreprises et dossiers
+        self._term_index = None
+        self._term_synced = 0
+        # Table des candidatures (une ligne par dossier)
+        self._candidature_table = None
+        self._candidature_synced = 0
+        
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        """Complète les attributs absents des bases pickle plus anciennes."""
+        self.__dict__.update(state)
+        self.__dict__.setdefault('incremental', INDEXING_CONFIG.get('incremental', True))
+        self.__dict__.setdefault('refit_drift_threshold',
+                                 INDEXING_CONFIG.get('refit_drift_threshold', 0.2))
+        if '_fitted_doc_count' not in self.__dict__:
+            self._fitted_doc_count = len(self.documents) if self.vectors is not None else 0
+        self._batch_depth = 0
+        self._batch_start = None
+        self.__dict__.setdefault('_next_id', 0)
+        self.__dict__.setdefault('_database_id', uuid.uuid4().hex)
+        self._pending_ops = []
+        self._needs_compaction = True
+        self._storage_dir = None
+        self._storage_snapshot = None
+        self._snapshot_doc_count = 0
+        self._journal_size = 0
+        self._journal_records = 0
+        self._metadata_index = None
+        self._dense_index = None
+        self._dense_synced = 0
+        self._id_positions = None
+        self._bm25_index = None
+        self._bm25_synced = 0
+        self._term_index = None
+        self._term_synced = 0
+        self._candidature_table = None
+        self._candidature_synced = 0
+        self._ensure_ids()
+        
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state['_batch_depth'] = 0
+        state['_batch_start'] = None
+        state['_metadata_index'] = None
+        state['_dense_index'] = None
+        state['_dense_synced'] = 0
+        state['_id_positions'] = None
+        state['_bm25_index'] = None
+        state['_bm25_synced'] = 0
+        state['_term_index'] = None
+        state['_term_synced'] = 0
+        state['_candidature_table'] = None
+        state['_candidature_synced'] = 0
+        return state
         
     def add_document(self, text: str, metadata: Dict[str, Any]) -> None:
         """Ajoute un document à la base vectorielle."""
         document = {
+            'id': self._allocate_id(),
             'text': text,
             'metadata': metadata,
             'timestamp': datetime.now().isoformat(),
             'type': 'document'
         }
         self.documents.append(document)
-        self._update_vectors()
+        self._pending_ops.append({'op': 'add', 'document': document})
+        self._index_new_documents(len(self.documents) - 1)
         
     def add_image(self, image_path: str, text_content: str, description: str, 
                   categories: List[str], metadata: Dict[str, Any]) -> None:
@@ -54,69 +233,665 @@ class VectorDatabase:
         self.images.append(image_data)
         
         # Ajouter aussi comme document pour la recherche textuelle
-        self.documents.append({
+        start = len(self.documents)
+        document = {
+            'id': self._allocate_id(),
             'text': search_text,
             'metadata': {**metadata, 'type': 'image', 'image_path': image_path},
             'timestamp': datetime.now().isoformat(),
             'type': 'image_document'
-        })
+        }
+        self.documents.append(document)
+        self._pending_ops.append({'op': 'add_image', 'image': image_data, 'document': document})
         
+        self._index_new_documents(start)
+        
+    def add_documents(self, documents: Iterable[Union[Tuple[str, Dict[str, Any]], Dict[str, Any]]]) -> int:
+        """Ajoute plusieurs documents avec une seule passe de vectorisation.
+        
+        Accepte des tuples ``(text, metadata)`` ou des dictionnaires
+        ``{'text': ..., 'metadata': ...}``. Retourne le nombre de documents ajoutés.
+        """
+        count = 0
+        with self.batch():
+            for item in documents:
+                if isinstance(item, dict):
+                    self.add_document(item['text'], item.get('metadata', {}))
+                else:
+                    text, metadata = item
+                    self.add_document(text, metadata)
+                count += 1
+        return count
+        
+    def add_document_chunks(self, chunks: Iterable[Dict[str, Any]], metadata: Dict[str, Any]) -> int:
+        """Ajoute les passages d'un même document source.
+        
+        ``chunks`` contient des dictionnaires ``{'text', 'start', 'end'}``
+        (voir ``utils.text_chunker.chunk_text``). Chaque passage devient une
+        ligne de l'index dont les métadonnées reprennent celles du document
+        avec ``parent_id``, ``chunk_index``, ``chunk_count`` et les décalages
+        ``chunk_start``/``chunk_end`` dans le texte d'origine, complétées par
+        le dictionnaire ``metadata`` propre au passage s'il existe (pages).
+        Retourne l'identifiant du document parent.
+        """
+        chunks = list(chunks)
+        parent_id = self._allocate_id()
+        with self.batch():
+            for index, chunk in enumerate(chunks):
+                self.add_document(chunk['text'], {
+                    **metadata,
+                    'parent_id': parent_id,
+                    'chunk_index': index,
+                    'chunk_count': len(chunks),
+                    'chunk_start': chunk.get('start'),
+                    'chunk_end': chunk.get('end'),
+                    **chunk.get('metadata', {})
+                })
+        return parent_id
+        
+    def add_images(self, images: Iterable[Dict[str, Any]]) -> int:
+        """Ajoute plusieurs images (arguments nommés de ``add_image``) en un seul lot."""
+        count = 0
+        with self.batch():
+            for image in images:
+                self.add_image(**image)
+                count += 1
+        return count
+        
+    @contextmanager
+    def batch(self) -> Iterator['VectorDatabase']:
+        """Diffère la vectorisation des ajouts jusqu'à la sortie du bloc.
+        
+        Les blocs peuvent être imbriqués : seule la sortie du bloc le plus
+        externe déclenche la vectorisation.
+        """
+        if self._batch_depth == 0:
+            self._batch_start = len(self.documents)
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                start = self._batch_start
+                self._batch_start = None
+                if start < len(self.documents):
+                    self._index_new_documents(start)
+        
+    def get_index_drift(self) -> float:
+        """Retourne la dérive du vocabulaire depuis le dernier fit complet."""
+        if self.vectors is None or self._fitted_doc_count == 0:
+            return 0.0 if not self.documents else float('inf')
+        added = len(self.documents) - self._fitted_doc_count
+        return max(added, 0) / self._fitted_doc_count
+        
+    def rebuild(self) -> None:
+        """Recalcule vocabulaire, IDF et vecteurs sur tout le corpus."""
         self._update_vectors()
         
+    def _index_new_documents(self, start: int) -> None:
+        """Vectorise les documents à partir de ``start`` sans refit si possible."""
+        if self._batch_depth:
+            return
+            
+        # Métadonnées seules : index exact tenu à jour dès l'indexation
+        self._get_term_index()
+        # Entreprise devinée tant que les textes sont en mémoire ; table des
+        # candidatures complétée si elle couvre les documents précédents, sinon
+        # (base rechargée) construite à la première requête
+        for document in self.documents[start:]:
+            remember_guessed_company(document)
+        if self._candidature_synced >= start:
+            self._get_candidature_table()
+        # Index BM25 complété s'il couvre les documents précédents ; sinon (base
+        # rechargée) rouvert ou construit à la première requête
+        if self._bm25_synced >= start:
+            self._get_bm25_index()
+            
+        if (not self.incremental or self.vectors is None
+                or self.vectors.shape[0] != start
+                or self.get_index_drift() > self.refit_drift_threshold):
+            self._update_vectors()
+            return
+            
+        texts = [doc['text'] for doc in self.documents[start:]]
+        try:
+            new_vectors = self.vectorizer.transform(texts)
+            self.vectors = sp.vstack([self.vectors, new_vectors], format='csr')
+        except Exception as e:
+            print(f"Erreur lors de la vectorisation incrémentale: {e}")
+            self._update_vectors()
+        
     def _update_vectors(self) -> None:
-        """Met à jour les vecteurs TF-IDF."""
+        """Met à jour les vecteurs TF-IDF (refonte complète du vocabulaire)."""
         if not self.documents:
             self.vectors = None
+            self._fitted_doc_count = 0
             return
             
         texts = [doc['text'] for doc in self.documents]
+        # Vocabulaire et vecteurs changent : le journal ne suffit plus
+        self._needs_compaction = True
         try:
             self.vectors = self.vectorizer.fit_transform(texts)
+            self._fitted_doc_count = len(self.documents)
         except Exception as e:
             print(f"Erreur lors de la vectorisation: {e}")
             self.vectors = None
+            self._fitted_doc_count = 0
             
     def search(self, query: str, top_k: int = 5, filter_by: Optional[Dict] = None,
-               filter_type: Optional[str] = None) -> List[Dict]:
-        """Recherche les documents les plus similaires avec filtrage optionnel."""
-        if not self.documents or self.vectors is None:
-            return []
+               filter_type: Optional[str] = None, backend: Optional[str] = None) -> List[Dict]:
+        """Recherche les documents les plus similaires avec filtrage optionnel.
+        
+        ``backend`` choisit le moteur : ``'tfidf'`` ou ``'dense'`` (par défaut
+        ``DENSE_CONFIG['default_backend']``).
+        """
+        return self.search_many([query], top_k=top_k, filter_by=filter_by,
+                                filter_type=filter_type, backend=backend)[0]
+        
+    def search_many(self, queries: List[str], top_k: int = 5, filter_by: Optional[Dict] = None,
+                    filter_type: Optional[str] = None,
+                    backend: Optional[str] = None) -> List[List[Dict]]:
+        """Recherche plusieurs requêtes en une seule passe sur le corpus.
+        
+        Les requêtes sont vectorisées ensemble et scorées par un unique produit
+        matriciel creux. Retourne, pour chaque requête et dans le même ordre,
+        les résultats qu'aurait donnés ``search``.
+        """
+        queries = list(queries)
+        if self._resolve_backend(backend) == 'dense':
+            return self._dense_search_many(queries, top_k, filter_by, filter_type)
+        if not queries or not self.documents or self.vectors is None:
+            return [[] for _ in queries]
             
-        # Vectoriser la requête
+        # Vectoriser les requêtes
         try:
-            query_vector = self.vectorizer.transform([query])
+            query_vectors = self.vectorizer.transform(queries)
         except Exception:
-            return []
+            return [[] for _ in queries]
             
-        # Calculer les similarités
-        similarities = cosine_similarity(query_vector, self.vectors)[0]
+        # Préfiltrage par l'index des métadonnées : seules les lignes
+        # retenues sont scorées
+        rows, residual_filter = None, None
+        if filter_by or filter_type:
+            rows, residual_filter = self._get_metadata_index().filter_rows(
+                filter_by, filter_type, limit=self.vectors.shape[0]
+            )
+            if rows is not None and rows.size == 0:
+                return [[] for _ in queries]
+                
+        # Calculer les similarités (résultat creux : une ligne par requête)
+        matrix = self.vectors if rows is None else self.vectors[rows]
+        similarities = cosine_similarity(query_vectors, matrix, dense_output=False).tocsr()
         
-        # Obtenir les indices triés par similarité décroissante
-        top_indices = np.argsort(similarities)[::-1]
+        return [
+            list(islice(self._iter_results(similarities[i].toarray()[0], rows, residual_filter,
+                                           first_batch=top_k * 4 if residual_filter else top_k),
+                        max(top_k, 1)))
+            for i in range(len(queries))
+        ]
         
-        results = []
-        for idx in top_indices:
-            if similarities[idx] < 0.1:  # Seuil de similarité minimum
-                break
+    def search_grouped(self, query: str, top_k: int = 5, chunks_per_group: int = 3,
+                       filter_by: Optional[Dict] = None,
+                       filter_type: Optional[str] = None,
+                       backend: Optional[str] = None) -> List[Dict]:
+        """Recherche des passages regroupés par document parent.
+        
+        Retourne au plus ``top_k`` groupes, par similarité de leur meilleur
+        passage : ``{'parent_id', 'document', 'similarity', 'chunks'}`` où
+        ``document``/``similarity`` sont ceux du meilleur passage et ``chunks``
+        les ``chunks_per_group`` meilleurs passages du parent rencontrés avant
+        que ``top_k`` groupes soient réunis. Un document non découpé forme un
+        groupe à lui seul.
+        """
+        if self._resolve_backend(backend) == 'dense':
+            results = self._iter_dense_query(query, filter_by, filter_type,
+                                             first_batch=top_k * chunks_per_group)
+        else:
+            results = self._iter_tfidf_query(query, filter_by, filter_type,
+                                             first_batch=top_k * chunks_per_group)
+            
+        groups = {}
+        for result in results:
+            document = result['document']
+            parent_id = document.get('metadata', {}).get('parent_id', document.get('id'))
+            group = groups.get(parent_id)
+            if group is None:
+                if len(groups) >= top_k:
+                    break
+                groups[parent_id] = {
+                    'parent_id': parent_id,
+                    'document': document,
+                    'similarity': result['similarity'],
+                    'chunks': [result]
+                }
+            elif len(group['chunks']) < chunks_per_group:
+                group['chunks'].append(result)
                 
-            document = self.documents[idx]
+        return list(groups.values())
+        
+    def search_bm25(self, query: str, top_k: int = 5, filter_by: Optional[Dict] = None,
+                    filter_type: Optional[str] = None) -> List[Dict]:
+        """Recherche lexicale BM25 ; ``similarity`` contient le score BM25."""
+        return list(islice(self._iter_bm25_query(query, filter_by, filter_type), max(top_k, 1)))
+        
+    def hybrid_search(self, query: str, top_k: int = 5, filter_by: Optional[Dict] = None,
+                      filter_type: Optional[str] = None, backend: Optional[str] = None,
+                      candidates: Optional[int] = None) -> List[Dict]:
+        """Recherche BM25 + vectorielle fusionnée par rang réciproque (RRF).
+        
+        Les ``candidates`` premiers résultats de chaque moteur sont fusionnés.
+        Chaque résultat contient ``document``, ``score`` (score RRF),
+        ``similarity`` (similarité vectorielle, 0 si absent du classement
+        vectoriel) et ``bm25_score``.
+        """
+        candidates = candidates or max(HYBRID_CONFIG.get('candidates', 50), top_k)
+        vector_results = self.search(query, top_k=candidates, filter_by=filter_by,
+                                     filter_type=filter_type, backend=backend)
+        bm25_results = self.search_bm25(query, top_k=candidates, filter_by=filter_by,
+                                        filter_type=filter_type)
+        
+        documents = {}
+        similarities, bm25_scores = {}, {}
+        for result in vector_results:
+            doc_id = result['document']['id']
+            documents[doc_id] = result['document']
+            similarities[doc_id] = result['similarity']
+        for result in bm25_results:
+            doc_id = result['document']['id']
+            documents[doc_id] = result['document']
+            bm25_scores[doc_id] = result['similarity']
             
-            # Appliquer les filtres si spécifiés
-            if filter_by and not self._matches_filter(document, filter_by):
+        fused = reciprocal_rank_fusion([
+            [result['document']['id'] for result in vector_results],
+            [result['document']['id'] for result in bm25_results]
+        ])
+        return [
+            {
+                'document': documents[doc_id],
+                'score': score,
+                'similarity': similarities.get(doc_id, 0.0),
+                'bm25_score': bm25_scores.get(doc_id, 0.0)
+            }
+            for doc_id, score in fused[:max(top_k, 1)]
+        ]
+        
+    def exact_lookup(self, query: str, filter_by: Optional[Dict] = None,
+                     filter_type: Optional[str] = None, top_k: Optional[int] = None) -> List[Dict]:
+        """Documents portant un code projet, une entreprise ou un dossier cité dans ``query``.
+        
+        Retourne une liste vide si la requête ne cite aucun terme indexé.
+        Chaque résultat contient ``document``, ``similarity`` (1.0),
+        ``bm25_score`` et ``matched_terms``. Les documents portant le plus de
+        termes de la requête viennent d'abord, puis par score BM25 de la
+        requête (calculé sur les seuls documents trouvés) ; le meilleur passage
+        de chaque document parent passe avant les autres passages du même
+        parent. ``top_k`` limite le nombre de résultats.
+        """
+        index = self._get_term_index()
+        terms = index.match(query)
+        if not terms:
+            return []
+        found = index.documents_for(terms)
+        
+        rows, residual_filter = None, None
+        if filter_by or filter_type:
+            rows, residual_filter = self._get_metadata_index().filter_rows(
+                filter_by, filter_type, limit=len(self.documents)
+            )
+        allowed = None if rows is None else set(rows.tolist())
+        
+        positions = self._get_id_positions()
+        results = []
+        for doc_id, matched in found.items():
+            position = positions.get(doc_id)
+            if position is None or (allowed is not None and position not in allowed):
                 continue
-                
-            if filter_type and document.get('type') != filter_type:
+            document = self.documents[position]
+            if residual_filter and not self._matches_filter(document, residual_filter):
                 continue
-                
             results.append({
                 'document': document,
-                'similarity': float(similarities[idx])
+                'similarity': 1.0,
+                'bm25_score': 0.0,
+                'matched_terms': [term for _, term in matched]
             })
+        if not results:
+            return []
+            
+        # Scores BM25 de la requête, retenus pour les seuls documents trouvés
+        ids, scores = self._get_bm25_index().scores(query)
+        bm25_scores = dict(zip(ids.tolist(), scores.tolist()))
+        for result in results:
+            result['bm25_score'] = bm25_scores.get(result['document']['id'], 0.0)
+        results.sort(key=lambda result: (len(result['matched_terms']), result['bm25_score']),
+                     reverse=True)
+        
+        # Un passage par parent d'abord, les autres passages ensuite
+        best, others = [], []
+        seen_parents = set()
+        for result in results:
+            document = result['document']
+            parent_id = document.get('metadata', {}).get('parent_id', document.get('id'))
+            (others if parent_id in seen_parents else best).append(result)
+            seen_parents.add(parent_id)
+        results = best + others
+        return results if top_k is None else results[:top_k]
+        
+    def _get_term_index(self) -> TermIndex:
+        """Retourne l'index exact, complété des documents ajoutés depuis."""
+        if self._term_index is None:
+            self._term_index = TermIndex()
+            self._term_synced = 0
+        if self._term_synced < len(self.documents):
+            self._term_index.extend(self.documents[self._term_synced:])
+            self._term_synced = len(self.documents)
+        return self._term_index
+        
+    def get_candidatures(self, filter_by: Optional[Dict] = None) -> List[Dict]:
+        """Lignes de la table des candidatures, triées par dossier.
+        
+        Une ligne par dossier ou, pour les documents sans dossier ni code, par
+        entreprise (``dossier`` vide). Chaque ligne contient ``dossier``,
+        ``entreprise``, ``etat``, ``todo``, ``contact``, ``tel``, ``mail``,
+        ``date``, ``date_reponse``, ``title``, ``category``, les indicateurs
+        ``cv``/``ba``, ``projects``, ``sources`` et ``document_count``.
+        ``filter_by`` compare des champs de la ligne.
+        """
+        return self._get_candidature_table().rows(filter_by)
+        
+    def get_candidature_companies(self, filter_by: Optional[Dict] = None) -> Dict[str, List[Dict]]:
+        """Lignes de la table des candidatures regroupées par entreprise."""
+        return self._get_candidature_table().companies(filter_by)
+        
+    def _get_candidature_table(self) -> CandidatureTable:
+        """Retourne la table des candidatures, complétée des documents ajoutés depuis.
+        
+        Construite à partir des métadonnées : seuls les documents sauvegardés
+        sans entreprise devinée (bases antérieures) voient leur texte relu, une
+        fois, l'entreprise étant ensuite sauvegardée avec eux.
+        """
+        if self._candidature_table is None:
+            self._candidature_table = CandidatureTable()
+            self._candidature_synced = 0
+        if self._candidature_synced < len(self.documents):
+            documents = self.documents[self._candidature_synced:]
+            for document in documents:
+                remember_guessed_company(document)
+            self._candidature_table.extend(documents)
+            self._candidature_synced = len(self.documents)
+        return self._candidature_table
+        
+    def _iter_bm25_query(self, query: str, filter_by: Optional[Dict],
+                         filter_type: Optional[str]) -> Iterator[Dict]:
+        """Résultats BM25 d'une requête par score décroissant."""
+        if not self.documents:
+            return
+        rows, residual_filter = None, None
+        if filter_by or filter_type:
+            rows, residual_filter = self._get_metadata_index().filter_rows(
+                filter_by, filter_type, limit=len(self.documents)
+            )
+            if rows is not None and rows.size == 0:
+                return
+                
+        ids, scores = self._get_bm25_index().scores(query)
+        positions = self._get_id_positions()
+        position_array = np.fromiter((positions.get(doc_id, -1) for doc_id in ids),
+                                     dtype=np.int64, count=len(ids))
+        keep = position_array >= 0
+        if rows is not None:
+            keep &= np.isin(position_array, rows)
+        position_array, scores = position_array[keep], scores[keep]
+        
+        # Scores BM25 non bornés : aucun seuil, tous les documents contenant un terme
+        for i in iter_ranked_indices(scores, min_similarity=0.0,
+                                     first_batch=HYBRID_CONFIG.get('candidates', 50)):
+            document = self.documents[int(position_array[i])]
+            if residual_filter and not self._matches_filter(document, residual_filter):
+                continue
+            yield {'document': document, 'similarity': float(scores[i])}
+            
+    def _get_bm25_index(self) -> BM25Index:
+        """Retourne l'index BM25, complété des documents ajoutés depuis.
+        
+        L'index sauvegardé dans l'instantané est rouvert au premier appel : les
+        documents supprimés depuis en sont retirés et seuls les documents qu'il
+        ne contient pas (ajouts du journal) sont indexés.
+        """
+        if self._bm25_index is None:
+            index = None
+            if self._storage_snapshot is not None:
+                index = BM25Index.load(self._storage_snapshot / BM25_INDEX_DIR)
+                if index is not None:
+                    index.retain(doc['id'] for doc in self.documents)
+            self._bm25_index = index or BM25Index()
+            self._bm25_synced = 0
+        if self._bm25_synced < len(self.documents):
+            self._bm25_index.extend(self.documents[self._bm25_synced:])
+            self._bm25_synced = len(self.documents)
+        return self._bm25_index
+        
+    def _iter_tfidf_query(self, query: str, filter_by: Optional[Dict], filter_type: Optional[str],
+                          first_batch: int) -> Iterator[Dict]:
+        """Résultats TF-IDF d'une requête par similarité décroissante."""
+        if not self.documents or self.vectors is None:
+            return
+            
+        try:
+            query_vector = self.vectorizer.transform([query])
+        except Exception:
+            return
+            
+        rows, residual_filter = None, None
+        if filter_by or filter_type:
+            rows, residual_filter = self._get_metadata_index().filter_rows(
+                filter_by, filter_type, limit=self.vectors.shape[0]
+            )
+            if rows is not None and rows.size == 0:
+                return
+                
+        matrix = self.vectors if rows is None else self.vectors[rows]
+        similarities = cosine_similarity(query_vector, matrix)[0]
+        yield from self._iter_results(similarities, rows, residual_filter, first_batch)
+        
+    @staticmethod
+    def _resolve_backend(backend: Optional[str]) -> str:
+        backend = backend or DENSE_CONFIG.get('default_backend', 'tfidf')
+        if backend not in ('tfidf', 'dense'):
+            raise ValueError(f"Moteur de recherche inconnu: {backend}")
+        return backend
+        
+    def _dense_search_many(self, queries: List[str], top_k: int, filter_by: Optional[Dict],
+                           filter_type: Optional[str]) -> List[List[Dict]]:
+        """Équivalent de ``search_many`` sur l'index dense."""
+        if not queries or not self.documents:
+            return [[] for _ in queries]
+        query_vectors = get_embedder().embed(queries)
+        return [
+            list(islice(self._iter_dense_query(None, filter_by, filter_type, first_batch=top_k,
+                                               query_vector=query_vector), max(top_k, 1)))
+            for query_vector in query_vectors
+        ]
+        
+    def _iter_dense_query(self, query: Optional[str], filter_by: Optional[Dict],
+                          filter_type: Optional[str], first_batch: int,
+                          query_vector: Optional[np.ndarray] = None) -> Iterator[Dict]:
+        """Résultats de l'index dense par similarité décroissante.
+        
+        Le nombre de voisins demandés à l'index est multiplié par 4 tant que
+        le consommateur demande des résultats (filtres écartant des voisins) ;
+        quand les listes sondées sont épuisées, toutes les listes sont parcourues.
+        """
+        if not self.documents:
+            return
+        rows, residual_filter = None, None
+        if filter_by or filter_type:
+            rows, residual_filter = self._get_metadata_index().filter_rows(
+                filter_by, filter_type, limit=len(self.documents)
+            )
+            if rows is not None and rows.size == 0:
+                return
+        allowed = None
+        if rows is not None:
+            allowed = np.zeros(len(self.documents), dtype=bool)
+            allowed[rows] = True
+            
+        index = self._get_dense_index()
+        positions = self._get_id_positions()
+        if query_vector is None:
+            query_vector = get_embedder().embed([query])[0]
+        min_similarity = DENSE_CONFIG.get('min_similarity', MIN_SIMILARITY)
+        
+        k = max(int(first_batch), 1)
+        seen = set()
+        while index.size:
+            exhaustive = k >= index.size
+            ids, scores = index.search(query_vector, k, nprobe=index.nlist if exhaustive else None)[0]
+            for doc_id, score in zip(ids.tolist(), scores.tolist()):
+                if score < min_similarity:
+                    return
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                position = positions.get(doc_id)
+                if position is None or (allowed is not None and not allowed[position]):
+                    continue
+                document = self.documents[position]
+                if residual_filter and not self._matches_filter(document, residual_filter):
+                    continue
+                yield {'document': document, 'similarity': float(score)}
+            if exhaustive:
+                return
+            # Listes sondées épuisées : parcours exhaustif
+            k = min(k * 4, index.size) if len(ids) >= k else index.size
+            
+    def _get_dense_index(self) -> DenseIndex:
+        """Retourne l'index dense, complété des documents ajoutés depuis.
+        
+        Un index sauvegardé avec la base est rouvert s'il provient du même
+        embedder et de la même base (voir ``_dense_state``) : les documents
+        supprimés depuis en sont retirés et seuls les documents qu'il ne
+        contient pas sont embarqués.
+        """
+        embedder = get_embedder()
+        if self._dense_index is None or self._dense_index.signature != embedder.signature:
+            index = None
+            if self._storage_dir is not None:
+                index = DenseIndex.load(self._storage_dir / DENSE_INDEX_DIR, embedder.signature,
+                                        state=self._dense_state())
+                if index is not None:
+                    index.retain(doc['id'] for doc in self.documents)
+            self._dense_index = index or DenseIndex(embedder.dim, embedder.signature)
+            self._dense_synced = 0
+            
+        if self._dense_synced < len(self.documents):
+            pending = [doc for doc in self.documents[self._dense_synced:]
+                       if doc['id'] not in self._dense_index]
+            batch_size = 256
+            for start in range(0, len(pending), batch_size):
+                batch = pending[start:start + batch_size]
+                self._dense_index.add(embedder.embed(doc['text'] for doc in batch),
+                                      [doc['id'] for doc in batch])
+            self._dense_synced = len(self.documents)
+        return self._dense_index
+        
+    def _get_id_positions(self) -> Dict[Any, int]:
+        """Position de chaque identifiant dans ``documents`` (complétée à chaque ajout)."""
+        if self._id_positions is None or len(self._id_positions) > len(self.documents):
+            self._id_positions = {}
+        for position in range(len(self._id_positions), len(self.documents)):
+            self._id_positions[self.documents[position]['id']] = position
+        return self._id_positions
+        
+    def _forget_removed(self, doc_ids: List[Any], positions: List[int]) -> None:
+        """Retire des index annexes les documents supprimés (positions avant suppression)."""
+        self._id_positions = None
+        if self._dense_index is not None:
+            self._dense_index.remove(doc_ids)
+            self._dense_synced -= sum(1 for position in positions
+                                      if position < self._dense_synced)
+        if self._bm25_index is not None:
+            self._bm25_index.remove(doc_ids)
+            self._bm25_synced -= sum(1 for position in positions
+                                     if position < self._bm25_synced)
+        if self._term_index is not None:
+            self._term_index.remove(doc_ids)
+            self._term_synced -= sum(1 for position in positions
+                                     if position < self._term_synced)
+        if self._candidature_table is not None:
+            self._candidature_table.remove(doc_ids)
+            self._candidature_synced -= sum(1 for position in positions
+                                            if position < self._candidature_synced)
+            
+    def _forget_images(self, removed: List[Dict[str, Any]]) -> None:
+        """Retire de ``images`` les images dont plus aucun document ne porte le chemin."""
+        paths = {doc['metadata'].get('image_path') for doc in removed
+                 if doc.get('type') == 'image_document' and doc.get('metadata')}
+        paths.discard(None)
+        if not paths or not self.images:
+            return
+        # Une même image indexée deux fois reste tant qu'un de ses documents existe
+        paths -= {doc['metadata'].get('image_path') for doc in self.documents
+                  if doc.get('type') == 'image_document' and doc.get('metadata')}
+        if paths:
+            self.images = [image for image in self.images if image.get('image_path') not in paths]
             
-            if len(results) >= top_k:
-                break
+    def _dense_state(self) -> Dict[str, Any]:
+        """Base accompagnée par l'index dense et identifiants qu'elle a déjà attribués.
+        
+        Un index sauvegardé n'est rouvert que pour la même base et s'il ne
+        contient aucun identifiant que celle-ci n'a pas encore attribué ; les
+        ajouts et suppressions postérieurs sont rattrapés à l'ouverture.
+        """
+        return {'database': self._database_id, 'next_id': self._next_id}
+        
+    def _save_dense_index(self, directory: Path, bound: bool = True) -> None:
+        """Sauvegarde l'index dense s'il a changé depuis son chargement.
+        
+        ``bound`` indique que ``directory`` est le répertoire auquel la base
+        était déjà rattachée. Dans un autre répertoire, l'index en mémoire est
+        écrit même inchangé et, sans index en mémoire, celui d'une autre base
+        est supprimé.
+        """
+        path = Path(directory) / DENSE_INDEX_DIR
+        if self._dense_index is not None:
+            if self._dense_index.dirty or not bound:
+                self._dense_index.save(path, state=self._dense_state())
+        elif not bound and path.exists():
+            shutil.rmtree(path, ignore_errors=True)
+            
+    def _save_bm25_index(self) -> None:
+        """Écrit l'index BM25 en mémoire dans l'instantané qui vient d'être créé."""
+        if self._bm25_index is not None:
+            self._get_bm25_index().save(self._storage_snapshot / BM25_INDEX_DIR)
+        
+    def _iter_results(self, similarities: np.ndarray, rows: Optional[np.ndarray],
+                      residual_filter: Optional[Dict], first_batch: int) -> Iterator[Dict]:
+        """Produit les résultats d'une requête par similarité décroissante."""
+        # Sélection partielle des meilleurs indices au-dessus du seuil, élargie
+        # tant que le consommateur demande des résultats
+        for position in iter_ranked_indices(similarities, MIN_SIMILARITY, first_batch):
+            idx = position if rows is None else int(rows[position])
+            document = self.documents[idx]
+            
+            # Filtres sur des champs non indexés
+            if residual_filter and not self._matches_filter(document, residual_filter):
+                continue
                 
-        return results
+            yield {
+                'document': document,
+                'similarity': float(similarities[position])
+            }
+        
+    def _get_metadata_index(self) -> MetadataIndex:
+        """Retourne l'index des métadonnées, complété des documents ajoutés depuis."""
+        if self._metadata_index is None or self._metadata_index.size > len(self.documents):
+            self._metadata_index = MetadataIndex()
+        if self._metadata_index.size < len(self.documents):
+            self._metadata_index.extend(self.documents[self._metadata_index.size:])
+        return self._metadata_index
         
     def _matches_filter(self, document: Dict, filter_by: Dict) -> bool:
         """Vérifie si un document correspond aux critères de filtrage."""
@@ -169,7 +944,8 @@ class VectorDatabase:
         categories = self.get_categories()
         projects = self.get_projects()
         
-        total_chars = sum(len(doc['text']) for doc in self.documents)
+        # Longueurs stockées : pas de lecture des textes chargés à la demande
+        total_chars = sum(document_text_length(doc) for doc in self.documents)
         
         return {
             'total_documents': len(self.documents),
@@ -179,29 +955,179 @@ class VectorDatabase:
             'projects': len(projects),
             'categories_list': categories,
             'projects_list': projects,
-            'has_vectors': self.vectors is not None
+            'has_vectors': self.vectors is not None,
+            'index_drift': self.get_index_drift()
         }
         
     def save(self, filepath: str = None) -> None:
-        """Sauvegarde la base vectorielle."""
-        if filepath is None:
-            filepath = str(VECTOR_DB_FILE)
-            
-        # Créer le dossier si nécessaire
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        """Sauvegarde la base vectorielle.
+        
+        Les opérations depuis la dernière sauvegarde sont ajoutées au journal
+        de l'instantané courant ; une compaction complète n'a lieu que si
+        nécessaire. ``filepath`` désigne le répertoire de la base ; un ancien
+        chemin ``vector_db.pkl`` est redirigé vers le répertoire ``vector_db``.
+        """
+        directory = resolve_storage_dir(filepath or VECTOR_DB_DIR)
         
         try:
-            with open(filepath, 'wb') as f:
-                pickle.dump(self, f)
+            if self._should_compact(directory):
+                self.compact(directory)
+            elif self._pending_ops:
+                try:
+                    self._journal_size = append_journal(
+                        self._storage_snapshot, self._pending_ops, self._journal_size
+                    )
+                except ValueError:
+                    # Journal modifié hors de cette instance : repartir d'un instantané
+                    self.compact(directory)
+                    return
+                self._journal_records += len(self._pending_ops)
+                self._pending_ops = []
+                self._save_dense_index(directory)
         except Exception as e:
             print(f"Erreur lors de la sauvegarde: {e}")
             
+    def compact(self, filepath: str = None) -> None:
+        """Réécrit la base complète dans un nouvel instantané (journal vide).
+        
+        Les textes pas encore chargés sont rattachés au nouvel instantané
+        avant la suppression de l'ancien (voir ``write_snapshot``). L'index
+        BM25 est écrit s'il est en mémoire ; sinon celui de l'instantané
+        précédent est repris tel quel, rattrapé à sa réouverture.
+        """
+        directory = resolve_storage_dir(filepath or VECTOR_DB_DIR)
+        bound = self._storage_dir is not None and Path(directory).resolve() == self._storage_dir
+        carry = []
+        if bound and self._bm25_index is None and self._storage_snapshot is not None:
+            carry.append(self._storage_snapshot / BM25_INDEX_DIR)
+        snapshot = write_snapshot(
+            directory,
+            documents=self.documents,
+            images=self.images,
+            vectors=self.vectors,
+            vectorizer=self.vectorizer,
+            state={'fitted_doc_count': self._fitted_doc_count, 'next_id': self._next_id,
+                   'database_id': self._database_id},
+            carry=carry
+        )
+        self._bind_storage(directory, snapshot)
+        self._save_bm25_index()
+        self._save_dense_index(directory, bound=bound)
+        
+    def _should_compact(self, directory: Path) -> bool:
+        """Détermine si la sauvegarde doit réécrire un instantané complet."""
+        if self._needs_compaction or self._storage_snapshot is None:
+            return True
+        if Path(directory).resolve() != self._storage_dir:
+            return True
+        # Un autre processus a pu écrire un instantané entre-temps
+        snapshot = current_snapshot(directory)
+        if snapshot is None or snapshot.resolve() != self._storage_snapshot:
+            return True
+            
+        records = self._journal_records + len(self._pending_ops)
+        limit = max(STORAGE_CONFIG.get('compaction_min_records', 500),
+                    STORAGE_CONFIG.get('compaction_ratio', 0.5) * self._snapshot_doc_count)
+        return records > limit
+        
+    def _bind_storage(self, directory: Path, snapshot: Path) -> None:
+        """Rattache la base à un instantané dont elle reflète exactement le contenu."""
+        self._storage_dir = Path(directory).resolve()
+        self._storage_snapshot = Path(snapshot).resolve()
+        self._snapshot_doc_count = len(self.documents)
+        self._journal_size = 0
+        self._journal_records = 0
+        self._pending_ops = []
+        self._needs_compaction = False
+        
     @classmethod
     def load(cls, filepath: str = None) -> 'VectorDatabase':
-        """Charge la base vectorielle depuis un fichier."""
-        if filepath is None:
-            filepath = str(VECTOR_DB_FILE)
+        """Charge la base vectorielle (vecteurs projetés en mémoire, textes à la demande).
+        
+        L'instantané actif est chargé puis les opérations validées de son
+        journal sont rejouées. Les index BM25 et dense ne sont rouverts qu'à
+        la première requête qui s'en sert.
+        """
+        directory = resolve_storage_dir(filepath or VECTOR_DB_DIR)
+        
+        try:
+            snapshot = read_snapshot(directory)
+            if snapshot is not None:
+                records, journal_size = read_journal(snapshot['snapshot'])
+        except Exception as e:
+            print(f"Erreur lors du chargement: {e}")
+            return cls()
+            
+        if snapshot is not None:
+            db = cls()
+            db.documents = snapshot['documents']
+            db.images = snapshot['images']
+            db.vectors = snapshot['vectors']
+            db.vectorizer = snapshot['vectorizer']
+            db._fitted_doc_count = snapshot['state'].get('fitted_doc_count', len(db.documents))
+            db._next_id = snapshot['state'].get('next_id', 0)
+            db._database_id = snapshot['state'].get('database_id') or db._database_id
+            db._bind_storage(directory, snapshot['snapshot'])
+            if db._ensure_ids() or 'database_id' not in snapshot['state']:
+                # Instantané antérieur aux identifiants de document ou de base :
+                # réécrit au prochain save()
+                db._needs_compaction = True
+            db._replay_journal(records)
+            db._journal_size = journal_size
+            db._journal_records = len(records)
+            return db
+            
+        # Ancien format pickle : converti au prochain save()
+        return cls._load_legacy_pickle(directory.with_suffix('.pkl'))
+        
+    def _replay_journal(self, records: List[Dict[str, Any]]) -> None:
+        """Rejoue les opérations du journal sur l'instantané chargé."""
+        if not records:
+            return
             
+        # Les vecteurs sont projetés sur le vocabulaire de l'instantané, comme
+        # lors des ajouts d'origine : aucune refonte pendant la relecture
+        threshold = self.refit_drift_threshold
+        self.refit_drift_threshold = float('inf')
+        try:
+            with self.batch():
+                removed_ids = []
+                for record in records:
+                    op = record.get('op')
+                    if op in ('add', 'add_image'):
+                        if op == 'add_image':
+                            self.images.append(record['image'])
+                        document = record['document']
+                        self.documents.append(document)
+                        self._next_id = max(self._next_id, document.get('id', -1) + 1)
+                    elif op == 'remove':
+                        removed_ids.append(record.get('id'))
+                # Identifiants jamais réattribués : les suppressions peuvent
+                # être appliquées en une passe, après tous les ajouts
+                self.remove_documents_by_ids(removed_ids)
+        finally:
+            self.refit_drift_threshold = threshold
+        self._pending_ops = []
+        
+    def _allocate_id(self) -> int:
+        doc_id = self._next_id
+        self._next_id += 1
+        return doc_id
+        
+    def _ensure_ids(self) -> bool:
+        """Attribue un identifiant aux documents qui n'en ont pas."""
+        missing = [doc for doc in self.documents if 'id' not in doc]
+        if not missing:
+            return False
+        existing = [doc['id'] for doc in self.documents if 'id' in doc]
+        self._next_id = max([self._next_id] + [doc_id + 1 for doc_id in existing])
+        for doc in missing:
+            doc['id'] = self._allocate_id()
+        return True
+        
+    @classmethod
+    def _load_legacy_pickle(cls, filepath) -> 'VectorDatabase':
+        """Charge une base sauvegardée par pickle de l'objet complet."""
         try:
             with open(filepath, 'rb') as f:
                 db = pickle.load(f)
@@ -223,14 +1149,97 @@ class VectorDatabase:
         self.documents = []
         self.images = []
         self.vectors = None
+        self._fitted_doc_count = 0
+        if self._batch_start is not None:
+            self._batch_start = 0
+        self._pending_ops = []
+        self._needs_compaction = True
+        self._metadata_index = None
+        self._id_positions = None
+        if self._dense_index is not None:
+            self._dense_index.retain([])
+        self._dense_synced = 0
+        # Index vide plutôt qu'absent : l'index de l'instantané n'est pas repris
+        self._bm25_index = BM25Index()
+        self._bm25_synced = 0
+        self._term_index = None
+        self._term_synced = 0
+        self._candidature_table = None
+        self._candidature_synced = 0
         
     def remove_document(self, index: int) -> bool:
         """Supprime un document par son index."""
         try:
             if 0 <= index < len(self.documents):
-                self.documents.pop(index)
-                self._update_vectors()
+                document = self.documents.pop(index)
+                self._metadata_index = None
+                self._forget_removed([document.get('id')], [index])
+                self._forget_images([document])
+                self._pending_ops.append({'op': 'remove', 'id': document.get('id')})
+                if self._batch_start is not None:
+                    if index >= self._batch_start:
+                        # Document du lot en cours : pas encore vectorisé
+                        return True
+                    self._batch_start -= 1
+                vectorized = (self._batch_start if self._batch_start is not None
+                              else len(self.documents))
+                if (self.incremental and self.vectors is not None
+                        and self.vectors.shape[0] == vectorized + 1):
+                    # Retirer la ligne sans recalculer le vocabulaire
+                    keep = np.ones(self.vectors.shape[0], dtype=bool)
+                    keep[index] = False
+                    self.vectors = self.vectors[keep] if self.vectors.shape[0] > 1 else None
+                    self._fitted_doc_count = max(self._fitted_doc_count - 1, 0)
+                else:
+                    self._update_vectors()
                 return True
             return False
         except Exception:
             return False
+            
+    def get_document_by_id(self, doc_id: Any) -> Optional[Dict[str, Any]]:
+        """Retourne le document portant cet identifiant, ou ``None``."""
+        position = self._get_id_positions().get(doc_id)
+        return self.documents[position] if position is not None else None
+        
+    def remove_document_by_id(self, doc_id: Any) -> bool:
+        """Supprime un document par son identifiant stable."""
+        index = self._get_id_positions().get(doc_id)
+        return index is not None and self.remove_document(index)
+        
+    def remove_documents_by_ids(self, doc_ids: Iterable[Any]) -> int:
+        """Supprime en une passe les documents dont l'identifiant est fourni.
+        
+        Retourne le nombre de documents supprimés.
+        """
+        ids = set(doc_ids)
+        positions = [i for i, doc in enumerate(self.documents) if doc.get('id') in ids]
+        if not positions:
+            return 0
+            
+        drop = np.zeros(len(self.documents), dtype=bool)
+        drop[positions] = True
+        vectorized = (self._batch_start if self._batch_start is not None
+                      else len(self.documents))
+        removed_vectorized = int(drop[:vectorized].sum())
+        
+        removed = [self.documents[position] for position in positions]
+        for document in removed:
+            self._pending_ops.append({'op': 'remove', 'id': document.get('id')})
+        self.documents = [doc for doc, dropped in zip(self.documents, drop) if not dropped]
+        self._metadata_index = None
+        self._forget_removed(list(ids), positions)
+        self._forget_images(removed)
+        
+        if self._batch_start is not None:
+            self._batch_start -= removed_vectorized
+        if removed_vectorized:
+            if (self.incremental and self.vectors is not None
+                    and self.vectors.shape[0] == vectorized):
+                # Retirer les lignes sans recalculer le vocabulaire
+                keep = ~drop[:vectorized]
+                self.vectors = self.vectors[keep] if keep.any() else None
+                self._fitted_doc_count = max(self._fitted_doc_count - removed_vectorized, 0)
+            else:
+                self._update_vectors()
+        return len(positions)
@@ -1,25 +1,120 @@
 """Service de traitement par lots."""
 
 import os
-from typing import List, Tuple, Dict, Callable, Optional, Any
+import time
+from itertools import chain
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Tuple, Dict, Callable, Optional, Any, Iterable, Iterator
 from pathlib import Path
 import streamlit as st
 
 from ..core.vector_database import VectorDatabase
 from ..utils.file_utils import (
-    find_files_recursive, 
+    iter_files_recursive, 
     extract_text_from_file,
+    extract_text_from_image_files,
+    extract_pdf_page_range,
+    get_cached_text,
+    get_pdf_page_count,
+    store_cached_text,
     validate_directory_path,
     is_file_too_large
 )
-from ..config.settings import PROCESSING_CONFIG
+from ..utils.keyword_matcher import KeywordMatcher
+from ..utils.text_chunker import PAGE_BREAK, assign_pages, chunk_text
+from ..config.settings import CLASSIFICATION_CONFIG, OCR_CONFIG, PDF_CONFIG, PROCESSING_CONFIG
+
+DOCUMENT_EXTENSIONS = ['.pdf', '.txt']
+IMAGE_EXTENSIONS = ['.png', '.jpg', '.jpeg']
+
+# Catégories d'images selon les mots-clés du texte OCR
+_IMAGE_CATEGORY_MATCHER = KeywordMatcher(CLASSIFICATION_CONFIG['image_categories'])
+
+# Pool de processus partagé entre les traitements (les workers restent chargés)
+_extraction_pool = None
+_extraction_pool_size = 0
+
+def _get_extraction_pool(max_workers: int) -> Optional[ProcessPoolExecutor]:
+    """Retourne le pool d'extraction, créé au premier usage."""
+    global _extraction_pool, _extraction_pool_size
+    if _extraction_pool is not None and _extraction_pool_size != max_workers:
+        _shutdown_extraction_pool()
+    if _extraction_pool is None:
+        try:
+            _extraction_pool = ProcessPoolExecutor(max_workers=max_workers)
+            _extraction_pool_size = max_workers
+        except (OSError, ValueError, NotImplementedError) as e:
+            print(f"Pool d'extraction indisponible, traitement séquentiel: {e}")
+            return None
+    return _extraction_pool
+
+def _shutdown_extraction_pool(futures: Iterable[Any] = ()) -> None:
+    """Arrête le pool sans attendre ses workers, après annulation de ``futures``.
+    
+    Les extractions en file sont annulées ici plutôt que par
+    ``shutdown(cancel_futures=True)``, absent de Python 3.8.
+    """
+    global _extraction_pool, _extraction_pool_size
+    for future in futures:
+        future.cancel()
+    if _extraction_pool is not None:
+        _extraction_pool.shutdown(wait=False)
+    _extraction_pool = None
+    _extraction_pool_size = 0
+
+def _extract_file(file_path: str) -> Tuple[str, Optional[str], Dict[str, Any]]:
+    """Extrait le texte d'un fichier (exécuté dans un worker).
+    
+    Retourne ``(texte, erreur, infos)`` où ``infos`` contient au moins la
+    durée ``seconds`` ; les exceptions sont converties en message pour ne
+    jamais interrompre le pool.
+    """
+    if Path(file_path).suffix.lower() in IMAGE_EXTENSIONS:
+        return _extract_image_batch([file_path])[0]
+    start = time.perf_counter()
+    try:
+        return extract_text_from_file(file_path) or "", None, {'seconds': time.perf_counter() - start}
+    except Exception as e:
+        return "", str(e), {'seconds': time.perf_counter() - start}
+
+def _extract_pdf_range(file_path: str, start: int, stop: int) -> Tuple[str, Optional[str], Dict[str, Any]]:
+    """Extrait une tranche de pages d'un PDF (exécuté dans un worker)."""
+    started = time.perf_counter()
+    try:
+        return extract_pdf_page_range(file_path, start, stop), None, {'seconds': time.perf_counter() - started}
+    except Exception as e:
+        return "", str(e), {'seconds': time.perf_counter() - started}
+
+def _extract_image_batch(file_paths: List[str]) -> List[Tuple[str, Optional[str], Dict[str, Any]]]:
+    """OCR d'un lot d'images par un seul processus Tesseract (exécuté dans un worker).
+    
+    Les infos de chaque image comprennent la décision de la pré-analyse
+    (``ocr_skipped``, ``text_components``).
+    """
+    try:
+        return [(outcome['text'] or "", None,
+                 {key: outcome[key] for key in ('seconds', 'ocr_skipped', 'text_components')})
+                for outcome in extract_text_from_image_files(file_paths)]
+    except Exception as e:
+        if len(file_paths) == 1:
+            return [("", str(e), {'seconds': 0.0})]
+        # Lot en échec : chaque image est retentée seule pour isoler l'erreur
+        return [_extract_image_batch([file_path])[0] for file_path in file_paths]
 
 class BatchService:
     """Service pour le traitement par lots de documents et images."""
     
-    def __init__(self, vector_db: VectorDatabase):
+    def __init__(self, vector_db: VectorDatabase, max_workers: Optional[int] = None):
         self.vector_db = vector_db
         self.max_file_size_mb = PROCESSING_CONFIG.get('max_file_size_mb', 100)
+        workers = PROCESSING_CONFIG.get('extraction_workers') if max_workers is None else max_workers
+        self.max_workers = max(int(workers or os.cpu_count() or 1), 1)
+        self.max_chunk_size = PROCESSING_CONFIG.get('max_chunk_size', 500)
+        self.chunk_overlap = PROCESSING_CONFIG.get('chunk_overlap', 50)
+        self.pdf_split_min_bytes = PDF_CONFIG.get('split_min_size_mb', 1) * 1024 * 1024
+        self.pages_per_task = PDF_CONFIG.get('pages_per_task', 50)
+        self.ocr_batch_size = OCR_CONFIG.get('batch_size', 8)
         
     def process_directory(
         self, 
@@ -28,75 +123,257 @@ class BatchService:
         progress_callback: Optional[Callable] = None,
         enable_vision: bool = False
     ) -> Dict[str, Any]:
-        """Traite tous les fichiers d'un répertoire."""
+        """Traite tous les fichiers d'un répertoire.
+        
+        L'extraction du texte (PDF, TXT, OCR) s'exécute en parallèle dans un
+        pool de ``max_workers`` processus ; l'indexation reste faite par ce
+        seul thread, dans l'ordre où les extractions se terminent. Les
+        extractions démarrent pendant le parcours du répertoire.
+        ``progress_callback(traités, total, fichier)`` est appelé une fois par
+        fichier, après son traitement ; tant que le parcours n'est pas terminé,
+        ``total`` est le nombre de fichiers trouvés jusqu'ici.
+        """
         
         if not validate_directory_path(directory):
             return {'error': f"Répertoire non accessible: {directory}"}
         
-        # Trouver tous les fichiers
-        files_found = find_files_recursive(directory, file_extensions)
-        
         results = {
             'success': 0,
             'errors': 0,
             'skipped': 0,
             'errors_list': [],
             'images_processed': [],
-            'total_files': len(files_found)
+            'total_files': 0
         }
         
-        total_files = len(files_found)
+        # Parcours et traitement simultanés, une seule passe de vectorisation
+        files_found = iter_files_recursive(directory, file_extensions)
+        with self.vector_db.batch():
+            results['total_files'] = self.process_files(files_found, results, progress_callback, enable_vision)
+                
+        return results
+        
+    def process_files(
+        self,
+        files_found: Iterable[Tuple[str, Dict]],
+        results: Dict[str, Any],
+        progress_callback: Optional[Callable],
+        enable_vision: bool
+    ) -> int:
+        """Traite des fichiers et agrège les compteurs dans ``results``.
+        
+        ``files_found`` peut être un générateur (``iter_files_recursive``) :
+        les fichiers partent à l'extraction au fur et à mesure qu'il les
+        produit. Retourne le nombre de fichiers reçus.
+        """
+        total_files = len(files_found) if hasattr(files_found, '__len__') else None
+        discovered = 0
+        completed = 0
+        
+        def report(file_path: str) -> None:
+            nonlocal completed
+            completed += 1
+            if progress_callback:
+                progress_callback(completed, total_files or discovered, file_path)
         
-        for i, (file_path, annonce_data) in enumerate(files_found):
+        def iter_tasks() -> Iterator[Tuple[str, Dict]]:
+            # Tri préalable : seuls les fichiers à indexer partent à l'extraction
+            nonlocal discovered
+            for file_path, annonce_data in files_found:
+                discovered += 1
+                try:
+                    # Vérifier la taille du fichier
+                    if is_file_too_large(file_path, self.max_file_size_mb):
+                        results['skipped'] += 1
+                        results['errors_list'].append(f"{file_path}: Fichier trop volumineux")
+                        report(file_path)
+                        continue
+                        
+                    file_ext = Path(file_path).suffix.lower()
+                    if file_ext in DOCUMENT_EXTENSIONS or (file_ext in IMAGE_EXTENSIONS and enable_vision):
+                        yield file_path, annonce_data
+                    else:
+                        results['skipped'] += 1
+                        report(file_path)
+                except Exception as e:
+                    results['errors'] += 1
+                    results['errors_list'].append(f"{file_path}: {str(e)}")
+                    report(file_path)
+        
+        # Indexation au fil des extractions terminées
+        for file_path, annonce_data, text, error, info in self._iter_extractions(iter_tasks()):
             try:
-                if progress_callback:
-                    progress_callback(i, total_files, file_path)
-                    
-                # Vérifier la taille du fichier
-                if is_file_too_large(file_path, self.max_file_size_mb):
-                    results['skipped'] += 1
-                    results['errors_list'].append(f"{file_path}: Fichier trop volumineux")
+                if error:
+                    results['errors'] += 1
+                    results['errors_list'].append(f"{file_path}: {error}")
                     continue
                     
                 # Traiter selon le type de fichier
                 file_ext = Path(file_path).suffix.lower()
                 
-                if file_ext in ['.pdf', '.txt']:
-                    success = self._process_document(file_path, annonce_data)
+                if file_ext in DOCUMENT_EXTENSIONS:
+                    success = self._process_document(file_path, annonce_data, text)
                     if success:
                         results['success'] += 1
                     else:
                         results['errors'] += 1
-                        
-                elif file_ext in ['.png', '.jpg', '.jpeg'] and enable_vision:
-                    img_result = self._process_image(file_path, annonce_data)
+                else:
+                    img_result = self._process_image(file_path, annonce_data, text, info)
                     if img_result:
                         results['images_processed'].append(img_result)
                         results['success'] += 1
                     else:
                         results['skipped'] += 1
-                else:
-                    results['skipped'] += 1
                         
             except Exception as e:
                 results['errors'] += 1
                 results['errors_list'].append(f"{file_path}: {str(e)}")
+            finally:
+                report(file_path)
+        
+        return discovered
                 
-        return results
+    def _iter_extractions(self, tasks: Iterable[Tuple[str, Dict]]) -> Iterator[Tuple[str, Dict, str, Optional[str], Dict[str, Any]]]:
+        """Extrait les textes en parallèle et les produit par ordre de fin d'extraction.
+        
+        Chaque résultat est ``(fichier, métadonnées, texte, erreur, infos)``.
+        """
+        tasks = iter(tasks)
+        pending = {}
+        pool = _get_extraction_pool(self.max_workers) if self.max_workers > 1 else None
+        
+        if pool is not None:
+            try:
+                yield from self._iter_pool_results(pool, tasks, pending)
+            except BrokenProcessPool as e:
+                # Worker tué (mémoire, OCR bloqué...) : on termine séquentiellement
+                print(f"Pool d'extraction interrompu, reprise séquentielle: {e}")
+                _shutdown_extraction_pool(future for future in pending if future is not None)
+                
+        # Extractions soumises mais non abouties, puis le reste des fichiers
+        interrupted = {id(group): group['task'] for targets in pending.values() for group, _ in targets}
+        for task in chain(list(interrupted.values()), tasks):
+            yield task + _extract_file(task[0])
+                
+    def _iter_pool_results(self, pool: ProcessPoolExecutor, tasks: Iterator[Tuple[str, Dict]],
+                           pending: Dict[Any, List[Tuple[Dict, int]]]) -> Iterator[Tuple[str, Dict, str, Optional[str], Dict[str, Any]]]:
+        """Soumet les extractions par fenêtre bornée et produit les résultats terminés.
+        
+        Un gros PDF est extrait par tranches de pages sur plusieurs workers,
+        puis réassemblé ; les images sont regroupées par lots de
+        ``ocr_batch_size`` pour un seul appel à Tesseract. ``pending`` associe
+        chaque extraction en cours à ses cibles ``(groupe, tranche)`` ; il est
+        laissé à l'appelant pour reprendre ces fichiers si le pool casse (les
+        extractions jamais soumises, images en attente de lot comprises, sous
+        la clé ``None``).
+        """
+        window = self.max_workers * 2
+        exhausted = False
+        images = []
+        
+        def submit(function: Callable, args: Tuple, targets: List[Tuple[Dict, int]]) -> None:
+            try:
+                pending[pool.submit(function, *args)] = targets
+            except BrokenProcessPool:
+                # Extraction jamais soumise : reprise séquentielle par l'appelant
+                pending.setdefault(None, []).extend(targets)
+                raise
         
-    def _process_document(self, file_path: str, annonce_data: Dict) -> bool:
-        """Traite un document (PDF ou TXT)."""
+        try:
+            while True:
+                while not exhausted and len(pending) < window:
+                    task = next(tasks, None)
+                    if task is None:
+                        exhausted = True
+                        break
+                    if Path(task[0]).suffix.lower() in IMAGE_EXTENSIONS and self.ocr_batch_size > 1:
+                        images.append(self._new_group(task, 1))
+                        if len(images) >= self.ocr_batch_size:
+                            submit(_extract_image_batch, ([group['task'][0] for group in images],),
+                                   [(group, 0) for group in images])
+                            images = []
+                        continue
+                    parts = self._extraction_parts(task[0])
+                    group = self._new_group(task, len(parts))
+                    for index, (function, args) in enumerate(parts):
+                        submit(function, args, [(group, index)])
+                if images and (exhausted or not pending):
+                    # Dernier lot incomplet
+                    submit(_extract_image_batch, ([group['task'][0] for group in images],),
+                           [(group, 0) for group in images])
+                    images = []
+                if not pending:
+                    return
+                
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    result = future.result()
+                    targets = pending.pop(future)
+                    outcomes = result if isinstance(result, list) else [result]
+                    for (group, index), (text, error, info) in zip(targets, outcomes):
+                        group['texts'][index] = text
+                        group['error'] = group['error'] or error
+                        group['info'] = {**info, 'seconds': group['info'].get('seconds', 0.0) + info['seconds']}
+                        group['remaining'] -= 1
+                        if group['remaining'] == 0:
+                            yield group['task'] + self._join_parts(group)
+                        
+        except BrokenProcessPool:
+            # Images en attente d'un lot complet : à reprendre aussi
+            pending.setdefault(None, []).extend((group, 0) for group in images)
+            raise
+                        
+    @staticmethod
+    def _new_group(task: Tuple[str, Dict], part_count: int) -> Dict[str, Any]:
+        """Suivi de l'extraction d'un fichier réparti en ``part_count`` tranches."""
+        return {'task': task, 'texts': [""] * part_count, 'error': None,
+                'info': {}, 'remaining': part_count}
+                    
+    def _extraction_parts(self, file_path: str) -> List[Tuple[Callable, Tuple]]:
+        """Découpe l'extraction d'un gros PDF en tranches de pages, sinon une seule tâche."""
+        parts = [(_extract_file, (file_path,))]
+        if Path(file_path).suffix.lower() != '.pdf' or self.pages_per_task <= 0:
+            return parts
+        try:
+            if os.path.getsize(file_path) < self.pdf_split_min_bytes or get_cached_text(file_path) is not None:
+                return parts
+            page_count = get_pdf_page_count(file_path)
+        except Exception:
+            # PDF illisible : l'extraction complète remontera l'erreur
+            return parts
+        if page_count <= self.pages_per_task:
+            return parts
+        return [
+            (_extract_pdf_range, (file_path, start, min(start + self.pages_per_task, page_count)))
+            for start in range(0, page_count, self.pages_per_task)
+        ]
+        
+    def _join_parts(self, group: Dict[str, Any]) -> Tuple[str, Optional[str], Dict[str, Any]]:
+        """Réassemble les tranches d'un PDF et met le texte complet en cache."""
+        if len(group['texts']) == 1 or group['error']:
+            return (group['texts'][0] if len(group['texts']) == 1 else ""), group['error'], group['info']
+        text = PAGE_BREAK.join(group['texts'])
+        store_cached_text(group['task'][0], text)
+        return text, None, group['info']
+        
+    def _process_document(self, file_path: str, annonce_data: Dict, text: Optional[str] = None) -> bool:
+        """Traite un document (PDF ou TXT) dont le texte est extrait si non fourni."""
         try:
             # Extraire le texte
-            text = extract_text_from_file(file_path)
+            if text is None:
+                text = extract_text_from_file(file_path)
             if not text or len(text.strip()) < 10:
                 return False
                 
             # Préparer les métadonnées
             metadata = self._prepare_metadata(file_path, annonce_data)
             
-            # Ajouter à la base vectorielle
-            self.vector_db.add_document(text, metadata)
+            # Découper en passages puis les ajouter à la base vectorielle
+            chunks = chunk_text(text, self.max_chunk_size, self.chunk_overlap)
+            if Path(file_path).suffix.lower() == '.pdf':
+                # Seul l'extracteur PDF sépare les pages par PAGE_BREAK
+                chunks = assign_pages(chunks, text)
+            self.vector_db.add_document_chunks(chunks, metadata)
             
             return True
             
@@ -104,11 +381,20 @@ class BatchService:
             st.error(f"Erreur traitement document {file_path}: {e}")
             return False
             
-    def _process_image(self, image_path: str, annonce_data: Dict) -> Optional[Dict]:
-        """Traite une image avec OCR et analyse."""
+    def _process_image(self, image_path: str, annonce_data: Dict,
+                       text_content: Optional[str] = None,
+                       ocr_info: Optional[Dict[str, Any]] = None) -> Optional[Dict]:
+        """Traite une image avec OCR (si le texte n'est pas fourni) et analyse.
+        
+        ``ocr_info`` décrit l'extraction (durée, décision de la pré-analyse) ;
+        une image jugée sans texte n'a pas été passée à l'OCR et va
+        directement à la classification.
+        """
         try:
             # OCR pour extraire le texte
-            text_content = extract_text_from_file(image_path) or ""
+            if text_content is None:
+                text_content, _, ocr_info = _extract_file(image_path)
+            ocr_info = ocr_info or {}
             
             # Description automatique (stub pour l'instant)
             description = self._generate_image_description(image_path)
@@ -119,6 +405,9 @@ class BatchService:
             # Préparer les métadonnées
             metadata = self._prepare_metadata(image_path, annonce_data)
             metadata['type'] = 'image'
+            metadata['ocr_skipped'] = bool(ocr_info.get('ocr_skipped'))
+            if ocr_info.get('text_components') is not None:
+                metadata['text_components'] = ocr_info['text_components']
             
             # Ajouter à la base vectorielle
             self.vector_db.add_image(
@@ -133,7 +422,9 @@ class BatchService:
                 'file': image_path,
                 'description': description,
                 'categories': categories,
-                'ocr_text': text_content[:100] + "..." if len(text_content) > 100 else text_content
+                'ocr_text': text_content[:100] + "..." if len(text_content) > 100 else text_content,
+                'ocr_seconds': round(ocr_info.get('seconds', 0.0), 3),
+                'ocr_skipped': metadata['ocr_skipped']
             }
             
         except Exception as e:
@@ -157,6 +448,21 @@ class BatchService:
             'status': annonce_data.get('status', 'active')
         }
         
+        # Identifiants du .data.json, indexés tels quels pour les recherches exactes
+        original_data = annonce_data.get('original_data') or {}
+        for key in ('dossier', 'entreprise'):
+            if original_data.get(key):
+                metadata[key] = str(original_data[key])
+        
+        # Suivi de la candidature (table des candidatures de la base)
+        for key, data_key in (('etat', 'etat'), ('todo', 'todo'), ('contact', 'contact'),
+                              ('tel', 'tel'), ('mail', 'mail'), ('date_reponse', 'Date_rep')):
+            if original_data.get(data_key):
+                metadata[key] = str(original_data[data_key])
+        for key, data_key in (('cv', 'CV'), ('ba', 'BA')):
+            if data_key in original_data:
+                metadata[key] = original_data[data_key] == 'O'
+        
         return metadata
         
     def _generate_image_description(self, image_path: str) -> str:
@@ -169,17 +475,9 @@ class BatchService:
         """Classifie le contenu de l'image en catégories."""
         categories = []
         
-        # Classification basée sur le texte extrait
+        # Classification basée sur le texte extrait (un seul passage pour toutes les catégories)
         if text_content:
-            text_lower = text_content.lower()
-            if any(word in text_lower for word in ['facture', 'invoice', 'total', 'prix', 'montant']):
-                categories.append('Document financier')
-            if any(word in text_lower for word in ['certificat', 'diplome', 'formation', 'université']):
-                categories.append('Document éducatif')
-            if any(word in text_lower for word in ['contrat', 'accord', 'signature', 'conditions']):
-                categories.append('Document juridique')
-            if any(word in text_lower for word in ['email', 'mail', 'message', 'correspondance']):
-                categories.append('Communication')
+            categories.extend(_IMAGE_CATEGORY_MATCHER.classify(text_content))
         
         # Classification basée sur l'extension
         file_ext = Path(image_path).suffix.lower()
@@ -195,7 +493,7 @@ class BatchService:
     def get_supported_extensions(self) -> Dict[str, List[str]]:
         """Retourne les extensions de fichiers supportées."""
         return {
-            'documents': ['.pdf', '.txt'],
-            'images': ['.png', '.jpg', '.jpeg'],
-            'all': ['.pdf', '.txt', '.png', '.jpg', '.jpeg']
+            'documents': list(DOCUMENT_EXTENSIONS),
+            'images': list(IMAGE_EXTENSIONS),
+            'all': DOCUMENT_EXTENSIONS + IMAGE_EXTENSIONS
         }
@@ -0,0 +1,362 @@
+"""Client partagé des fournisseurs de modèles de langage (Mistral API, Ollama).
+
+Les réponses sont lues au fil de l'eau et produites morceau par morceau :
+l'interface peut afficher les premiers mots dès leur génération au lieu
+d'attendre la réponse complète.
+
+- Mistral (``/chat/completions`` avec ``stream: true``) répond en Server-Sent
+  Events : lignes ``data: {json}`` séparées par des lignes vides, terminées
+  par ``data: [DONE]`` ;
+- Ollama (``/api/generate`` avec ``stream: true``) répond en NDJSON : un
+  objet JSON par ligne, le dernier portant ``"done": true``.
+
+``LLMClient`` regroupe ce que chaque appel refaisait seul :
+
+- une ``requests.Session`` commune (connexions HTTP gardées ouvertes) ;
+- les nouvelles tentatives sur 429, 5xx et erreurs réseau, avec un délai
+  exponentiel aléatoire (« full jitter ») ou celui de l'en-tête ``Retry-After`` ;
+- une limite de requêtes simultanées par fournisseur ;
+- un disjoncteur par fournisseur : après plusieurs échecs consécutifs, le
+  fournisseur est écarté un moment et la requête passe au suivant de la liste
+  (Mistral → Ollama) ;
+- une API asynchrone (``acomplete``, ``acomplete_many``) pour lancer plusieurs
+  requêtes en parallèle.
+
+Un fournisseur cible est décrit par un dictionnaire ``{'provider': 'mistral'
+| 'ollama', 'model', 'api_key', 'base_url'}``.
+"""
+
+import asyncio
+import functools
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ..config.settings import LLM_CONFIG
+
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+class LLMError(Exception):
+    """Erreur d'un fournisseur de modèle (statut HTTP, corps de la réponse).
+
+    Après un basculement infructueux, ``errors`` contient l'erreur de chaque
+    fournisseur essayé, la première étant celle du fournisseur principal.
+    """
+
+    def __init__(self, message: str, status_code: Optional[int] = None, body: str = '',
+                 provider: Optional[str] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.body = body
+        self.provider = provider
+        self.errors: List['LLMError'] = [self]
+
+def iter_sse_data(lines: Iterable[bytes]) -> Iterator[str]:
+    """Contenu des champs ``data`` de chaque événement SSE (lignes multiples jointes)."""
+    data = []
+    for raw_line in lines:
+        line = raw_line.decode('utf-8') if isinstance(raw_line, bytes) else raw_line
+        line = line.rstrip('\r')
+        if not line:
+            if data:
+                yield '\n'.join(data)
+                data = []
+        elif line.startswith('data:'):
+            data.append(line[5:].lstrip(' '))
+        # Commentaires (« : ping ») et autres champs (event, id, retry) ignorés
+    if data:
+        yield '\n'.join(data)
+
+def iter_ndjson(lines: Iterable[bytes]) -> Iterator[Dict[str, Any]]:
+    """Objets JSON d'un flux NDJSON (lignes vides ignorées)."""
+    for raw_line in lines:
+        line = raw_line.decode('utf-8') if isinstance(raw_line, bytes) else raw_line
+        if line.strip():
+            yield json.loads(line)
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Délai en secondes d'un en-tête ``Retry-After`` (nombre ou date HTTP)."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max((date - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+class CircuitBreaker:
+    """Écarte un fournisseur après ``failure_threshold`` échecs consécutifs.
+
+    Le circuit reste ouvert ``reset_timeout`` secondes ; la requête suivante
+    sert alors d'essai : un succès le referme, un échec le rouvre.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        return 'half_open' if self.clock() - self.opened_at >= self.reset_timeout else 'open'
+
+    def allow(self) -> bool:
+        return self.state != 'open'
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+
+class LLMClient:
+    """Client HTTP des fournisseurs, partagé par toutes les pages (voir ``get_llm_client``)."""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.config = {**LLM_CONFIG, **(config or {})}
+        self.sleep = sleep
+        pool_size = self.config.get('pool_size', 10)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, provider: str) -> CircuitBreaker:
+        with self._lock:
+            if provider not in self._breakers:
+                self._breakers[provider] = CircuitBreaker(
+                    self.config.get('circuit_failure_threshold', 3),
+                    self.config.get('circuit_reset_timeout', 60)
+                )
+            return self._breakers[provider]
+
+    def _semaphore(self, provider: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if provider not in self._semaphores:
+                limit = self.config.get('max_concurrency', {}).get(provider, 4)
+                self._semaphores[provider] = threading.BoundedSemaphore(limit)
+            return self._semaphores[provider]
+
+    def get(self, url: str, timeout: float = 5) -> requests.Response:
+        """Requête GET simple sur la session partagée (tests de connexion)."""
+        return self.session.get(url, timeout=timeout)
+
+    def stream(self, target: Dict[str, Any], messages: List[Dict[str, str]],
+               max_tokens: Optional[int] = None,
+               temperature: Optional[float] = None) -> Iterator[str]:
+        """Produit les fragments de texte de la réponse d'un fournisseur."""
+        provider = target['provider']
+        breaker = self.breaker(provider)
+        if not breaker.allow():
+            raise LLMError(f"Fournisseur {provider} temporairement écarté après des échecs répétés",
+                           provider=provider)
+
+        if provider == 'mistral':
+            url = f"{(target.get('base_url') or self.config['mistral_url']).rstrip('/')}/chat/completions"
+            payload = {
+                "model": target['model'],
+                "messages": messages,
+                "max_tokens": max_tokens or self.config.get('max_tokens', 1000),
+                "temperature": (self.config.get('temperature', 0.7)
+                                if temperature is None else temperature),
+                "stream": True
+            }
+            headers = {
+                "Authorization": f"Bearer {target.get('api_key', '')}",
+                "Content-Type": "application/json",
+                "Accept": "text/event-stream"
+            }
+            timeout = self.config.get('timeout', 30)
+            parse = self._parse_mistral
+        elif provider == 'ollama':
+            url = f"{(target.get('base_url') or self.config['ollama_url']).rstrip('/')}/api/generate"
+            prompt = "\n\n".join(message['content'] for message in messages)
+            payload = {"model": target['model'], "prompt": prompt, "stream": True}
+            headers = {}
+            timeout = self.config.get('ollama_timeout', 60)
+            parse = self._parse_ollama
+        else:
+            raise LLMError(f"Fournisseur inconnu: {provider}", provider=provider)
+
+        semaphore = self._semaphore(provider)
+        response = self._post(provider, url, payload, headers, timeout, semaphore, breaker)
+        try:
+            with response:
+                yield from parse(response)
+            breaker.record_success()
+        except LLMError:
+            # Événement d'erreur dans le flux (Ollama)
+            breaker.record_failure()
+            raise
+        except (requests.RequestException, ValueError) as e:
+            # Coupure réseau ou flux illisible (JSON tronqué, encodage)
+            breaker.record_failure()
+            raise LLMError(f"Erreur {provider}: {e}", provider=provider) from e
+        finally:
+            semaphore.release()
+
+    def _post(self, provider: str, url: str, payload: Dict[str, Any], headers: Dict[str, str],
+              timeout: float, semaphore: threading.BoundedSemaphore,
+              breaker: CircuitBreaker) -> requests.Response:
+        """Envoie la requête avec nouvelles tentatives ; retourne la réponse 200, sémaphore pris."""
+        max_retries = self.config.get('max_retries', 3)
+        backoff_base = self.config.get('backoff_base', 1.0)
+        backoff_max = self.config.get('backoff_max', 30.0)
+
+        for attempt in range(max_retries + 1):
+            semaphore.acquire()
+            retry_after = None
+            try:
+                response = self.session.post(url, headers=headers, json=payload,
+                                             stream=True, timeout=timeout)
+            except requests.RequestException as e:
+                semaphore.release()
+                error = LLMError(f"Erreur {provider}: {e}", provider=provider)
+            else:
+                if response.status_code == 200:
+                    return response
+                semaphore.release()
+                body = response.text
+                response.close()
+                error = LLMError(f"Erreur {provider}: {response.status_code}",
+                                 response.status_code, body, provider)
+                if response.status_code not in RETRYABLE_STATUS:
+                    break
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+
+            if attempt == max_retries:
+                break
+            if retry_after is not None:
+                # Attente imposée trop longue : mieux vaut basculer sur un autre fournisseur
+                if retry_after > backoff_max:
+                    break
+                delay = retry_after
+            else:
+                delay = random.uniform(0, min(backoff_max, backoff_base * 2 ** attempt))
+            self.sleep(delay)
+
+        breaker.record_failure()
+        raise error
+
+    @staticmethod
+    def _parse_mistral(response: requests.Response) -> Iterator[str]:
+        for data in iter_sse_data(response.iter_lines()):
+            if data == '[DONE]':
+                return
+            event = json.loads(data)
+            for choice in event.get('choices', []):
+                content = (choice.get('delta') or {}).get('content')
+                if content:
+                    yield content
+
+    @staticmethod
+    def _parse_ollama(response: requests.Response) -> Iterator[str]:
+        for event in iter_ndjson(response.iter_lines()):
+            if event.get('error'):
+                raise LLMError(f"Erreur Ollama: {event['error']}", provider='ollama')
+            if event.get('response'):
+                yield event['response']
+            if event.get('done'):
+                return
+
+    def stream_with_failover(self, targets: Union[Dict[str, Any], List[Dict[str, Any]]],
+                             messages: List[Dict[str, str]],
+                             on_failover: Optional[Callable[[Dict, Dict, LLMError], None]] = None,
+                             **options) -> Iterator[str]:
+        """Comme ``stream``, en passant au fournisseur suivant tant que rien n'a été produit.
+
+        ``on_failover(cible_en_échec, cible_suivante, erreur)`` est appelé à
+        chaque basculement. Si tous échouent, l'erreur du premier est levée
+        avec celles des suivants dans ``errors``.
+        """
+        targets = [targets] if isinstance(targets, dict) else list(targets)
+        errors = []
+        for i, target in enumerate(targets):
+            started = False
+            try:
+                for chunk in self.stream(target, messages, **options):
+                    started = True
+                    yield chunk
+                return
+            except LLMError as e:
+                # Réponse déjà entamée : on ne mélange pas deux fournisseurs
+                if started:
+                    raise
+                errors.append(e)
+                if on_failover and i + 1 < len(targets):
+                    on_failover(target, targets[i + 1], e)
+        if not errors:
+            raise LLMError("Aucun fournisseur configuré")
+        errors[0].errors = errors
+        raise errors[0]
+
+    def complete(self, targets: Union[Dict[str, Any], List[Dict[str, Any]]],
+                 messages: List[Dict[str, str]], **options) -> str:
+        """Réponse complète (bloquante), avec basculement entre fournisseurs."""
+        return "".join(self.stream_with_failover(targets, messages, **options))
+
+    async def acomplete(self, targets: Union[Dict[str, Any], List[Dict[str, Any]]],
+                        messages: List[Dict[str, str]], **options) -> str:
+        """Version asynchrone de ``complete`` (exécutée dans un thread)."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, functools.partial(self.complete, targets, messages, **options)
+        )
+
+    async def acomplete_many(self, jobs: Iterable[Dict[str, Any]]) -> List[Union[str, LLMError]]:
+        """Lance plusieurs ``acomplete`` en parallèle (arguments nommés de chaque job).
+
+        Les limites par fournisseur s'appliquent ; une requête en échec donne
+        son ``LLMError`` à sa place dans la liste au lieu d'interrompre les autres.
+        """
+        return await asyncio.gather(*(self.acomplete(**job) for job in jobs),
+                                    return_exceptions=True)
+
+_default_client = None
+
+def get_llm_client() -> LLMClient:
+    """Retourne le client partagé configuré par ``LLM_CONFIG``."""
+    global _default_client
+    if _default_client is None:
+        _default_client = LLMClient()
+    return _default_client
+
+def stream_mistral_chat(api_key: str, model: str, messages: List[Dict[str, str]],
+                        base_url: Optional[str] = None, **options) -> Iterator[str]:
+    """Produit les fragments de texte d'une complétion Mistral en streaming."""
+    target = {'provider': 'mistral', 'model': model, 'api_key': api_key, 'base_url': base_url}
+    return get_llm_client().stream(target, messages, **options)
+
+def stream_ollama_generate(model: str, prompt: str, base_url: Optional[str] = None,
+                           **options) -> Iterator[str]:
+    """Produit les fragments de texte d'une génération Ollama en streaming."""
+    target = {'provider': 'ollama', 'model': model, 'base_url': base_url}
+    return get_llm_client().stream(target, [{'role': 'user', 'content': prompt}], **options)
@@ -0,0 +1,227 @@
+"""Service de synchronisation incrémentale des sources de documents."""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from ..config.settings import SYNC_CONFIG
+from ..utils.extraction_cache import file_content_hash
+from ..utils.file_utils import iter_files_recursive, validate_directory_path
+from .batch_service import BatchService
+
+MANIFEST_VERSION = 1
+
+def _normalize_path(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+def _metadata_fingerprint(metadata: Dict[str, Any]) -> str:
+    """Empreinte des métadonnées héritées du dossier (.data.json, notes...)."""
+    payload = json.dumps(metadata, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+class SyncManifest:
+    """Manifeste des fichiers indexés : chemin → taille, date, empreintes et documents."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'SyncManifest':
+        manifest = cls(path)
+        try:
+            with open(manifest.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == MANIFEST_VERSION:
+                manifest.entries = data.get('sources', {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        return manifest
+
+    def save(self) -> None:
+        """Écrit le manifeste via un fichier temporaire remplacé atomiquement."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'sources': self.entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def paths_under(self, directory: str) -> List[str]:
+        prefix = _normalize_path(directory).rstrip(os.sep) + os.sep
+        return [path for path in self.entries if path.startswith(prefix)]
+
+class SyncService:
+    """Indexe uniquement les fichiers ajoutés ou modifiés depuis la dernière synchronisation.
+
+    Le manifeste est confronté à la base à chaque synchronisation : un fichier
+    dont les documents n'existent plus (base non sauvegardée, nettoyée...) est
+    réindexé, et les documents d'une même source indexés hors synchronisation
+    (anciens doublons) sont remplacés.
+    """
+
+    def __init__(self, batch_service: BatchService, manifest_path: Optional[Union[str, Path]] = None,
+                 verify_hash: Optional[bool] = None):
+        self.batch_service = batch_service
+        self.vector_db = batch_service.vector_db
+        self.manifest = SyncManifest.load(manifest_path or SYNC_CONFIG['manifest_file'])
+        self.verify_hash = SYNC_CONFIG.get('verify_hash', False) if verify_hash is None else verify_hash
+
+    def plan(self, directory: str, file_extensions: List[str]) -> Dict[str, Any]:
+        """Compare le répertoire au manifeste et à la base sans rien modifier."""
+        plan = {'added': [], 'modified': [], 'unchanged': [], 'deleted': [], 'total_files': 0}
+        scanned: Set[str] = set()
+        for file_path, annonce_data, status in self._classify(
+                iter_files_recursive(directory, file_extensions), self._ids_by_source(), scanned):
+            plan[status].append((file_path, annonce_data))
+        plan['total_files'] = len(scanned)
+        plan['deleted'] = self._deleted_paths(directory, file_extensions, scanned)
+        return plan
+
+    def sync(
+        self,
+        directory: str,
+        file_extensions: List[str],
+        progress_callback: Optional[Callable] = None,
+        enable_vision: bool = False
+    ) -> Dict[str, Any]:
+        """Synchronise un répertoire avec la base.
+
+        Retourne les compteurs de ``BatchService.process_directory`` complétés
+        de ``added``, ``modified``, ``unchanged``, ``deleted`` et
+        ``documents_removed``. Chaque fichier est classé pendant le parcours :
+        les fichiers ajoutés ou modifiés partent aussitôt à l'extraction, les
+        suppressions sont déterminées une fois le parcours terminé.
+        ``progress_callback(traités, total, fichier)`` est appelé une fois par
+        fichier trouvé, fichiers inchangés compris ; ``total`` est le nombre de
+        fichiers trouvés jusqu'ici.
+        """
+        if not validate_directory_path(directory):
+            return {'error': f"Répertoire non accessible: {directory}"}
+
+        results = {
+            'success': 0,
+            'errors': 0,
+            'skipped': 0,
+            'errors_list': [],
+            'images_processed': [],
+            'total_files': 0,
+            'added': 0,
+            'modified': 0,
+            'unchanged': 0,
+            'deleted': 0,
+            'documents_removed': 0
+        }
+        ids_by_source = self._ids_by_source()
+        scanned: Set[str] = set()
+        to_index: List[Tuple[str, Dict]] = []
+        completed = 0
+
+        def report(file_path: str) -> None:
+            nonlocal completed
+            completed += 1
+            if progress_callback:
+                progress_callback(completed, len(scanned), file_path)
+
+        def iter_changed() -> Iterator[Tuple[str, Dict]]:
+            for file_path, annonce_data, status in self._classify(
+                    iter_files_recursive(directory, file_extensions), ids_by_source, scanned):
+                results[status] += 1
+                if status == 'unchanged':
+                    report(file_path)
+                    continue
+                to_index.append((file_path, annonce_data))
+                yield file_path, annonce_data
+
+        with self.vector_db.batch():
+            start = len(self.vector_db.documents)
+            self.batch_service.process_files(iter_changed(), results,
+                                             lambda done, total, file_path: report(file_path),
+                                             enable_vision)
+            new_ids = self._ids_by_source(self.vector_db.documents[start:])
+
+            # Parcours terminé : retirer les documents des fichiers disparus et
+            # les anciennes versions des fichiers réindexés (identifiants jamais
+            # réattribués : les nouveaux documents ne sont pas concernés)
+            deleted = self._deleted_paths(directory, file_extensions, scanned)
+            stale_paths = deleted + [_normalize_path(path) for path, _ in to_index]
+            stale_ids = [doc_id for path in stale_paths for doc_id in ids_by_source.get(path, [])]
+            results['documents_removed'] = self.vector_db.remove_documents_by_ids(stale_ids)
+            for path in deleted:
+                self.manifest.entries.pop(path, None)
+        results['deleted'] = len(deleted)
+        results['total_files'] = len(scanned)
+
+        for file_path, annonce_data in to_index:
+            key = _normalize_path(file_path)
+            if new_ids.get(key):
+                self.manifest.entries[key] = self._entry(file_path, annonce_data, new_ids[key])
+            else:
+                # Rien d'indexé (erreur, fichier ignoré) : retenté à la prochaine synchronisation
+                self.manifest.entries.pop(key, None)
+
+        self.manifest.save()
+        return results
+
+    def _classify(self, files_found: Iterable[Tuple[str, Dict]], ids_by_source: Dict[str, List[Any]],
+                  scanned: Set[str]) -> Iterator[Tuple[str, Dict, str]]:
+        """Produit ``(chemin, métadonnées, statut)`` au fil du parcours et note les fichiers vus."""
+        for file_path, annonce_data in files_found:
+            key = _normalize_path(file_path)
+            scanned.add(key)
+            yield file_path, annonce_data, self._file_status(key, file_path, annonce_data,
+                                                             ids_by_source.get(key, []))
+
+    def _deleted_paths(self, directory: str, file_extensions: List[str], scanned: Set[str]) -> List[str]:
+        """Sources du manifeste sous ``directory`` absentes du parcours terminé."""
+        # Un fichier absent du parcours n'est supprimé que s'il aurait dû y figurer
+        # (extension sélectionnée) ou s'il n'existe plus : une synchronisation
+        # limitée à certaines extensions garde les autres sources indexées
+        extensions = {extension.lower() for extension in file_extensions}
+        return [path for path in self.manifest.paths_under(directory)
+                if path not in scanned
+                and (os.path.splitext(path)[1].lower() in extensions
+                     or not os.path.exists(path))]
+
+    def _file_status(self, key: str, file_path: str, annonce_data: Dict,
+                     indexed_ids: List[Any]) -> str:
+        entry = self.manifest.entries.get(key)
+        if entry is None:
+            return 'added'
+        # Documents absents de la base ou doublons hors manifeste
+        if sorted(entry.get('doc_ids', []), key=str) != sorted(indexed_ids, key=str):
+            return 'modified'
+        if entry.get('metadata_hash') != _metadata_fingerprint(annonce_data):
+            return 'modified'
+
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return 'modified'
+        if entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns:
+            return 'unchanged'
+        if (self.verify_hash and entry.get('size') == stat.st_size and entry.get('hash')
+                and entry['hash'] == file_content_hash(file_path)):
+            entry['mtime_ns'] = stat.st_mtime_ns
+            return 'unchanged'
+        return 'modified'
+
+    def _entry(self, file_path: str, annonce_data: Dict, doc_ids: List[Any]) -> Dict[str, Any]:
+        stat = os.stat(file_path)
+        return {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'hash': file_content_hash(file_path) if self.verify_hash else None,
+            'metadata_hash': _metadata_fingerprint(annonce_data),
+            'doc_ids': doc_ids
+        }
+
+    def _ids_by_source(self, documents: Optional[List[Dict]] = None) -> Dict[str, List[Any]]:
+        """Regroupe les identifiants de documents par fichier source."""
+        ids_by_source: Dict[str, List[Any]] = {}
+        for doc in self.vector_db.documents if documents is None else documents:
+            source = doc.get('metadata', {}).get('source')
+            if source:
+                ids_by_source.setdefault(_normalize_path(source), []).append(doc.get('id'))
+        return ids_by_source
@@ -6,6 +6,7 @@ from typing import Dict, Any
 from pathlib import Path
 
 from ...services.batch_service import BatchService
+from ...services.sync_service import SyncService
 from ...config.settings import VECTOR_DB_FILE
 from ..components.debug_panel import show_debug_panel
 
@@ -442,7 +443,8 @@ def _show_main_interface(batch_service: BatchService) -> None:
                     default_options = {
                         'extensions': ['.pdf', '.txt', '.png', '.jpg', '.jpeg'],
                         'max_file_size': 100,
-                        'enable_vision': False
+                        'enable_vision': False,
+                        'sync': True
                     }
                     _execute_single_source_processing(source, default_options, batch_service)
             
@@ -512,10 +514,17 @@ def _show_processing_options(batch_service: BatchService) -> Dict[str, Any]:
     if enable_vision:
         st.info("⚠️ Le traitement sera plus lent mais les images seront mieux analysées")
     
+    sync = st.checkbox(
+        "🔄 Synchronisation incrémentale",
+        value=True,
+        help="N'indexe que les fichiers ajoutés ou modifiés depuis le dernier traitement et retire ceux supprimés"
+    )
+    
     return {
         'extensions': extensions,
         'max_file_size': max_file_size,
-        'enable_vision': enable_vision
+        'enable_vision': enable_vision,
+        'sync': sync
     }
 
 def _show_source_preview(source_path: str, batch_service: BatchService) -> None:
@@ -627,20 +636,11 @@ def _show_source_preview(source_path: str, batch_service: BatchService) -> None:
                 st.warning("⚠️ Aucun fichier trouvé")
 
 def _execute_single_source_processing(source_path: str, options: Dict[str, Any], batch_service: BatchService) -> None:
-    """Exécute le traitement sur une seule source avec progression détaillée."""
-    
-    from ...utils.file_utils import find_files_recursive
+    """Exécute le traitement sur une seule source avec progression détaillée.
     
-    # Scanner les fichiers d'abord
-    with st.spinner("🔍 Scan des fichiers..."):
-        files_found = find_files_recursive(source_path, options['extensions'])
-    
-    if not files_found:
-        st.warning("⚠️ Aucun fichier trouvé à traiter")
-        return
-    
-    total_files = len(files_found)
-    st.success(f"📊 **{total_files} fichier(s)** trouvé(s) à traiter")
+    Pas de scan préalable : le traitement commence pendant le parcours du
+    répertoire et le total affiché grandit au fil des fichiers trouvés.
+    """
     
     # Barres de progression
     progress_bar = st.progress(0)
@@ -656,12 +656,16 @@ def _execute_single_source_processing(source_path: str, options: Dict[str, Any],
     
     # Traitement avec callback
     with st.spinner("🔄 Traitement en cours..."):
-        results = batch_service.process_directory(
-            directory=source_path,
-            file_extensions=options['extensions'],
-            progress_callback=update_progress,
-            enable_vision=options['enable_vision']
-        )
+        results = _process_source(source_path, options, batch_service, update_progress)
+    
+    if 'error' in results:
+        st.error(f"❌ {results['error']}")
+        return
+    
+    total_files = results.get('total_files', 0)
+    if total_files == 0:
+        st.warning("⚠️ Aucun fichier trouvé à traiter")
+        return
     
     # Finalisation
     progress_bar.progress(1.0)
@@ -717,7 +721,8 @@ def _execute_multi_source_processing(sources: list, options: Dict[str, Any], bat
         'errors': 0,
         'skipped': 0,
         'images_processed': [],
-        'sources_processed': []
+        'sources_processed': [],
+        'documents_removed': 0
     }
     
     # Compteur global de fichiers traités
@@ -736,7 +741,23 @@ def _execute_multi_source_processing(sources: list, options: Dict[str, Any], bat
         status_text.text(f"� {os.path.basename(current_file)}")
         file_counter.metric("📊 Progression", f"{files_processed}/{total_files}", delta=f"{int(global_progress*100)}%")
     
-    # Traitement source par source
+    # Traitement source par source, vectorisation différée jusqu'à la dernière source
+    with batch_service.vector_db.batch():
+        _process_sources(valid_sources, files_by_source, options, batch_service,
+                         update_global_progress, total_results)
+    
+    # Finalisation
+    progress_bar.progress(1.0)
+    status_text.text("✅ Traitement terminé !")
+    file_counter.text(f"🎉 **Terminé** : {files_processed}/{total_files} fichiers traités")
+    
+    # Affichage des résultats globaux
+    _show_multi_source_results(total_results, batch_service)
+
+def _process_sources(valid_sources: list, files_by_source: Dict[str, list], options: Dict[str, Any],
+                     batch_service: BatchService, progress_callback, total_results: Dict[str, Any]) -> None:
+    """Traite chaque source et agrège les résultats dans ``total_results``."""
+    
     for source_idx, source in enumerate(valid_sources):
         source_name = os.path.basename(source)
         files_in_source = files_by_source[source]
@@ -749,15 +770,11 @@ def _execute_multi_source_processing(sources: list, options: Dict[str, Any], bat
         
         # Traitement de la source avec callback de progression
         try:
-            results = batch_service.process_directory(
-                directory=source,
-                file_extensions=options['extensions'],
-                progress_callback=update_global_progress,
-                enable_vision=options['enable_vision']
-            )
+            results = _process_source(source, options, batch_service, progress_callback)
             
             # Agréger les résultats
             total_results['success'] += results.get('success', 0)
+            total_results['documents_removed'] += results.get('documents_removed', 0)
             total_results['errors'] += results.get('errors', 0)
             total_results['skipped'] += results.get('skipped', 0)
             total_results['images_processed'].extend(results.get('images_processed', []))
@@ -778,14 +795,31 @@ def _execute_multi_source_processing(sources: list, options: Dict[str, Any], bat
         except Exception as e:
             st.error(f"❌ Erreur traitement {source_name}: {e}")
             total_results['errors'] += len(files_in_source) if files_in_source else 1
-    
-    # Finalisation
-    progress_bar.progress(1.0)
-    status_text.text("✅ Traitement terminé !")
-    file_counter.text(f"🎉 **Terminé** : {files_processed}/{total_files} fichiers traités")
-    
-    # Affichage des résultats globaux
-    _show_multi_source_results(total_results, batch_service)
+
+def _process_source(source: str, options: Dict[str, Any], batch_service: BatchService,
+                    progress_callback) -> Dict[str, Any]:
+    """Traite une source, en synchronisation incrémentale si l'option est active."""
+    if options.get('sync'):
+        return SyncService(batch_service).sync(
+            directory=source,
+            file_extensions=options['extensions'],
+            progress_callback=progress_callback,
+            enable_vision=options['enable_vision']
+        )
+    return batch_service.process_directory(
+        directory=source,
+        file_extensions=options['extensions'],
+        progress_callback=progress_callback,
+        enable_vision=options['enable_vision']
+    )
+
+def _show_sync_summary(results: Dict[str, Any]) -> None:
+    """Affiche le bilan d'une synchronisation incrémentale."""
+    if 'unchanged' in results:
+        st.info(
+            f"🔄 **Synchronisation :** {results['added']} ajouté(s), {results['modified']} modifié(s), "
+            f"{results['deleted']} supprimé(s), {results['unchanged']} inchangé(s)"
+        )
 
 def _show_processing_results(results: Dict[str, Any], batch_service: BatchService) -> None:
     """Affiche les résultats du traitement d'une source unique."""
@@ -801,6 +835,8 @@ def _show_processing_results(results: Dict[str, Any], batch_service: BatchServic
     with col4:
         st.metric("🖼️ Images", len(results.get('images_processed', [])))
     
+    _show_sync_summary(results)
+    
     # Analyser les projets et catégories traités
     _show_processed_projects_and_categories(batch_service)
     
@@ -824,12 +860,16 @@ def _show_processing_results(results: Dict[str, Any], batch_service: BatchServic
                     st.write(f"**Catégories:** {', '.join(img_result.get('categories', []))}")
                     if img_result.get('ocr_text'):
                         st.write(f"**Texte OCR:** {img_result['ocr_text']}")
+                    if img_result.get('ocr_skipped'):
+                        st.write("**OCR:** ignoré (aucun texte détecté)")
+                    elif img_result.get('ocr_seconds') is not None:
+                        st.write(f"**Temps OCR:** {img_result['ocr_seconds']:.2f} s")
         
         if len(results['images_processed']) > 5:
             st.write(f"... et {len(results['images_processed']) - 5} autres images")
     
     # Sauvegarder la base
-    if results.get('success', 0) > 0:
+    if results.get('success', 0) > 0 or results.get('documents_removed', 0) > 0:
         batch_service.vector_db.save()
         st.success(f"✅ {results['success']} fichier(s) ajouté(s) à la base !")
     
@@ -876,6 +916,8 @@ def _show_multi_source_results(results: Dict[str, Any], batch_service: BatchServ
                 with col3:
                     st.metric("⏭️ Ignorés", source_results.get('skipped', 0))
                 
+                _show_sync_summary(source_results)
+                
                 # Afficher les erreurs de cette source si présentes
                 if source_results.get('errors_list'):
                     st.markdown("**❌ Erreurs :**")
@@ -914,7 +956,7 @@ def _show_multi_source_results(results: Dict[str, Any], batch_service: BatchServ
             st.write(f"... et {total_images - 3} autres images")
     
     # Sauvegarder la base
-    if results['success'] > 0:
+    if results['success'] > 0 or results.get('documents_removed', 0) > 0:
         batch_service.vector_db.save()
         st.success(f"🎉 **{results['success']} fichier(s) au total** ajoutés à la base RAG !")
         
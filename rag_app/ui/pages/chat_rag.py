@@ -3,10 +3,25 @@
 import streamlit as st
 import json
 import os
-from typing import List, Dict, Any, Optional
+import time
+from typing import List, Dict, Any, Iterable, Iterator, Optional
 from datetime import datetime
 import re
 
+import requests
+
+from ...config.settings import CLASSIFICATION_CONFIG, LLM_CONFIG
+from ...core.dense_index import get_embedder
+from ...services.llm_service import LLMError, get_llm_client
+from ...utils.answer_cache import get_answer_cache, normalize_question
+from ...utils.context_packer import context_budget, estimate_tokens, pack_context
+from ...utils.keyword_matcher import compile_patterns, first_match
+
+# Règles précompilées une fois pour toutes les questions et tous les documents
+_LIST_REQUEST_RULES = compile_patterns(CLASSIFICATION_CONFIG['list_requests'])
+
+_PROVIDER_LABELS = {'mistral': "API Mistral", 'ollama': "Ollama"}
+
 # Charger les variables d'environnement
 try:
     from dotenv import load_dotenv
@@ -211,118 +226,38 @@ def _process_question(question: str, vector_db):
     """Traite une question utilisateur."""
     
     try:
-        # 1. Recherche de documents pertinents avec debug
-        with st.spinner("🔍 Recherche dans les documents..."):
-            # Recherche vectorielle
-            relevant_docs = vector_db.search(question, top_k=5)
+        # 1. Codes projet, entreprises ou dossiers cités : recherche exacte, sans scoring
+        results = vector_db.exact_lookup(question, top_k=5)
+        if results:
+            matched_terms = sorted({term for result in results for term in result['matched_terms']})
+            st.info(f"🎯 Recherche exacte : {', '.join(matched_terms)}")
+        else:
+            # Sinon recherche hybride (BM25 à champs + vectorielle, fusion par rang réciproque)
+            with st.spinner("🔍 Recherche dans les documents..."):
+                results = vector_db.hybrid_search(question, top_k=5)
+        relevant_docs = [result['document'] for result in results]
         
         # DEBUG: Afficher les informations de recherche
         st.info(f"🔍 **Debug recherche :** {len(relevant_docs)} documents trouvés pour '{question}'")
         
-        # DEBUG: Analyse détaillée des résultats
-        if relevant_docs:
-            st.success("✅ Documents trouvés par la recherche vectorielle")
-            # Afficher des infos sur les documents trouvés
-            for i, doc in enumerate(relevant_docs[:3]):
-                if isinstance(doc, dict):
-                    metadata = doc.get('metadata', {})
-                    text_preview = doc.get('text', '')[:100].replace('\n', ' ')
-                    source = metadata.get('source', 'N/A')
-                else:
-                    # Analyser la structure du document
-                    doc_type = type(doc).__name__
-                    doc_attrs = dir(doc)
-                    st.info(f"Type document: {doc_type}, Attributs: {doc_attrs[:5]}...")
-                    
-                    if hasattr(doc, 'metadata'):
-                        metadata = doc.metadata if isinstance(doc.metadata, dict) else {}
-                        source = metadata.get('source', 'N/A')
-                        text_preview = getattr(doc, 'page_content', getattr(doc, 'text', str(doc)))[:100]
-                    else:
-                        source = "N/A (structure inconnue)"
-                        text_preview = str(doc)[:100]
-                
-                st.info(f"📄 Doc {i+1}: {source} - {text_preview}...")
-        else:
-            st.warning("❌ Recherche vectorielle retourne 0 résultats")
-        
-        # FORCE: Toujours utiliser la recherche directe en complément de la recherche vectorielle
-        # ou quand la recherche vectorielle échoue
-        should_use_direct = (
-            len(relevant_docs) == 0 or 
-            all(doc.get('metadata', {}).get('source') == 'N/A' for doc in relevant_docs) or
-            max([doc.get('similarity', 0) for doc in relevant_docs] + [0]) < 0.3  # Similarité faible
-        )
-        
-        if should_use_direct:
-            st.info("🔄 Activation de la recherche directe (mode secours)")
+        if not results:
+            st.error("❌ Aucun document trouvé (recherche vectorielle et lexicale)")
+            return
             
-            # Accéder directement aux documents 
-            if hasattr(vector_db, 'documents'):
-                direct_matches = []
-                search_terms = question.lower().split()
-                
-                for doc in vector_db.documents:
-                    doc_text = doc.get('text', '').lower()
-                    doc_metadata = doc.get('metadata', {})
-                    doc_source = doc_metadata.get('source', '').lower()
-                    doc_tags = doc_metadata.get('tags', '').lower()
-                    
-                    # Rechercher dans le texte, la source et les tags
-                    match_found = False
-                    match_score = 0
-                    
-                    # Recherche précise pour tous les termes de la question
-                    for term in search_terms:
-                        if len(term) >= 3:  # Éviter les mots trop courts
-                            # Recherche exacte dans le texte (plus importante)
-                            if term in doc_text:
-                                match_found = True
-                                match_score += 3
-                            # Recherche dans la source/nom de fichier
-                            elif term in doc_source:
-                                match_found = True
-                                match_score += 2
-                            # Recherche dans les tags
-                            elif term in doc_tags:
-                                match_found = True
-                                match_score += 1
-                    
-                    # N'ajouter que si le score est suffisant
-                    if match_found and match_score >= 2:
-                        direct_matches.append((doc, match_score))
-                
-                # Dédupliquer et trier par score
-                seen_sources = set()
-                unique_matches = []
-                
-                # Trier par score décroissant
-                direct_matches.sort(key=lambda x: x[1], reverse=True)
-                
-                for doc, score in direct_matches:
-                    source = doc.get('metadata', {}).get('source', '')
-                    if source not in seen_sources and source != '':
-                        unique_matches.append(doc)
-                        seen_sources.add(source)
-                        if len(unique_matches) >= 5:
-                            break
-                
-                if unique_matches:
-                    st.success(f"✅ Trouvé {len(unique_matches)} documents via recherche directe")
-                    relevant_docs = unique_matches
-                    
-                    # Debug: afficher les sources trouvées
-                    sources_found = [doc.get('metadata', {}).get('source', 'N/A') for doc in unique_matches]
-                    st.info(f"📁 Sources: {sources_found[:3]}...")
-                else:
-                    st.error("❌ Aucun document trouvé même avec recherche directe")
-                    return
-            else:
-                st.error("❌ Impossible d'accéder aux documents de la base")
-                return
-        
-        # 2. Préparation du contexte
-        context = _prepare_context(relevant_docs)
+        # DEBUG: Analyse détaillée des résultats
+        for i, result in enumerate(results[:3]):
+            doc = result['document']
+            source = doc.get('metadata', {}).get('source', 'N/A')
+            text_preview = doc.get('text', '')[:100].replace('\n', ' ')
+            st.info(f"📄 Doc {i+1}: {source} (similarité {result['similarity']:.2f}, "
+                    f"BM25 {result.get('bm25_score', 0):.2f}) - {text_preview}...")
+        
+        # 2. Préparation du contexte (budget de tokens du modèle)
+        packed = _pack_context(relevant_docs, question)
+        context = _context_text(packed, len(relevant_docs))
+        st.info(f"📏 **Contexte :** ~{packed['tokens']} / {packed['budget']} tokens, "
+                f"{len(packed['passages'])} passages ({packed['duplicates']} redondants, "
+                f"{packed['dropped']} hors budget)")
         
         # 2.5 Analyse intelligente d'existence de projet
         project_analysis = _analyze_project_existence(question, relevant_docs)
@@ -331,7 +266,7 @@ def _process_question(question: str, vector_db):
             response = project_analysis
         else:
             # 2.6 Analyse intelligente des questions de type "liste"
-            list_analysis = _analyze_list_request(question, relevant_docs)
+            list_analysis = _analyze_list_request(question, relevant_docs, vector_db)
             if list_analysis:
                 st.success("📋 Logique de génération de liste déclenchée !")
                 response = list_analysis
@@ -355,22 +290,24 @@ def _process_question(question: str, vector_db):
                         filtered_docs = relevant_docs
                     # Si on a des documents filtrés, préparer le contexte
                     if filtered_docs:
-                        context = _prepare_context(filtered_docs)
+                        context = _prepare_context(filtered_docs, question)
                     # Sinon, garder le contexte initial
-                    response = _generate_mistral_response(question, context)
+                    response = _answer_with_cache(question, filtered_docs or relevant_docs,
+                                                  context, vector_db)
                 else:
-                    st.info(f"📝 **Contexte préparé :** {len(context)} caractères")
+                    st.info(f"📝 **Contexte préparé :** {len(context)} caractères, "
+                            f"~{estimate_tokens(context)} tokens")
                     with st.expander("🔍 Aperçu du contexte"):
                         st.text(context[:500] + "..." if len(context) > 500 else context)
-                    with st.spinner("🤖 Génération de la réponse avec Mistral..."):
-                        response = _generate_mistral_response(question, context)
+                    st.caption("🤖 Génération de la réponse avec Mistral...")
+                    response = _answer_with_cache(question, relevant_docs, context, vector_db)
         
         # 4. Ajout à l'historique
         chat_entry = {
             'timestamp': datetime.now().strftime("%H:%M:%S"),
             'question': question,
             'response': response,
-            'sources': [doc.get('metadata', {}).get('source', 'N/A') for doc in relevant_docs],
+            'sources': [_source_label(doc.get('metadata', {})) for doc in relevant_docs],
             'debug_info': f"{len(relevant_docs)} docs trouvés"
         }
         
@@ -384,72 +321,62 @@ def _process_question(question: str, vector_db):
         import traceback
         st.code(traceback.format_exc())
 
-def _prepare_context(relevant_docs: List[Dict]) -> str:
+def _page_label(metadata: Dict) -> str:
+    """Pages couvertes par un passage de PDF (« p. 3 », « p. 3-4 »), sinon chaîne vide."""
+    page = metadata.get('page')
+    if not page:
+        return ""
+    page_end = metadata.get('page_end') or page
+    return f"p. {page}" if page_end == page else f"p. {page}-{page_end}"
+
+def _source_label(metadata: Dict) -> str:
+    """Source d'un document citée dans l'historique, avec la page si elle est connue."""
+    source = metadata.get('source', 'N/A')
+    pages = _page_label(metadata)
+    return f"{source} ({pages})" if pages else source
+
+def _context_header(rank: int, metadata: Dict) -> str:
+    """En-tête d'un passage du contexte : fichier, pages, catégorie, projet et titre."""
+    
+    header = f"Document {rank}"
+    source = metadata.get('source', '')
+    if source and source != 'N/A':
+        # Juste le nom du fichier, chemins Windows comme POSIX
+        source_name = re.split(r'[\\/]', source)[-1]
+        pages = _page_label(metadata)
+        header += f" ({source_name}, {pages})" if pages else f" ({source_name})"
+    
+    for label, key in (("Catégorie", 'category'), ("Projet", 'project'), ("Titre", 'title')):
+        value = str(metadata.get(key, '') or '').strip()
+        if value and value != 'N/A':
+            header += f" - {label}: {value}"
+    return header
+
+def _pack_context(relevant_docs: List[Dict], question: str = '') -> Dict[str, Any]:
+    """Contexte des documents dans le budget de tokens du modèle sélectionné."""
+    _, model = _current_model()
+    return pack_context(relevant_docs, question, budget=context_budget(model),
+                        header=_context_header)
+
+def _prepare_context(relevant_docs: List[Dict], question: str = '') -> str:
     """Prépare le contexte à partir des documents pertinents."""
     
     if not relevant_docs:
         return "Aucun document pertinent trouvé."
     
-    context_parts = []
-    
-    for i, doc in enumerate(relevant_docs, 1):
-        # Gérer les différents formats de documents
-        if isinstance(doc, dict):
-            metadata = doc.get('metadata', {})
-            text = doc.get('text', '')
-        else:
-            # Format alternatif
-            metadata = getattr(doc, 'metadata', {}) if hasattr(doc, 'metadata') else {}
-            text = getattr(doc, 'text', '') if hasattr(doc, 'text') else str(doc)
-        
-        # Assurer une longueur raisonnable du texte
-        if not text or text.strip() == '':
-            text = "Contenu non disponible"
-        else:
-            text = text[:2000] if len(text) > 2000 else text
-        
-        # Construire les informations source
-        source_info = f"Document {i}"
-        
-        # Extraire les métadonnées disponibles
-        source = metadata.get('source', 'Source inconnue')
-        if source and source != 'N/A' and source != 'Source inconnue':
-            # Extraire juste le nom du fichier pour plus de clarté
-            if '\\' in source:
-                source_name = source.split('\\')[-1]
-            elif '/' in source:
-                source_name = source.split('/')[-1]
-            else:
-                source_name = source
-            source_info += f" ({source_name})"
-        
-        category = metadata.get('category', '')
-        if category and category != 'N/A' and category.strip():
-            source_info += f" - Catégorie: {category}"
-        
-        project = metadata.get('project', '')
-        if project and project != 'N/A' and project.strip():
-            source_info += f" - Projet: {project}"
-        
-        title = metadata.get('title', '')
-        if title and title.strip():
-            source_info += f" - Titre: {title}"
-        
-        # Ajouter le contexte avec des séparateurs clairs
-        context_parts.append(f"=== {source_info} ===\n{text.strip()}\n")
-    
-    final_context = "\n".join(context_parts)
+    return _context_text(_pack_context(relevant_docs, question), len(relevant_docs))
+
+def _context_text(packed: Dict[str, Any], document_count: int) -> str:
+    """Texte du contexte assemblé, ou message d'erreur s'il est vide."""
     
     # Debug: vérifier que le contexte n'est pas vide
-    if not final_context.strip() or len(final_context.strip()) < 50:
-        return f"Erreur: Contexte vide ou trop court. Documents: {len(relevant_docs)}"
+    if not packed['context'].strip() or len(packed['context'].strip()) < 50:
+        return f"Erreur: Contexte vide ou trop court. Documents: {document_count}"
     
-    return final_context
+    return packed['context']
 
-def _generate_mistral_response(question: str, context: str) -> str:
-    """Génère une réponse avec Mistral AI."""
-    
-    provider = st.session_state.get('mistral_provider', 'Mistral API')
+def _build_prompts(question: str, context: str) -> tuple:
+    """Prompts système et utilisateur d'une question posée sur le contexte."""
     
     # Prompt système optimisé pour l'analyse de CV et candidatures
     system_prompt = """Tu es un assistant IA spécialisé dans l'analyse de CV et de candidatures professionnelles. 
@@ -472,61 +399,134 @@ Documents pertinents:
 
 Réponds de manière précise et structurée en te basant uniquement sur les documents fournis."""
     
+    return system_prompt, user_prompt
+
+def _current_model() -> tuple:
+    """Fournisseur et modèle sélectionnés dans la configuration du chat."""
+    provider = st.session_state.get('mistral_provider', 'Mistral API')
+    if provider == "Mistral API":
+        return provider, st.session_state.get('mistral_model', 'mistral-large-latest')
+    if provider == "Ollama Local":
+        return provider, st.session_state.get('ollama_model', 'mistral:7b')
+    return provider, st.session_state.get('hf_model', 'mistralai/Mistral-7B-Instruct-v0.1')
+
+def _answer_with_cache(question: str, documents: List[Dict], context: str, vector_db) -> str:
+    """Réponse en cache si la question (ou une question proche) a déjà été posée, sinon générée."""
+    
+    cache = get_answer_cache()
+    if cache is None:
+        return _render_stream(_stream_response(question, context))
+    
+    provider, model = _current_model()
+    vector = get_embedder().embed([normalize_question(question)])[0]
+    hit = cache.get(question, documents, model, provider, vector=vector,
+                    resolve=vector_db.get_document_by_id)
+    if hit:
+        if hit['match'] == 'exact':
+            st.caption("♻️ Réponse déjà générée pour cette question (cache)")
+        else:
+            st.caption(f"♻️ Réponse reprise de la question « {hit['question']} » "
+                       f"(similarité {hit['similarity']:.2f})")
+        st.markdown(hit['answer'])
+        return hit['answer']
+    
+    response = _render_stream(_stream_response(question, context))
+    # Les messages d'erreur des fournisseurs ne sont pas mis en cache
+    if response and not response.startswith(("❌", "⚠️")):
+        cache.put(question, documents, model, provider, response, vector=vector)
+    return response
+
+def _generate_mistral_response(question: str, context: str) -> str:
+    """Génère une réponse avec Mistral AI."""
+    return "".join(_stream_response(question, context))
+
+def _stream_response(question: str, context: str) -> Iterator[str]:
+    """Produit la réponse du fournisseur configuré fragment par fragment."""
+    
+    provider = st.session_state.get('mistral_provider', 'Mistral API')
+    system_prompt, user_prompt = _build_prompts(question, context)
+    
     try:
         if provider == "Mistral API":
-            return _call_mistral_api(system_prompt, user_prompt)
+            yield from _stream_mistral_api(system_prompt, user_prompt, failover=True)
         elif provider == "Ollama Local":
-            return _call_ollama(system_prompt, user_prompt)
+            yield from _stream_ollama(system_prompt, user_prompt, failover=True)
         else:  # Hugging Face
-            return _call_huggingface(system_prompt, user_prompt)
+            yield _call_huggingface(system_prompt, user_prompt)
             
     except Exception as e:
-        return f"❌ Erreur lors de la génération : {str(e)}\n\nVeuillez vérifier votre configuration Mistral."
+        yield f"❌ Erreur lors de la génération : {str(e)}\n\nVeuillez vérifier votre configuration Mistral."
 
-def _call_mistral_api(system_prompt: str, user_prompt: str) -> str:
-    """Appelle l'API Mistral."""
+def _render_stream(chunks: Iterable[str], refresh_interval: float = 0.05) -> str:
+    """Affiche une réponse au fil de sa génération et retourne le texte complet."""
+    
+    placeholder = st.empty()
+    parts = []
+    last_refresh = 0.0
+    for chunk in chunks:
+        parts.append(chunk)
+        # Rafraîchissement limité : le rendu markdown coûte plus qu'un fragment
+        now = time.monotonic()
+        if now - last_refresh >= refresh_interval:
+            placeholder.markdown("".join(parts) + "▌")
+            last_refresh = now
+    response = "".join(parts)
+    placeholder.markdown(response)
+    return response
+
+def _provider_targets(first: str, failover: bool = False) -> List[Dict[str, Any]]:
+    """Fournisseurs à essayer : ``first`` puis, avec basculement, les suivants de ``failover_chain``."""
+    
+    chain = LLM_CONFIG.get('failover_chain', ['mistral', 'ollama'])
+    names = [first]
+    if failover and first in chain:
+        names += chain[chain.index(first) + 1:]
+    
+    targets = []
+    for name in names:
+        if name == 'mistral':
+            # Récupérer la clé API depuis la session ou .env
+            api_key = st.session_state.get('mistral_api_key') or _load_mistral_api_key()
+            if api_key:
+                targets.append({
+                    'provider': 'mistral',
+                    'model': st.session_state.get('mistral_model', 'mistral-large-latest'),
+                    'api_key': api_key
+                })
+        elif name == 'ollama':
+            targets.append({
+                'provider': 'ollama',
+                'model': st.session_state.get('ollama_model', 'mistral:7b'),
+                'base_url': st.session_state.get('ollama_url', 'http://localhost:11434')
+            })
+    return targets
+
+def _stream_from_providers(targets: List[Dict[str, Any]], system_prompt: str,
+                           user_prompt: str) -> Iterator[str]:
+    """Réponse en streaming via le client partagé, avec basculement entre ``targets``."""
     
-    # Récupérer la clé API depuis la session ou .env
-    api_key = st.session_state.get('mistral_api_key') or _load_mistral_api_key()
-    model = st.session_state.get('mistral_model', 'mistral-large-latest')
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
     
-    if not api_key:
-        return "❌ Clé API Mistral non configurée. Vérifiez votre fichier .env ou configurez-la manuellement."
+    def announce_failover(failed: Dict, following: Dict, error: LLMError) -> None:
+        st.warning(f"⚠️ {_PROVIDER_LABELS[failed['provider']]} indisponible ({error}), "
+                   f"bascule vers {_PROVIDER_LABELS[following['provider']]}")
     
     try:
-        import requests
-        
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        data = {
-            "model": model,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            "max_tokens": 1000,
-            "temperature": 0.7
-        }
-        
-        response = requests.post(
-            "https://api.mistral.ai/v1/chat/completions",
-            headers=headers,
-            json=data,
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            return result['choices'][0]['message']['content']
-        elif response.status_code == 429:
-            error_data = response.json()
-            error_type = error_data.get('type', '')
-            
-            if 'service_tier_capacity_exceeded' in error_type:
-                return """⚠️ **Limite de capacité Mistral dépassée**
+        yield from get_llm_client().stream_with_failover(targets, messages,
+                                                          on_failover=announce_failover)
+    except LLMError as e:
+        yield _format_llm_error(e)
+
+def _format_llm_error(error: LLMError) -> str:
+    """Message affiché pour l'échec du fournisseur principal (et des suivants)."""
+    
+    if error.provider == 'mistral':
+        if error.status_code == 429:
+            if 'service_tier_capacity_exceeded' in error.body:
+                message = """⚠️ **Limite de capacité Mistral dépassée**
 
 Votre tier de service Mistral a atteint sa limite. Voici vos options :
 
@@ -547,46 +547,40 @@ Votre tier de service Mistral a atteint sa limite. Voici vos options :
 
 **Réessayez dans quelques minutes ou changez de configuration !**"""
             else:
-                return f"⚠️ **Limite de requêtes atteinte** (429)\n\nAttendez quelques minutes puis réessayez.\n\nDétails: {response.text}"
+                message = f"⚠️ **Limite de requêtes atteinte** (429)\n\nAttendez quelques minutes puis réessayez.\n\nDétails: {error.body}"
+        elif error.status_code:
+            message = f"❌ Erreur API Mistral: {error.status_code} - {error.body}"
         else:
-            return f"❌ Erreur API Mistral: {response.status_code} - {response.text}"
-            
-    except ImportError:
-        return "❌ Module 'requests' non installé. Exécutez: pip install requests"
-    except Exception as e:
-        return f"❌ Erreur API Mistral: {str(e)}"
+            message = f"❌ Erreur API Mistral: {error}"
+    elif error.status_code:
+        message = f"❌ Erreur Ollama: {error.status_code}"
+    else:
+        message = f"❌ {error}. Vérifiez qu'Ollama est démarré."
+    
+    for other in error.errors[1:]:
+        message += f"\n\n❌ Basculement vers {_PROVIDER_LABELS.get(other.provider, other.provider)} échoué : {other}"
+    return message
+
+def _call_mistral_api(system_prompt: str, user_prompt: str) -> str:
+    """Appelle l'API Mistral."""
+    return "".join(_stream_mistral_api(system_prompt, user_prompt))
+
+def _stream_mistral_api(system_prompt: str, user_prompt: str, failover: bool = False) -> Iterator[str]:
+    """Appelle l'API Mistral en streaming (Server-Sent Events)."""
+    
+    targets = _provider_targets('mistral', failover)
+    if not targets or targets[0]['provider'] != 'mistral':
+        yield "❌ Clé API Mistral non configurée. Vérifiez votre fichier .env ou configurez-la manuellement."
+        return
+    yield from _stream_from_providers(targets, system_prompt, user_prompt)
 
 def _call_ollama(system_prompt: str, user_prompt: str) -> str:
     """Appelle Ollama local."""
-    
-    ollama_url = st.session_state.get('ollama_url', 'http://localhost:11434')
-    model = st.session_state.get('ollama_model', 'mistral:7b')
-    
-    try:
-        import requests
-        
-        data = {
-            "model": model,
-            "prompt": f"{system_prompt}\n\n{user_prompt}",
-            "stream": False
-        }
-        
-        response = requests.post(
-            f"{ollama_url}/api/generate",
-            json=data,
-            timeout=60
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            return result.get('response', 'Pas de réponse')
-        else:
-            return f"❌ Erreur Ollama: {response.status_code}"
-            
-    except ImportError:
-        return "❌ Module 'requests' non installé. Exécutez: pip install requests"
-    except Exception as e:
-        return f"❌ Erreur Ollama: {str(e)}. Vérifiez qu'Ollama est démarré."
+    return "".join(_stream_ollama(system_prompt, user_prompt))
+
+def _stream_ollama(system_prompt: str, user_prompt: str, failover: bool = False) -> Iterator[str]:
+    """Appelle Ollama local en streaming (NDJSON)."""
+    yield from _stream_from_providers(_provider_targets('ollama', failover), system_prompt, user_prompt)
 
 def _call_huggingface(system_prompt: str, user_prompt: str) -> str:
     """Appelle Hugging Face (version simplifiée)."""
@@ -685,10 +679,8 @@ def _show_example_questions() -> None:
 def _test_ollama_connection(ollama_url: str) -> None:
     """Teste la connexion avec Ollama."""
     try:
-        import requests
-        
-        # Tester la disponibilité d'Ollama
-        response = requests.get(f"{ollama_url}/api/tags", timeout=5)
+        # Tester la disponibilité d'Ollama (session HTTP partagée)
+        response = get_llm_client().get(f"{ollama_url}/api/tags", timeout=5)
         
         if response.status_code == 200:
             models = response.json().get('models', [])
@@ -712,11 +704,6 @@ def _test_ollama_connection(ollama_url: str) -> None:
             st.info("💡 Démarrez Ollama avec: `ollama serve`")
         except:
             print("❌ Impossible de se connecter à Ollama. Vérifiez qu'il est démarré.")
-    except ImportError:
-        try:
-            st.error("❌ Module 'requests' requis")
-        except:
-            print("❌ Module 'requests' requis")
     except Exception as e:
         try:
             st.error(f"❌ Erreur test Ollama: {str(e)}")
@@ -763,7 +750,8 @@ def _run_database_diagnostic(vector_db) -> None:
         st.info(f"📄 **Documents trouvés pour 'Cyril Sauret' :** {len(cyril_docs)}")
         
         if cyril_docs:
-            for i, doc in enumerate(cyril_docs):
+            for i, result in enumerate(cyril_docs):
+                doc = result['document']
                 metadata = doc.get('metadata', {})
                 text = doc.get('text', '')[:200]
                 source = metadata.get('source', 'N/A')
@@ -775,12 +763,12 @@ def _run_database_diagnostic(vector_db) -> None:
             
             test_keywords = ["Cyril", "Sauret", "CV", "développeur", "compétences"]
             
-            for keyword in test_keywords:
-                test_docs = vector_db.search(keyword, top_k=3)
+            # Tous les mots-clés en une seule passe sur le corpus
+            for keyword, test_docs in zip(test_keywords, vector_db.search_many(test_keywords, top_k=3)):
                 if test_docs:
                     st.info(f"✅ **'{keyword}' :** {len(test_docs)} documents")
                     # Afficher le premier résultat
-                    first_doc = test_docs[0]
+                    first_doc = test_docs[0]['document']
                     text_preview = first_doc.get('text', '')[:100]
                     source = first_doc.get('metadata', {}).get('source', 'N/A')
                     st.text(f"Exemple: {source} - {text_preview}...")
@@ -816,7 +804,6 @@ def _analyze_project_existence(question: str, relevant_docs: List[Dict]) -> Opti
         r'([A-Z]\d{3}).*existe'
     ]
     
-    question_lower = question.lower()
     project_code = None
     
     # Chercher le code de projet dans la question
@@ -899,66 +886,28 @@ def _analyze_project_existence(question: str, relevant_docs: List[Dict]) -> Opti
     
     return response
 
-def _analyze_list_request(question: str, relevant_docs: List[Dict]) -> Optional[str]:
+def _analyze_list_request(question: str, relevant_docs: List[Dict], vector_db=None) -> Optional[str]:
     """Analyse les questions de type liste et génère une réponse appropriée pour les candidatures."""
     
-    import re
-    import os
-    
-    # Patterns spécialisés pour les candidatures et recherche d'emploi
-    list_patterns = [
-        # Entreprises et candidatures
-        (r'(liste|énumère|cite|quelles?) .*entreprises?.*(postul|candidat|contact)', 'entreprises'),
-        (r'(où|quelles entreprises).*(j\'ai|ai).*(postul|candidat)', 'entreprises'),
-        (r'(liste|énumère|cite).*(candidatures|postulations|demandes)', 'candidatures'),
-        
-        # Candidatures en cours spécifiquement
-        (r'(candidatures?).*(en cours|actuelles?|actives?)', 'candidatures_en_cours'),
-        (r'(quelles? sont mes).*(candidatures?).*(en cours)', 'candidatures_en_cours'),
-        (r'(suivi|status|état).*(candidatures?)', 'candidatures_en_cours'),
-        
-        # Postes et emplois
-        (r'(liste|énumère|cite|quels?) .*postes?.*(demandé|postul|candidat)', 'postes'),
-        (r'(liste|énumère|cite|quels?) .*emplois?.*(cherch|postul|candidat)', 'postes'),
-        (r'(quels? types? de).*(postes?|emplois?|métiers?)', 'postes'),
-        
-        # Compétences et technologies - distinguer "mes" compétences
-        (r'(mes|ma|mon).*(compétences|technologies|savoir.faire)', 'mes_competences'),
-        (r'(liste|énumère|cite|quelles?) .*compétences', 'competences'),
-        (r'(liste|énumère|cite|quelles?) .*technologies', 'technologies'),
-        
-        # Projets
-        (r'(liste|énumère|cite|quels?) .*projets', 'projets'),
-        (r'quels? projets.*réalis|fait|participé', 'projets'),
-        
-        # Documents généraux
-        (r'(liste|énumère|cite|quels?) .*documents', 'documents')
-    ]
-    
-    question_lower = question.lower()
-    list_type = None
-    
-    # Détecter le type de liste demandée
-    for pattern, category in list_patterns:
-        if re.search(pattern, question_lower, re.IGNORECASE):
-            list_type = category
-            break
+    # Détecter le type de liste demandée (règles de CLASSIFICATION_CONFIG['list_requests'])
+    list_type = first_match(_LIST_REQUEST_RULES, question.lower())
     
     if not list_type:
         return None  # Pas une question de liste reconnue
     
+    st.info(f"🔍 Détection: Question de liste type '{list_type}'")
+    
+    # Entreprises et projets : table des candidatures construite à l'indexation (tout le corpus)
+    if list_type == 'entreprises':
+        return _extract_company_list(vector_db)
+    elif list_type == 'projets':
+        return _extract_project_list(vector_db)
+    
     if not relevant_docs:
         return f"❌ Aucun document pertinent trouvé pour générer la liste de {list_type}."
     
-    st.info(f"🔍 Détection: Question de liste type '{list_type}'")
-    
     # Extraction spécialisée selon le type de liste
-    if list_type == 'entreprises':
-        # Pour les entreprises, on a besoin de TOUS les documents de candidature
-        # Pas seulement ceux retournés par la recherche vectorielle
-        st.info("🔍 Recherche exhaustive de toutes les candidatures...")
-        return _extract_company_list_exhaustive()
-    elif list_type == 'candidatures_en_cours':
+    if list_type == 'candidatures_en_cours':
         return _extract_ongoing_applications(relevant_docs)
     elif list_type == 'postes':
         return _extract_job_list(relevant_docs)
@@ -966,534 +915,158 @@ def _analyze_list_request(question: str, relevant_docs: List[Dict]) -> Optional[
         return _extract_skills_list(relevant_docs)  # La fonction gère déjà la distinction
     elif list_type == 'competences' or list_type == 'technologies':
         return _extract_skills_list(relevant_docs)
-    elif list_type == 'projets':
-        return _extract_project_list(relevant_docs)
     elif list_type == 'candidatures':
         return _extract_application_list(relevant_docs)
     elif list_type == 'documents':
         return _extract_document_list(relevant_docs)
     else:
-        return _extract_generic_list(relevant_docs)
+        return _extract_generic_list(vector_db, list_type)
 
-def _extract_company_list(relevant_docs: List[Dict]) -> str:
-    """Extrait la liste complète des entreprises depuis les documents.
-    
-    LOGIQUE D'EXTRACTION OPTIMISÉE:
-    1. Priorité: champs company/enterprise (métadonnées dédiées)
-    2. Fallback: champ author (contient l'entreprise des fichiers .data.json)
-    3. Puis: extraction depuis les tags, contenu, noms de fichiers
-    4. L'objectif est d'utiliser en PREMIER le champ entreprise du .data.json
+def _application_status(row: Dict[str, Any]) -> tuple:
+    """Statut et étape d'une candidature d'après l'état et le todo de son dossier."""
+    
+    todo = row.get('todo', '')
+    todo_lower = todo.lower()
+    step = ''
+    if 'repondue' in todo_lower or 'répondue' in todo_lower:
+        status = '📬 Candidature répondue'
+    elif 'etape' in todo_lower:
+        status = '📤 Candidature envoyée'
+        # Étapes : 1 appel téléphonique, 2 entretien RH, 3 entretien technique
+        for number, waiting, refused, done in (
+                ('1', '📞 En attente appel téléphonique', '❌ Refus après étape 1', '✅ Appel téléphonique réalisé'),
+                ('2', '🤝 En attente entretien RH', '❌ Refus après entretien RH', '✅ Entretien RH réalisé'),
+                ('3', '💻 En attente entretien technique', '❌ Refus après entretien technique', '✅ Entretien technique réalisé')):
+            if number in todo:
+                step = waiting if '?' in todo else refused if 'refus' in todo_lower else done
+                break
+    elif todo:
+        status = '📤 Candidature envoyée'
+    elif row.get('etat'):
+        status = f"📌 {row['etat']}"
+    elif any('_lm_' in source.lower() or 'lettre' in source.lower() for source in row['sources']):
+        status = '📝 Lettre de motivation rédigée'
+    elif row.get('cv'):
+        status = '📋 CV adapté pour l\'entreprise'
+    else:
+        status = '📁 Dossier de candidature constitué'
+    return status, step
+
+def _extract_company_list(vector_db, filter_by: Optional[Dict] = None) -> str:
+    """Liste complète des entreprises, lue dans la table des candidatures de la base.
+    
+    La table est construite à l'indexation à partir des ``.data.json`` (ou,
+    à défaut, des noms de fichiers) : aucune recherche ni expression
+    régulière n'est exécutée au moment de la question. Si elle est vide, les
+    entreprises indiquées dans les métadonnées des documents sont listées.
     """
     
-    companies = {}  # Utiliser dict pour éviter les doublons tout en gardant les détails
-    
-    for doc in relevant_docs:
-        metadata = doc.get('metadata', {})
-        source = metadata.get('source', '')
-        content = doc.get('content', doc.get('text', ''))
-        
-        # Extraire entreprise depuis les métadonnées - ORDRE OPTIMISÉ
-        # 1. Priorité au champ 'entreprise' (directement issu du .data.json)
-        company_name = metadata.get('entreprise', '')
-        # 2. Si pas trouvé, chercher dans 'company' puis 'enterprise' (compatibilité)
-        if not company_name or company_name == 'N/A':
-            company_name = metadata.get('company', metadata.get('enterprise', ''))
-        project = metadata.get('project', '')
-        description = metadata.get('description', '')
-        todo = metadata.get('todo', '')
-        
-        # 3. NOUVEAU: Si toujours pas trouvé, utiliser la fonction helper pour extraire depuis le code projet
-        if not company_name or company_name == 'N/A':
-            company_name = _extract_company_from_project_code(source, content)
-        
-        # 4. Extraire entreprise depuis tags si pas dans métadonnées directes
-        if not company_name or company_name == 'N/A':
-            tags = metadata.get('tags', '')
-            if tags:
-                tag_list = [tag.strip() for tag in tags.split(',')]
-                for tag in tag_list:
-                    if (len(tag) > 2 and 
-                        not tag.lower() in ['annonce', 'cv', 'todo', 'new', 'formation', 'candidature', 'presentation', 'cyrilsauret', 'cyril', 'sauret'] and
-                        not tag.startswith('maturité-') and
-                        not tag.lower() in ['gpt-summary', 'competences', 'python', 'react', 'javascript', 'pdf', 'doc', 'docx']):
-                        company_name = tag
-                        break
-        
-        # 5. Chercher entreprise dans le contenu si toujours pas trouvée
-        if not company_name or company_name == 'N/A':
-            import re
-            # Chercher patterns d'entreprises dans le contenu - patterns améliorés
-            enterprise_patterns = [
-                r'entreprise[:\s]+([A-Z][A-Za-z\s&\-]+?)(?:\s|,|\.|$)',
-                r'société[:\s]+([A-Z][A-Za-z\s&\-]+?)(?:\s|,|\.|$)',
-                r'chez[:\s]+([A-Z][A-Za-z\s&\-]+?)(?:\s|,|\.|$)',
-                r'([A-Z][A-Za-z\s&\-]+?)\s+recrute',
-                r'Poste.*?chez[:\s]+([A-Z][A-Za-z\s&\-]+?)(?:\s|,|\.|$)',
-                r'candidature.*?chez\s+([A-Z][A-Za-z\s&\-]+?)(?:\s|,|\.|$)',
-                r'candidature.*?entreprise\s+([A-Z][A-Za-z\s&\-]+?)(?:\s|,|\.|$)',
-                r'lettre.*?motivation.*?([A-Z][A-Za-z\s&\-]+?)(?:\s|,|\.|$)',
-                r'postul.*?chez\s+([A-Z][A-Za-z\s&\-]+?)(?:\s|,|\.|$)'
-            ]
-            
-            for pattern in enterprise_patterns:
-                matches = re.findall(pattern, content, re.IGNORECASE)
-                if matches:
-                    potential_name = matches[0].strip()
-                    # Filtrer les faux positifs
-                    if (len(potential_name) > 3 and 
-                        not potential_name.lower() in ['un', 'une', 'le', 'la', 'les', 'cette', 'cette entreprise', 'votre', 'notre', 'mon', 'ma', 'mes'] and
-                        not potential_name.lower().startswith('cyril')):
-                        company_name = potential_name
-                        break
-        
-        # 6. NOUVEAU: Pour les lettres de motivation (LM), analyser plus finement
-        if (not company_name or company_name == 'N/A') and '_lm_' in source.lower():
-            # Pour les LM, chercher dans les premières lignes qui contiennent souvent l'entreprise
-            content_lines = content.split('\n')[:10]  # Premières 10 lignes
-            content_start = ' '.join(content_lines).lower()
-            
-            # Patterns spécifiques aux lettres de motivation
-            lm_patterns = [
-                r'madame,?\s*monsieur,?\s*([A-Za-z\s&\-]+?)(?:\s|,|\.|$)',
-                r'candidature.*?poste.*?([A-Z][A-Za-z\s&\-]+?)(?:\s|,|\.|$)',
-                r'intéressé.*?par.*?([A-Z][A-Za-z\s&\-]+?)(?:\s|,|\.|$)'
-            ]
-            
-            for pattern in lm_patterns:
-                matches = re.findall(pattern, content_start, re.IGNORECASE)
-                if matches:
-                    potential_name = matches[0].strip()
-                    if len(potential_name) > 3:
-                        company_name = potential_name
-                        break
-        
-        if company_name and company_name != 'N/A' and len(company_name) > 2:
-            company_key = company_name
-            
-            if company_key not in companies:
-                companies[company_key] = {
-                    'nom': company_name,
-                    'postes': [],
-                    'statut_candidature': 'Non défini',
-                    'etape_actuelle': '',
-                    'sources': [],
-                    'dates': [],
-                    'projets': [],
-                    'details_todo': todo
-                }
-            
-            # Analyser le statut détaillé depuis le champ todo
-            if todo:
-                companies[company_key]['details_todo'] = todo
-                
-                # Déterminer le statut de candidature
-                if 'repondue' in todo.lower():
-                    companies[company_key]['statut_candidature'] = '📬 Candidature répondue'
-                elif 'etape' in todo.lower():
-                    # Analyser les étapes
-                    if 'etape' in todo.lower() and '1' in todo:
-                        if '?' in todo:
-                            companies[company_key]['etape_actuelle'] = '📞 En attente appel téléphonique'
-                        elif 'refus' in todo.lower():
-                            companies[company_key]['etape_actuelle'] = '❌ Refus après étape 1'
-                        else:
-                            companies[company_key]['etape_actuelle'] = '✅ Appel téléphonique réalisé'
-                    
-                    elif 'etape' in todo.lower() and '2' in todo:
-                        if '?' in todo:
-                            companies[company_key]['etape_actuelle'] = '🤝 En attente entretien RH'
-                        elif 'refus' in todo.lower():
-                            companies[company_key]['etape_actuelle'] = '❌ Refus après entretien RH'
-                        else:
-                            companies[company_key]['etape_actuelle'] = '✅ Entretien RH réalisé'
-                    
-                    elif 'etape' in todo.lower() and '3' in todo:
-                        if '?' in todo:
-                            companies[company_key]['etape_actuelle'] = '💻 En attente entretien technique'
-                        elif 'refus' in todo.lower():
-                            companies[company_key]['etape_actuelle'] = '❌ Refus après entretien technique'
-                        else:
-                            companies[company_key]['etape_actuelle'] = '✅ Entretien technique réalisé'
-                else:
-                    companies[company_key]['statut_candidature'] = '📤 Candidature envoyée'
-            else:
-                # NOUVEAU: Si pas de todo, deviner le statut depuis le type de document
-                source_lower = source.lower()
-                if '_lm_' in source_lower or 'lettre' in source_lower:
-                    companies[company_key]['statut_candidature'] = '📝 Lettre de motivation rédigée'
-                elif '_cv_' in source_lower and company_name.lower() in source_lower:
-                    companies[company_key]['statut_candidature'] = '📋 CV adapté pour l\'entreprise'
-                elif any(code in source_lower for code in ['m401', 'm402', 'm403', 'm404', 'm405', 'm595', 'm596', 'm587']):
-                    companies[company_key]['statut_candidature'] = '📁 Dossier de candidature constitué'
-                else:
-                    companies[company_key]['statut_candidature'] = '📤 Candidature en cours'
-            
-            # Ajouter informations complémentaires
-            if source:
-                source_name = os.path.basename(source)
-                if source_name not in companies[company_key]['sources']:
-                    companies[company_key]['sources'].append(source_name)
-            
-            if project and project not in companies[company_key]['projets']:
-                companies[company_key]['projets'].append(project)
-            
-            title = metadata.get('title', '')
-            if title and 'cv' not in title.lower() and title not in companies[company_key]['postes']:
-                companies[company_key]['postes'].append(title)
-            
-            date = metadata.get('date', '')
-            if date and date != 'N/A' and date not in companies[company_key]['dates']:
-                companies[company_key]['dates'].append(date)
+    if vector_db is None:
+        return "❌ Erreur: Base vectorielle non initialisée dans la session."
     
+    companies = vector_db.get_candidature_companies(filter_by)
     if not companies:
-        return "❌ Aucune entreprise trouvée dans les documents consultés."
+        names = _scan_metadata_values(vector_db, "entreprises", filter_by)
+        if not names:
+            return "❌ Aucune entreprise trouvée dans la table des candidatures."
+        response = f"🏢 **LISTE DES ENTREPRISES** ({len(names)} trouvées dans les métadonnées)\n\n"
+        return (response + "\n".join(f"{i}. {name}" for i, name in enumerate(names, 1))).strip()
     
     # Construire la réponse formatée complète
     response = f"🏢 **LISTE COMPLÈTE DES ENTREPRISES** ({len(companies)} trouvées)\n\n"
     
-    for i, (company_key, details) in enumerate(sorted(companies.items()), 1):
-        response += f"**{i}. {details['nom']}**\n"
-        
-        # Statut de candidature
-        response += f"   📊 Statut: {details['statut_candidature']}\n"
-        
-        # Étape actuelle si définie
-        if details['etape_actuelle']:
-            response += f"   🎯 Étape: {details['etape_actuelle']}\n"
-        
-        # Postes candidatés
-        if details['postes']:
-            unique_postes = list(set(details['postes']))
-            response += f"   � Postes: {', '.join(unique_postes)}\n"
-        
-        # Dernière activité
-        if details['dates']:
-            latest_date = max(details['dates']) if details['dates'] else ''
-            if latest_date:
-                response += f"   📅 Dernière activité: {latest_date}\n"
-        
-        # Projets associés
-        if details['projets']:
-            unique_projets = list(set(details['projets']))
-            response += f"   🗂️ Projets: {', '.join(unique_projets)}\n"
-        
-        # Nombre de documents
-        if details['sources']:
-            response += f"   📄 Documents: {len(details['sources'])} fichiers\n"
+    for i, (name, rows) in enumerate(companies.items(), 1):
+        response += f"**{i}. {name}**\n"
         
-        # Détails todo si disponible
-        if details['details_todo'] and details['details_todo'].strip():
-            response += f"   � Todo: {details['details_todo'][:50]}...\n"
-        
-        response += "\n"
-    
-    return response.strip()
-
-def _extract_company_list_exhaustive() -> str:
-    """Extraction exhaustive des entreprises en cherchant dans toute la base vectorielle."""
-    
-    try:
-        # Accès à la base vectorielle depuis la session state
-        vector_db = st.session_state.get('vector_db')
-        if not vector_db:
-            return "❌ Erreur: Base vectorielle non initialisée dans la session."
-        
-        # Recherche exhaustive avec plusieurs termes pour capturer toutes les candidatures
-        search_terms = [
-            "candidature", "entreprise", "annonce", "todo", "etape", "repondue",
-            "appel", "entretien", "refus", "validation", "hr", "rh", "poste"
-        ]
-        
-        st.info(f"🔍 Recherche exhaustive avec {len(search_terms)} termes...")
-        all_docs = set()
-        
-        # Recherche avec chaque terme
-        for term in search_terms:
-            try:
-                results = vector_db.search(term, top_k=200)  # Plus large
-                all_docs.update(results)
-                st.info(f"   📑 Terme '{term}': {len(results)} documents")
-            except Exception as e:
-                st.warning(f"   ⚠️ Erreur recherche '{term}': {e}")
-                continue
-        
-        st.success(f"📄 Total documents uniques collectés: {len(all_docs)}")
-        
-        # Convertir en format Dict pour _extract_company_list
-        docs_as_dict = []
-        for doc in all_docs:
-            if isinstance(doc, dict):
-                # Format déjà dict
-                doc_dict = {
-                    'metadata': doc.get('metadata', {}),
-                    'content': doc.get('content', doc.get('text', '')),
-                    'text': doc.get('text', doc.get('content', ''))
-                }
+        for row in rows:
+            status, step = _application_status(row)
+            if row['dossier']:
+                response += f"   🗂️ Dossier {row['dossier']}"
             else:
-                # Format objet avec attributs
-                doc_dict = {
-                    'metadata': getattr(doc, 'metadata', {}) if hasattr(doc, 'metadata') else {},
-                    'content': getattr(doc, 'page_content', getattr(doc, 'text', str(doc))) if hasattr(doc, 'page_content') else getattr(doc, 'text', str(doc)),
-                    'text': getattr(doc, 'page_content', getattr(doc, 'text', str(doc))) if hasattr(doc, 'page_content') else getattr(doc, 'text', str(doc))
-                }
-            docs_as_dict.append(doc_dict)
-        
-        # Filtrer pour ne garder que les candidatures avant d'appeler _extract_company_list
-        candidature_docs = []
-        for doc_dict in docs_as_dict:
-            metadata = doc_dict.get('metadata', {})
-            todo = metadata.get('todo', '')
-            tags = metadata.get('tags', '')
-            content = doc_dict.get('content', '')
-            source = metadata.get('source', '')
-            title = metadata.get('title', '')
-            
-            # Vérifier si c'est une candidature avec logique élargie
-            is_application = False
-            detection_reason = ""
-            
-            # Vérification 1: Le todo contient des mots-clés de candidature
-            if todo:
-                todo_lower = todo.lower()
-                candidature_keywords = ['repondue', 'etape', 'appel', 'entretien', 'refus', 'validation', 'hr', 'rh', 'candidature', 'postul']
-                if any(keyword in todo_lower for keyword in candidature_keywords):
-                    is_application = True
-                    detection_reason = f"Todo: {todo}"
-            
-            # Vérification 2: Les tags contiennent "candidature"
-            if not is_application and tags:
-                if 'candidature' in tags.lower():
-                    is_application = True
-                    detection_reason = f"Tags: {tags}"
+                response += f"   🗂️ Sans dossier ({', '.join(row['sources'][:3])})"
+            if row['title']:
+                response += f" — {row['title']}"
+            response += "\n"
+            response += f"   📊 Statut: {status}\n"
+            if step:
+                response += f"   🎯 Étape: {step}\n"
+            if row['etat']:
+                response += f"   🏷️ État: {row['etat']}\n"
             
-            # Vérification 3: Le contenu mentionne explicitement une candidature
-            if not is_application and content:
-                content_lower = content.lower()
-                if ('candidature' in content_lower or 'postulé' in content_lower or 
-                    'cv envoyé' in content_lower or 'lettre de motivation' in content_lower or
-                    'postuler' in content_lower or 'demande d\'emploi' in content_lower):
-                    is_application = True
-                    detection_reason = "Contenu candidature"
+            dates = [date for date in (row['date'], row['date_reponse']) if date]
+            if dates:
+                response += f"   📅 Dernière activité: {max(dates)}\n"
+            if row['contact']:
+                response += f"   👤 Contact: {row['contact']}\n"
             
-            # Vérification 4: NOUVEAU - Analyse du nom de fichier et des patterns
-            if not is_application and source:
-                source_lower = source.lower()
-                # Lettres de motivation
-                if any(pattern in source_lower for pattern in ['_lm_', 'lettre', 'motivation', 'candidature']):
-                    is_application = True
-                    detection_reason = f"Fichier LM: {source}"
-                # Projets avec codes (M###, A###) qui sont souvent des candidatures
-                elif re.search(r'(?:^|_|-)[MA]\d{3}(?:_|-|$)', os.path.basename(source).upper()):  # Codes M### ou A### avec séparateurs
-                    is_application = True
-                    detection_reason = f"Projet candidature: {source}"
-                # CV avec entreprises spécifiques (pas les CV génériques)
-                elif '_cv_' in source_lower and not any(generic in source_lower for generic in ['cyrilsauret', 'general', 'template']):
-                    is_application = True
-                    detection_reason = f"CV spécifique: {source}"
+            pieces = [label for label, present in (("CV", row['cv']), ("BA", row['ba'])) if present]
+            if pieces:
+                response += f"   📎 Pièces: {', '.join(pieces)}\n"
+            response += f"   📄 Documents: {len(row['sources'])} fichiers\n"
             
-            # Vérification 5: NOUVEAU - Analyse du titre
-            if not is_application and title:
-                title_lower = title.lower()
-                if any(pattern in title_lower for pattern in ['candidature', 'postul', 'demande', 'lettre de motivation', 'cv pour']):
-                    is_application = True
-                    detection_reason = f"Titre: {title}"
-            
-            # Vérification 6: NOUVEAU - Détection d'entreprises dans le nom de fichier
-            if not is_application and source:
-                # Recherche générique d'entreprises dans le nom de fichier SEULEMENT (pas le chemin)
-                filename_only = os.path.basename(source)
-                
-                # Patterns génériques pour détecter des noms d'entreprises dans le nom de fichier
-                enterprise_patterns = [
-                    r'_([A-Z][a-zA-Z\s&\-]+?)_',  # Entre underscores
-                    r'-([A-Z][a-zA-Z\s&\-]+?)-',  # Entre tirets
-                ]
-                
-                for pattern in enterprise_patterns:
-                    matches = re.findall(pattern, filename_only)
-                    for match in matches:
-                        # Filtrer pour garder seulement ce qui ressemble à des entreprises
-                        if (len(match) > 3 and 
-                            not match.lower() in ['cv', 'lm', 'lettre', 'motivation', 'data', 'new', 'doc', 'pdf', 'actions'] and
-                            not match.lower().startswith('cyril') and
-                            not re.match(r'^[A-Z]\d+$', match) and  # Éviter les codes projets
-                            any(c.isupper() for c in match)):  # Au moins une majuscule
-                            is_application = True
-                            detection_reason = f"Entreprise détectée: {match}"
-                            break
-                    if is_application:
-                        break
-            
-            if is_application:
-                candidature_docs.append(doc_dict)
-                st.info(f"✅ Candidature détectée: {detection_reason}")
-            else:
-                # Debug pour comprendre pourquoi le document est rejeté
-                st.warning(f"❌ Document rejeté: {os.path.basename(source)} - Aucun critère candidature")
-        
-        st.info(f"✅ Documents candidature filtrés: {len(candidature_docs)}")
+            if row['todo']:
+                response += f"   ✏️ Todo: {row['todo'][:50]}\n"
         
-        if not candidature_docs:
-            return "❌ Aucun document de candidature trouvé dans la base vectorielle."
-
-        # Extraire la liste des entreprises (détails)
-        companies = {}
-        for doc in candidature_docs:
-            metadata = doc.get('metadata', {})
-            source = metadata.get('source', '')
-            content = doc.get('content', doc.get('text', ''))
-            company_name = metadata.get('entreprise', '')
-            if not company_name or company_name == 'N/A':
-                company_name = metadata.get('company', metadata.get('enterprise', ''))
-            project = metadata.get('project', '')
-            todo = metadata.get('todo', '')
-            if company_name and company_name != 'N/A' and len(company_name) > 2:
-                company_key = company_name
-                if company_key not in companies:
-                    companies[company_key] = {
-                        'nom': company_name,
-                        'postes': [],
-                        'statut_candidature': 'Non défini',
-                        'etape_actuelle': '',
-                        'sources': [],
-                        'dates': [],
-                        'projets': [],
-                        'details_todo': todo
-                    }
-                if source:
-                    source_name = os.path.basename(source)
-                    if source_name not in companies[company_key]['sources']:
-                        companies[company_key]['sources'].append(source_name)
-                if project and project not in companies[company_key]['projets']:
-                    companies[company_key]['projets'].append(project)
-                title = metadata.get('title', '')
-                if title and 'cv' not in title.lower() and title not in companies[company_key]['postes']:
-                    companies[company_key]['postes'].append(title)
-                date = metadata.get('date', '')
-                if date and date != 'N/A' and date not in companies[company_key]['dates']:
-                    companies[company_key]['dates'].append(date)
-
-        import streamlit as st
-        st.markdown(f"🏢 **LISTE DES ENTREPRISES** ({len(companies)} trouvées)")
-        for i, (company_key, details) in enumerate(sorted(companies.items()), 1):
-            # Ligne compacte
-            with st.expander(f"{i}. {details['nom']}  |  {details['statut_candidature']}  |  {details['etape_actuelle']}"):
-                st.write(f"**Statut:** {details['statut_candidature']}")
-                if details['etape_actuelle']:
-                    st.write(f"**Étape:** {details['etape_actuelle']}")
-                if details['postes']:
-                    st.write(f"**Postes:** {', '.join(details['postes'])}")
-                if details['dates']:
-                    st.write(f"**Dernière activité:** {max(details['dates'])}")
-                if details['projets']:
-                    st.write(f"**Projets associés:** {', '.join(details['projets'])}")
-                if details['sources']:
-                    st.write(f"**Documents:** {len(details['sources'])} fichiers")
-                if details['details_todo'] and details['details_todo'].strip():
-                    st.write(f"**Todo:** {details['details_todo']}")
-        return ""
+        response += "\n"
     
-    except Exception as e:
-        import traceback
-        error_details = traceback.format_exc()
-        return f"❌ Erreur lors de l'extraction exhaustive des entreprises: {str(e)}\n\nDétails:\n```\n{error_details}\n```"
+    return response.strip()
 
-def _extract_company_from_project_code(source: str, content: str = "") -> str:
-    """Extrait le nom d'entreprise depuis le code projet et le contenu de manière générique."""
-    
-    # Patterns génériques pour extraire les entreprises depuis les noms de fichiers
-    source_lower = source.lower()
-    
-    # 1. Chercher des patterns d'entreprises dans le nom du fichier
-    # Pattern: tout ce qui ressemble à un nom d'entreprise entre underscores ou tirets
-    filename_patterns = [
-        r'_([A-Z][a-zA-Z\s&\-]+?)_',  # Entre underscores
-        r'-([A-Z][a-zA-Z\s&\-]+?)-',  # Entre tirets
-        r'\\([A-Z][a-zA-Z\s&\-]+?)\\', # Entre slashes (chemins)
-        r'/([A-Z][a-zA-Z\s&\-]+?)/',   # Entre slashes unix
-    ]
+def _extract_project_list(vector_db) -> str:
+    """Liste compacte des projets (dossiers) de la table des candidatures.
     
-    for pattern in filename_patterns:
-        matches = re.findall(pattern, source)
-        for match in matches:
-            # Filtrer les faux positifs courants
-            if (len(match) > 2 and 
-                not match.lower() in ['cv', 'lm', 'lettre', 'motivation', 'data', 'new', 'doc', 'pdf', 'actions'] and
-                not match.lower().startswith('cyril') and
-                not re.match(r'^[A-Z]\d+$', match) and  # Éviter les codes projets
-                any(c.isupper() for c in match)):  # Au moins une majuscule
-                return match.strip()
-    
-    # 2. Extraire depuis le contenu avec des patterns génériques
-    if content and len(content.strip()) > 50:
-        content_lines = content.split('\n')[:15]  # Premières lignes
-        content_start = ' '.join(content_lines)
-        
-        # Patterns génériques pour entreprises dans le contenu
-        content_patterns = [
-            r'entreprise[:\s]+([A-Z][a-zA-Z\s&\-\.]+?)(?:\s|,|\.|$|\n)',
-            r'société[:\s]+([A-Z][a-zA-Z\s&\-\.]+?)(?:\s|,|\.|$|\n)',
-            r'chez[:\s]+([A-Z][a-zA-Z\s&\-\.]+?)(?:\s|,|\.|$|\n)',
-            r'([A-Z][a-zA-Z\s&\-\.]+?)\s+(?:recrute|embauche)',
-            r'candidature.*?(?:chez|pour)\s+([A-Z][a-zA-Z\s&\-\.]+?)(?:\s|,|\.|$|\n)',
-            r'postul.*?(?:chez|pour)\s+([A-Z][a-zA-Z\s&\-\.]+?)(?:\s|,|\.|$|\n)',
-            r'Madame,?\s*Monsieur,?\s*([A-Z][a-zA-Z\s&\-\.]+?)(?:\s|,|\.|$|\n)',
-            r'À l\'attention de[:\s]+([A-Z][a-zA-Z\s&\-\.]+?)(?:\s|,|\.|$|\n)'
-        ]
-        
-        for pattern in content_patterns:
-            matches = re.findall(pattern, content_start, re.IGNORECASE | re.MULTILINE)
-            for match in matches:
-                match = match.strip()
-                # Filtrer les faux positifs
-                if (len(match) > 3 and 
-                    not match.lower() in ['votre', 'notre', 'cette', 'une', 'le', 'la', 'les', 'mon', 'ma', 'mes', 'son', 'sa', 'ses'] and
-                    not match.lower().startswith('cyril') and
-                    not match.lower().endswith('sauret') and
-                    not re.match(r'^[A-Z]\d+$', match)):  # Éviter les codes
-                    return match
-    
-    return ""
+    Sans ligne dans la table, les projets indiqués dans les métadonnées des
+    documents sont listés.
+    """
+    
+    if vector_db is None:
+        return "❌ Erreur: Base vectorielle non initialisée dans la session."
+    
+    rows = [row for row in vector_db.get_candidatures() if row['dossier'] or row['projects']]
+    if not rows:
+        projects = _scan_metadata_values(vector_db, "projets")
+        if not projects:
+            return "❌ Aucun projet trouvé dans la table des candidatures."
+        response = f"📂 **LISTE DES PROJETS** ({len(projects)} trouvés dans les métadonnées)\n\n"
+        return (response + "\n".join(f"{i}. {project}" for i, project in enumerate(projects, 1))).strip()
+    
+    response = f"📂 **LISTE DES PROJETS** ({len(rows)} trouvés)\n\n"
+    for i, row in enumerate(rows, 1):
+        project = ', '.join(row['projects']) or row['dossier']
+        response += f"**{i}. {project}** — {row['document_count']} documents\n"
+        response += f"   🏢 Entreprise: {row['entreprise'] or 'N/A'}\n"
+        response += f"   🏷️ État: {row['etat'] or 'N/A'}\n"
+        if row['category']:
+            response += f"   📁 Catégorie: {row['category']}\n"
+        if row['contact']:
+            response += f"   👤 Contact: {row['contact']}\n"
+        dates = ', '.join(date for date in (row['date'], row['date_reponse']) if date)
+        if dates:
+            response += f"   📅 Dates: {dates}\n"
+        response += f"   📄 Sources: {', '.join(row['sources'])}\n\n"
+    
+    return response.strip()
 
-def _extract_project_list(relevant_docs: list) -> str:
-    """Affiche une liste compacte des projets extraits des documents pertinents."""
-    import streamlit as st
-    projects = {}
-    for doc in relevant_docs:
+def _scan_metadata_values(vector_db, list_type: str, filter_dict: Optional[Dict] = None) -> List[str]:
+    """Valeurs distinctes (triées) d'un champ des métadonnées, en parcourant tous les documents.
+    
+    Repli des listes quand la table des candidatures ne contient rien.
+    """
+    fields = {
+        "entreprises": ('entreprise', 'company', 'enterprise'),
+        "candidatures": ('entreprise', 'company', 'enterprise'),
+        "annonces": ('title', 'annonce'),
+        "projets": ('project',)
+    }.get(list_type, ())
+    items = set()
+    for doc in getattr(vector_db, 'documents', []):
         metadata = doc.get('metadata', {})
-        project = metadata.get('project', '')
-        if project and project != 'N/A':
-            if project not in projects:
-                projects[project] = {
-                    'count': 0,
-                    'categories': set(),
-                    'authors': set(),
-                    'dates': set(),
-                    'sources': set()
-                }
-            projects[project]['count'] += 1
-            category = metadata.get('category', '')
-            if category:
-                projects[project]['categories'].add(category)
-            author = metadata.get('author', '')
-            if author:
-                projects[project]['authors'].add(author)
-            date = metadata.get('date', '')
-            if date:
-                projects[project]['dates'].add(date)
-            source = metadata.get('source', '')
-            if source:
-                projects[project]['sources'].add(source)
-    if not projects:
-        return "❌ Aucun projet trouvé dans les documents consultés."
-    st.markdown(f"📂 **LISTE DES PROJETS** ({len(projects)} trouvés)")
-    for i, (project, details) in enumerate(sorted(projects.items()), 1):
-        with st.expander(f"{i}. {project}  |  {details['count']} documents"):
-            st.write(f"**Catégories:** {', '.join(details['categories']) if details['categories'] else 'N/A'}")
-            st.write(f"**Auteurs:** {', '.join(details['authors']) if details['authors'] else 'N/A'}")
-            st.write(f"**Dates:** {', '.join(details['dates']) if details['dates'] else 'N/A'}")
-            st.write(f"**Sources:** {', '.join(details['sources']) if details['sources'] else 'N/A'}")
-    return ""
+        # Filtrage par champs si demandé
+        if filter_dict and any(metadata.get(k, "") != v for k, v in filter_dict.items()):
+            continue
+        value = next((metadata.get(field) for field in fields if metadata.get(field)), None)
+        if value and value != "N/A":
+            items.add(value)
+    return sorted(items)
 
 def analyze_user_feedback_with_mistral():
     """Utilise Mistral pour analyser l'historique des interactions et proposer des améliorations."""
@@ -1522,37 +1095,29 @@ def analyze_user_feedback_with_mistral():
     st.write(suggestions)
 
 def _extract_generic_list(vector_db, list_type="entreprises", filter_dict=None):
-    import streamlit as st
-    items = set()
-    for doc in getattr(vector_db, 'documents', []):
-        metadata = doc.get('metadata', {})
-        # Filtrage par champs si demandé
-        if filter_dict:
-            match = True
-            for k, v in filter_dict.items():
-                if metadata.get(k, "") != v:
-                    match = False
-                    break
-            if not match:
-                continue
-        # Extraction selon le type
-        if list_type == "entreprises":
-            val = metadata.get('entreprise') or metadata.get('company') or metadata.get('enterprise')
-            if val and val != "N/A":
-                items.add(val)
-        elif list_type == "annonces":
-            val = metadata.get('title') or metadata.get('annonce')
-            if val and val != "N/A":
-                items.add(val)
-        elif list_type == "projets":
-            val = metadata.get('project')
-            if val and val != "N/A":
-                items.add(val)
-        elif list_type == "candidatures":
-            val = metadata.get('entreprise') or metadata.get('company') or metadata.get('enterprise')
-            if val and val != "N/A":
-                items.add(val)
-        # Ajoute d'autres types si besoin
+    """Liste simple (entreprises, annonces, projets, candidatures) lue dans la table des candidatures.
+    
+    ``filter_dict`` compare des champs des lignes (``{"todo": "Répondue"}``).
+    Si la table ne donne rien, les métadonnées des documents sont parcourues.
+    """
+    
+    if vector_db is None or not hasattr(vector_db, 'get_candidatures'):
+        st.error("❌ Base vectorielle non initialisée dans la session.")
+        return
+    
+    if list_type in ("entreprises", "candidatures"):
+        items = list(vector_db.get_candidature_companies(filter_dict))
+    else:
+        items = set()
+        for row in vector_db.get_candidatures(filter_dict):
+            if list_type == "annonces" and row['title']:
+                items.add(row['title'])
+            elif list_type == "projets":
+                items.update(row['projects'] or ([row['dossier']] if row['dossier'] else []))
+        items = sorted(items)
+    if not items:
+        items = _scan_metadata_values(vector_db, list_type, filter_dict)
+    
     st.markdown(f"### Liste complète ({list_type}) : {len(items)} trouvés")
-    for i, item in enumerate(sorted(items), 1):
+    for i, item in enumerate(items, 1):
         st.write(f"{i}. {item}")
@@ -172,11 +172,17 @@ def _perform_search(vector_db) -> None:
     # Effectuer la recherche
     with st.spinner("Recherche en cours..."):
         try:
-            results = vector_db.search(
-                search_query, 
-                top_k=max_results, 
-                filter_by=filters if filters else None
-            )
+            # Code projet, entreprise ou dossier cité : recherche exacte, sans scoring
+            results = vector_db.exact_lookup(search_query, filter_by=filters if filters else None,
+                                             top_k=max_results)
+            if results:
+                st.info(f"🎯 Recherche exacte : {len(results)} document(s)")
+            else:
+                results = vector_db.search(
+                    search_query, 
+                    top_k=max_results, 
+                    filter_by=filters if filters else None
+                )
             
             # Filtrer par similarité
             filtered_results = [r for r in results if r['similarity'] >= min_similarity]
@@ -0,0 +1,240 @@
+"""Cache persistant des réponses du chat.
+
+Une réponse est retrouvée par une clé qui combine la question normalisée,
+l'empreinte du contexte (identifiants et textes des documents retrouvés), le
+modèle et le fournisseur. Une question formulée autrement (« liste des
+entreprises » / « Liste des entreprises ? ») peut aussi réutiliser une
+réponse si son vecteur est assez proche de celui d'une question en cache,
+pour le même modèle, à condition de citer les mêmes nombres et codes
+(« 2023 » / « 2024 », « M0123 » / « M0124 ») et que les documents retrouvés
+pour elle fassent tous partie de ceux qui ont produit la réponse.
+
+Chaque entrée garde l'empreinte des documents qui ont servi à la produire :
+dès que l'un d'eux est modifié ou supprimé, l'entrée est écartée. Les
+entrées expirent après ``ttl_seconds`` ; au-delà de ``max_entries``, les
+moins récemment utilisées sont supprimées.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+
+from ..config.settings import ANSWER_CACHE_CONFIG
+from ..core.term_index import normalize_term
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    key TEXT PRIMARY KEY,
+    question TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    documents TEXT NOT NULL,
+    vector BLOB,
+    answer TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_answers_model ON answers (provider, model);
+CREATE INDEX IF NOT EXISTS idx_answers_last_access ON answers (last_access);
+"""
+
+def normalize_question(question: str) -> str:
+    """Question en minuscules, sans accents ni ponctuation."""
+    return normalize_term(question)
+
+def question_markers(question: str) -> frozenset:
+    """Termes de la question contenant un chiffre (années, montants, codes)."""
+    return frozenset(term for term in normalize_question(question).split()
+                     if any(char.isdigit() for char in term))
+
+def document_fingerprint(document: Dict[str, Any]) -> str:
+    """Empreinte d'un document : change avec son identifiant ou son texte."""
+    digest = hashlib.sha1(str(document.get('id')).encode('utf-8'))
+    digest.update(b'\0')
+    digest.update((document.get('text', '') or '').encode('utf-8'))
+    return digest.hexdigest()
+
+def context_fingerprint(documents: Iterable[Dict[str, Any]]) -> str:
+    """Empreinte des documents du contexte, dans leur ordre."""
+    digest = hashlib.sha1()
+    for document in documents:
+        digest.update(document_fingerprint(document).encode('ascii'))
+    return digest.hexdigest()
+
+def answer_key(question: str, documents: Iterable[Dict[str, Any]], model: str,
+               provider: str) -> str:
+    """Clé exacte d'une réponse."""
+    parts = (normalize_question(question), context_fingerprint(documents), model, provider)
+    return hashlib.sha1('\0'.join(parts).encode('utf-8')).hexdigest()
+
+class AnswerCache:
+    """Réponses déjà générées, par question exacte ou quasi identique."""
+
+    def __init__(self, db_path: Union[str, Path], ttl_seconds: float = 7 * 24 * 3600,
+                 max_entries: int = 1000, similarity_threshold: float = 0.92,
+                 clock: Callable[[], float] = time.time):
+        self.db_path = Path(db_path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.clock = clock
+        self._connection = None
+        self._pid = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None or self._pid != os.getpid():
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            # Streamlit exécute chaque session dans son propre thread
+            connection = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def close(self) -> None:
+        if self._connection is not None and self._pid == os.getpid():
+            self._connection.close()
+        self._connection = None
+
+    def get(self, question: str, documents: List[Dict[str, Any]], model: str, provider: str,
+            vector: Optional[np.ndarray] = None,
+            resolve: Optional[Callable[[Any], Optional[Dict[str, Any]]]] = None
+            ) -> Optional[Dict[str, Any]]:
+        """Retourne ``{'answer', 'question', 'match', 'similarity'}`` ou ``None``.
+
+        ``match`` vaut ``'exact'`` (même question, même contexte) ou
+        ``'similar'`` (question proche de ``vector``, mêmes nombres et codes,
+        ``documents`` tous présents dans le contexte de la réponse en cache).
+        ``resolve(id)`` donne la version courante d'un document : une entrée
+        dont un document a changé ou disparu est supprimée au lieu d'être
+        servie.
+        """
+        connection = self._connect()
+        expired_before = self.clock() - self.ttl_seconds
+        key = answer_key(question, documents, model, provider)
+        row = connection.execute(
+            "SELECT key, question, documents, answer FROM answers WHERE key = ? AND created >= ?",
+            (key, expired_before)
+        ).fetchone()
+        if row is not None and self._is_current(row, resolve):
+            return self._hit(row, 'exact', 1.0)
+
+        if vector is None or not np.any(vector):
+            return None
+        rows = connection.execute(
+            "SELECT key, question, documents, answer, vector FROM answers"
+            " WHERE provider = ? AND model = ? AND created >= ? AND vector IS NOT NULL",
+            (provider, model, expired_before)
+        ).fetchall()
+        if not rows:
+            return None
+
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / np.linalg.norm(query)
+        stored = np.stack([np.frombuffer(r[4], dtype=np.float32) for r in rows])
+        similarities = stored @ query / np.maximum(np.linalg.norm(stored, axis=1), 1e-12)
+        markers = question_markers(question)
+        context_ids = {document.get('id') for document in documents}
+        for position in np.argsort(-similarities, kind='stable'):
+            if similarities[position] < self.similarity_threshold:
+                break
+            row = rows[position]
+            # Questions proches mais portant sur une autre année, un autre dossier
+            # ou d'autres documents : la réponse en cache ne s'applique pas
+            if question_markers(row[1]) != markers:
+                continue
+            if not context_ids <= {doc_id for doc_id, _ in json.loads(row[2])}:
+                continue
+            if self._is_current(row, resolve):
+                return self._hit(row, 'similar', float(similarities[position]))
+        return None
+
+    def _is_current(self, row, resolve) -> bool:
+        if resolve is None:
+            return True
+        for doc_id, fingerprint in json.loads(row[2]):
+            document = resolve(doc_id)
+            if document is None or document_fingerprint(document) != fingerprint:
+                self._connect().execute("DELETE FROM answers WHERE key = ?", (row[0],))
+                return False
+        return True
+
+    def _hit(self, row, match: str, similarity: float) -> Dict[str, Any]:
+        self._connect().execute("UPDATE answers SET last_access = ? WHERE key = ?",
+                                (self.clock(), row[0]))
+        return {'answer': row[3], 'question': row[1], 'match': match, 'similarity': similarity}
+
+    def put(self, question: str, documents: List[Dict[str, Any]], model: str, provider: str,
+            answer: str, vector: Optional[np.ndarray] = None) -> None:
+        """Enregistre une réponse puis applique la durée de validité et la limite d'entrées."""
+        key = answer_key(question, documents, model, provider)
+        fingerprints = [[document.get('id'), document_fingerprint(document)]
+                        for document in documents]
+        blob = None
+        if vector is not None and np.any(vector):
+            blob = np.asarray(vector, dtype=np.float32).tobytes()
+        now = self.clock()
+        self._connect().execute(
+            "INSERT OR REPLACE INTO answers (key, question, provider, model, documents, vector,"
+            " answer, created, last_access) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, question, provider, model, json.dumps(fingerprints), blob, answer, now, now)
+        )
+        self.evict()
+
+    def evict(self) -> int:
+        """Supprime les entrées expirées puis les moins récemment utilisées en trop.
+
+        Retourne le nombre d'entrées supprimées.
+        """
+        connection = self._connect()
+        removed = connection.execute("DELETE FROM answers WHERE created < ?",
+                                     (self.clock() - self.ttl_seconds,)).rowcount
+        removed += connection.execute(
+            "DELETE FROM answers WHERE key IN (SELECT key FROM answers"
+            " ORDER BY last_access DESC LIMIT -1 OFFSET ?)", (self.max_entries,)
+        ).rowcount
+        return removed
+
+    def invalidate_documents(self, doc_ids: Iterable[Any]) -> int:
+        """Supprime les réponses construites à partir de ces documents ; retourne leur nombre."""
+        ids = set(doc_ids)
+        connection = self._connect()
+        keys = [(key,) for key, documents in connection.execute("SELECT key, documents FROM answers")
+                if any(doc_id in ids for doc_id, _ in json.loads(documents))]
+        connection.executemany("DELETE FROM answers WHERE key = ?", keys)
+        return len(keys)
+
+    def clear(self) -> int:
+        return self._connect().execute("DELETE FROM answers").rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        """Retourne le nombre d'entrées du cache."""
+        count, oldest = self._connect().execute(
+            "SELECT COUNT(*), MIN(created) FROM answers"
+        ).fetchone()
+        return {'path': str(self.db_path), 'entries': count, 'max_entries': self.max_entries,
+                'oldest_entry': oldest}
+
+_default_cache = None
+
+def get_answer_cache() -> Optional[AnswerCache]:
+    """Retourne le cache configuré dans ``ANSWER_CACHE_CONFIG`` (ou ``None`` s'il est désactivé)."""
+    global _default_cache
+    if not ANSWER_CACHE_CONFIG.get('enabled', True):
+        return None
+    if _default_cache is None:
+        _default_cache = AnswerCache(
+            ANSWER_CACHE_CONFIG['path'],
+            ttl_seconds=ANSWER_CACHE_CONFIG.get('ttl_seconds', 7 * 24 * 3600),
+            max_entries=ANSWER_CACHE_CONFIG.get('max_entries', 1000),
+            similarity_threshold=ANSWER_CACHE_CONFIG.get('similarity_threshold', 0.92)
+        )
+    return _default_cache
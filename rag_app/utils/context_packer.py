@@ -0,0 +1,171 @@
+"""Construction du contexte envoyé au modèle dans un budget de tokens.
+
+Les documents retrouvés sont parcourus dans l'ordre de leur score. Chacun
+est réduit à la fenêtre qui contient le plus de termes de la question, et
+les passages qui recouvrent un texte déjà retenu (passages voisins d'un même
+document, doublons) sont écartés ou rognés. Les passages sont ajoutés tant
+que le budget du modèle n'est pas atteint : la taille du prompt ne dépend
+plus du nombre ni de la longueur des documents.
+
+Le nombre de tokens est estimé localement (environ quatre caractères par
+token pour un mot, un token par signe de ponctuation), sans tokenizer.
+"""
+
+import hashlib
+import math
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..config.settings import CONTEXT_CONFIG
+from ..core.bm25_index import tokenize
+
+_PIECE_RE = re.compile(r'\w+|[^\w\s]', re.UNICODE)
+_WORD_RE = re.compile(r'[^\W_]+', re.UNICODE)
+# Coupures préférées en bord de fenêtre : fin de phrase, puis espace
+_SENTENCE_END_RE = re.compile(r'[.!?;:\n]\s+')
+
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    """Nombre approximatif de tokens d'un texte."""
+    return sum(math.ceil(len(piece) / CHARS_PER_TOKEN) for piece in _PIECE_RE.findall(text))
+
+def context_budget(model: Optional[str] = None) -> int:
+    """Budget de tokens du contexte pour un modèle (``CONTEXT_CONFIG['budgets']``)."""
+    return CONTEXT_CONFIG.get('budgets', {}).get(model, CONTEXT_CONFIG.get('default_budget', 3000))
+
+def query_window(text: str, query_terms: List[str], max_chars: int) -> Tuple[int, int]:
+    """Intervalle ``(début, fin)`` d'au plus ``max_chars`` caractères couvrant le plus de termes.
+
+    Sans terme de la question dans le texte, la fenêtre part du début.
+    """
+    if len(text) <= max_chars:
+        return 0, len(text)
+
+    terms = set(query_terms)
+    hits = [(match.start(), tokens[0]) for match in _WORD_RE.finditer(text)
+            for tokens in [tokenize(match.group())] if tokens and tokens[0] in terms]
+    start = 0
+    if hits:
+        # Fenêtre commençant un peu avant un terme, qui couvre le plus de termes distincts
+        lead = max_chars // 5
+        best = None
+        for i, (position, _) in enumerate(hits):
+            covered = {term for hit, term in hits[i:] if hit < position + max_chars - lead}
+            if best is None or len(covered) > best[0]:
+                best = (len(covered), position)
+        start = min(max(best[1] - lead, 0), len(text) - max_chars)
+
+    end = start + max_chars
+    if start > 0:
+        # Démarrer au début d'une phrase (ou d'un mot) plutôt qu'en plein mot
+        boundary = _SENTENCE_END_RE.search(text, start, start + max_chars // 4)
+        if boundary:
+            start = boundary.end()
+        else:
+            space = text.find(' ', start, start + 30)
+            start = space + 1 if space >= 0 else start
+    if end < len(text):
+        space = text.rfind(' ', max(start, end - 30), end)
+        end = space if space > start else end
+    return start, end
+
+def _uncovered(start: int, end: int, covered: List[Tuple[int, int]]) -> Tuple[int, int]:
+    """Plus grand morceau de ``[start, end)`` qui ne recouvre aucun intervalle de ``covered``."""
+    pieces = [(start, end)]
+    for covered_start, covered_end in covered:
+        next_pieces = []
+        for piece_start, piece_end in pieces:
+            if covered_end <= piece_start or covered_start >= piece_end:
+                next_pieces.append((piece_start, piece_end))
+                continue
+            if covered_start > piece_start:
+                next_pieces.append((piece_start, covered_start))
+            if covered_end < piece_end:
+                next_pieces.append((covered_end, piece_end))
+        pieces = next_pieces
+    return max(pieces, key=lambda piece: piece[1] - piece[0], default=(start, start))
+
+def pack_context(documents: List[Dict[str, Any]], query: str = '',
+                 budget: Optional[int] = None,
+                 header: Optional[Callable[[int, Dict[str, Any]], str]] = None,
+                 passage_tokens: Optional[int] = None,
+                 min_passage_tokens: Optional[int] = None) -> Dict[str, Any]:
+    """Assemble le contexte des ``documents`` (du plus au moins pertinent).
+
+    ``header(rang, métadonnées)`` donne l'en-tête de chaque passage. Retourne
+    ``{'context', 'tokens', 'budget', 'passages', 'duplicates', 'dropped'}`` :
+    ``passages`` décrit les passages retenus (document, décalages, tokens),
+    ``duplicates`` compte les documents écartés car déjà couverts et
+    ``dropped`` ceux qui ne tenaient plus dans le budget.
+    """
+    budget = context_budget() if budget is None else budget
+    passage_tokens = passage_tokens or CONTEXT_CONFIG.get('passage_tokens', 400)
+    min_tokens = (CONTEXT_CONFIG.get('min_passage_tokens', 40)
+                  if min_passage_tokens is None else min_passage_tokens)
+    header = header or (lambda rank, metadata: f"Document {rank}")
+    query_terms = [term for term in tokenize(query) if len(term) >= 3]
+
+    parts = []
+    passages = []
+    used = 0
+    duplicates = dropped = 0
+    seen_texts = set()
+    # Intervalles déjà retenus dans le texte d'origine, par document parent
+    covered: Dict[Any, List[Tuple[int, int]]] = {}
+
+    for document in documents:
+        metadata = document.get('metadata') or {}
+        text = (document.get('text', '') or '').strip()
+        if not text:
+            continue
+        digest = hashlib.sha1(' '.join(text.split()).lower().encode('utf-8')).digest()
+        if digest in seen_texts:
+            duplicates += 1
+            continue
+
+        title = f"=== {header(len(passages) + 1, metadata)} ===\n"
+        remaining = budget - used - estimate_tokens(title)
+        if remaining < min_tokens:
+            dropped += 1
+            continue
+        window_tokens = min(passage_tokens, remaining)
+        start, end = query_window(text, query_terms, window_tokens * CHARS_PER_TOKEN)
+
+        # Passages d'un même document : ne garder que le texte pas encore retenu
+        parent = metadata.get('parent_id')
+        offset = metadata.get('chunk_start')
+        if parent is not None and isinstance(offset, int):
+            start, end = _uncovered(offset + start, offset + end, covered.get(parent, []))
+            start, end = start - offset, end - offset
+        passage = text[start:end].strip()
+        if estimate_tokens(passage) < min(min_tokens, estimate_tokens(text)):
+            duplicates += 1
+            continue
+
+        passage_text = ("… " if start > 0 else "") + passage + (" …" if end < len(text) else "")
+        tokens = estimate_tokens(title) + estimate_tokens(passage_text)
+        # L'estimation des bords de fenêtre peut déborder un peu : rogner jusqu'au budget
+        while tokens > budget - used and len(passage_text) > CHARS_PER_TOKEN:
+            cut = len(passage_text) - (tokens - (budget - used)) * CHARS_PER_TOKEN - 2
+            passage_text = passage_text[:max(cut, 0)].rstrip() + " …"
+            tokens = estimate_tokens(title) + estimate_tokens(passage_text)
+        if tokens > budget - used:
+            dropped += 1
+            continue
+
+        seen_texts.add(digest)
+        if parent is not None and isinstance(offset, int):
+            covered.setdefault(parent, []).append((offset + start, offset + end))
+        parts.append(f"{title}{passage_text}\n")
+        passages.append({'document': document, 'start': start, 'end': end, 'tokens': tokens})
+        used += tokens
+
+    return {
+        'context': "\n".join(parts),
+        'tokens': used,
+        'budget': budget,
+        'passages': passages,
+        'duplicates': duplicates,
+        'dropped': dropped
+    }
@@ -0,0 +1,233 @@
+"""Cache persistant des textes extraits (PDF, TXT, OCR).
+
+Une entrée est identifiée par le chemin du fichier et reste valide tant que
+sa taille et sa date de modification n'ont pas changé, ainsi que la version
+de l'extracteur. Avec ``verify_hash``, le contenu est aussi haché : un fichier
+simplement « touché » (date changée, contenu identique) reste alors en cache.
+
+Le cache est une base SQLite (mode WAL) partagée sans risque entre les
+processus d'extraction et entre les threads (sessions Streamlit) d'un même
+processus. Au-delà de ``max_size_mb`` de texte stocké, les
+entrées les moins récemment utilisées sont supprimées.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from ..config.settings import EXTRACTION_CACHE_CONFIG
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    content_hash TEXT,
+    extractor_version INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries (last_access);
+-- Taille totale tenue à jour par triggers : pas de SUM() à chaque ajout
+CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY CHECK (id = 0), bytes INTEGER NOT NULL);
+INSERT OR IGNORE INTO totals (id, bytes) VALUES (0, 0);
+CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries
+BEGIN UPDATE totals SET bytes = bytes + NEW.bytes WHERE id = 0; END;
+CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries
+BEGIN UPDATE totals SET bytes = bytes - OLD.bytes WHERE id = 0; END;
+"""
+
+def file_content_hash(file_path: Union[str, Path], block_size: int = 1 << 20) -> str:
+    """Empreinte SHA-1 du contenu d'un fichier."""
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class ExtractionCache:
+    """Cache des textes extraits, indexé par chemin, taille et date de modification."""
+
+    def __init__(self, db_path: Union[str, Path], max_size_mb: float = 512,
+                 verify_hash: bool = False):
+        self.db_path = Path(db_path)
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.verify_hash = verify_hash
+        self._connection = None
+        self._pid = None
+        # Transactions explicites de ``put`` : une à la fois sur la connexion partagée
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Une connexion par processus : les workers du pool d'extraction
+        # n'héritent pas de celle du processus parent
+        if self._connection is None or self._pid != os.getpid():
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            # Streamlit exécute chaque session dans son propre thread
+            connection = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def close(self) -> None:
+        if self._connection is not None and self._pid == os.getpid():
+            self._connection.close()
+        self._connection = None
+
+    def get(self, file_path: Union[str, Path], extractor_version: int = 0) -> Optional[str]:
+        """Retourne le texte en cache s'il correspond encore au fichier, sinon ``None``."""
+        key = os.path.abspath(file_path)
+        try:
+            stat = os.stat(key)
+        except OSError:
+            return None
+
+        connection = self._connect()
+        row = connection.execute(
+            "SELECT size, mtime_ns, content_hash, extractor_version, text FROM entries WHERE path = ?",
+            (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        size, mtime_ns, content_hash, version, text = row
+        if version != extractor_version or size != stat.st_size:
+            return None
+        if mtime_ns != stat.st_mtime_ns:
+            # Date modifiée : le contenu peut être identique
+            if not (self.verify_hash and content_hash and content_hash == file_content_hash(key)):
+                return None
+            connection.execute("UPDATE entries SET mtime_ns = ? WHERE path = ?",
+                               (stat.st_mtime_ns, key))
+
+        connection.execute("UPDATE entries SET last_access = ? WHERE path = ?", (time.time(), key))
+        return text
+
+    def put(self, file_path: Union[str, Path], text: str, extractor_version: int = 0) -> None:
+        """Enregistre le texte extrait d'un fichier puis applique la limite de taille."""
+        key = os.path.abspath(file_path)
+        try:
+            stat = os.stat(key)
+            content_hash = file_content_hash(key) if self.verify_hash else None
+        except OSError:
+            return
+
+        size_bytes = len(text.encode('utf-8'))
+        if size_bytes > self.max_bytes:
+            return
+
+        now = time.time()
+        connection = self._connect()
+        with self._lock:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                # DELETE explicite (et non INSERT OR REPLACE) pour déclencher le trigger de taille
+                connection.execute("DELETE FROM entries WHERE path = ?", (key,))
+                connection.execute(
+                    "INSERT INTO entries (path, size, mtime_ns, content_hash, extractor_version,"
+                    " text, bytes, created, last_access) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, stat.st_size, stat.st_mtime_ns, content_hash, extractor_version,
+                     text, size_bytes, now, now)
+                )
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        self.evict()
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """Supprime les entrées les moins récemment utilisées au-delà de la taille maximale.
+
+        Retourne le nombre d'entrées supprimées.
+        """
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        connection = self._connect()
+        total = self._total_bytes(connection)
+        if total <= limit:
+            return 0
+
+        removed = []
+        for path, size_bytes in connection.execute(
+                "SELECT path, bytes FROM entries ORDER BY last_access ASC"):
+            if total <= limit:
+                break
+            removed.append((path,))
+            total -= size_bytes
+        connection.executemany("DELETE FROM entries WHERE path = ?", removed)
+        return len(removed)
+
+    @staticmethod
+    def _total_bytes(connection: sqlite3.Connection) -> int:
+        return connection.execute("SELECT bytes FROM totals WHERE id = 0").fetchone()[0]
+
+    def purge(self, older_than_days: Optional[float] = None, missing_only: bool = False) -> int:
+        """Supprime des entrées et retourne leur nombre.
+
+        Sans argument, vide le cache ; sinon supprime les entrées non utilisées
+        depuis ``older_than_days`` jours, ou celles dont le fichier n'existe plus.
+        """
+        connection = self._connect()
+        if missing_only:
+            paths = [(path,) for (path,) in connection.execute("SELECT path FROM entries")
+                     if not os.path.exists(path)]
+            connection.executemany("DELETE FROM entries WHERE path = ?", paths)
+            return len(paths)
+        if older_than_days is not None:
+            cursor = connection.execute("DELETE FROM entries WHERE last_access < ?",
+                                        (time.time() - older_than_days * 86400,))
+        else:
+            cursor = connection.execute("DELETE FROM entries")
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        """Retourne le nombre d'entrées et la taille du cache."""
+        connection = self._connect()
+        count, oldest = connection.execute(
+            "SELECT COUNT(*), MIN(last_access) FROM entries"
+        ).fetchone()
+        total = self._total_bytes(connection)
+        return {
+            'path': str(self.db_path),
+            'entries': count,
+            'text_bytes': total,
+            'max_bytes': self.max_bytes,
+            'file_bytes': self.db_path.stat().st_size if self.db_path.exists() else 0,
+            'oldest_access': oldest
+        }
+
+    def entries(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Retourne les entrées les plus récemment utilisées."""
+        connection = self._connect()
+        rows = connection.execute(
+            "SELECT path, size, bytes, extractor_version, last_access FROM entries"
+            " ORDER BY last_access DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [
+            {'path': path, 'size': size, 'text_bytes': text_bytes,
+             'extractor_version': version, 'last_access': last_access}
+            for path, size, text_bytes, version, last_access in rows
+        ]
+
+_default_cache = None
+
+def get_extraction_cache() -> Optional[ExtractionCache]:
+    """Retourne le cache configuré dans ``EXTRACTION_CACHE_CONFIG`` (ou ``None`` s'il est désactivé)."""
+    global _default_cache
+    if not EXTRACTION_CACHE_CONFIG.get('enabled', True):
+        return None
+    if _default_cache is None:
+        _default_cache = ExtractionCache(
+            EXTRACTION_CACHE_CONFIG['path'],
+            max_size_mb=EXTRACTION_CACHE_CONFIG.get('max_size_mb', 512),
+            verify_hash=EXTRACTION_CACHE_CONFIG.get('verify_hash', False)
+        )
+    return _default_cache
@@ -3,13 +3,14 @@
 import os
 import json
 import PyPDF2
-import pytesseract
-import cv2
-import numpy as np
-from typing import Dict, List, Tuple, Optional
-from PIL import Image
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional
 import streamlit as st
 
+from .extraction_cache import get_extraction_cache
+from .ocr import ocr_images
+from .text_chunker import PAGE_BREAK
+from ..config.settings import PDF_CONFIG
+
 # Système de logging centralisé pour éviter la pollution de l'interface
 class DebugLogger:
     """Logger centralisé pour collecter les messages de debug sans polluer l'interface"""
@@ -51,40 +52,11 @@ class DebugLogger:
 # Instance globale du logger
 debug_logger = DebugLogger()
 
-# Configuration automatique de Tesseract pour Windows
-def configure_tesseract():
-    """Configure automatiquement le chemin vers Tesseract OCR."""
-    if os.name == 'nt':  # Windows
-        possible_paths = [
-            r"C:\Program Files\Tesseract-OCR\tesseract.exe",
-            r"C:\Program Files (x86)\Tesseract-OCR\tesseract.exe",
-            r"C:\tesseract\tesseract.exe",
-            r"C:\tools\tesseract\tesseract.exe"
-        ]
-        
-        for path in possible_paths:
-            if os.path.exists(path):
-                pytesseract.pytesseract.tesseract_cmd = path
-                return path
-        
-        # Si aucun trouvé, essayer d'ajouter au PATH temporairement
-        tesseract_dir = r"C:\Program Files\Tesseract-OCR"
-        if os.path.exists(tesseract_dir) and tesseract_dir not in os.environ.get('PATH', ''):
-            os.environ['PATH'] += os.pathsep + tesseract_dir
-            
-    return None
-
-# Configurer Tesseract au chargement du module
-configure_tesseract()
-
 def read_annonce_file(file_path: str) -> Dict:
     """Lit un fichier ._rag_.data et retourne ses informations."""
     try:
         # Détecter l'encodage pour les fichiers d'annonce aussi
-        encoding = detect_file_encoding(file_path)
-        
-        with open(file_path, 'r', encoding=encoding) as f:
-            content = f.read().strip()
+        content = read_text_file(file_path).strip()
         
         # Essayer de parser comme JSON
         try:
@@ -249,106 +221,195 @@ def _map_status_from_etat(etat: str) -> str:
 
 def find_files_recursive(directory: str, extensions: List[str]) -> List[Tuple[str, Dict]]:
     """Trouve tous les fichiers avec les extensions spécifiées de manière récursive."""
-    import glob
-    files_found = []
-    
-    for root, dirs, files in os.walk(directory):
-        # AJOUT: Forcer la détection des fichiers cachés .data.json
-        hidden_data_json = os.path.join(root, '.data.json')
-        if os.path.exists(hidden_data_json) and '.data.json' not in files:
-            files.append('.data.json')
-            debug_logger.info(f"🔍 Fichier caché .data.json détecté et ajouté : {hidden_data_json}")
-        
-        # Chercher les fichiers de métadonnées dans ce répertoire
-        rag_data = {}
-        data_json_data = {}
-        notes_data = {}
-        
-        # 1. Chercher d'abord les fichiers ._rag_.data (priorité haute)
-        annonce_files = [f for f in files if f.startswith('._rag_.') and f.endswith('.data')]
-        
-        if annonce_files:
-            annonce_path = os.path.join(root, annonce_files[0])
-            rag_data = read_annonce_file(annonce_path)
-            debug_logger.info(f"📋 Fichier ._rag_.data trouvé : {annonce_path}")
-        
-        # 2. Chercher les fichiers .data.json (y compris les fichiers cachés commençant par un point)
-        data_json_files = [f for f in files if f.endswith('.data.json') or f == '.data.json']
-        
-        if data_json_files:
-            data_json_path = os.path.join(root, data_json_files[0])
-            data_json_data = read_data_json_file(data_json_path)
-            debug_logger.info(f"📊 Fichier .data.json trouvé : {data_json_path}")
-        
-        # 3. Chercher les fichiers _notes.txt (dossier_notes.txt)
-        notes_files = [f for f in files if f.endswith('_notes.txt')]
-        
-        if notes_files:
-            notes_path = os.path.join(root, notes_files[0])
-            notes_data = read_notes_file(notes_path)
-            debug_logger.info(f"📝 Fichier notes trouvé : {notes_path}")
-        
-        # 4. Détecter les fichiers de présentation (CV et BA)
-        cv_files = detect_cv_files(files)
-        ba_files = detect_ba_files(files)
+    return list(iter_files_recursive(directory, extensions))
+
+def iter_files_recursive(directory: str, extensions: List[str]) -> Iterator[Tuple[str, Dict]]:
+    """Parcourt récursivement un répertoire et produit ``(chemin, métadonnées)`` au fil de l'eau.
+    
+    Même résultat et même ordre que ``find_files_recursive``, mais les fichiers
+    d'un dossier sont produits dès que ce dossier a été lu : le traitement peut
+    commencer avant la fin du parcours. Le type des entrées vient de
+    ``os.scandir`` (sans ``stat`` supplémentaire) et chaque fichier de
+    métadonnées n'est lu qu'une fois par dossier.
+    """
+    pending_dirs = [directory]
+    
+    while pending_dirs:
+        root = pending_dirs.pop()
+        try:
+            with os.scandir(root) as entries:
+                files, subdirs = [], []
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if not is_dir:
+                        files.append(entry.name)
+                    elif not entry.is_symlink():
+                        subdirs.append(entry.path)
+        except OSError:
+            continue
         
-        if cv_files:
-            debug_logger.info(f"📄 Fichier(s) CV de candidature trouvé(s) : {', '.join(cv_files)}")
-        if ba_files:
-            debug_logger.info(f"🎤 Fichier(s) BA de support oral trouvé(s) : {', '.join(ba_files)}")
-        
-        # Fusionner toutes les métadonnées
-        base_metadata = merge_metadata_sources(rag_data, data_json_data, notes_data)
-        annonce_data = enrich_metadata_with_presentation_files(base_metadata, cv_files, ba_files)
-        
-        # Chercher les fichiers à traiter
-        for file in files:
-            file_path = os.path.join(root, file)
-            file_ext = os.path.splitext(file)[1].lower()
-            
-            # Inclure les fichiers selon les extensions + les .data.json comme projets
-            should_include = False
-            metadata_to_use = annonce_data  # Métadonnées par défaut
-            
-            # Fichiers normaux selon les extensions
-            if (file_ext in extensions and 
-                not file.startswith('._rag_.') and 
-                not file.endswith('_notes.txt')):
-                should_include = True
-            
-            # Fichiers .data.json comme projets (avec leurs propres métadonnées, y compris fichiers cachés)
-            elif file.endswith('.data.json') or file == '.data.json':
-                should_include = True
-                # Pour les .data.json, utiliser leurs propres métadonnées
-                own_metadata = read_data_json_file(file_path)
-                if own_metadata:
-                    metadata_to_use = own_metadata
-                debug_logger.info(f"📊 Fichier .data.json inclus comme projet : {file_path}")
-            
-            if should_include:
-                files_found.append((file_path, metadata_to_use))
-    
-    return files_found
+        # Sous-dossiers parcourus dans l'ordre de lecture, comme os.walk
+        pending_dirs.extend(reversed(subdirs))
+        yield from _iter_directory_files(root, files, extensions)
 
-def detect_file_encoding(file_path: str) -> str:
-    """Détecte l'encodage d'un fichier texte."""
-    # Liste des encodages à tester par ordre de priorité
-    encodings = ['utf-8', 'utf-8-sig', 'cp1252', 'iso-8859-1', 'latin1']
-    
-    for encoding in encodings:
+def _iter_directory_files(root: str, files: List[str], extensions: List[str]) -> Iterator[Tuple[str, Dict]]:
+    """Produit les fichiers à traiter d'un dossier avec leurs métadonnées."""
+    # Chercher les fichiers de métadonnées dans ce répertoire
+    rag_data = {}
+    data_json_data = {}
+    notes_data = {}
+    data_json_cache = {}
+    
+    # 1. Chercher d'abord les fichiers ._rag_.data (priorité haute)
+    annonce_files = [f for f in files if f.startswith('._rag_.') and f.endswith('.data')]
+    
+    if annonce_files:
+        annonce_path = os.path.join(root, annonce_files[0])
+        rag_data = read_annonce_file(annonce_path)
+        debug_logger.info(f"📋 Fichier ._rag_.data trouvé : {annonce_path}")
+    
+    # 2. Chercher les fichiers .data.json (y compris les fichiers cachés commençant par un point)
+    data_json_files = [f for f in files if f.endswith('.data.json')]
+    
+    if data_json_files:
+        data_json_path = os.path.join(root, data_json_files[0])
+        data_json_data = data_json_cache[data_json_files[0]] = read_data_json_file(data_json_path)
+        debug_logger.info(f"📊 Fichier .data.json trouvé : {data_json_path}")
+    
+    # 3. Chercher les fichiers _notes.txt (dossier_notes.txt)
+    notes_files = [f for f in files if f.endswith('_notes.txt')]
+    
+    if notes_files:
+        notes_path = os.path.join(root, notes_files[0])
+        notes_data = read_notes_file(notes_path)
+        debug_logger.info(f"📝 Fichier notes trouvé : {notes_path}")
+    
+    # 4. Détecter les fichiers de présentation (CV et BA)
+    cv_files = detect_cv_files(files)
+    ba_files = detect_ba_files(files)
+    
+    if cv_files:
+        debug_logger.info(f"📄 Fichier(s) CV de candidature trouvé(s) : {', '.join(cv_files)}")
+    if ba_files:
+        debug_logger.info(f"🎤 Fichier(s) BA de support oral trouvé(s) : {', '.join(ba_files)}")
+    
+    # Fusionner toutes les métadonnées
+    base_metadata = merge_metadata_sources(rag_data, data_json_data, notes_data)
+    annonce_data = enrich_metadata_with_presentation_files(base_metadata, cv_files, ba_files)
+    
+    # Chercher les fichiers à traiter
+    for file in files:
+        file_path = os.path.join(root, file)
+        file_ext = os.path.splitext(file)[1].lower()
+        
+        # Fichiers normaux selon les extensions
+        if (file_ext in extensions and 
+            not file.startswith('._rag_.') and 
+            not file.endswith('_notes.txt')):
+            yield file_path, annonce_data
+        
+        # Fichiers .data.json comme projets (avec leurs propres métadonnées, y compris fichiers cachés)
+        elif file.endswith('.data.json'):
+            if file not in data_json_cache:
+                data_json_cache[file] = read_data_json_file(file_path)
+            debug_logger.info(f"📊 Fichier .data.json inclus comme projet : {file_path}")
+            yield file_path, data_json_cache[file] or annonce_data
+
+# Marques d'ordre des octets (UTF-32 avant UTF-16 : même préfixe FF FE)
+_BOM_ENCODINGS = [
+    (b'\xef\xbb\xbf', 'utf-8-sig'),
+    (b'\xff\xfe\x00\x00', 'utf-32'),
+    (b'\x00\x00\xfe\xff', 'utf-32'),
+    (b'\xff\xfe', 'utf-16'),
+    (b'\xfe\xff', 'utf-16')
+]
+
+def decode_text_bytes(data: bytes) -> Tuple[str, str]:
+    """Décode le contenu d'un fichier texte et retourne ``(texte, encodage)``.
+    
+    Une marque d'ordre des octets fixe l'encodage ; sinon UTF-8 puis cp1252
+    sont essayés sur tout le contenu (et non sur un échantillon), latin1
+    acceptant en dernier recours n'importe quel octet.
+    """
+    for bom, encoding in _BOM_ENCODINGS:
+        if data.startswith(bom):
+            return data.decode(encoding, errors='replace'), encoding
+    
+    for encoding in ('utf-8', 'cp1252'):
         try:
-            with open(file_path, 'r', encoding=encoding) as f:
-                # Lire un échantillon pour valider l'encodage
-                f.read(1024)
-            return encoding
-        except (UnicodeDecodeError, UnicodeError):
+            return data.decode(encoding), encoding
+        except UnicodeDecodeError:
             continue
     
-    # Si aucun encodage ne fonctionne, utiliser latin1 qui accepte tous les bytes
-    return 'latin1'
+    return data.decode('latin1'), 'latin1'
+
+def read_text_file(file_path: str) -> str:
+    """Lit un fichier texte en une seule lecture, avec détection de l'encodage.
+    
+    Les fins de ligne sont normalisées en ``\\n`` comme en mode texte.
+    """
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    text = decode_text_bytes(data)[0]
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+def detect_file_encoding(file_path: str) -> str:
+    """Détecte l'encodage d'un fichier texte."""
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    return decode_text_bytes(data)[1]
+
+# Version des extracteurs : à incrémenter quand leur sortie change pour invalider le cache
+EXTRACTOR_VERSION = 4
+
+def extract_text_from_file(file_path: str, use_cache: bool = True) -> Optional[str]:
+    """Extrait le texte d'un fichier selon son extension.
+    
+    Le cache d'extraction est consulté d'abord : un fichier inchangé depuis
+    sa dernière extraction n'est ni relu ni repassé à l'OCR.
+    """
+    if os.path.splitext(file_path)[1].lower() in ['.png', '.jpg', '.jpeg']:
+        # Images : cache et pré-analyse gérés par le traitement par lots
+        return extract_text_from_image_files([file_path], use_cache)[0]['text']
+    
+    if use_cache:
+        cached = get_cached_text(file_path)
+        if cached is not None:
+            return cached
+    
+    text = _extract_text_uncached(file_path)
+    
+    if use_cache:
+        store_cached_text(file_path, text)
+    return text
+
+def get_cached_text(file_path: str) -> Optional[str]:
+    """Retourne le texte extrait en cache pour un fichier inchangé, sinon ``None``."""
+    cache = get_extraction_cache()
+    if cache is None:
+        return None
+    try:
+        return cache.get(file_path, EXTRACTOR_VERSION)
+    except Exception as e:
+        print(f"Cache d'extraction indisponible: {e}")
+        return None
 
-def extract_text_from_file(file_path: str) -> Optional[str]:
-    """Extrait le texte d'un fichier selon son extension."""
+def store_cached_text(file_path: str, text: Optional[str]) -> None:
+    """Met en cache le texte extrait d'un fichier."""
+    cache = get_extraction_cache()
+    # Les échecs (None) ne sont pas mis en cache pour être retentés
+    if cache is None or text is None:
+        return
+    try:
+        cache.put(file_path, text, EXTRACTOR_VERSION)
+    except Exception as e:
+        print(f"Erreur écriture cache d'extraction: {e}")
+
+def _extract_text_uncached(file_path: str) -> Optional[str]:
+    """Extrait le texte d'un fichier selon son extension, sans cache."""
     try:
         file_ext = os.path.splitext(file_path)[1].lower()
         
@@ -371,53 +432,29 @@ def extract_text_from_file(file_path: str) -> Optional[str]:
 def extract_text_from_txt_file(file_path: str) -> Optional[str]:
     """Extrait le texte d'un fichier TXT avec détection automatique d'encodage."""
     try:
-        # Détecter l'encodage automatiquement
-        encoding = detect_file_encoding(file_path)
-        
-        with open(file_path, 'r', encoding=encoding) as f:
-            content = f.read()
-        
-        # Log de l'encodage détecté si c'est dans Streamlit
-        #if 'st' in globals() and encoding != 'utf-8':
-            #st.info(f"📝 Fichier {os.path.basename(file_path)} lu avec encodage {encoding}")
-        #elif encoding != 'utf-8':
-            #print(f"Fichier {file_path} lu avec encodage {encoding}")
-            
-        return content
+        # Une seule lecture : l'encodage est détecté sur le contenu en mémoire
+        return read_text_file(file_path)
         
     except Exception as e:
-        # Tentative de fallback avec errors='replace' pour éviter les crashes
-        try:
-            with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
-                content = f.read()
-            
-            if 'st' in globals():
-                st.warning(f"⚠️ Caractères non-UTF8 remplacés dans {os.path.basename(file_path)}")
-            else:
-                print(f"Avertissement: Caractères non-UTF8 remplacés dans {file_path}")
-                
-            return content
-            
-        except Exception as e2:
-            if 'st' in globals():
-                st.error(f"Erreur lecture fichier TXT {file_path}: {e2}")
-            print(f"Erreur lecture fichier TXT {file_path}: {e2}")
-            return None
+        if 'st' in globals():
+            st.error(f"Erreur lecture fichier TXT {file_path}: {e}")
+        print(f"Erreur lecture fichier TXT {file_path}: {e}")
+        return None
 
 def extract_text_from_pdf_file(file_path: str) -> Optional[str]:
-    """Extrait le texte d'un fichier PDF."""
+    """Extrait le texte d'un fichier PDF.
+    
+    Les pages sont séparées par ``PAGE_BREAK`` (saut de page) pour retrouver
+    le numéro de page de chaque passage ; au plus ``PDF_CONFIG['max_pages']``
+    pages sont extraites.
+    """
     try:
         # Vérifier que le fichier n'est pas vide
         if os.path.getsize(file_path) == 0:
             debug_logger.warning(f"Fichier PDF vide ignoré : {os.path.basename(file_path)}")
             return None
         
-        with open(file_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            return text
+        return join_pdf_pages(text for _, text in iter_pdf_pages(file_path, stop=PDF_CONFIG.get('max_pages')))
     except (PyPDF2.errors.PdfReadError, PyPDF2.errors.PdfStreamError) as e:
         debug_logger.warning(f"Fichier PDF corrompu ou illisible ignoré {os.path.basename(file_path)}: {str(e)}")
         return None
@@ -425,69 +462,95 @@ def extract_text_from_pdf_file(file_path: str) -> Optional[str]:
         debug_logger.error(f"Erreur extraction PDF {file_path}: {e}")
         return None
 
+def iter_pdf_pages(file_path: str, start: int = 0, stop: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+    """Produit ``(numéro de page, texte)`` pour les pages ``start`` à ``stop`` (exclue) d'un PDF.
+    
+    Les numéros de page commencent à 1 ; une seule page est en mémoire à la fois.
+    """
+    with open(file_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        page_count = len(pdf_reader.pages)
+        stop = page_count if stop is None else min(stop, page_count)
+        for index in range(start, stop):
+            text = pdf_reader.pages[index].extract_text() or ""
+            yield index + 1, text.replace(PAGE_BREAK, "\n")
+
+def get_pdf_page_count(file_path: str) -> int:
+    """Nombre de pages d'un PDF, plafonné à ``PDF_CONFIG['max_pages']``."""
+    with open(file_path, 'rb') as file:
+        page_count = len(PyPDF2.PdfReader(file).pages)
+    max_pages = PDF_CONFIG.get('max_pages')
+    return min(page_count, max_pages) if max_pages else page_count
+
+def extract_pdf_page_range(file_path: str, start: int, stop: int) -> str:
+    """Extrait une tranche de pages d'un PDF (même format que ``extract_text_from_pdf_file``).
+    
+    Des tranches consécutives réunies par ``PAGE_BREAK`` redonnent le texte
+    complet du document.
+    """
+    return join_pdf_pages(text for _, text in iter_pdf_pages(file_path, start, stop))
+
+def join_pdf_pages(page_texts: Iterable[str]) -> str:
+    """Assemble les textes des pages, séparés par ``PAGE_BREAK``."""
+    return PAGE_BREAK.join(text + "\n" for text in page_texts)
+
 def extract_text_from_image_file(file_path: str) -> Optional[str]:
     """Extrait le texte d'une image via OCR."""
-    try:
-        # Vérifier que Tesseract est configuré
-        if not hasattr(pytesseract.pytesseract, 'tesseract_cmd') or not pytesseract.pytesseract.tesseract_cmd:
-            configure_tesseract()
-        
-        image = Image.open(file_path)
-        # Convertir en OpenCV format pour améliorer la qualité OCR
-        img_array = np.array(image)
-        
-        # Gérer les images en mode RGBA
-        if len(img_array.shape) == 3 and img_array.shape[2] == 4:
-            # Convertir RGBA en RGB
-            img_array = cv2.cvtColor(img_array, cv2.COLOR_RGBA2RGB)
-        elif len(img_array.shape) == 3:
-            # Convertir RGB en BGR pour OpenCV
-            img_array = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
-        
-        # Convertir en niveaux de gris
-        gray = cv2.cvtColor(img_array, cv2.COLOR_BGR2GRAY) if len(img_array.shape) == 3 else img_array
-        
-        # Améliorer la qualité pour l'OCR
-        _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        
-        # Extraire le texte avec gestion d'erreur spécifique
-        try:
-            text = pytesseract.image_to_string(thresh, lang='fra+eng')
-            return text.strip()
-        except pytesseract.TesseractNotFoundError:
-            # Essayer de reconfigurer Tesseract
-            tesseract_path = configure_tesseract()
-            if tesseract_path:
-                print(f"Tesseract reconfiguré vers: {tesseract_path}")
-                text = pytesseract.image_to_string(thresh, lang='fra+eng')
-                return text.strip()
-            else:
-                error_msg = "Tesseract OCR non trouvé. Veuillez installer Tesseract ou vérifier le PATH."
-                if 'st' in globals():
-                    st.warning(f"⚠️ {error_msg}")
-                print(f"Avertissement OCR {file_path}: {error_msg}")
-                return ""
-                
-    except Exception as e:
-        if 'tesseract' in str(e).lower():
-            error_msg = f"Erreur Tesseract: {str(e)}"
-            if 'st' in globals():
-                st.warning(f"⚠️ OCR non disponible pour {os.path.basename(file_path)}: {error_msg}")
-            print(f"Avertissement OCR {file_path}: {error_msg}")
-            return ""
+    return _image_ocr_outcome(ocr_images([file_path])[0])
+
+def extract_text_from_image_files(file_paths: List[str], use_cache: bool = True) -> List[Dict]:
+    """Extrait le texte d'un lot d'images, l'OCR des images absentes du cache étant groupé.
+    
+    Retourne pour chaque image ``{'path', 'text', 'seconds', 'ocr_skipped',
+    'text_components'}`` où ``seconds`` est le temps de préparation et d'OCR
+    de l'image (0 si elle était en cache) et ``ocr_skipped`` indique une
+    image jugée sans texte par la pré-analyse, non envoyée à Tesseract.
+    """
+    outcomes = {}
+    to_ocr = []
+    for file_path in file_paths:
+        cached = get_cached_text(file_path) if use_cache else None
+        if cached is not None:
+            outcomes[file_path] = {'path': file_path, 'text': cached, 'seconds': 0.0,
+                                   'ocr_skipped': False, 'text_components': None}
         else:
-            if 'st' in globals():
-                st.error(f"Erreur OCR {file_path}: {e}")
-            print(f"Erreur OCR {file_path}: {e}")
-            return None
+            to_ocr.append(file_path)
+    
+    for result in ocr_images(to_ocr):
+        text = _image_ocr_outcome(result)
+        # Sans Tesseract ou sans OCR (image sans texte), rien n'est mis en cache :
+        # une image en cache a toujours été reconnue
+        if use_cache and result['text'] is not None and not result['ocr_skipped']:
+            store_cached_text(result['path'], text)
+        outcomes[result['path']] = {
+            'path': result['path'],
+            'text': text,
+            'seconds': result['prepare_seconds'] + result['ocr_seconds'],
+            'ocr_skipped': result['ocr_skipped'],
+            'text_components': result['text_components']
+        }
+    return [outcomes[file_path] for file_path in file_paths]
+
+def _image_ocr_outcome(result: Dict) -> Optional[str]:
+    """Texte d'un résultat OCR : chaîne vide si Tesseract manque, ``None`` en cas d'erreur."""
+    file_path = result['path']
+    if result['error']:
+        if 'st' in globals():
+            st.error(f"Erreur OCR {file_path}: {result['error']}")
+        print(f"Erreur OCR {file_path}: {result['error']}")
+        return None
+    if result['text'] is None:
+        error_msg = "Tesseract OCR non trouvé. Veuillez installer Tesseract ou vérifier le PATH."
+        if 'st' in globals():
+            st.warning(f"⚠️ {error_msg}")
+        print(f"Avertissement OCR {file_path}: {error_msg}")
+        return ""
+    return result['text']
 
 def read_notes_file(file_path: str) -> Dict:
     """Lit un fichier _notes.txt contenant des métadonnées JSON."""
     try:
-        encoding = detect_file_encoding(file_path)
-        
-        with open(file_path, 'r', encoding=encoding) as f:
-            notes_data = json.load(f)
+        notes_data = json.loads(read_text_file(file_path))
         
         debug_logger.info(f"📝 Fichier notes trouvé : {file_path}")
         
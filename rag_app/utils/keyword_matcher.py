@@ -0,0 +1,57 @@
+"""Recherche de mots-clés par catégorie, avec des règles compilées une fois."""
+
+import re
+from typing import Dict, Iterable, List, Optional, Pattern, Sequence, Set, Tuple
+
+class KeywordMatcher:
+    """Associe des catégories à des mots-clés et retrouve celles présentes dans un texte.
+    
+    Le résultat est exactement celui de ``any(mot in texte.lower() ...)``
+    pour chaque catégorie : le texte est mis en minuscules une seule fois,
+    chaque mot-clé distinct n'est cherché qu'une fois (``in``, recherche en
+    C), un mot-clé dont toutes les catégories sont déjà trouvées est sauté
+    et la recherche s'arrête dès que toutes les catégories sont trouvées.
+    Mesuré sous CPython, c'est plus rapide qu'une expression régulière
+    combinée ou qu'un automate écrit en Python, qui testent chaque position
+    du texte.
+    """
+    
+    def __init__(self, rules: Dict[str, Iterable[str]]):
+        self.categories = list(rules)
+        keyword_categories: Dict[str, Set[str]] = {}
+        for category, keywords in rules.items():
+            for keyword in keywords:
+                if keyword:
+                    keyword_categories.setdefault(keyword.lower(), set()).add(category)
+        self._keywords: List[Tuple[str, frozenset]] = [
+            (keyword, frozenset(categories)) for keyword, categories in keyword_categories.items()
+        ]
+        
+    def find(self, text: str) -> Set[str]:
+        """Retourne les catégories dont au moins un mot-clé apparaît dans le texte."""
+        found: Set[str] = set()
+        if not text:
+            return found
+        text = text.lower()
+        for keyword, categories in self._keywords:
+            if not categories <= found and keyword in text:
+                found |= categories
+                if len(found) == len(self.categories):
+                    break
+        return found
+        
+    def classify(self, text: str) -> List[str]:
+        """Catégories trouvées, dans l'ordre des règles."""
+        found = self.find(text)
+        return [category for category in self.categories if category in found]
+
+def compile_patterns(rules: Sequence[Tuple[str, str]], flags: int = re.IGNORECASE) -> List[Tuple[Pattern, str]]:
+    """Compile une liste ordonnée de règles ``(expression, étiquette)``."""
+    return [(re.compile(pattern, flags), label) for pattern, label in rules]
+
+def first_match(rules: Sequence[Tuple[Pattern, str]], text: str) -> Optional[str]:
+    """Étiquette de la première règle dont l'expression apparaît dans le texte."""
+    for pattern, label in rules:
+        if pattern.search(text):
+            return label
+    return None
@@ -0,0 +1,250 @@
+"""Étape OCR : préparation des images et reconnaissance par lots avec Tesseract.
+
+Les images sont réduites avant binarisation (résolution ramenée à
+``OCR_CONFIG['target_dpi']`` et plus grand côté plafonné), ce qui réduit
+fortement le temps de Tesseract sur les scans haute résolution. Un lot
+d'images est reconnu par un seul processus ``tesseract`` (liste de fichiers
+en entrée, pages séparées par un saut de page) : le chargement des modèles
+de langue n'est payé qu'une fois par lot.
+
+Avant l'OCR, ``detect_text`` examine une miniature de l'image (composantes
+connexes alignées comme des caractères) : une photo ou une capture sans
+texte n'est pas envoyée à Tesseract.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+import pytesseract
+from PIL import Image
+
+from ..config.settings import OCR_CONFIG
+
+# Configuration automatique de Tesseract pour Windows
+def configure_tesseract():
+    """Configure automatiquement le chemin vers Tesseract OCR."""
+    if os.name == 'nt':  # Windows
+        possible_paths = [
+            r"C:\Program Files\Tesseract-OCR\tesseract.exe",
+            r"C:\Program Files (x86)\Tesseract-OCR\tesseract.exe",
+            r"C:\tesseract\tesseract.exe",
+            r"C:\tools\tesseract\tesseract.exe"
+        ]
+        
+        for path in possible_paths:
+            if os.path.exists(path):
+                pytesseract.pytesseract.tesseract_cmd = path
+                return path
+        
+        # Si aucun trouvé, essayer d'ajouter au PATH temporairement
+        tesseract_dir = r"C:\Program Files\Tesseract-OCR"
+        if os.path.exists(tesseract_dir) and tesseract_dir not in os.environ.get('PATH', ''):
+            os.environ['PATH'] += os.pathsep + tesseract_dir
+            
+    return None
+
+# Configurer Tesseract au chargement du module
+configure_tesseract()
+
+# Disponibilité de Tesseract, vérifiée une seule fois par processus
+_tesseract_available = None
+
+def tesseract_available() -> bool:
+    """Indique si Tesseract peut être lancé (résultat mémorisé pour le processus)."""
+    global _tesseract_available
+    if _tesseract_available is None:
+        try:
+            pytesseract.get_tesseract_version()
+            _tesseract_available = True
+        except Exception:
+            tesseract_path = configure_tesseract()
+            if tesseract_path:
+                print(f"Tesseract reconfiguré vers: {tesseract_path}")
+            try:
+                pytesseract.get_tesseract_version()
+                _tesseract_available = True
+            except Exception:
+                _tesseract_available = False
+    return _tesseract_available
+
+def _load_gray(file_path: str, max_side: Optional[int] = None) -> np.ndarray:
+    """Charge une image en niveaux de gris (transparence sur fond blanc).
+    
+    Avec ``max_side``, l'image est réduite pour que son plus grand côté n'en
+    dépasse pas la valeur ; les JPEG sont alors décodés directement à taille
+    réduite (1/2, 1/4, 1/8).
+    """
+    with Image.open(file_path) as image:
+        target = None
+        if max_side and max(image.size) > max_side:
+            ratio = max_side / max(image.size)
+            target = (max(int(image.width * ratio), 1), max(int(image.height * ratio), 1))
+            image.draft('L', target)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGBA', image.size, 'white')
+            image = Image.alpha_composite(background, image)
+        gray = image.convert('L')
+        if target and gray.size != target:
+            gray = gray.resize(target, Image.BILINEAR, reducing_gap=2.0)
+        return np.array(gray)
+
+def detect_text(file_path: str) -> Dict:
+    """Estime sur une miniature si une image contient du texte.
+    
+    Les composantes connexes de la miniature binarisée (dans les deux
+    polarités : texte sombre sur fond clair ou l'inverse) qui ont une taille
+    de caractère et un voisin de même hauteur sur la même ligne sont
+    comptées ; au-delà de ``precheck_min_components``, l'image est jugée
+    porteuse de texte. Le test privilégie les faux positifs (OCR inutile)
+    aux faux négatifs (texte perdu).
+    
+    Retourne ``{'has_text', 'text_components', 'edge_density'}``.
+    """
+    gray = _load_gray(file_path, OCR_CONFIG.get('precheck_size', 1024))
+    edges = cv2.Canny(gray, 100, 200)
+    edge_density = float(np.count_nonzero(edges)) / edges.size if edges.size else 0.0
+    
+    text_components = 0
+    if edge_density > 0:
+        _, dark = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        text_components = max(_count_aligned_components(dark), _count_aligned_components(255 - dark))
+    
+    return {
+        'has_text': text_components >= OCR_CONFIG.get('precheck_min_components', 12),
+        'text_components': text_components,
+        'edge_density': round(edge_density, 4)
+    }
+
+def _count_aligned_components(binary: np.ndarray, max_candidates: int = 2000) -> int:
+    """Compte les composantes de taille de caractère ayant un voisin aligné."""
+    count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    stats = stats[1:]  # sans le fond
+    if count <= 1:
+        return 0
+    
+    x, y, w, h, area = (stats[:, i].astype(np.float64) for i in range(5))
+    max_height = max(0.1 * binary.shape[0], 8)
+    fill = area / (w * h)
+    candidates = (h >= 3) & (h <= max_height) & (w <= 3 * h) & (fill >= 0.1) & (fill <= 0.95)
+    x, y, w, h = x[candidates], y[candidates], w[candidates], h[candidates]
+    if len(h) < 2:
+        return 0
+    if len(h) > max_candidates:
+        x, y, w, h = x[:max_candidates], y[:max_candidates], w[:max_candidates], h[:max_candidates]
+    
+    # Voisin : hauteur proche, même ligne, écart horizontal inférieur à 1,5 hauteur
+    center_y = y + h / 2
+    pair_height = np.maximum(h[:, None], h[None, :])
+    gap = np.maximum(x[None, :] - (x + w)[:, None], x[:, None] - (x + w)[None, :])
+    aligned = ((np.abs(h[:, None] - h[None, :]) <= 0.5 * pair_height)
+               & (np.abs(center_y[:, None] - center_y[None, :]) <= 0.5 * pair_height)
+               & (gap <= 1.5 * pair_height))
+    np.fill_diagonal(aligned, False)
+    return int(np.count_nonzero(aligned.any(axis=1)))
+
+def prepare_image_for_ocr(file_path: str) -> Image.Image:
+    """Charge une image en niveaux de gris réduite et binarisée pour l'OCR.
+    
+    L'image est ramenée à ``target_dpi`` si sa résolution est connue et plus
+    élevée, puis son plus grand côté est plafonné à ``max_dimension`` ; elle
+    n'est jamais agrandie. Les JPEG sont décodés directement à taille réduite.
+    """
+    target_dpi = OCR_CONFIG.get('target_dpi', 300)
+    max_dimension = OCR_CONFIG.get('max_dimension', 3500)
+    
+    with Image.open(file_path) as image:
+        width, height = image.size
+        scale = 1.0
+        dpi = image.info.get('dpi')
+        if dpi and dpi[0] and float(dpi[0]) > target_dpi:
+            scale = target_dpi / float(dpi[0])
+        if max_dimension and max(width, height) * scale > max_dimension:
+            scale = max_dimension / max(width, height)
+        size = (max(int(width * scale), 1), max(int(height * scale), 1))
+        
+    gray = _load_gray(file_path, max(size) if scale < 1 else None)
+    
+    # Améliorer la qualité pour l'OCR
+    _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    prepared = Image.fromarray(thresh)
+    if dpi and dpi[0]:
+        prepared.info['dpi'] = (min(float(dpi[0]), target_dpi),) * 2
+    return prepared
+
+def ocr_image(file_path: str) -> Optional[str]:
+    """Reconnaît le texte d'une image (``None`` si Tesseract est indisponible)."""
+    return ocr_images([file_path])[0]['text']
+
+def ocr_images(file_paths: List[str]) -> List[Dict]:
+    """Reconnaît le texte d'un lot d'images avec un seul processus Tesseract.
+    
+    Retourne pour chaque image ``{'path', 'text', 'error', 'prepare_seconds',
+    'ocr_seconds', 'ocr_skipped', 'text_components'}`` ; le temps de
+    Tesseract d'un lot est réparti entre ses images. ``text`` vaut ``None``
+    si Tesseract est indisponible, ``""`` si l'image a été jugée sans texte
+    (``ocr_skipped``), et ``error`` décrit un échec propre à l'image.
+    """
+    results = [{'path': path, 'text': None, 'error': None, 'prepare_seconds': 0.0, 'ocr_seconds': 0.0,
+                'ocr_skipped': False, 'text_components': None}
+               for path in file_paths]
+    if not file_paths or not tesseract_available():
+        return results
+    
+    lang = OCR_CONFIG.get('lang', 'fra+eng')
+    work_dir = tempfile.mkdtemp(prefix='rag_ocr_')
+    try:
+        # Préparation : une image PNG réduite par fichier source
+        prepared = []
+        for index, result in enumerate(results):
+            start = time.perf_counter()
+            try:
+                if OCR_CONFIG.get('precheck', True):
+                    detection = detect_text(result['path'])
+                    result['text_components'] = detection['text_components']
+                    if not detection['has_text']:
+                        result['text'] = ""
+                        result['ocr_skipped'] = True
+                        result['prepare_seconds'] = time.perf_counter() - start
+                        continue
+                image = prepare_image_for_ocr(result['path'])
+                image_path = os.path.join(work_dir, f"{index:05d}.png")
+                save_options = {'dpi': image.info['dpi']} if 'dpi' in image.info else {}
+                image.save(image_path, **save_options)
+                prepared.append((result, image_path))
+            except Exception as e:
+                result['error'] = str(e)
+            result['prepare_seconds'] = time.perf_counter() - start
+        
+        if len(prepared) > 1:
+            list_path = os.path.join(work_dir, 'images.txt')
+            with open(list_path, 'w', encoding='utf-8') as f:
+                f.write("\n".join(image_path for _, image_path in prepared) + "\n")
+            start = time.perf_counter()
+            try:
+                pages = pytesseract.image_to_string(list_path, lang=lang).split('\f')
+            except Exception:
+                pages = []
+            elapsed = time.perf_counter() - start
+            if len(pages) >= len(prepared):
+                for (result, _), page in zip(prepared, pages):
+                    result['text'] = page.strip()
+                    result['ocr_seconds'] = elapsed / len(prepared)
+                return results
+        
+        # Image seule, ou lot refusé par Tesseract : une image à la fois
+        for result, image_path in prepared:
+            start = time.perf_counter()
+            try:
+                result['text'] = pytesseract.image_to_string(image_path, lang=lang).strip()
+            except Exception as e:
+                result['error'] = str(e)
+            result['ocr_seconds'] = time.perf_counter() - start
+        return results
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
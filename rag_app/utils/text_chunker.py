@@ -0,0 +1,96 @@
+"""Découpage des textes extraits en passages avant indexation."""
+
+import re
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+from ..config.settings import PROCESSING_CONFIG
+
+# Séparateur de pages dans le texte extrait des PDF (saut de page)
+PAGE_BREAK = '\f'
+
+# Séparateurs essayés dans l'ordre : paragraphes (et pages), phrases, mots
+_SEPARATORS = [
+    re.compile(r'\n\s*\n|' + PAGE_BREAK),
+    re.compile(r'(?<=[.!?;:])\s+'),
+    re.compile(r'\s+')
+]
+
+def chunk_text(text: str, max_chunk_size: Optional[int] = None,
+               chunk_overlap: Optional[int] = None) -> List[Dict]:
+    """Découpe un texte en passages d'au plus ``max_chunk_size`` caractères.
+
+    Le texte est coupé de préférence entre paragraphes, puis entre phrases,
+    puis entre mots ; un mot plus long que la taille maximale est coupé net.
+    Deux passages consécutifs partagent jusqu'à ``chunk_overlap`` caractères
+    (en unités entières : paragraphes, phrases ou mots).
+
+    Chaque passage est un dictionnaire ``{'text', 'start', 'end', 'index'}``
+    où ``text == texte[start:end]``.
+    """
+    max_size = max(int(max_chunk_size or PROCESSING_CONFIG.get('max_chunk_size', 500)), 1)
+    overlap = PROCESSING_CONFIG.get('chunk_overlap', 50) if chunk_overlap is None else chunk_overlap
+    overlap = min(max(int(overlap), 0), max_size - 1)
+
+    spans = _split_spans(text, 0, len(text), 0, max_size)
+    chunks = []
+    i = 0
+    while i < len(spans):
+        # Regrouper autant d'unités que possible dans le passage
+        j = i
+        while j + 1 < len(spans) and spans[j + 1][1] - spans[i][0] <= max_size:
+            j += 1
+        start, end = spans[i][0], spans[j][1]
+        chunks.append({'text': text[start:end], 'start': start, 'end': end, 'index': len(chunks)})
+
+        if j + 1 >= len(spans):
+            break
+        # Reprendre aux dernières unités qui tiennent dans le recouvrement
+        next_i = j + 1
+        while next_i - 1 > i and end - spans[next_i - 1][0] <= overlap:
+            next_i -= 1
+        i = next_i
+
+    return chunks
+
+def assign_pages(chunks: List[Dict], text: str) -> List[Dict]:
+    """Ajoute aux passages les pages qu'ils couvrent, d'après les ``PAGE_BREAK`` du texte.
+    
+    Chaque passage reçoit ``metadata = {'page': première page, 'page_end':
+    dernière page}`` (pages numérotées à partir de 1). Sans saut de page dans
+    le texte, les passages sont laissés tels quels.
+    """
+    breaks = [match.start() for match in re.finditer(PAGE_BREAK, text)]
+    if not breaks:
+        return chunks
+    for chunk in chunks:
+        page = bisect_right(breaks, chunk['start']) + 1
+        page_end = bisect_right(breaks, chunk['end'] - 1) + 1
+        chunk['metadata'] = {**chunk.get('metadata', {}), 'page': page, 'page_end': page_end}
+    return chunks
+
+def _split_spans(text: str, start: int, end: int, level: int,
+                 max_size: int) -> List[Tuple[int, int]]:
+    """Découpe ``text[start:end]`` en unités d'au plus ``max_size`` caractères."""
+    start, end = _strip_span(text, start, end)
+    if start >= end:
+        return []
+    if end - start <= max_size:
+        return [(start, end)]
+    if level >= len(_SEPARATORS):
+        return [(pos, min(pos + max_size, end)) for pos in range(start, end, max_size)]
+
+    spans = []
+    piece_start = start
+    for match in _SEPARATORS[level].finditer(text, start, end):
+        spans.extend(_split_spans(text, piece_start, match.start(), level + 1, max_size))
+        piece_start = match.end()
+    spans.extend(_split_spans(text, piece_start, end, level + 1, max_size))
+    return spans
+
+def _strip_span(text: str, start: int, end: int) -> Tuple[int, int]:
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
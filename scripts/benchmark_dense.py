@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Benchmark de l'index dense IVF : rappel@k et latence face à la recherche exhaustive.
+
+Les textes sont ceux de la base (``--db``) ou un corpus synthétique par
+thèmes, dupliqué jusqu'aux tailles demandées. Les requêtes sont des passages
+du corpus légèrement tronqués. Le rappel@k est la fraction des ``k`` voisins
+exacts (produit scalaire sur tous les vecteurs) retrouvés par l'index.
+"""
+
+import sys
+import time
+import argparse
+import random
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from rag_app.config.settings import DENSE_CONFIG
+from rag_app.core.dense_index import DenseIndex, exact_search, get_embedder
+
+def synthetic_texts(count, topics=40, seed=0):
+    """Textes tirés de vocabulaires thématiques qui se recouvrent partiellement."""
+    rng = random.Random(seed)
+    common = [f"mot{i}" for i in range(400)]
+    vocabularies = [[f"theme{t}_{i}" for i in range(60)] + rng.sample(common, 60) for t in range(topics)]
+    return [" ".join(rng.choices(vocabularies[rng.randrange(topics)], k=60)) for _ in range(count)]
+
+def database_texts(path):
+    from rag_app.core.vector_database import VectorDatabase
+    return [doc['text'] for doc in VectorDatabase.load(path).documents]
+
+def percentile_ms(timings, q):
+    return float(np.percentile(timings, q)) * 1000
+
+def main():
+    """Fonction principale."""
+
+    parser = argparse.ArgumentParser(description="Benchmark de la recherche dense IVF")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2_000, 10_000, 50_000],
+                       help="Nombres de vecteurs indexés")
+    parser.add_argument("--db", help="Répertoire d'une base dont les textes forment le corpus")
+    parser.add_argument("--top-k", type=int, default=10, help="k du rappel@k")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16],
+                       help="Listes parcourues par requête")
+    parser.add_argument("--queries", type=int, default=200, help="Nombre de requêtes")
+
+    args = parser.parse_args()
+
+    embedder = get_embedder()
+    texts = database_texts(args.db) if args.db else synthetic_texts(max(args.sizes))
+    if not texts:
+        print("❌ Aucun texte à indexer")
+        return 1
+
+    print("⏱️  BENCHMARK RECHERCHE DENSE")
+    print("="*72)
+    print(f"🧠 Embedder : {embedder.signature}  |  stockage {DENSE_CONFIG.get('dtype', 'float16')}")
+
+    start = time.perf_counter()
+    base_vectors = embedder.embed(texts[:max(args.sizes)])
+    print(f"📐 {len(base_vectors)} textes embarqués en {time.perf_counter() - start:.1f} s\n")
+
+    rng = np.random.default_rng(0)
+    print(f"{'vecteurs':>9} {'listes':>7} {'nprobe':>7} {'rappel@k':>9} "
+          f"{'exact p50 (ms)':>15} {'IVF p50 (ms)':>13} {'IVF p95 (ms)':>13}")
+
+    for size in args.sizes:
+        # Corpus plus petit que la taille demandée : vecteurs répétés avec bruit
+        repeats = rng.integers(len(base_vectors), size=size)
+        vectors = base_vectors[repeats] + 0.05 * rng.normal(size=(size, base_vectors.shape[1]))
+        vectors = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+        query_rows = rng.integers(size, size=args.queries)
+        queries = embedder.embed(" ".join(texts[row % len(texts)].split()[:-5])
+                                 for row in repeats[query_rows])
+
+        exact_timings = []
+        truths = []
+        for query in queries:
+            begin = time.perf_counter()
+            truths.append(exact_search(vectors, query[None, :], args.top_k)[0])
+            exact_timings.append(time.perf_counter() - begin)
+
+        index = DenseIndex(vectors.shape[1])
+        index.add(vectors, range(size))
+        index.merge()
+
+        for nprobe in args.nprobe:
+            timings, hits = [], 0
+            for query, truth in zip(queries, truths):
+                begin = time.perf_counter()
+                ids, _ = index.search(query, args.top_k, nprobe=nprobe)[0]
+                timings.append(time.perf_counter() - begin)
+                hits += len(set(ids.tolist()) & set(truth.tolist()))
+            recall = hits / (len(queries) * args.top_k)
+            print(f"{size:>9} {index.nlist:>7} {nprobe:>7} {recall:>9.3f} "
+                  f"{percentile_ms(exact_timings, 50):>15.2f} {percentile_ms(timings, 50):>13.2f} "
+                  f"{percentile_ms(timings, 95):>13.2f}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
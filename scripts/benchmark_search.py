@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Micro-benchmark de la sélection top-k de VectorDatabase.search.
+
+Compare l'ancien tri complet (``np.argsort`` puis parcours Python jusqu'au
+seuil de similarité) à la sélection partielle ``iter_ranked_indices`` sur des
+similarités synthétiques. Le calcul des similarités lui-même n'est pas mesuré :
+il est identique dans les deux cas.
+"""
+
+import sys
+import time
+import argparse
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from rag_app.core.vector_database import MIN_SIMILARITY, iter_ranked_indices
+
+def make_similarities(size, hit_ratio, seed=0):
+    """Similarités creuses : seule une fraction des documents partage des termes avec la requête."""
+    rng = np.random.default_rng(seed)
+    similarities = np.zeros(size)
+    hits = rng.choice(size, size=max(int(size * hit_ratio), 1), replace=False)
+    similarities[hits] = rng.random(hits.size) * 0.6
+    return similarities
+
+def legacy_top_k(similarities, top_k):
+    """Sélection telle qu'implémentée avant la sélection partielle."""
+    results = []
+    for idx in np.argsort(similarities)[::-1]:
+        if similarities[idx] < MIN_SIMILARITY:
+            break
+        results.append(idx)
+        if len(results) >= top_k:
+            break
+    return results
+
+def partial_top_k(similarities, top_k):
+    return list(islice(iter_ranked_indices(similarities, MIN_SIMILARITY, top_k), top_k))
+
+def best_time(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    """Fonction principale."""
+
+    parser = argparse.ArgumentParser(description="Benchmark de la sélection top-k")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                       help="Nombres de documents simulés")
+    parser.add_argument("--top-k", type=int, nargs="+", default=[5, 200],
+                       help="Valeurs de top_k (5 : chat/recherche, 200 : extraction exhaustive)")
+    parser.add_argument("--hit-ratio", type=float, default=0.2,
+                       help="Fraction des documents ayant une similarité non nulle")
+    parser.add_argument("--repeat", type=int, default=5,
+                       help="Nombre de mesures (la meilleure est retenue)")
+
+    args = parser.parse_args()
+
+    print("⏱️  BENCHMARK SÉLECTION TOP-K")
+    print("="*60)
+    print(f"{'documents':>10} {'top_k':>6} {'argsort (ms)':>14} {'partiel (ms)':>14} {'gain':>8}")
+
+    for size in args.sizes:
+        similarities = make_similarities(size, args.hit_ratio)
+        for top_k in args.top_k:
+            legacy = [int(i) for i in legacy_top_k(similarities, top_k)]
+            partial = partial_top_k(similarities, top_k)
+            # Similarités tirées en continu : pas d'ex aequo, ordres comparables
+            if legacy != partial:
+                print(f"❌ Résultats différents pour {size} documents, top_k={top_k}")
+                return 1
+
+            legacy_time = best_time(lambda: legacy_top_k(similarities, top_k), args.repeat)
+            partial_time = best_time(lambda: partial_top_k(similarities, top_k), args.repeat)
+            print(f"{size:>10} {top_k:>6} {legacy_time * 1000:>14.2f} "
+                  f"{partial_time * 1000:>14.2f} {legacy_time / partial_time:>7.1f}x")
+
+    print("\n✅ Résultats identiques pour toutes les tailles")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
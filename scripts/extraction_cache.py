@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Inspection et purge du cache d'extraction de texte."""
+
+import sys
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from rag_app.config.settings import EXTRACTION_CACHE_CONFIG
+from rag_app.utils.extraction_cache import ExtractionCache
+
+def _format_size(size_bytes):
+    return f"{size_bytes / (1024 * 1024):.1f} Mo"
+
+def _format_date(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S') if timestamp else "-"
+
+def show_stats(cache):
+    """Affiche l'état du cache."""
+    stats = cache.stats()
+    print("📦 CACHE D'EXTRACTION")
+    print("="*40)
+    print(f"📁 Fichier : {stats['path']} ({_format_size(stats['file_bytes'])})")
+    print(f"📄 Entrées : {stats['entries']}")
+    print(f"📏 Texte en cache : {_format_size(stats['text_bytes'])} / {_format_size(stats['max_bytes'])}")
+    print(f"🕒 Plus ancien accès : {_format_date(stats['oldest_access'])}")
+
+def show_entries(cache, limit):
+    """Liste les entrées les plus récemment utilisées."""
+    for entry in cache.entries(limit):
+        print(f"{_format_date(entry['last_access'])}  {entry['text_bytes']:>9} o  "
+              f"v{entry['extractor_version']}  {entry['path']}")
+
+def main():
+    """Fonction principale."""
+
+    parser = argparse.ArgumentParser(description="Gestion du cache d'extraction")
+    parser.add_argument("--path", default=str(EXTRACTION_CACHE_CONFIG['path']),
+                       help="Fichier du cache (par défaut celui de la configuration)")
+    subparsers = parser.add_subparsers(dest="command")
+
+    subparsers.add_parser("stats", help="Afficher la taille et le nombre d'entrées")
+
+    list_parser = subparsers.add_parser("list", help="Lister les entrées récentes")
+    list_parser.add_argument("--limit", type=int, default=20,
+                            help="Nombre d'entrées affichées")
+
+    purge_parser = subparsers.add_parser("purge", help="Supprimer des entrées")
+    purge_group = purge_parser.add_mutually_exclusive_group(required=True)
+    purge_group.add_argument("--all", action="store_true",
+                            help="Vider complètement le cache")
+    purge_group.add_argument("--older-than", type=float, metavar="JOURS",
+                            help="Entrées non utilisées depuis N jours")
+    purge_group.add_argument("--missing", action="store_true",
+                            help="Entrées dont le fichier source n'existe plus")
+
+    evict_parser = subparsers.add_parser("evict", help="Réduire le cache à une taille maximale")
+    evict_parser.add_argument("--max-size-mb", type=float,
+                             default=EXTRACTION_CACHE_CONFIG.get('max_size_mb', 512),
+                             help="Taille maximale conservée")
+
+    args = parser.parse_args()
+
+    if not Path(args.path).exists():
+        print(f"ℹ️  Aucun cache trouvé : {args.path}")
+        return
+
+    cache = ExtractionCache(args.path, max_size_mb=EXTRACTION_CACHE_CONFIG.get('max_size_mb', 512))
+
+    if args.command == "list":
+        show_entries(cache, args.limit)
+    elif args.command == "purge":
+        if args.all:
+            removed = cache.purge()
+        elif args.missing:
+            removed = cache.purge(missing_only=True)
+        else:
+            removed = cache.purge(older_than_days=args.older_than)
+        print(f"🗑️  {removed} entrée(s) supprimée(s)")
+    elif args.command == "evict":
+        removed = cache.evict(int(args.max_size_mb * 1024 * 1024))
+        print(f"🗑️  {removed} entrée(s) évincée(s)")
+    else:
+        show_stats(cache)
+
+    cache.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Configuration commune des tests."""
+
+import pytest
+
+from rag_app.utils import extraction_cache
+
+
+@pytest.fixture(autouse=True)
+def isolated_extraction_cache(tmp_path, monkeypatch):
+    """Cache d'extraction propre à chaque test, hors du répertoire data/."""
+    cache = extraction_cache.ExtractionCache(tmp_path / "extraction_cache.sqlite")
+    monkeypatch.setattr(extraction_cache, '_default_cache', cache)
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def fake_llm_server():
+    """Faux serveur Mistral/Ollama en streaming sur un port local libre."""
+    from tests.fake_llm_server import FakeLLMServer
+
+    server = FakeLLMServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def make_pdf():
+    """Fabrique un PDF dont chaque page contient une ligne de texte."""
+    from PyPDF2 import PageObject, PdfWriter
+    from PyPDF2.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+    def _make_pdf(path, page_texts):
+        writer = PdfWriter()
+        font = DictionaryObject({
+            NameObject('/Type'): NameObject('/Font'),
+            NameObject('/Subtype'): NameObject('/Type1'),
+            NameObject('/BaseFont'): NameObject('/Helvetica')
+        })
+        for text in page_texts:
+            page = PageObject.create_blank_page(None, 595, 842)
+            content = DecodedStreamObject()
+            content.set_data(f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode('latin-1'))
+            page[NameObject('/Contents')] = content
+            page[NameObject('/Resources')] = DictionaryObject({
+                NameObject('/Font'): DictionaryObject({NameObject('/F1'): font})
+            })
+            writer.add_page(page)
+        with open(path, 'wb') as f:
+            writer.write(f)
+        return str(path)
+
+    return _make_pdf
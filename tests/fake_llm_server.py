@@ -0,0 +1,99 @@
+"""Faux serveur local des API Mistral et Ollama pour les tests.
+
+Répond en streaming comme les vrais services : Server-Sent Events sur
+``/v1/chat/completions`` et NDJSON sur ``/api/generate``. Les fragments
+renvoyés, un éventuel statut d'erreur et le délai entre fragments se
+règlent par les attributs de ``FakeLLMServer``.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        fake = self.server.fake
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        fake.requests.append({'path': self.path, 'headers': dict(self.headers), 'json': payload})
+
+        if fake.responses:
+            status, body, headers = fake.responses.pop(0)
+            self._send_plain(status, body, headers)
+            return
+
+        if self.path.endswith('/chat/completions'):
+            self._stream('text/event-stream', self._sse_events(fake))
+        elif self.path == '/api/generate':
+            self._stream('application/x-ndjson', self._ndjson_events(fake))
+        else:
+            self._send_plain(404, 'not found')
+
+    def _sse_events(self, fake):
+        for chunk in fake.chunks:
+            event = {'choices': [{'index': 0, 'delta': {'content': chunk}}]}
+            yield f"data: {json.dumps(event)}\n\n".encode('utf-8')
+        yield b"data: [DONE]\n\n"
+
+    def _ndjson_events(self, fake):
+        for chunk in fake.chunks:
+            yield (json.dumps({'response': chunk, 'done': False}) + "\n").encode('utf-8')
+        yield (json.dumps({'response': '', 'done': True}) + "\n").encode('utf-8')
+
+    def _stream(self, content_type, events):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for event in events:
+            self.wfile.write(f"{len(event):x}\r\n".encode() + event + b"\r\n")
+            self.wfile.flush()
+            self.server.fake.sent_at.append(time.monotonic())
+            time.sleep(self.server.fake.delay)
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _send_plain(self, status, body, headers=None):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeLLMServer:
+    """Serveur HTTP lancé dans un thread sur un port libre de 127.0.0.1."""
+
+    def __init__(self, chunks=None, delay=0.0):
+        self.chunks = list(chunks or ["Bonjour", " le", " monde"])
+        self.delay = delay
+        # Réponses non streamées (statut, corps, en-têtes) servies en priorité, dans l'ordre
+        self.responses = []
+        self.requests = []
+        self.sent_at = []
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
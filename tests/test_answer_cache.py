@@ -0,0 +1,117 @@
+"""Tests du cache des réponses du chat."""
+
+import numpy as np
+
+from rag_app.core.dense_index import HashingEmbedder
+from rag_app.core.vector_database import VectorDatabase
+from rag_app.utils.answer_cache import AnswerCache, normalize_question
+
+
+def _database():
+    db = VectorDatabase()
+    db.add_document("Candidature chez Coservices pour un poste de développeur", {'source': 'a.txt'})
+    db.add_document("Candidature chez Alten, relance envoyée", {'source': 'b.txt'})
+    return db
+
+
+def test_exact_hit_requires_same_context_model_and_provider(tmp_path):
+    db = _database()
+    cache = AnswerCache(tmp_path / "answers.sqlite")
+    cache.put("Liste des entreprises ?", db.documents, "mistral-small", "Mistral API", "Coservices, Alten")
+
+    hit = cache.get("liste des  entreprises", db.documents, "mistral-small", "Mistral API")
+    assert hit['answer'] == "Coservices, Alten" and hit['match'] == 'exact'
+    assert cache.get("liste des entreprises", db.documents[:1], "mistral-small", "Mistral API") is None
+    assert cache.get("liste des entreprises", db.documents, "mistral-large", "Mistral API") is None
+    assert cache.get("liste des entreprises", db.documents, "mistral-small", "Ollama Local") is None
+
+
+def test_similar_question_reuses_answer(tmp_path):
+    db = _database()
+    embedder = HashingEmbedder(256)
+    cache = AnswerCache(tmp_path / "answers.sqlite", similarity_threshold=0.8)
+    first = "donne moi la liste des entreprises contactées"
+    cache.put(first, db.documents, "m", "p", "Coservices, Alten",
+              vector=embedder.embed([normalize_question(first)])[0])
+
+    near = "donne-moi la liste des entreprises contactées s'il te plaît"
+    hit = cache.get(near, db.documents[:1], "m", "p",
+                    vector=embedder.embed([normalize_question(near)])[0],
+                    resolve=db.get_document_by_id)
+    assert hit['match'] == 'similar' and hit['answer'] == "Coservices, Alten"
+
+    other = "quel est le salaire proposé par Alten"
+    assert cache.get(other, db.documents, "m", "p",
+                     vector=embedder.embed([normalize_question(other)])[0]) is None
+
+
+
+def test_near_miss_questions_are_not_reused(tmp_path):
+    db = _database()
+    embedder = HashingEmbedder(256)
+    cache = AnswerCache(tmp_path / "answers.sqlite", similarity_threshold=0.9)
+    pairs = [("Quel est le statut de ma candidature chez Airbus en 2023 ?",
+              "Quel est le statut de ma candidature chez Airbus en 2024 ?"),
+             ("Quel est le contact du dossier M0123 ?", "Quel est le contact du dossier M0124 ?")]
+    for cached, asked in pairs:
+        cache.put(cached, db.documents, "m", "p", f"Réponse à : {cached}",
+                  vector=embedder.embed([normalize_question(cached)])[0])
+        vector = embedder.embed([normalize_question(asked)])[0]
+        assert float(vector @ embedder.embed([normalize_question(cached)])[0]) > 0.9
+        # Même contexte : l'année ou le code diffère, la réponse n'est pas réutilisée
+        assert cache.get(asked, db.documents, "m", "p", vector=vector,
+                         resolve=db.get_document_by_id) is None
+
+
+def test_similar_question_needs_documents_of_the_cached_context(tmp_path):
+    db = _database()
+    db.add_document("Candidature chez Airbus, entretien prévu", {'source': 'c.txt'})
+    embedder = HashingEmbedder(256)
+    cache = AnswerCache(tmp_path / "answers.sqlite", similarity_threshold=0.8)
+    first = "où en est ma candidature chez Airbus"
+    cache.put(first, db.documents[:2], "m", "p", "Aucune candidature Airbus",
+              vector=embedder.embed([normalize_question(first)])[0])
+
+    near = "où en est ma candidature chez Airbus stp ?"
+    vector = embedder.embed([normalize_question(near)])[0]
+    # Le document Airbus retrouvé ne faisait pas partie du contexte de la réponse
+    assert cache.get(near, db.documents[2:], "m", "p", vector=vector) is None
+    assert cache.get(near, db.documents[:1], "m", "p", vector=vector)['match'] == 'similar'
+
+
+def test_changed_document_invalidates_answer(tmp_path):
+    db = _database()
+    cache = AnswerCache(tmp_path / "answers.sqlite")
+    documents = list(db.documents)
+    cache.put("connais-tu Alten", documents, "m", "p", "Oui, relance envoyée")
+
+    db.remove_document_by_id(documents[1]['id'])
+    assert cache.get("connais-tu Alten", documents, "m", "p", resolve=db.get_document_by_id) is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_ttl_and_lru_eviction(tmp_path):
+    now = [1000.0]
+    cache = AnswerCache(tmp_path / "answers.sqlite", ttl_seconds=60, max_entries=2,
+                        clock=lambda: now[0])
+    for question in ("q1", "q2"):
+        cache.put(question, [], "m", "p", question.upper())
+        now[0] += 1
+    assert cache.get("q1", [], "m", "p")['answer'] == "Q1"
+
+    cache.put("q3", [], "m", "p", "Q3")
+    assert cache.get("q2", [], "m", "p") is None
+    assert cache.get("q1", [], "m", "p") is not None
+
+    now[0] += 120
+    assert cache.get("q3", [], "m", "p") is None
+    assert cache.evict() == 2
+
+
+def test_invalidate_documents(tmp_path):
+    cache = AnswerCache(tmp_path / "answers.sqlite")
+    cache.put("a", [{'id': 1, 'text': 'x'}], "m", "p", "A", vector=np.ones(4))
+    cache.put("b", [{'id': 2, 'text': 'y'}], "m", "p", "B")
+
+    assert cache.invalidate_documents([1]) == 1
+    assert cache.get("b", [{'id': 2, 'text': 'y'}], "m", "p")['answer'] == "B"
@@ -0,0 +1,136 @@
+"""Tests du service de traitement par lots."""
+
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from rag_app.core.vector_database import VectorDatabase
+from rag_app.services import batch_service
+from rag_app.services.batch_service import BatchService
+
+
+def _make_corpus(directory, count=8):
+    for i in range(count):
+        (directory / f"note_{i}.txt").write_text(
+            f"Document numéro {i} sur le projet M{400 + i}. " * 5, encoding='utf-8'
+        )
+    (directory / "vide.txt").write_text("", encoding='utf-8')
+    (directory / "ignore.md").write_text("non indexé", encoding='utf-8')
+
+
+def _run(directory, max_workers):
+    db = VectorDatabase()
+    progress = []
+    results = BatchService(db, max_workers=max_workers).process_directory(
+        str(directory), ['.txt', '.md'],
+        progress_callback=lambda done, total, path: progress.append((done, total))
+    )
+    return db, results, progress
+
+
+def test_parallel_extraction_matches_sequential(tmp_path):
+    _make_corpus(tmp_path)
+
+    serial_db, serial_results, _ = _run(tmp_path, max_workers=1)
+    parallel_db, parallel_results, progress = _run(tmp_path, max_workers=3)
+
+    assert parallel_results['success'] == serial_results['success'] == 8
+    assert parallel_results['errors'] == serial_results['errors'] == 1
+    assert (sorted(d['text'] for d in parallel_db.documents)
+            == sorted(d['text'] for d in serial_db.documents))
+    assert parallel_db.vectors.shape[0] == len(parallel_db.documents)
+    # Le total annoncé grandit pendant le parcours jusqu'au nombre final de fichiers
+    total = parallel_results['total_files']
+    assert [done for done, _ in progress] == list(range(1, total + 1))
+    assert all(done <= seen <= total for done, seen in progress)
+    assert progress[-1] == (total, total)
+
+
+def test_processing_starts_before_walk_ends(tmp_path):
+    _make_corpus(tmp_path, count=3)
+    events = []
+
+    def walk():
+        for path in sorted(tmp_path.glob("note_*.txt")):
+            events.append('found')
+            yield str(path), {}
+
+    results = {'success': 0, 'errors': 0, 'skipped': 0, 'errors_list': [], 'images_processed': []}
+    count = BatchService(VectorDatabase(), max_workers=1).process_files(
+        walk(), results, lambda done, total, path: events.append('processed'), False
+    )
+
+    assert count == 3 and results['success'] == 3
+    assert events == ['found', 'processed'] * 3
+
+
+def test_large_pdf_split_by_pages(tmp_path, make_pdf):
+    make_pdf(tmp_path / "rapport.pdf", [f"Chapitre {i} du rapport annuel" for i in range(1, 6)])
+    db = VectorDatabase()
+    service = BatchService(db, max_workers=2)
+    service.pdf_split_min_bytes = 0
+    service.pages_per_task = 2
+    service.max_chunk_size = 40
+    service.chunk_overlap = 0
+
+    results = service.process_directory(str(tmp_path), ['.pdf'])
+
+    assert results['success'] == 1
+    pages = [(doc['text'], doc['metadata']['page'], doc['metadata']['page_end']) for doc in db.documents]
+    assert pages == [(f"Chapitre {i} du rapport annuel", i, i) for i in range(1, 6)]
+
+
+class _BrokenPool:
+    """Pool dont chaque extraction échoue comme si un worker avait été tué."""
+
+    def __init__(self):
+        self.shutdowns = []
+
+    def submit(self, function, *args):
+        future = Future()
+        future.set_exception(BrokenProcessPool("worker tué"))
+        return future
+
+    def shutdown(self, wait=True):
+        # Signature de Python 3.8 : pas de cancel_futures
+        self.shutdowns.append(wait)
+
+
+def test_broken_pool_recovers_buffered_images(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_service, '_get_extraction_pool', lambda workers: _BrokenPool())
+    monkeypatch.setattr(batch_service, '_extract_file',
+                        lambda path: (f"texte de {Path(path).name}", None, {'seconds': 0.0}))
+    service = BatchService(VectorDatabase(), max_workers=2)
+    service.ocr_batch_size = 3
+    # Deux images attendent un lot complet quand les quatre textes remplissent la fenêtre
+    tasks = [(str(tmp_path / name), {}) for name in
+             ["a.png", "b.png", "c.txt", "d.txt", "e.txt", "f.txt", "g.txt"]]
+
+    extracted = list(service._iter_extractions(tasks))
+
+    assert sorted(Path(path).name for path, *_ in extracted) == sorted(Path(path).name for path, _ in tasks)
+
+
+def test_broken_pool_is_shut_down_and_replaced(tmp_path, monkeypatch):
+    pool = _BrokenPool()
+    monkeypatch.setattr(batch_service, '_extraction_pool', pool)
+    monkeypatch.setattr(batch_service, '_extraction_pool_size', 2)
+    monkeypatch.setattr(batch_service, '_extract_file',
+                        lambda path: (f"texte de {Path(path).name}", None, {'seconds': 0.0}))
+    tasks = [(str(tmp_path / f"note_{i}.txt"), {}) for i in range(5)]
+
+    extracted = list(BatchService(VectorDatabase(), max_workers=2)._iter_extractions(tasks))
+
+    assert len(extracted) == 5
+    assert pool.shutdowns == [False]
+    assert batch_service._extraction_pool is None
+
+
+def test_form_feed_in_txt_gives_no_pages(tmp_path):
+    (tmp_path / "notes.txt").write_text("Première partie du texte\fSeconde partie du texte", encoding='utf-8')
+    db = VectorDatabase()
+
+    results = BatchService(db, max_workers=1).process_directory(str(tmp_path), ['.txt'])
+
+    assert results['success'] == 1
+    assert all('page' not in doc['metadata'] for doc in db.documents)
@@ -0,0 +1,168 @@
+"""Tests de l'index BM25 et de la recherche hybride."""
+
+import pytest
+
+from rag_app.core.bm25_index import BM25Index, reciprocal_rank_fusion, tokenize
+from rag_app.core.vector_database import VectorDatabase
+
+
+def _document(doc_id, text, **metadata):
+    return {'id': doc_id, 'text': text, 'metadata': metadata}
+
+
+def test_tokenize_folds_case_accents_and_separators():
+    assert tokenize("Société M401_Entreprise-X.pdf") == ['societe', 'm401', 'entreprise', 'pdf']
+
+
+def test_rare_terms_and_short_fields_score_higher():
+    index = BM25Index()
+    index.add(_document(1, "rapport annuel sur la maintenance des serveurs"))
+    index.add(_document(2, "rapport annuel"))
+    index.add(_document(3, "compte rendu de réunion", source="C:/docs/maintenance.txt"))
+
+    ranked = [doc_id for doc_id, _ in index.search("maintenance")]
+    # Le nom de fichier (champ court et pondéré) l'emporte sur le long texte
+    assert ranked == [3, 1]
+    assert index.search("inconnu") == []
+
+
+def test_remove_updates_postings_and_statistics():
+    index = BM25Index()
+    index.add(_document(1, "alpha beta"))
+    index.add(_document(2, "alpha gamma"))
+    before = dict(index.search("alpha"))
+
+    assert index.remove([1, 42]) == 1
+    assert [doc_id for doc_id, _ in index.search("alpha")] == [2]
+    assert index.search("beta") == []
+    assert index.size == 1
+    # Moins de documents : l'IDF de « alpha » a changé
+    assert dict(index.search("alpha"))[2] != before[2]
+
+
+def test_reopened_index_scores_like_a_rebuilt_one(tmp_path):
+    documents = [_document(i, f"rapport {i % 3} maintenance serveur {i}", source=f"doc_{i}.txt")
+                 for i in range(12)]
+    index = BM25Index()
+    index.extend(documents[:10])
+    index.save(tmp_path / 'bm25')
+
+    loaded = BM25Index.load(tmp_path / 'bm25')
+    assert loaded.remove([0, 5]) == 2
+    loaded.extend(documents[10:])
+    assert loaded.size == 10 and 0 not in loaded and 11 in loaded
+    expected = BM25Index()
+    expected.extend(documents[1:5] + documents[6:])
+    for query in ("rapport maintenance", "serveur 11", "doc_3"):
+        assert dict(loaded.search(query)) == pytest.approx(dict(expected.search(query)))
+
+    # Partie sauvegardée et ajouts réunis dans la nouvelle sauvegarde
+    loaded.save(tmp_path / 'bm25')
+    reloaded = BM25Index.load(tmp_path / 'bm25')
+    assert dict(reloaded.search("rapport")) == pytest.approx(dict(expected.search("rapport")))
+
+    BM25Index().save(tmp_path / 'empty')
+    assert BM25Index.load(tmp_path / 'empty').search("rapport") == []
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([['a', 'b', 'c'], ['b', 'd']], k=60)
+    assert [key for key, _ in fused] == ['b', 'a', 'd', 'c']
+    assert fused[0][1] == 1 / 62 + 1 / 61
+
+
+def test_hybrid_search_combines_and_tracks_changes():
+    db = VectorDatabase()
+    db.add_document("Candidature développeur Python chez Coservices",
+                    {'source': 'M401_Coservices.pdf', 'category': 'candidatures', 'tags': 'python'})
+    db.add_document("Facture électricité du mois de mars",
+                    {'source': 'facture_mars.pdf', 'category': 'factures'})
+    db.add_document("Notes de réunion projet interne",
+                    {'source': 'notes.txt', 'category': 'notes', 'title': 'Coservices kickoff'})
+
+    results = db.hybrid_search("coservices", top_k=3)
+    sources = [result['document']['metadata']['source'] for result in results]
+    assert set(sources) == {'M401_Coservices.pdf', 'notes.txt'}
+    assert all(result['bm25_score'] > 0 for result in results)
+
+    filtered = db.hybrid_search("coservices", top_k=3, filter_by={'category': 'notes'})
+    assert [r['document']['metadata']['source'] for r in filtered] == ['notes.txt']
+
+    db.remove_document(0)
+    db.add_document("Relance Coservices", {'source': 'relance.txt'})
+    sources = [r['document']['metadata']['source'] for r in db.hybrid_search("coservices")]
+    assert 'M401_Coservices.pdf' not in sources and 'relance.txt' in sources
+
+
+def test_index_is_saved_with_the_snapshot_and_reloaded_without_texts(tmp_path):
+    path = str(tmp_path / 'db')
+    db = VectorDatabase()
+    for i in range(30):
+        db.add_document(f"Compte rendu numéro {i} de la réunion hebdomadaire",
+                        {'source': f"cr_{i}.txt", 'tags': 'réunion'})
+    db.add_document("Relance Coservices pour la mission Python", {'source': 'relance.txt'})
+    expected = [(r['document']['id'], r['similarity']) for r in db.search_bm25("coservices python")]
+    db.save(path)
+
+    loaded = VectorDatabase.load(path)
+    results = [(r['document']['id'], r['similarity']) for r in loaded.search_bm25("coservices python")]
+    assert results == expected
+    assert not any(doc.text_loaded for doc in loaded.documents)
+
+    # Ajout journalisé : l'index sauvegardé suit le journal
+    loaded.add_document("Coservices : entretien fixé", {'source': 'entretien.txt'})
+    loaded.remove_document_by_id(expected[0][0])
+    loaded.save(path)
+    reloaded = VectorDatabase.load(path)
+    sources = [r['document']['metadata']['source'] for r in reloaded.search_bm25("coservices")]
+    assert sources == ['entretien.txt']
+    assert not any(getattr(doc, 'text_loaded', False) for doc in reloaded.documents[:30])
+
+
+def test_index_is_opened_on_first_query_and_written_only_at_compaction(tmp_path, monkeypatch):
+    path = str(tmp_path / 'db')
+    db = VectorDatabase()
+    for i in range(20):
+        db.add_document(f"Compte rendu numéro {i} de la réunion", {'source': f"cr_{i}.txt"})
+    db.save(path)
+
+    calls = []
+    original_load, original_save = BM25Index.load, BM25Index.save
+    monkeypatch.setattr(BM25Index, 'load', classmethod(
+        lambda cls, directory: (calls.append('load'), original_load.__func__(cls, directory))[1]))
+    monkeypatch.setattr(BM25Index, 'save',
+                        lambda index, directory: (calls.append('save'), original_save(index, directory)))
+
+    loaded = VectorDatabase.load(path)
+    loaded.add_document("Relance Coservices", {'source': 'relance.txt'})
+    loaded.save(path)
+    assert calls == []
+
+    # Première requête : index de l'instantané rouvert, ajout du journal rattrapé
+    assert [r['document']['metadata']['source'] for r in loaded.search_bm25("coservices")] == ['relance.txt']
+    assert calls == ['load']
+    loaded.add_document("Relance Coservices bis", {'source': 'relance_bis.txt'})
+    loaded.save(path)
+    assert calls == ['load']
+
+    loaded.compact(path)
+    assert calls == ['load', 'save']
+
+
+def test_compaction_keeps_the_saved_index_when_it_was_never_opened(tmp_path):
+    path = str(tmp_path / 'db')
+    db = VectorDatabase()
+    for i in range(20):
+        db.add_document(f"Compte rendu numéro {i} de la réunion", {'source': f"cr_{i}.txt"})
+    db.save(path)
+
+    loaded = VectorDatabase.load(path)
+    loaded.remove_document(0)
+    loaded.add_document("Compte rendu Coservices", {'source': 'coservices.txt'})
+    loaded.compact(path)
+
+    reloaded = VectorDatabase.load(path)
+    sources = [r['document']['metadata']['source'] for r in reloaded.search_bm25("compte rendu", top_k=30)]
+    assert len(sources) == 20 and 'cr_0.txt' not in sources and 'coservices.txt' in sources
+    # Index repris de l'instantané précédent : seul le texte du document ajouté depuis est lu
+    assert [doc['metadata']['source'] for doc in reloaded.documents if doc.text_loaded] == ['coservices.txt']
@@ -0,0 +1,110 @@
+"""Tests de la table des candidatures construite à l'indexation."""
+
+from rag_app.core.candidature_table import GUESSED_COMPANY_FIELD, CandidatureTable, guess_company
+from rag_app.core.vector_database import VectorDatabase
+
+
+def _database():
+    db = VectorDatabase()
+    db.add_document_chunks(
+        [{'text': "Annonce développeur Python", 'start': 0, 'end': 26},
+         {'text': "Suite de l'annonce", 'start': 26, 'end': 44}],
+        {'source': 'docs/M595/M595_annonce.pdf', 'dossier': 'M595', 'entreprise': 'Coservices',
+         'etat': 'En cours', 'todo': 'etape 2 ?', 'contact': 'Mme Martin',
+         'date': '2025-06-01', 'date_reponse': '2025-06-10', 'cv': True, 'ba': False,
+         'title': 'Développeur Python', 'project': 'M595_Développeur Python'}
+    )
+    db.add_document("Lettre de motivation", {'source': 'docs/M595/M595_BA_oral.pdf',
+                                             'dossier': 'M595', 'entreprise': 'Coservices'})
+    db.add_document("Candidature spontanée", {'source': 'docs/A401_CV_Alten_.pdf'})
+    db.add_document("Facture électricité", {'source': 'docs/facture_mars.pdf'})
+    return db
+
+
+def test_rows_merge_documents_of_a_dossier():
+    db = _database()
+    rows = db.get_candidatures()
+
+    assert [row['dossier'] for row in rows] == ['A401', 'M595']
+    m595 = rows[1]
+    assert m595['entreprise'] == 'Coservices' and m595['etat'] == 'En cours'
+    assert m595['contact'] == 'Mme Martin' and m595['date_reponse'] == '2025-06-10'
+    assert m595['cv'] and m595['ba']
+    assert m595['document_count'] == 3
+    assert m595['sources'] == ['M595_annonce.pdf', 'M595_BA_oral.pdf']
+
+    a401 = rows[0]
+    assert a401['entreprise'] == 'Alten' and a401['cv']
+
+
+def test_companies_and_filters():
+    db = _database()
+    assert list(db.get_candidature_companies()) == ['Alten', 'Coservices']
+    assert [row['dossier'] for row in db.get_candidatures({'etat': 'en cours'})] == ['M595']
+
+
+def test_removal_recomputes_row():
+    db = _database()
+    db.remove_documents_by_ids([doc['id'] for doc in db.documents
+                                if doc['metadata']['source'].endswith('BA_oral.pdf')])
+    m595 = db.get_candidatures({'dossier': 'M595'})[0]
+    assert not m595['ba'] and m595['document_count'] == 2
+
+    db.remove_documents_by_ids([doc['id'] for doc in db.documents
+                                if doc['metadata'].get('dossier') == 'M595'])
+    assert [row['dossier'] for row in db.get_candidatures()] == ['A401']
+
+
+def test_table_is_rebuilt_after_reload(tmp_path):
+    db = _database()
+    db.save(str(tmp_path / 'db'))
+    loaded = VectorDatabase.load(str(tmp_path / 'db'))
+    assert [row['dossier'] for row in loaded.get_candidatures()] == ['A401', 'M595']
+
+
+def test_reload_and_journal_replay_read_no_texts(tmp_path):
+    path = str(tmp_path / 'db')
+    db = _database()
+    db.save(path)
+    lettre = {'source': 'docs/M401_lettre.pdf'}
+    db.add_document("Objet : candidature chez Thales pour le poste de développeur Python.", lettre)
+    db.save(path)
+    # Entreprise devinée à l'ajout, sans toucher au dictionnaire de l'appelant
+    assert db.documents[-1]['metadata'][GUESSED_COMPANY_FIELD] == 'Thales'
+    assert GUESSED_COMPANY_FIELD not in lettre
+
+    loaded = VectorDatabase.load(path)
+    assert not any(getattr(doc, 'text_loaded', False) for doc in loaded.documents)
+    # Petit corpus : pas de refonte TF-IDF (qui relit tous les textes) à l'ajout
+    loaded.refit_drift_threshold = 1.0
+    loaded.add_document("Relance", {'source': 'docs/M401_relance.pdf'})
+    rows = loaded.get_candidatures()
+    assert [(row['dossier'], row['entreprise']) for row in rows] == [
+        ('A401', 'Alten'), ('M401', 'Thales'), ('M595', 'Coservices')]
+    assert not any(getattr(doc, 'text_loaded', False) for doc in loaded.documents)
+
+
+def test_guess_company_from_filename_tags_and_text():
+    assert guess_company('M401_CV_Capgemini_2025.pdf') == 'Capgemini'
+    assert guess_company('m401.pdf', tags='candidature, Sopra Steria') == 'Sopra Steria'
+    assert guess_company('m401.pdf', "Objet : candidature chez Thales pour le poste de développeur "
+                                     "Python, suite à votre annonce.") == 'Thales'
+    assert guess_company('m401.pdf') == ''
+
+
+def test_documents_without_code_or_dossier_are_keyed_by_company():
+    table = CandidatureTable()
+    table.add({'id': 1, 'text': 'x', 'metadata': {'source': 'notes.txt', 'entreprise': 'Société Générale'}})
+    table.add({'id': 2, 'text': 'y', 'metadata': {'source': 'relance.txt', 'entreprise': 'societe generale',
+                                                  'etat': 'En cours'}})
+    table.add({'id': 3, 'text': 'z', 'metadata': {'source': 'facture.txt'}})
+    table.add({'id': 4, 'text': 'w', 'metadata': {'source': 'M401_CV.pdf', 'entreprise': 'Alten'}})
+
+    rows = table.rows()
+    assert [(row['dossier'], row['entreprise']) for row in rows] == [
+        ('M401', 'Alten'), ('', 'Société Générale')]
+    assert rows[1]['document_count'] == 2 and rows[1]['etat'] == 'En cours'
+    assert list(table.companies()) == ['Alten', 'Société Générale']
+
+    table.remove([1])
+    assert table.rows()[1]['sources'] == ['relance.txt']
@@ -0,0 +1,49 @@
+"""Tests de l'assemblage du contexte dans un budget de tokens."""
+
+from rag_app.core.vector_database import VectorDatabase
+from rag_app.utils.context_packer import estimate_tokens, pack_context, query_window
+from rag_app.utils.text_chunker import chunk_text
+
+
+def test_estimate_tokens_counts_words_and_punctuation():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("Bonjour, le monde !") == 2 + 1 + 1 + 2 + 1
+    assert estimate_tokens("a" * 40) == 10
+
+
+def test_window_is_centred_on_query_terms():
+    text = "Introduction générale. " * 40 + "Le salaire proposé par Coservices est de 42k. " + "Fin. " * 100
+    start, end = query_window(text, ["salaire", "coservices"], 200)
+
+    assert end - start <= 200
+    assert "salaire proposé par Coservices" in text[start:end]
+
+
+def test_budget_is_respected_and_best_documents_come_first():
+    documents = [{'id': i, 'text': f"Document numéro {i}. " + "contenu " * 300, 'metadata': {}}
+                 for i in range(10)]
+    packed = pack_context(documents, "contenu", budget=500, passage_tokens=150)
+
+    assert packed['tokens'] <= 500
+    assert packed['tokens'] == sum(p['tokens'] for p in packed['passages'])
+    assert [p['document']['id'] for p in packed['passages']] == list(range(len(packed['passages'])))
+    assert packed['dropped'] == 10 - len(packed['passages'])
+
+
+def test_overlapping_chunks_and_duplicates_are_removed():
+    text = " ".join(f"Phrase {i} sur la mission Coservices." for i in range(60))
+    db = VectorDatabase()
+    db.add_document_chunks(chunk_text(text, 300, 150), {'source': 'a.txt'})
+    db.add_document("Texte copié.  " + "Autre contenu " * 20, {'source': 'b.txt'})
+    db.add_document("texte copié. " + "autre contenu " * 20, {'source': 'c.txt'})
+
+    packed = pack_context(db.documents, "mission Coservices", budget=100000,
+                          passage_tokens=1000, min_passage_tokens=5)
+    chunk_passages = [p for p in packed['passages']
+                      if p['document']['metadata'].get('parent_id') is not None]
+    spans = sorted((p['document']['metadata']['chunk_start'] + p['start'],
+                    p['document']['metadata']['chunk_start'] + p['end']) for p in chunk_passages)
+    assert all(previous[1] <= following[0] for previous, following in zip(spans, spans[1:]))
+    assert sum(end - start for start, end in spans) <= len(text)
+    assert packed['duplicates'] == 1
+    assert sum(1 for p in packed['passages'] if p['document']['metadata']['source'] in ('b.txt', 'c.txt')) == 1
@@ -0,0 +1,181 @@
+"""Tests de l'index dense IVF et de la recherche dense de VectorDatabase."""
+
+import random
+import shutil
+
+import numpy as np
+import pytest
+
+from rag_app.core import dense_index
+from rag_app.core.dense_index import DenseIndex, HashingEmbedder, exact_search
+from rag_app.core.vector_database import VectorDatabase
+
+
+@pytest.fixture(autouse=True)
+def hashing_embedder(monkeypatch):
+    """Embedder déterministe, quel que soit le modèle configuré."""
+    embedder = HashingEmbedder(64)
+    monkeypatch.setattr(dense_index, '_default_embedder', embedder)
+    return embedder
+
+
+def _clustered_vectors(count, dim=32, clusters=20, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    vectors = centers[rng.integers(clusters, size=count)] + 0.3 * rng.normal(size=(count, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def test_hashing_embedder_is_deterministic_and_normalized():
+    embedder = HashingEmbedder(64)
+    first = embedder.embed(["facture électricité mars", ""])
+    second = HashingEmbedder(64).embed(["facture électricité mars", ""])
+
+    np.testing.assert_array_equal(first, second)
+    assert np.isclose(np.linalg.norm(first[0]), 1.0)
+    assert not first[1].any()
+
+
+def test_ivf_recall_against_exact_search():
+    vectors = _clustered_vectors(3000)
+    queries = _clustered_vectors(50, seed=1)
+    index = DenseIndex(32, nprobe=8, min_train_size=500)
+    index.add(vectors, range(len(vectors)))
+    index.merge()
+    assert index.nlist > 1
+
+    exact = exact_search(vectors, queries, 10)
+    found = index.search(queries, 10)
+    recall = np.mean([len(set(ids.tolist()) & set(truth.tolist())) / 10
+                      for (ids, _), truth in zip(found, exact)])
+    assert recall >= 0.9
+
+
+def test_removed_ids_are_hidden_and_dropped_on_merge():
+    vectors = _clustered_vectors(200)
+    index = DenseIndex(32, min_train_size=50)
+    index.add(vectors, range(200))
+    index.merge()
+
+    index.remove([0])
+    ids, _ = index.search(vectors[0], 5, nprobe=index.nlist)[0]
+    assert 0 not in ids.tolist()
+
+    index.merge()
+    assert index.size == 199 and 0 not in index.ids.tolist()
+
+
+def test_save_and_load_memory_maps_vectors(tmp_path):
+    vectors = _clustered_vectors(300)
+    index = DenseIndex(32, signature='test', min_train_size=100)
+    index.add(vectors, range(300))
+    index.save(tmp_path / 'dense')
+
+    loaded = DenseIndex.load(tmp_path / 'dense', 'test')
+    assert isinstance(loaded.vectors, np.memmap)
+    assert loaded.vectors.dtype == np.float16
+    assert loaded.search(vectors[7], 1)[0][0][0] == 7
+    assert DenseIndex.load(tmp_path / 'dense', 'autre') is None
+
+
+def test_vector_database_dense_backend(tmp_path):
+    db = VectorDatabase()
+    db.add_document("facture électricité fournisseur énergie", {'source': 'a.txt', 'category': 'factures'})
+    db.add_document("contrat de travail développeur python", {'source': 'b.txt', 'category': 'rh'})
+    db.add_document("relevé bancaire compte courant", {'source': 'c.txt', 'category': 'banque'})
+
+    results = db.search("électricité facture", top_k=1, backend='dense')
+    assert results[0]['document']['metadata']['source'] == 'a.txt'
+
+    filtered = db.search("facture développeur", top_k=3, backend='dense', filter_by={'category': 'rh'})
+    assert [r['document']['metadata']['source'] for r in filtered] == ['b.txt']
+
+    db.remove_document(0)
+    sources = [r['document']['metadata']['source']
+               for r in db.search("électricité facture", top_k=3, backend='dense')]
+    assert 'a.txt' not in sources
+
+    db.save(str(tmp_path / 'db'))
+    assert (tmp_path / 'db' / 'dense' / 'vectors.npy').exists()
+    loaded = VectorDatabase.load(str(tmp_path / 'db'))
+    loaded.add_document("facture électricité avril", {'source': 'd.txt'})
+    results = loaded.search("électricité facture", top_k=1, backend='dense')
+    assert results[0]['document']['metadata']['source'] == 'd.txt'
+    assert loaded._dense_index.size == 3
+
+
+def test_dense_search_grouped_returns_best_parent_first():
+    rng = random.Random(0)
+    words = [f"mot{i}" for i in range(50)]
+    db = VectorDatabase()
+    for parent in range(5):
+        chunks = [{'text': " ".join(rng.choices(words, k=20)), 'start': 0, 'end': 0}
+                  for _ in range(3)]
+        db.add_document_chunks(chunks, {'source': f"doc_{parent}.txt"})
+
+    groups = db.search_grouped(db.documents[4]['text'], top_k=2, backend='dense')
+    assert groups[0]['document'] is db.documents[4]
+    assert len(groups) == 2
+
+
+def test_dense_index_of_another_save_is_discarded(tmp_path):
+    path = tmp_path / 'db'
+    first = VectorDatabase()
+    first.add_document("facture électricité fournisseur énergie", {'source': 'a.txt'})
+    first.add_document("contrat de travail développeur python", {'source': 'b.txt'})
+    first.search("facture", top_k=1, backend='dense')
+    first.save(str(path))
+    stale = tmp_path / 'dense_first'
+    shutil.copytree(path / 'dense', stale)
+
+    # Nouvelle base aux mêmes identifiants, sauvegardée au même endroit
+    second = VectorDatabase()
+    second.add_document("relevé bancaire compte courant", {'source': 'c.txt'})
+    second.add_document("billet de train pour Lyon", {'source': 'd.txt'})
+    second.save(str(path))
+    assert not (path / 'dense').exists()
+
+    # Index de la première base remis en place : il ne correspond pas à l'instantané
+    stale.rename(path / 'dense')
+    loaded = VectorDatabase.load(str(path))
+    results = loaded.search("relevé bancaire", top_k=1, backend='dense')
+    assert results[0]['document']['metadata']['source'] == 'c.txt'
+    assert loaded._dense_index.state is None
+
+    loaded.add_document("facture de gaz", {'source': 'e.txt'})
+    loaded.save(str(path))
+    reloaded = VectorDatabase.load(str(path))
+    assert reloaded._get_dense_index().state['database'] == reloaded._database_id
+    assert reloaded._dense_index.size == 3
+
+
+def test_journal_saves_rewrite_the_dense_index_only_when_it_changes(tmp_path, monkeypatch):
+    path = str(tmp_path / 'db')
+    db = VectorDatabase()
+    for i in range(20):
+        db.add_document(f"note numéro {i} sur la réunion d'équipe", {'source': f"n{i}.txt"})
+    db.search("réunion", top_k=1, backend='dense')
+    db.save(path)
+
+    saves = []
+    original_save = DenseIndex.save
+    monkeypatch.setattr(DenseIndex, 'save',
+                        lambda index, *args, **kwargs: (saves.append(index.size),
+                                                        original_save(index, *args, **kwargs)))
+    db.remove_document(0)
+    db.save(path)
+    assert saves == [19]
+
+    for i in range(3):
+        # Documents pas encore embarqués : l'index n'a pas changé
+        db.add_document(f"facture fournisseur {i}", {'source': f"f{i}.txt"})
+        db.save(path)
+    assert saves == [19]
+
+    # Index rouvert malgré les ajouts postérieurs : seuls ceux-ci sont embarqués
+    loaded = VectorDatabase.load(path)
+    index = loaded._get_dense_index()
+    assert index.state['next_id'] < loaded._next_id
+    assert index.size == len(loaded.documents) == 22
+    results = loaded.search("facture fournisseur 2", top_k=1, backend='dense')
+    assert results[0]['document']['metadata']['source'] == 'f2.txt'
@@ -0,0 +1,96 @@
+"""Tests du cache d'extraction."""
+
+import os
+import threading
+
+from rag_app.utils.extraction_cache import ExtractionCache
+from rag_app.utils.file_utils import EXTRACTOR_VERSION, extract_text_from_file
+
+
+def test_unchanged_file_is_served_from_cache(tmp_path, isolated_extraction_cache, monkeypatch):
+    path = tmp_path / "note.txt"
+    path.write_text("Contenu de la note", encoding='utf-8')
+    assert extract_text_from_file(str(path)) == "Contenu de la note"
+
+    import rag_app.utils.file_utils as file_utils
+    monkeypatch.setattr(file_utils, '_extract_text_uncached', lambda p: "ne doit pas être appelé")
+
+    assert extract_text_from_file(str(path)) == "Contenu de la note"
+    assert isolated_extraction_cache.stats()['entries'] == 1
+
+
+def test_modified_file_or_new_extractor_is_a_miss(tmp_path):
+    cache = ExtractionCache(tmp_path / "cache.sqlite")
+    path = tmp_path / "note.txt"
+    path.write_text("v1", encoding='utf-8')
+    cache.put(path, "v1", EXTRACTOR_VERSION)
+
+    assert cache.get(path, EXTRACTOR_VERSION) == "v1"
+    assert cache.get(path, EXTRACTOR_VERSION + 1) is None
+
+    path.write_text("v2 plus long", encoding='utf-8')
+    assert cache.get(path, EXTRACTOR_VERSION) is None
+
+
+def test_cache_is_shared_between_threads(tmp_path):
+    cache = ExtractionCache(tmp_path / "cache.sqlite")
+    paths = [tmp_path / f"note_{i}.txt" for i in range(9)]
+    for path in paths:
+        path.write_text(path.stem, encoding='utf-8')
+    cache.put(paths[0], paths[0].stem)
+    errors = []
+
+    def run(chunk):
+        # Comme une nouvelle exécution Streamlit : autre thread, même connexion
+        try:
+            for path in chunk:
+                cache.put(path, path.stem)
+                assert cache.get(paths[0]) == paths[0].stem
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(paths[i:i + 4],)) for i in (1, 5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert [cache.get(path) for path in paths] == [path.stem for path in paths]
+    assert cache.stats()['entries'] == 9
+
+
+def test_touched_file_stays_cached_with_hash_verification(tmp_path):
+    cache = ExtractionCache(tmp_path / "cache.sqlite", verify_hash=True)
+    path = tmp_path / "note.txt"
+    path.write_text("identique", encoding='utf-8')
+    cache.put(path, "identique")
+
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 5_000_000_000))
+
+    assert cache.get(path) == "identique"
+    assert ExtractionCache(tmp_path / "other.sqlite").get(path) is None
+
+
+def test_lru_eviction_keeps_cache_under_max_size(tmp_path):
+    cache = ExtractionCache(tmp_path / "cache.sqlite", max_size_mb=2500 / (1024 * 1024))
+    paths = []
+    for i in range(4):
+        path = tmp_path / f"f{i}.txt"
+        path.write_text(str(i), encoding='utf-8')
+        paths.append(path)
+
+    cache.put(paths[0], "a" * 1000)
+    cache.put(paths[1], "b" * 1000)
+    assert cache.get(paths[0]) is not None  # f0 devient le plus récent
+    cache.put(paths[2], "c" * 1000)
+
+    assert cache.get(paths[1]) is None
+    assert cache.get(paths[0]) is not None and cache.get(paths[2]) is not None
+    assert cache.stats()['text_bytes'] == 2000
+
+    paths[2].unlink()
+    assert cache.purge(missing_only=True) == 1
+    assert cache.purge() == 1
+    assert cache.stats()['text_bytes'] == 0
@@ -0,0 +1,92 @@
+"""Tests des utilitaires de fichiers."""
+
+import json
+import os
+
+import rag_app.utils.file_utils as file_utils
+from rag_app.utils.file_utils import (
+    decode_text_bytes, extract_text_from_txt_file, find_files_recursive,
+    iter_files_recursive, read_notes_file
+)
+
+
+def _make_tree(root):
+    (root / ".data.json").write_text(json.dumps({"dossier": "M400", "entreprise": "ACME"}), encoding='utf-8')
+    (root / "annonce.pdf").write_bytes(b"")
+    (root / "notes.txt").write_text("texte", encoding='utf-8')
+    sub = root / "sous_dossier"
+    sub.mkdir()
+    (sub / "lettre.txt").write_text("lettre", encoding='utf-8')
+    (sub / "image.png").write_bytes(b"")
+    deeper = sub / "archives"
+    deeper.mkdir()
+    (deeper / "ancien.txt").write_text("ancien", encoding='utf-8')
+
+
+def _walk_reference(directory, extensions):
+    """Ordre de parcours d'os.walk, sans les métadonnées."""
+    paths = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if os.path.splitext(name)[1].lower() in extensions or name.endswith('.data.json'):
+                paths.append(os.path.join(root, name))
+    return paths
+
+
+def test_iter_files_recursive_matches_walk_order(tmp_path):
+    _make_tree(tmp_path)
+
+    found = find_files_recursive(str(tmp_path), ['.pdf', '.txt'])
+
+    assert [path for path, _ in found] == _walk_reference(str(tmp_path), ['.pdf', '.txt'])
+    assert list(iter_files_recursive(str(tmp_path), ['.pdf', '.txt'])) == found
+
+
+def test_data_json_read_once_per_directory(tmp_path, monkeypatch):
+    _make_tree(tmp_path)
+    reads = []
+    original = file_utils.read_data_json_file
+    monkeypatch.setattr(file_utils, 'read_data_json_file',
+                        lambda path: reads.append(path) or original(path))
+
+    found = dict(iter_files_recursive(str(tmp_path), ['.txt']))
+
+    assert reads == [str(tmp_path / ".data.json")]
+    assert found[str(tmp_path / ".data.json")]['source_format'] == 'data_json'
+    assert found[str(tmp_path / "notes.txt")]['project'] == "M400_Sans description"
+
+
+def test_decode_text_bytes_detects_encoding():
+    assert decode_text_bytes("été".encode('utf-8')) == ("été", 'utf-8')
+    assert decode_text_bytes("été".encode('utf-8-sig')) == ("été", 'utf-8-sig')
+    assert decode_text_bytes("été".encode('utf-16')) == ("été", 'utf-16')
+    assert decode_text_bytes("été – 10 €".encode('cp1252')) == ("été – 10 €", 'cp1252')
+    assert decode_text_bytes(b"\x81\xe9") == ("\x81é", 'latin1')
+
+
+def test_txt_encoding_decided_on_whole_file(tmp_path):
+    # Un échantillon de 1 Ko en ASCII ne doit pas faire choisir UTF-8
+    path = tmp_path / "ancien.txt"
+    path.write_bytes(b"a" * 2048 + "\r\nfin d'été".encode('cp1252'))
+
+    assert extract_text_from_txt_file(str(path)) == "a" * 2048 + "\nfin d'été"
+
+
+def test_read_notes_file_with_bom(tmp_path):
+    path = tmp_path / "dossier_notes.txt"
+    path.write_bytes(json.dumps({"note": "réunion"}, ensure_ascii=False).encode('utf-8-sig'))
+
+    assert read_notes_file(str(path)) == {"note": "réunion"}
+
+
+def test_pdf_pages_are_separated_and_capped(tmp_path, make_pdf, monkeypatch):
+    path = make_pdf(tmp_path / "annonce.pdf", ["Page un", "Page deux", "Page trois"])
+
+    text = file_utils.extract_text_from_pdf_file(path)
+    assert text == "Page un\n\fPage deux\n\fPage trois\n"
+    assert "\f".join([file_utils.extract_pdf_page_range(path, 0, 1),
+                      file_utils.extract_pdf_page_range(path, 1, 3)]) == text
+
+    monkeypatch.setitem(file_utils.PDF_CONFIG, 'max_pages', 2)
+    assert file_utils.extract_text_from_pdf_file(path) == "Page un\n\fPage deux\n"
+    assert file_utils.get_pdf_page_count(path) == 2
@@ -0,0 +1,39 @@
+"""Tests du classifieur par mots-clés."""
+
+import random
+
+from rag_app.config.settings import CLASSIFICATION_CONFIG
+from rag_app.utils.keyword_matcher import KeywordMatcher, compile_patterns, first_match
+
+
+def _naive(rules, text):
+    text = text.lower()
+    return [category for category, words in rules.items() if any(word in text for word in words)]
+
+
+def test_matches_substring_semantics():
+    rules = {'Communication': ['mail'], 'Marketing': ['mailing'], 'Finance': ['total', 'tot']}
+    matcher = KeywordMatcher(rules)
+
+    # « mailing » contient « mail » : les deux catégories sont trouvées
+    assert matcher.classify("Campagne de MAILING") == ['Communication', 'Marketing']
+    assert matcher.classify("Sous-total") == ['Finance']
+    assert matcher.classify("") == [] and matcher.find("rien") == set()
+
+
+def test_image_rules_match_naive_scan():
+    rules = CLASSIFICATION_CONFIG['image_categories']
+    matcher = KeywordMatcher(rules)
+    vocabulary = [word for words in rules.values() for word in words] + ["texte", "Université", "e-mail", "x"]
+    rng = random.Random(0)
+    for _ in range(300):
+        text = " ".join(rng.choices(vocabulary, k=rng.randint(0, 6)))
+        assert matcher.classify(text) == _naive(rules, text)
+
+
+def test_list_request_rules_keep_priority():
+    rules = compile_patterns(CLASSIFICATION_CONFIG['list_requests'])
+
+    assert first_match(rules, "liste les entreprises où j'ai postulé") == 'entreprises'
+    assert first_match(rules, "quelles sont mes candidatures en cours ?") == 'candidatures_en_cours'
+    assert first_match(rules, "bonjour") is None
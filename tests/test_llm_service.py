@@ -0,0 +1,188 @@
+"""Tests des appels en streaming aux modèles (faux serveur local)."""
+
+import asyncio
+import time
+
+import pytest
+
+from rag_app.services import llm_service
+from rag_app.services.llm_service import (
+    CircuitBreaker, LLMClient, LLMError, iter_ndjson, iter_sse_data, parse_retry_after,
+    stream_mistral_chat, stream_ollama_generate
+)
+
+
+@pytest.fixture(autouse=True)
+def sleeps(monkeypatch):
+    """Client partagé neuf dont les attentes entre tentatives sont enregistrées, pas dormies."""
+    recorded = []
+    monkeypatch.setattr(llm_service, '_default_client', LLMClient(sleep=recorded.append))
+    return recorded
+
+
+def test_iter_sse_data_joins_multiline_events_and_skips_comments():
+    lines = [b": ping", b"data: un", b"data: deux", b"", b"event: x", b"data: [DONE]", b""]
+    assert list(iter_sse_data(lines)) == ["un\ndeux", "[DONE]"]
+
+
+def test_iter_ndjson_skips_blank_lines():
+    assert list(iter_ndjson([b'{"a": 1}', b'', b'{"b": "\xc3\xa9"}'])) == [{'a': 1}, {'b': 'é'}]
+
+
+def test_mistral_stream_yields_deltas(fake_llm_server):
+    fake_llm_server.chunks = ["Réponse", " en", " streaming"]
+    chunks = list(stream_mistral_chat("cle", "mistral-small", [{"role": "user", "content": "?"}],
+                                      base_url=f"{fake_llm_server.url}/v1"))
+
+    assert chunks == ["Réponse", " en", " streaming"]
+    request = fake_llm_server.requests[0]
+    assert request['json']['stream'] is True
+    assert request['headers']['Authorization'] == "Bearer cle"
+
+
+def test_ollama_stream_yields_fragments(fake_llm_server):
+    chunks = list(stream_ollama_generate("mistral:7b", "prompt", base_url=fake_llm_server.url))
+    assert "".join(chunks) == "Bonjour le monde"
+    assert fake_llm_server.requests[0]['json']['stream'] is True
+
+
+def test_first_fragment_arrives_before_generation_ends(fake_llm_server):
+    fake_llm_server.chunks = ["a", "b", "c", "d"]
+    fake_llm_server.delay = 0.2
+    start = time.monotonic()
+    stream = stream_ollama_generate("mistral:7b", "prompt", base_url=fake_llm_server.url)
+
+    assert next(stream) == "a"
+    first_token = time.monotonic() - start
+    assert "".join(stream) == "bcd"
+    assert first_token < 0.5 < time.monotonic() - start
+
+
+def test_http_error_raises_with_status_and_body(fake_llm_server):
+    fake_llm_server.responses.append((400, '{"type": "invalid_request"}', {}))
+    with pytest.raises(LLMError) as error:
+        list(stream_mistral_chat("cle", "m", [], base_url=f"{fake_llm_server.url}/v1"))
+    assert error.value.status_code == 400
+    assert 'invalid_request' in error.value.body
+    # Erreur non transitoire : pas de nouvelle tentative
+    assert len(fake_llm_server.requests) == 1
+
+
+def test_parse_retry_after_accepts_seconds_and_http_dates():
+    assert parse_retry_after("12") == 12.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("n'importe quoi") is None
+
+
+def test_transient_errors_are_retried_with_bounded_backoff(fake_llm_server, sleeps):
+    fake_llm_server.responses += [(503, 'indisponible', {}), (502, 'passerelle', {})]
+    chunks = stream_ollama_generate("mistral:7b", "prompt", base_url=fake_llm_server.url)
+
+    assert "".join(chunks) == "Bonjour le monde"
+    assert len(fake_llm_server.requests) == 3
+    assert len(sleeps) == 2
+    assert 0 <= sleeps[0] <= 1.0 and 0 <= sleeps[1] <= 2.0
+
+
+def test_retry_after_is_honored(fake_llm_server, sleeps):
+    fake_llm_server.responses.append((429, 'trop de requêtes', {'Retry-After': '7'}))
+    chunks = stream_mistral_chat("cle", "m", [], base_url=f"{fake_llm_server.url}/v1")
+
+    assert "".join(chunks) == "Bonjour le monde"
+    assert sleeps == [7.0]
+
+
+def test_long_retry_after_gives_up_immediately(fake_llm_server, sleeps):
+    fake_llm_server.responses.append((429, 'quota', {'Retry-After': '3600'}))
+    with pytest.raises(LLMError) as error:
+        list(stream_mistral_chat("cle", "m", [], base_url=f"{fake_llm_server.url}/v1"))
+    assert error.value.status_code == 429
+    assert sleeps == []
+
+
+def test_circuit_breaker_opens_then_half_opens():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    assert breaker.state == 'closed'
+    breaker.record_failure()
+    assert breaker.state == 'open' and not breaker.allow()
+
+    now[0] = 10.0
+    assert breaker.state == 'half_open' and breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+
+
+def test_open_circuit_skips_provider_without_request(fake_llm_server):
+    client = LLMClient(config={'max_retries': 0, 'circuit_failure_threshold': 1},
+                       sleep=lambda delay: None)
+    target = {'provider': 'ollama', 'model': 'm', 'base_url': fake_llm_server.url}
+    fake_llm_server.responses.append((500, 'panne', {}))
+    with pytest.raises(LLMError):
+        list(client.stream(target, []))
+
+    with pytest.raises(LLMError, match="temporairement"):
+        list(client.stream(target, []))
+    assert len(fake_llm_server.requests) == 1
+
+
+
+@pytest.mark.parametrize('provider, path, body', [
+    ('mistral', '/v1', 'data: {"choices": [{"delta": {"content": "tron'),
+    ('ollama', '', 'pas du json'),
+    ('ollama', '', '{"error": "modèle introuvable"}'),
+])
+def test_unreadable_stream_raises_llm_error_and_counts_as_failure(fake_llm_server, provider, path, body):
+    client = LLMClient(config={'max_retries': 0}, sleep=lambda delay: None)
+    target = {'provider': provider, 'model': 'm', 'api_key': 'cle',
+              'base_url': f"{fake_llm_server.url}{path}"}
+    fake_llm_server.responses.append((200, body, {}))
+    with pytest.raises(LLMError) as error:
+        list(client.stream(target, [{'role': 'user', 'content': '?'}]))
+    assert error.value.provider == provider
+    assert client.breaker(provider).failures == 1
+
+
+def test_failover_to_next_provider(fake_llm_server):
+    client = LLMClient(config={'max_retries': 0}, sleep=lambda delay: None)
+    fake_llm_server.responses.append((500, 'panne', {}))
+    switches = []
+    targets = [
+        {'provider': 'mistral', 'model': 'm', 'api_key': 'cle', 'base_url': f"{fake_llm_server.url}/v1"},
+        {'provider': 'ollama', 'model': 'mistral:7b', 'base_url': fake_llm_server.url},
+    ]
+    answer = client.complete(targets, [{'role': 'user', 'content': 'question'}],
+                             on_failover=lambda failed, following, error: switches.append(
+                                 (failed['provider'], following['provider'], error.status_code)))
+
+    assert answer == "Bonjour le monde"
+    assert switches == [('mistral', 'ollama', 500)]
+    assert fake_llm_server.requests[1]['json']['prompt'] == 'question'
+
+
+def test_all_providers_failing_reports_every_error(fake_llm_server):
+    client = LLMClient(config={'max_retries': 0}, sleep=lambda delay: None)
+    fake_llm_server.responses += [(500, 'panne', {}), (503, 'occupé', {})]
+    targets = [
+        {'provider': 'mistral', 'model': 'm', 'api_key': 'cle', 'base_url': f"{fake_llm_server.url}/v1"},
+        {'provider': 'ollama', 'model': 'mistral:7b', 'base_url': fake_llm_server.url},
+    ]
+    with pytest.raises(LLMError) as error:
+        client.complete(targets, [])
+    assert error.value.provider == 'mistral'
+    assert [e.status_code for e in error.value.errors] == [500, 503]
+
+
+def test_acomplete_many_runs_requests_concurrently(fake_llm_server):
+    fake_llm_server.delay = 0.1
+    client = LLMClient(config={'max_concurrency': {'ollama': 4}})
+    target = {'provider': 'ollama', 'model': 'm', 'base_url': fake_llm_server.url}
+    jobs = [{'targets': target, 'messages': [{'role': 'user', 'content': str(i)}]} for i in range(4)]
+
+    start = time.monotonic()
+    answers = asyncio.run(client.acomplete_many(jobs))
+    assert answers == ["Bonjour le monde"] * 4
+    # 4 fragments de 0,1 s par réponse : en série il faudrait 1,6 s
+    assert time.monotonic() - start < 1.2
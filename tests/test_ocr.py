@@ -0,0 +1,119 @@
+"""Tests de l'étape OCR."""
+
+import os
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from rag_app.utils import ocr
+from rag_app.utils.file_utils import extract_text_from_image_files
+
+
+def _fake_tesseract(calls):
+    """Remplace Tesseract : « texte N » pour la N-ième image d'une liste."""
+    def image_to_string(image, lang=None):
+        calls.append(image)
+        if image.endswith('.txt'):
+            with open(image, encoding='utf-8') as f:
+                count = len(f.read().split())
+            return "".join(f"texte {i}\n\f" for i in range(count))
+        return "texte seul\n"
+    return image_to_string
+
+
+def test_prepare_image_downscales_to_target_dpi(tmp_path):
+    path = tmp_path / "scan.jpg"
+    Image.new('RGB', (4000, 2000), 'white').save(path, dpi=(600, 600))
+
+    prepared = ocr.prepare_image_for_ocr(str(path))
+
+    assert prepared.size == (2000, 1000)
+    assert prepared.info['dpi'] == (300, 300)
+    assert set(np.unique(np.array(prepared))) <= {0, 255}
+
+
+def test_prepare_image_caps_dimension_without_upscaling(tmp_path, monkeypatch):
+    monkeypatch.setitem(ocr.OCR_CONFIG, 'max_dimension', 500)
+    large, small = tmp_path / "grand.png", tmp_path / "petit.png"
+    Image.new('RGBA', (1000, 400), (0, 0, 0, 0)).save(large)
+    Image.new('L', (200, 100), 255).save(small)
+
+    assert ocr.prepare_image_for_ocr(str(large)).size == (500, 200)
+    assert ocr.prepare_image_for_ocr(str(small)).size == (200, 100)
+
+
+def test_ocr_images_single_tesseract_call_per_batch(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(ocr, '_tesseract_available', True)
+    monkeypatch.setattr(ocr.pytesseract, 'image_to_string', _fake_tesseract(calls))
+    monkeypatch.setitem(ocr.OCR_CONFIG, 'precheck', False)
+    paths = []
+    for i in range(3):
+        paths.append(str(tmp_path / f"image_{i}.png"))
+        Image.new('L', (50, 50), 255).save(paths[-1])
+
+    results = ocr.ocr_images(paths)
+
+    assert len(calls) == 1
+    assert [result['text'] for result in results] == ["texte 0", "texte 1", "texte 2"]
+    assert all(result['ocr_seconds'] == results[0]['ocr_seconds'] for result in results)
+    assert all(result['prepare_seconds'] > 0 for result in results)
+
+
+def _text_image(path, lines, inverted=False):
+    image = np.full((900, 1400), 255, dtype=np.uint8)
+    for i, line in enumerate(lines):
+        cv2.putText(image, line, (40, 80 + 60 * i), cv2.FONT_HERSHEY_SIMPLEX, 1.2, 0, 2)
+    Image.fromarray(255 - image if inverted else image).save(path)
+    return str(path)
+
+
+def test_detect_text_on_thumbnail(tmp_path):
+    lines = ["Facture numero 2024-118", "Montant total : 1250 euros", "Conditions de paiement"]
+    gradient = np.tile(np.linspace(0, 255, 1400, dtype=np.uint8), (900, 1))
+    Image.fromarray(gradient).save(tmp_path / "degrade.png")
+
+    assert ocr.detect_text(_text_image(tmp_path / "facture.png", lines))['has_text']
+    assert ocr.detect_text(_text_image(tmp_path / "ecran.png", lines, inverted=True))['has_text']
+    assert not ocr.detect_text(str(tmp_path / "degrade.png"))['has_text']
+    assert not ocr.detect_text(_text_image(tmp_path / "vide.png", []))['has_text']
+
+
+def test_textless_image_skips_tesseract(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(ocr, '_tesseract_available', True)
+    monkeypatch.setattr(ocr.pytesseract, 'image_to_string', _fake_tesseract(calls))
+    blank = _text_image(tmp_path / "photo.png", [])
+    text = _text_image(tmp_path / "courrier.png", ["Madame, Monsieur,", "veuillez trouver ci-joint"])
+
+    results = ocr.ocr_images([blank, text])
+
+    assert [(r['text'], r['ocr_skipped']) for r in results] == [("", True), ("texte seul", False)]
+    assert len(calls) == 1
+
+
+def test_missing_tesseract_is_not_cached(tmp_path, monkeypatch, isolated_extraction_cache):
+    monkeypatch.setattr(ocr, '_tesseract_available', False)
+    path = str(tmp_path / "photo.png")
+    Image.new('L', (50, 50), 255).save(path)
+
+    assert extract_text_from_image_files([path])[0]['text'] == ""
+    assert isolated_extraction_cache.stats()['entries'] == 0
+
+
+def test_batch_service_records_ocr_decision(tmp_path, monkeypatch):
+    from rag_app.core.vector_database import VectorDatabase
+    from rag_app.services.batch_service import BatchService
+
+    monkeypatch.setattr(ocr, '_tesseract_available', True)
+    monkeypatch.setattr(ocr.pytesseract, 'image_to_string', _fake_tesseract([]))
+    _text_image(tmp_path / "photo.png", [])
+    _text_image(tmp_path / "facture.png", ["Facture numero 2024-118", "Montant total : 1250 euros"])
+    db = VectorDatabase()
+
+    results = BatchService(db, max_workers=1).process_directory(str(tmp_path), ['.png'], enable_vision=True)
+
+    assert results['success'] == 2
+    skipped = {os.path.basename(doc['metadata']['source']): doc['metadata']['ocr_skipped'] for doc in db.documents}
+    assert skipped == {'photo.png': True, 'facture.png': False}
@@ -0,0 +1,111 @@
+"""Tests de la synchronisation incrémentale des sources."""
+
+import os
+
+from rag_app.core.vector_database import VectorDatabase
+from rag_app.services.batch_service import BatchService
+import rag_app.services.sync_service as sync_service
+from rag_app.services.sync_service import SyncService
+
+
+def _write(path, text):
+    path.write_text(text, encoding='utf-8')
+
+
+def _sources(db):
+    return sorted(os.path.basename(d['metadata']['source']) for d in db.documents)
+
+
+def _sync(db, source, manifest):
+    return SyncService(BatchService(db, max_workers=1), manifest_path=manifest).sync(str(source), ['.txt'])
+
+
+def test_sync_indexes_only_the_delta(tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    manifest = tmp_path / "manifest.json"
+    for name in ("a", "b", "c"):
+        _write(source / f"{name}.txt", f"Contenu initial du fichier {name}. " * 3)
+    db = VectorDatabase()
+
+    first = _sync(db, source, manifest)
+    assert (first['added'], first['success']) == (3, 3)
+
+    progress = []
+    second = SyncService(BatchService(db, max_workers=1), manifest_path=manifest).sync(
+        str(source), ['.txt'], progress_callback=lambda done, total, path: progress.append(done))
+    assert (second['unchanged'], second['success'], second['documents_removed']) == (3, 0, 0)
+    assert progress == [1, 2, 3]
+    assert _sources(db) == ['a.txt', 'b.txt', 'c.txt']
+
+    _write(source / "b.txt", "Nouveau contenu modifié pour le fichier b, plus long qu'avant.")
+    (source / "c.txt").unlink()
+    _write(source / "d.txt", "Un fichier ajouté après la première synchronisation.")
+
+    third = _sync(db, source, manifest)
+
+    assert (third['added'], third['modified'], third['deleted'], third['unchanged']) == (1, 1, 1, 1)
+    assert _sources(db) == ['a.txt', 'b.txt', 'd.txt']
+    assert any("modifié" in d['text'] for d in db.documents)
+    assert db.vectors.shape[0] == len(db.documents)
+
+
+def test_sync_replaces_documents_indexed_without_manifest(tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    _write(source / "a.txt", "Document déjà indexé par un traitement classique.")
+    db = VectorDatabase()
+    batch_service = BatchService(db, max_workers=1)
+    batch_service.process_directory(str(source), ['.txt'])
+    batch_service.process_directory(str(source), ['.txt'])
+    assert _sources(db) == ['a.txt', 'a.txt']
+
+    results = _sync(db, source, tmp_path / "manifest.json")
+
+    assert results['documents_removed'] == 2
+    assert _sources(db) == ['a.txt']
+
+
+def test_sync_of_other_extensions_keeps_indexed_sources(tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    manifest = tmp_path / "manifest.json"
+    _write(source / "a.txt", "Notes texte sur la candidature.")
+    _write(source / "b.txt", "Compte rendu de l'entretien.")
+    db = VectorDatabase()
+    _sync(db, source, manifest)
+
+    pdf_only = SyncService(BatchService(db, max_workers=1), manifest_path=manifest)
+    assert pdf_only.sync(str(source), ['.pdf'])['deleted'] == 0
+    assert _sources(db) == ['a.txt', 'b.txt']
+
+    (source / "b.txt").unlink()
+    assert pdf_only.sync(str(source), ['.pdf'])['deleted'] == 1
+    assert _sources(db) == ['a.txt']
+
+
+def test_sync_processing_starts_before_walk_ends(tmp_path, monkeypatch):
+    source = tmp_path / "source"
+    source.mkdir()
+    manifest = tmp_path / "manifest.json"
+    _write(source / "a.txt", "Fichier déjà synchronisé.")
+    db = VectorDatabase()
+    _sync(db, source, manifest)
+    _write(source / "b.txt", "Fichier ajouté.")
+    _write(source / "c.txt", "Autre fichier ajouté.")
+    events = []
+    walk = sync_service.iter_files_recursive
+
+    def tracked_walk(directory, extensions):
+        for file_path, annonce_data in walk(directory, extensions):
+            events.append('found')
+            yield file_path, annonce_data
+
+    monkeypatch.setattr(sync_service, 'iter_files_recursive', tracked_walk)
+    results = SyncService(BatchService(db, max_workers=1), manifest_path=manifest).sync(
+        str(source), ['.txt'], progress_callback=lambda done, total, path: events.append((done, total)))
+
+    # Chaque fichier, inchangé ou ajouté, est traité avant que le suivant soit trouvé
+    assert events == ['found', (1, 1), 'found', (2, 2), 'found', (3, 3)]
+    assert (results['unchanged'], results['added'], results['total_files']) == (1, 2, 3)
+    assert _sources(db) == ['a.txt', 'b.txt', 'c.txt']
@@ -0,0 +1,70 @@
+"""Tests de l'index exact des codes projet, entreprises et dossiers."""
+
+from rag_app.core.term_index import TermIndex, extract_codes, normalize_term
+from rag_app.core.vector_database import VectorDatabase
+from rag_app.services.batch_service import BatchService
+
+
+def test_extract_codes_requires_code_boundaries():
+    assert extract_codes("M401_Coservices-A595.pdf") == ['m401', 'a595']
+    assert extract_codes("CAM4012 et xm401") == []
+    assert normalize_term("  Société  Générale ") == 'societe generale'
+
+
+def test_match_finds_codes_and_multiword_companies():
+    index = TermIndex()
+    index.add({'id': 1, 'metadata': {'source': '/docs/M595_CV.pdf', 'entreprise': 'Société Générale'}})
+    index.add({'id': 2, 'metadata': {'source': '/docs/notes.txt', 'dossier': 'M401'}})
+
+    assert index.match("des nouvelles de la societe generale ?") == [('company', 'societe generale')]
+    assert index.match("Où en est M595 ?") == [('code', 'm595')]
+    assert index.lookup('dossier', 'm401') == [2]
+    assert index.lookup('code', 'M401') == [2]
+
+    index.remove([1])
+    assert index.match("M595") == []
+
+
+def test_exact_lookup_follows_ingest_and_removals():
+    db = VectorDatabase()
+    db.add_document("Lettre de motivation", {'source': '/cand/M595_LM.pdf', 'category': 'lm'})
+    db.add_document("CV", {'source': '/cand/M595_CV.pdf', 'category': 'cv'})
+    db.add_document("Autre", {'source': '/cand/M401_CV.pdf', 'category': 'cv',
+                              'entreprise': 'Coservices'})
+
+    # Index alimenté à l'ajout, sans requête préalable
+    assert db._term_index.size == 3
+    sources = [r['document']['metadata']['source'] for r in db.exact_lookup("dossier M595")]
+    assert sources == ['/cand/M595_LM.pdf', '/cand/M595_CV.pdf']
+    assert [r['document']['metadata']['source']
+            for r in db.exact_lookup("M595", filter_by={'category': 'cv'})] == ['/cand/M595_CV.pdf']
+    # Deux termes de la requête portés par le même document : classé premier
+    assert db.exact_lookup("coservices m595 m401")[0]['matched_terms'] == ['m401', 'coservices']
+    assert db.exact_lookup("question sans code") == []
+
+    db.remove_document(0)
+    assert [r['document']['metadata']['source'] for r in db.exact_lookup("M595")] == ['/cand/M595_CV.pdf']
+
+
+def test_exact_lookup_ranks_matches_before_truncating():
+    db = VectorDatabase()
+    db.add_document_chunks([{'text': f"Annonce détaillée, partie {i}.", 'start': 0, 'end': 0}
+                            for i in range(6)], {'source': '/cand/M595_annonce.pdf'})
+    db.add_document("Compte rendu d'entretien", {'source': '/cand/M595_entretien.txt'})
+    db.add_document("Le salaire proposé est de 42k", {'source': '/cand/M595_offre.txt'})
+
+    results = db.exact_lookup("salaire proposé pour M595", top_k=3)
+    sources = [r['document']['metadata']['source'] for r in results]
+    assert sources[0] == '/cand/M595_offre.txt'
+    # Un seul passage de l'annonce découpée parmi les premiers résultats
+    assert sorted(sources[1:]) == ['/cand/M595_annonce.pdf', '/cand/M595_entretien.txt']
+    assert results[0]['bm25_score'] > 0
+    assert len(db.exact_lookup("M595")) == 8
+
+
+def test_data_json_identifiers_reach_metadata():
+    service = BatchService(VectorDatabase())
+    metadata = service._prepare_metadata('/cand/cv.pdf', {
+        'title': 'Développeur', 'original_data': {'dossier': 'M596', 'entreprise': 'Mondial'}
+    })
+    assert metadata['dossier'] == 'M596' and metadata['entreprise'] == 'Mondial'
@@ -0,0 +1,68 @@
+"""Tests du découpage des textes en passages."""
+
+import random
+
+from rag_app.utils.text_chunker import assign_pages, chunk_text
+
+
+def _sample_text(seed=0, paragraphs=30):
+    rng = random.Random(seed)
+    words = [f"mot{i}" for i in range(200)] + ["anticonstitutionnellement" * 30]
+    return "\n\n".join(
+        ". ".join(" ".join(rng.choices(words, k=rng.randint(3, 25)))
+                  for _ in range(rng.randint(1, 8)))
+        for _ in range(paragraphs)
+    )
+
+
+def test_chunks_respect_size_and_offsets():
+    text = _sample_text()
+    chunks = chunk_text(text, max_chunk_size=300, chunk_overlap=40)
+
+    assert len(chunks) > 1
+    for i, chunk in enumerate(chunks):
+        assert chunk['index'] == i
+        assert chunk['text'] == text[chunk['start']:chunk['end']]
+        assert 0 < len(chunk['text']) <= 300
+        assert chunk['text'] == chunk['text'].strip()
+
+
+def test_chunks_cover_text_with_bounded_overlap():
+    text = _sample_text(seed=1)
+    chunks = chunk_text(text, max_chunk_size=250, chunk_overlap=50)
+
+    covered = set()
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk['start'] > previous['start']
+        assert previous['end'] - chunk['start'] <= 50
+    for chunk in chunks:
+        covered.update(range(chunk['start'], chunk['end']))
+    assert all(i in covered for i, c in enumerate(text) if not c.isspace())
+
+
+def test_paragraph_boundaries_are_preferred():
+    text = "Premier paragraphe court.\n\nDeuxième paragraphe, un peu plus long que le premier."
+
+    chunks = chunk_text(text, max_chunk_size=60, chunk_overlap=0)
+
+    assert [c['text'] for c in chunks] == [
+        "Premier paragraphe court.",
+        "Deuxième paragraphe, un peu plus long que le premier."
+    ]
+
+
+def test_short_text_is_a_single_chunk():
+    assert chunk_text("  court  ", max_chunk_size=500) == [
+        {'text': 'court', 'start': 2, 'end': 7, 'index': 0}
+    ]
+    assert chunk_text("   ") == []
+
+
+def test_assign_pages_spanning_chunks():
+    text = "Première page.\n\fDeuxième page.\n\fTroisième page.\n"
+    chunks = assign_pages(chunk_text(text, max_chunk_size=35, chunk_overlap=0), text)
+
+    assert [chunk['metadata'] for chunk in chunks] == [
+        {'page': 1, 'page_end': 2}, {'page': 3, 'page_end': 3}
+    ]
+    assert assign_pages(chunk_text("Sans saut de page."), "Sans saut de page.")[0].get('metadata') is None
@@ -0,0 +1,408 @@
+"""Tests de la base vectorielle TF-IDF."""
+
+import math
+import random
+
+import numpy as np
+
+from rag_app.core.vector_database import VectorDatabase
+
+
+def _random_texts(count, seed=0, vocabulary_size=300, length=40):
+    rng = random.Random(seed)
+    words = [f"mot{i}" for i in range(vocabulary_size)]
+    return [" ".join(rng.choices(words, k=length)) for _ in range(count)]
+
+
+def _build(texts, **kwargs):
+    db = VectorDatabase(**kwargs)
+    for i, text in enumerate(texts):
+        db.add_document(text, {'source': f"doc_{i}.txt", 'category': 'test'})
+    return db
+
+
+def test_incremental_add_keeps_frozen_vocabulary():
+    """Sous le seuil de dérive, les ajouts ne recalculent pas le vocabulaire."""
+    db = _build(_random_texts(50), refit_drift_threshold=0.5)
+    fitted = db._fitted_doc_count
+    idf_before = db.vectorizer.idf_.copy()
+
+    db.add_document(_random_texts(1, seed=99)[0], {'source': 'nouveau.txt'})
+
+    assert db._fitted_doc_count == fitted
+    assert db.vectors.shape[0] == len(db.documents)
+    np.testing.assert_array_equal(db.vectorizer.idf_, idf_before)
+
+
+def test_drift_over_threshold_triggers_refit():
+    db = _build(_random_texts(10), refit_drift_threshold=0.2)
+    for text in _random_texts(5, seed=1):
+        db.add_document(text, {'source': 'extra.txt'})
+
+    assert db.get_index_drift() <= 0.2
+    assert db.vectors.shape[0] == len(db.documents)
+
+
+def test_rebuild_matches_full_refit():
+    texts = _random_texts(80)
+    incremental = _build(texts)
+    full = _build(texts, incremental=False)
+
+    incremental.rebuild()
+
+    assert incremental.get_index_drift() == 0
+    np.testing.assert_allclose(incremental.vectors.toarray(), full.vectors.toarray())
+
+
+def test_frozen_idf_within_documented_tolerance():
+    """L'IDF recalculé ne dépasse pas l'IDF gelé de plus de ln(1 + seuil)."""
+    threshold = 0.2
+    texts = _random_texts(120, vocabulary_size=150)
+    incremental = _build(texts, refit_drift_threshold=threshold)
+    full = _build(texts, incremental=False)
+
+    frozen = dict(zip(incremental.vectorizer.get_feature_names_out(), incremental.vectorizer.idf_))
+    refit = dict(zip(full.vectorizer.get_feature_names_out(), full.vectorizer.idf_))
+    common = set(frozen) & set(refit)
+
+    assert common
+    assert max(refit[t] - frozen[t] for t in common) <= math.log(1 + threshold) + 1e-9
+
+
+def test_remove_document_drops_matching_row():
+    db = _build(_random_texts(30))
+    expected = np.delete(db.vectors.toarray(), 4, axis=0)
+
+    assert db.remove_document(4)
+    np.testing.assert_allclose(db.vectors.toarray(), expected)
+
+
+def test_batch_defers_vectorization_until_exit():
+    db = _build(_random_texts(20))
+
+    with db.batch():
+        for text in _random_texts(10, seed=5):
+            db.add_document(text, {'source': 'lot.txt'})
+        assert db.vectors.shape[0] == 20
+
+    assert db.vectors.shape[0] == 30
+
+
+def test_add_documents_matches_sequential_adds():
+    texts = _random_texts(40)
+    sequential = _build(texts, incremental=False)
+    bulk = VectorDatabase(incremental=False)
+
+    added = bulk.add_documents(
+        (text, {'source': f"doc_{i}.txt", 'category': 'test'}) for i, text in enumerate(texts)
+    )
+
+    assert added == 40
+    np.testing.assert_allclose(bulk.vectors.toarray(), sequential.vectors.toarray())
+
+
+def test_remove_inside_batch_keeps_rows_aligned():
+    db = _build(_random_texts(20))
+
+    with db.batch():
+        db.add_documents([{'text': t, 'metadata': {}} for t in _random_texts(3, seed=7)])
+        db.remove_document(2)
+        db.remove_document(len(db.documents) - 1)
+
+    assert db.vectors.shape[0] == len(db.documents) == 21
+
+
+def test_save_load_roundtrip_with_lazy_texts(tmp_path):
+    texts = _random_texts(25)
+    db = _build(texts)
+    db.add_image('photo.png', 'facture total', 'Image: photo.png', ['Image'], {'source': 'photo.png'})
+    db.save(str(tmp_path / 'vector_db'))
+
+    loaded = VectorDatabase.load(str(tmp_path / 'vector_db'))
+
+    assert not loaded.vectors.data.flags.owndata  # projeté depuis le disque
+    assert loaded.get_stats()['total_characters'] == db.get_stats()['total_characters']
+    assert not loaded.documents[0].text_loaded
+    assert loaded.documents[3]['text'] == texts[3]
+    assert loaded.documents[4].get('metadata') == {'source': 'doc_4.txt', 'category': 'test'}
+    assert len(loaded.images) == 1
+    assert ([r['document']['metadata']['source'] for r in loaded.search(texts[7])]
+            == [r['document']['metadata']['source'] for r in db.search(texts[7])])
+
+
+def test_loaded_database_accepts_new_documents_and_resaves(tmp_path):
+    path = str(tmp_path / 'vector_db')
+    _build(_random_texts(25)).save(path)
+
+    loaded = VectorDatabase.load(path)
+    loaded.add_document("nouveau document mot1 mot2", {'source': 'nouveau.txt'})
+    loaded.save(path)
+    reloaded = VectorDatabase.load(path)
+
+    assert len(reloaded.documents) == 26
+    assert reloaded.documents[0]['text'] == loaded.documents[0]['text']
+    assert reloaded.documents[-1]['text'] == "nouveau document mot1 mot2"
+    assert len(list(tmp_path.joinpath('vector_db').glob('snapshot-*'))) == 1
+
+
+def test_unloaded_texts_survive_new_snapshot(tmp_path):
+    path = str(tmp_path / 'vector_db')
+    texts = _random_texts(1200)
+    _build(texts).save(path)
+
+    loaded = VectorDatabase.load(path)
+    # Plus de suppressions que le seuil du journal : compaction en nouvel instantané
+    loaded.remove_documents_by_ids([doc['id'] for doc in loaded.documents[:601]])
+    loaded.save(path)
+
+    assert _snapshots(tmp_path / 'vector_db') == ['snapshot-000002']
+    assert not loaded.documents[0].text_loaded
+    assert loaded.documents[0]['text'] == texts[601]
+    assert loaded.documents[-1]['text'] == texts[-1]
+
+
+def test_removing_image_documents_drops_their_images(tmp_path):
+    path = tmp_path / 'vector_db'
+    db = _build(_random_texts(40))
+    for name in ('a.png', 'b.png', 'c.png'):
+        db.add_image(f'/scans/{name}', "texte extrait", "capture", ['scan'], {'source': name})
+    db.save(str(path))
+
+    ids = {d['metadata']['image_path']: d['id'] for d in db.documents if d['type'] == 'image_document'}
+    db.remove_documents_by_ids([ids['/scans/a.png']])
+    db.remove_document_by_id(ids['/scans/b.png'])
+    assert [image['image_path'] for image in db.get_all_images()] == ['/scans/c.png']
+
+    db.save(str(path))
+    reloaded = VectorDatabase.load(str(path))
+    assert [image['image_path'] for image in reloaded.get_all_images()] == ['/scans/c.png']
+
+
+def test_legacy_pickle_is_loaded(tmp_path):
+    import pickle
+
+    db = _build(_random_texts(10))
+    with open(tmp_path / 'vector_db.pkl', 'wb') as f:
+        pickle.dump(db, f)
+
+    loaded = VectorDatabase.load(str(tmp_path / 'vector_db.pkl'))
+
+    assert len(loaded.documents) == 10
+    assert loaded.vectors.shape == db.vectors.shape
+
+
+def _snapshots(path):
+    return sorted(p.name for p in path.glob('snapshot-*'))
+
+
+def test_save_appends_to_journal_without_rewriting_snapshot(tmp_path):
+    path = tmp_path / 'vector_db'
+    db = _build(_random_texts(40))
+    db.save(str(path))
+    snapshot = _snapshots(path)
+    texts_size = (path / snapshot[0] / 'texts.bin').stat().st_size
+
+    db.add_document(_random_texts(1, seed=3)[0], {'source': 'ajout.txt'})
+    db.remove_document(5)
+    db.save(str(path))
+
+    assert _snapshots(path) == snapshot
+    assert (path / snapshot[0] / 'texts.bin').stat().st_size == texts_size
+    assert (path / snapshot[0] / 'journal.log').stat().st_size > 0
+
+    reloaded = VectorDatabase.load(str(path))
+    assert [d['id'] for d in reloaded.documents] == [d['id'] for d in db.documents]
+    np.testing.assert_allclose(reloaded.vectors.toarray(), db.vectors.toarray())
+
+
+def test_journal_removals_are_replayed_in_one_pass(tmp_path, monkeypatch):
+    path = tmp_path / 'vector_db'
+    db = _build(_random_texts(40))
+    db.save(str(path))
+    for i, text in enumerate(_random_texts(3, seed=4)):
+        db.add_document(text, {'source': f'ajout_{i}.txt'})
+    added = [d['id'] for d in db.documents[-3:]]
+    for doc_id in [3, 17, added[1], 30, added[0]]:
+        db.remove_document_by_id(doc_id)
+    db.save(str(path))
+
+    calls = []
+    remove = VectorDatabase.remove_documents_by_ids
+    monkeypatch.setattr(VectorDatabase, 'remove_documents_by_ids',
+                        lambda self, doc_ids: calls.append(list(doc_ids)) or remove(self, doc_ids))
+    reloaded = VectorDatabase.load(str(path))
+
+    assert calls == [[3, 17, added[1], 30, added[0]]]
+    assert [d['id'] for d in reloaded.documents] == [d['id'] for d in db.documents]
+    np.testing.assert_allclose(reloaded.vectors.toarray(), db.vectors.toarray())
+
+
+def test_torn_journal_tail_is_ignored_and_overwritten(tmp_path):
+    path = tmp_path / 'vector_db'
+    db = _build(_random_texts(40))
+    db.save(str(path))
+    db.add_document("premier ajout mot1", {'source': 'a.txt'})
+    db.save(str(path))
+
+    journal = path / _snapshots(path)[0] / 'journal.log'
+    with open(journal, 'ab') as f:
+        f.write(b'0000abcd\t{"op": "add", "document": {"id": 99, "te')
+
+    reloaded = VectorDatabase.load(str(path))
+    assert len(reloaded.documents) == 41
+
+    reloaded.add_document("second ajout mot2", {'source': 'b.txt'})
+    reloaded.save(str(path))
+    again = VectorDatabase.load(str(path))
+    assert [d['metadata'].get('source') for d in again.documents[-2:]] == ['a.txt', 'b.txt']
+
+
+def test_refit_forces_compaction(tmp_path):
+    path = tmp_path / 'vector_db'
+    db = _build(_random_texts(40))
+    db.save(str(path))
+    first = _snapshots(path)
+
+    db.add_document("ajout mot3", {'source': 'c.txt'})
+    db.rebuild()
+    db.save(str(path))
+
+    assert _snapshots(path) != first
+    assert not (path / _snapshots(path)[0] / 'journal.log').exists()
+    assert len(VectorDatabase.load(str(path)).documents) == 41
+
+
+def test_journal_compaction_keeps_unloaded_texts_readable(tmp_path, monkeypatch):
+    from rag_app.core import vector_database
+
+    monkeypatch.setitem(vector_database.STORAGE_CONFIG, 'compaction_min_records', 3)
+    monkeypatch.setitem(vector_database.STORAGE_CONFIG, 'compaction_ratio', 0.0)
+    path = tmp_path / 'vector_db'
+    texts = _random_texts(40)
+    db = _build(texts)
+    db.rebuild()
+    db.save(str(path))
+
+    loaded = VectorDatabase.load(str(path))
+    loaded.add_document("ajout un mot1", {'source': 'a.txt'})
+    loaded.save(str(path))
+    assert _snapshots(path) == ['snapshot-000001']
+
+    # Le journal dépasse le seuil : la sauvegarde compacte en nouvel instantané
+    loaded.add_document("ajout deux mot2", {'source': 'b.txt'})
+    loaded.add_document("ajout trois mot3", {'source': 'c.txt'})
+    loaded.add_document("ajout quatre mot4", {'source': 'd.txt'})
+    loaded.save(str(path))
+    assert _snapshots(path) == ['snapshot-000002']
+
+    assert not loaded.documents[5].text_loaded
+    assert loaded.documents[5]['text'] == texts[5]
+    loaded.compact(str(path))
+    assert loaded.documents[6]['text'] == texts[6]
+
+
+def test_ranked_indices_match_full_sort_with_ties():
+    from rag_app.core.vector_database import iter_ranked_indices
+
+    rng = np.random.default_rng(0)
+    similarities = np.round(rng.random(5000) * rng.integers(0, 2, 5000), 2)
+    reference = [int(i) for i in np.argsort(similarities, kind='stable')[::-1]
+                 if similarities[i] >= 0.1]
+
+    for first_batch in (1, 5, 200, 10000):
+        assert list(iter_ranked_indices(similarities, 0.1, first_batch)) == reference
+
+
+def test_search_with_filters_fills_top_k():
+    db = VectorDatabase()
+    for i, text in enumerate(_random_texts(60, vocabulary_size=40)):
+        db.add_document(text, {'source': f"doc_{i}.txt", 'category': 'pair' if i % 2 else 'impair'})
+
+    query = _random_texts(1, seed=11, vocabulary_size=40)[0]
+    expected = [r for r in db.search(query, top_k=60)
+                if r['document']['metadata']['category'] == 'pair'][:7]
+
+    assert db.search(query, top_k=7, filter_by={'category': 'pair'}) == expected
+
+
+def _brute_force_search(db, query, top_k, filter_by=None, filter_type=None):
+    """Recherche de référence : score de tout le corpus puis filtrage document par document."""
+    from sklearn.metrics.pairwise import cosine_similarity
+
+    similarities = cosine_similarity(db.vectorizer.transform([query]), db.vectors)[0]
+    results = []
+    for idx in np.argsort(similarities, kind='stable')[::-1]:
+        if similarities[idx] < 0.1:
+            break
+        document = db.documents[idx]
+        if filter_by and not db._matches_filter(document, filter_by):
+            continue
+        if filter_type and document.get('type') != filter_type:
+            continue
+        results.append({'document': document, 'similarity': float(similarities[idx])})
+        if len(results) >= top_k:
+            break
+    return results
+
+
+def test_metadata_prefilter_matches_brute_force():
+    db = VectorDatabase()
+    for i, text in enumerate(_random_texts(120, vocabulary_size=40)):
+        db.add_document(text, {
+            'source': f"doc_{i}.txt",
+            'category': ['Candidature', 'Projet', 'Notes'][i % 3],
+            'project': f"M{400 + i % 7}",
+            'tags': 'CV,BA' if i % 4 == 0 else 'Annonce',
+            'lang': 'fr' if i % 5 else 'en'
+        })
+    db.add_image('scan.png', 'mot1 mot2 mot3', 'Image', ['Document'], {'category': 'Projet'})
+    db.remove_document(10)
+    query = _random_texts(1, seed=3, vocabulary_size=40)[0] + " mot1 mot2"
+
+    cases = [
+        ({'category': 'projet'}, None),
+        ({'category': ['candid', 'notes'], 'project': ['M401', 'M402']}, None),
+        ({'tags': ['cv']}, None),
+        ({'project': ['M403'], 'lang': 'fr'}, None),
+        ({'category': 'Projet'}, 'image_document'),
+        (None, 'document'),
+        ({'status': 'inconnu'}, None),
+    ]
+    for filter_by, filter_type in cases:
+        assert (db.search(query, top_k=8, filter_by=filter_by, filter_type=filter_type)
+                == _brute_force_search(db, query, 8, filter_by, filter_type))
+
+
+def test_search_many_matches_individual_searches():
+    db = _build(_random_texts(80, vocabulary_size=60))
+    queries = _random_texts(6, seed=21, vocabulary_size=60, length=5) + ["", "inconnu"]
+
+    batched = db.search_many(queries, top_k=10, filter_by={'category': ['test']})
+
+    assert len(batched) == len(queries)
+    assert batched == [db.search(q, top_k=10, filter_by={'category': ['test']}) for q in queries]
+    assert db.search_many([]) == []
+
+
+def test_chunks_keep_parent_and_search_groups_by_parent():
+    from rag_app.utils.text_chunker import chunk_text
+
+    db = VectorDatabase()
+    texts = {}
+    for name, seed in (('a.pdf', 1), ('b.pdf', 2), ('c.pdf', 3)):
+        texts[name] = "\n\n".join(_random_texts(12, seed=seed, vocabulary_size=80, length=30))
+        parent_id = db.add_document_chunks(chunk_text(texts[name], 400, 40), {'source': name})
+        assert parent_id not in [d['id'] for d in db.documents]
+
+    chunk = db.documents[5]
+    metadata = chunk['metadata']
+    assert texts[metadata['source']][metadata['chunk_start']:metadata['chunk_end']] == chunk['text']
+    assert metadata['chunk_count'] > 1
+
+    groups = db.search_grouped(chunk['text'], top_k=2, chunks_per_group=2)
+
+    assert groups[0]['document'] is chunk
+    assert len({g['parent_id'] for g in groups}) == len(groups) <= 2
+    for group in groups:
+        assert 1 <= len(group['chunks']) <= 2
+        assert all(c['document']['metadata']['parent_id'] == group['parent_id'] for c in group['chunks'])